@@ -78,6 +78,16 @@ CTRL_RATE_LIMIT_MIN = 100
 CTRL_BURST_LIMIT_MIN = 25
 OVS_MAX_RATE = 2 ** 35 - 1
 
+# Leading flow mod command of each line of an "add-flows" bundle, indexed by
+# (action, strict).
+BUNDLE_FLOW_COMMANDS = {
+    ('add', False): 'add',
+    ('mod', False): 'modify',
+    ('mod', True): 'modify_strict',
+    ('del', False): 'delete',
+    ('del', True): 'delete_strict',
+}
+
 ActionFlowTuple = collections.namedtuple('ActionFlowTuple',
                                          ['action', 'flow', 'flow_group_id'])
 
@@ -120,6 +130,9 @@ def get_gre_tunnel_port_type(remote_ip, local_ip):
 
 
 class VifPort:
+    # NOTE: the agents keep one instance per port they wire
+    __slots__ = ('port_name', 'ofport', 'vif_id', 'vif_mac', 'switch')
+
     def __init__(self, port_name, ofport, vif_id, vif_mac, switch):
         self.port_name = port_name
         self.ofport = ofport
@@ -499,6 +512,31 @@ class OVSBridge(BaseOVS):
                           port_name)
         return ofport
 
+    @_ovsdb_retry
+    def _get_ports_ofports(self, port_names):
+        ofports = {
+            port['name']: port['ofport'] for port in
+            self.get_ports_attributes('Interface', columns=['name', 'ofport'],
+                                      ports=port_names, if_exists=True)}
+        if UNASSIGNED_OFPORT in ofports.values():
+            return UNASSIGNED_OFPORT
+        return ofports
+
+    def get_ports_ofports(self, port_names):
+        """Get the assigned ofports of several ports, waiting for them.
+
+        :returns: dict of the ofports by port name, INVALID_OFPORT for the
+                  ports not found or without an ofport after ovsdb_timeout.
+        """
+        try:
+            ofports = self._get_ports_ofports(port_names)
+        except tenacity.RetryError:
+            LOG.exception("Timed out retrieving ofports on ports %s.",
+                          port_names)
+            ofports = {}
+        return {port_name: ofports.get(port_name, INVALID_OFPORT)
+                for port_name in port_names}
+
     @_ovsdb_retry
     def _get_datapath_id(self):
         return self.db_get_val('Bridge', self.br_name, 'datapath_id')
@@ -527,6 +565,45 @@ class OVSBridge(BaseOVS):
                      for item in _list]
             self.do_action_flows(action, flows, use_bundle=use_bundle)
 
+    def _set_flow_cookie(self, action, kw):
+        if action == 'del':
+            if kw.get('cookie') == COOKIE_ANY:
+                # special value COOKIE_ANY was provided, unset
+                # cookie to match flows whatever their cookie is
+                kw.pop('cookie')
+                if kw.get('cookie_mask'):  # non-zero cookie mask
+                    raise Exception(_("cookie=COOKIE_ANY but cookie_mask "
+                                      "set to %s") % kw.get('cookie_mask'))
+            elif 'cookie' in kw:
+                # a cookie was specified, use it
+                kw['cookie'] = check_cookie_mask(kw['cookie'])
+            else:
+                # nothing was specified about cookies, use default
+                kw['cookie'] = "%d/-1" % self._default_cookie
+        else:
+            if 'cookie' not in kw:
+                kw['cookie'] = self._default_cookie
+
+    def do_action_flows_in_bundle(self, action_flow_tuples):
+        """Apply a list of flow additions, modifications and deletions in
+        one single OpenFlow bundle, atomically and in the given order.
+        """
+        flow_strs = []
+        for action, kw, _flow_group_id in action_flow_tuples:
+            self._set_flow_cookie(action, kw)
+            strict = kw.pop('strict', False)
+            if action == 'add' and strict:
+                msg = "cannot use 'strict' with 'add' action"
+                raise exceptions.InvalidInput(error_message=msg)
+            flow_strs.append('{} {}'.format(
+                BUNDLE_FLOW_COMMANDS[(action, strict)],
+                _build_flow_expr_str(kw, action, strict)))
+        LOG.debug("Processing %d OpenFlow rules in one bundle.",
+                  len(flow_strs))
+        # NOTE: add-flows accepts a leading command on every line, which
+        # allows mixing additions, modifications and deletions.
+        self.run_ofctl('add-flows', ['--bundle', '-'], '\n'.join(flow_strs))
+
     def do_action_flows(self, action, kwargs_list, use_bundle=False,
                         flow_group_id=None):
         # we can't mix strict and non-strict, so we'll use the first kw
@@ -534,23 +611,7 @@ class OVSBridge(BaseOVS):
         strict = kwargs_list[0].get('strict', False)
 
         for kw in kwargs_list:
-            if action == 'del':
-                if kw.get('cookie') == COOKIE_ANY:
-                    # special value COOKIE_ANY was provided, unset
-                    # cookie to match flows whatever their cookie is
-                    kw.pop('cookie')
-                    if kw.get('cookie_mask'):  # non-zero cookie mask
-                        raise Exception(_("cookie=COOKIE_ANY but cookie_mask "
-                                          "set to %s") % kw.get('cookie_mask'))
-                elif 'cookie' in kw:
-                    # a cookie was specified, use it
-                    kw['cookie'] = check_cookie_mask(kw['cookie'])
-                else:
-                    # nothing was specified about cookies, use default
-                    kw['cookie'] = "%d/-1" % self._default_cookie
-            else:
-                if 'cookie' not in kw:
-                    kw['cookie'] = self._default_cookie
+            self._set_flow_cookie(action, kw)
 
             if action in ('mod', 'del'):
                 if kw.pop('strict', False) != strict:
@@ -620,12 +681,9 @@ class OVSBridge(BaseOVS):
     def deferred(self, *args, **kwargs):
         return DeferredOVSBridge(self, *args, **kwargs)
 
-    def add_tunnel_port(self, port_name, remote_ip, local_ip,
-                        tunnel_type=p_const.TYPE_GRE,
-                        vxlan_udp_port=p_const.VXLAN_UDP_PORT,
-                        dont_fragment=True,
-                        tunnel_csum=False,
-                        tos=None):
+    def _get_tunnel_port_attrs(self, remote_ip, local_ip, tunnel_type,
+                               vxlan_udp_port, dont_fragment, tunnel_csum,
+                               tos):
         if tunnel_type == p_const.TYPE_GRE:
             tunnel_type = get_gre_tunnel_port_type(remote_ip, local_ip)
         attrs = [('type', tunnel_type)]
@@ -656,9 +714,41 @@ class OVSBridge(BaseOVS):
             # over IPv6 are not supported.
             options['packet_type'] = 'legacy_l2'
         attrs.append(('options', options))
+        return attrs
 
+    def add_tunnel_port(self, port_name, remote_ip, local_ip,
+                        tunnel_type=p_const.TYPE_GRE,
+                        vxlan_udp_port=p_const.VXLAN_UDP_PORT,
+                        dont_fragment=True,
+                        tunnel_csum=False,
+                        tos=None):
+        attrs = self._get_tunnel_port_attrs(
+            remote_ip, local_ip, tunnel_type, vxlan_udp_port, dont_fragment,
+            tunnel_csum, tos)
         return self.add_port(port_name, *attrs)
 
+    def add_tunnel_ports(self, tunnel_ports, local_ip,
+                         vxlan_udp_port=p_const.VXLAN_UDP_PORT,
+                         dont_fragment=True,
+                         tunnel_csum=False,
+                         tos=None):
+        """Add several tunnel ports in a single OVSDB transaction.
+
+        :param tunnel_ports: dict of (remote_ip, tunnel_type) tuples by port
+                             name.
+        :returns: dict of the ofports by port name, see get_ports_ofports.
+        """
+        if not tunnel_ports:
+            return {}
+        with self.ovsdb.transaction() as txn:
+            for port_name, (remote_ip, tunnel_type) in tunnel_ports.items():
+                attrs = self._get_tunnel_port_attrs(
+                    remote_ip, local_ip, tunnel_type, vxlan_udp_port,
+                    dont_fragment, tunnel_csum, tos)
+                txn.add(self.ovsdb.add_port(self.br_name, port_name))
+                txn.add(self.ovsdb.db_set('Interface', port_name, *attrs))
+        return self.get_ports_ofports(list(tunnel_ports))
+
     def add_patch_port(self, local_name, remote_name):
         attrs = [('type', 'patch'),
                  ('options', {'peer': remote_name})]
@@ -1336,7 +1426,8 @@ class DeferredOVSBridge:
     ALLOWED_PASSTHROUGHS = 'add_port', 'add_tunnel_port', 'delete_port'
 
     def __init__(self, br, full_ordered=False,
-                 order=('add', 'mod', 'del'), use_bundle=False):
+                 order=('add', 'mod', 'del'), use_bundle=False,
+                 single_bundle=False):
         '''Constructor.
 
         :param br: wrapped bridge
@@ -1344,6 +1435,9 @@ class DeferredOVSBridge:
         :param order: Optional, define in which order flow are applied
         :param use_bundle: Optional, a bool whether --bundle should be passed
                            to all ofctl commands. Default is set to False.
+        :param single_bundle: Optional, a bool whether all the deferred flows
+                              are applied in one single bundle, whatever
+                              their action. Default is set to False.
         '''
 
         self.br = br
@@ -1353,6 +1447,7 @@ class DeferredOVSBridge:
             self.weights = {y: x for x, y in enumerate(self.order)}
         self.action_flow_tuples = []
         self.use_bundle = use_bundle
+        self.single_bundle = single_bundle
 
     def __getattr__(self, name):
         if name in self.ALLOWED_PASSTHROUGHS:
@@ -1378,6 +1473,10 @@ class DeferredOVSBridge:
         if not self.full_ordered:
             action_flow_tuples.sort(key=lambda flow: self.weights[flow.action])
 
+        if self.single_bundle:
+            self.br.do_action_flows_in_bundle(action_flow_tuples)
+            return
+
         flows_by_action = itertools.groupby(action_flow_tuples,
                                             key=lambda af: af.action)
         for action, flows in flows_by_action:
@@ -13,9 +13,11 @@
 #    under the License.
 
 import collections
+import threading
 
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from ovsdbapp.backend.ovs_idl import event as idl_event
 
 from neutron.agent.common import async_process
 from neutron.agent.ovsdb import api as ovsdb
@@ -29,6 +31,29 @@ OVSDB_ACTION_INITIAL = 'initial'
 OVSDB_ACTION_INSERT = 'insert'
 OVSDB_ACTION_DELETE = 'delete'
 OVSDB_ACTION_NEW = 'new'
+INTERFACE_COLUMNS = ('name', 'ofport', 'external_ids')
+
+
+def filter_events_by_bridge(events, bridge_names, ovs):
+    """Return the Interface events of the ports of the given bridges."""
+    port_to_bridge = {}
+    events_filtered = collections.defaultdict(list)
+    for device in events['added']:
+        bridge_name = ovs.get_bridge_for_iface(device['name'])
+        if bridge_name in bridge_names:
+            port_to_bridge[device['name']] = bridge_name
+            events_filtered['added'].append(device)
+
+    for (etype, devs) in ((etype, devs) for (etype, devs) in events.items()
+                          if etype in ('removed', 'modified')):
+        for device in devs:
+            bridge_name = port_to_bridge.get(device['name'])
+            if etype == 'removed':
+                port_to_bridge.pop(device['name'], None)
+            if bridge_name in bridge_names:
+                events_filtered[etype].append(device)
+
+    return events_filtered
 
 
 class OvsdbMonitor(async_process.AsyncProcess):
@@ -162,22 +187,114 @@ class SimpleInterfaceMonitor(OvsdbMonitor):
     def _filter_events(self, events):
         if not (self._bridge_names and self._ovs):
             return events
+        return filter_events_by_bridge(events, self._bridge_names, self._ovs)
+
+
+class InterfaceEvent(idl_event.RowEvent):
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        table = 'Interface'
+        super().__init__((self.ROW_CREATE, self.ROW_UPDATE, self.ROW_DELETE),
+                         table, None)
+        self.event_name = 'InterfaceEvent'
+
+    def match_fn(self, event, row, old):
+        if event != self.ROW_UPDATE:
+            return True
+        # Updates of other columns (e.g. statistics) are not reported by
+        # the "ovsdb-client monitor" process either.
+        return any(hasattr(old, column) for column in INTERFACE_COLUMNS)
+
+    def run(self, event, row, old):
+        self.monitor.add_event(event, row)
+
+
+class IdlInterfaceMonitor:
+    """Monitors the Interface table using the native OVSDB IDL.
+
+    This is a drop-in replacement of SimpleInterfaceMonitor that receives
+    the Interface row events from the IDL connection already used by the
+    agent, instead of spawning and parsing an "ovsdb-client monitor"
+    process. The events returned by get_events() have the same format.
+    """
+
+    def __init__(self, ovs, bridge_names=None):
+        self._ovs = ovs
+        self._bridge_names = bridge_names or []
+        self._lock = threading.Lock()
+        self._event = None
+        self.new_events = {'added': [], 'removed': [], 'modified': []}
+
+    @property
+    def _idl(self):
+        return self._ovs.ovsdb.idl_monitor
+
+    @staticmethod
+    def _row_to_device(row):
+        # "ofport" is an optional column: the IDL returns an empty list
+        # until Open vSwitch has assigned one to the interface.
+        ofport = row.ofport[0] if row.ofport else []
+        return {'name': row.name,
+                'ofport': ofport,
+                'external_ids': dict(row.external_ids)}
+
+    def start(self, block=False, timeout=60):
+        if self._event:
+            return
+        self._event = InterfaceEvent(self)
+        self._idl.notify_handler.watch_event(self._event)
+        # As the "initial" rows of "ovsdb-client monitor", report every
+        # existing interface as added.
+        rows = list(self._idl.tables['Interface'].rows.values())
+        with self._lock:
+            added_names = {device['name']
+                           for device in self.new_events['added']}
+            for row in rows:
+                device = self._row_to_device(row)
+                if device['name'] not in added_names:
+                    self.new_events['added'].append(device)
+
+    def stop(self):
+        if not self._event:
+            return
+        self._idl.notify_handler.unwatch_event(self._event)
+        self._event = None
+
+    def is_active(self):
+        return self._event is not None
 
-        port_to_bridge = {}
-        events_filtered = collections.defaultdict(list)
-        for device in events['added']:
-            bridge_name = self._ovs.get_bridge_for_iface(device['name'])
-            if bridge_name in self._bridge_names:
-                port_to_bridge[device['name']] = bridge_name
-                events_filtered['added'].append(device)
-
-        for (etype, devs) in ((etype, devs) for (etype, devs) in events.items()
-                              if etype in ('removed', 'modified')):
-            for device in devs:
-                bridge_name = port_to_bridge.get(device['name'])
-                if etype == 'removed':
-                    port_to_bridge.pop(device['name'], None)
-                if bridge_name in self._bridge_names:
-                    events_filtered[etype].append(device)
-
-        return events_filtered
+    def add_event(self, event, row):
+        device = self._row_to_device(row)
+        with self._lock:
+            if event == InterfaceEvent.ROW_CREATE:
+                self.new_events['added'].append(device)
+            elif event == InterfaceEvent.ROW_DELETE:
+                self.new_events['removed'].append(device)
+            else:
+                for added in self.new_events['added']:
+                    if added['name'] == device['name']:
+                        # Update the ofport of a device not yet reported.
+                        added.update(device)
+                        break
+                else:
+                    self.new_events['modified'].append(device)
+
+    @property
+    def has_updates(self):
+        """Indicate whether the Interface table has been updated."""
+        if not self.is_active():
+            LOG.error("Interface IDL monitor is not active")
+        with self._lock:
+            return bool(self.new_events['added'] or
+                        self.new_events['removed'] or
+                        self.new_events['modified'])
+
+    def get_events(self):
+        with self._lock:
+            events = self.new_events
+            self.new_events = {'added': [], 'removed': [], 'modified': []}
+        LOG.debug('Interface IDL monitor events: %s', events)
+        if not (self._bridge_names and self._ovs):
+            return events
+        return filter_events_by_bridge(events, self._bridge_names, self._ovs)
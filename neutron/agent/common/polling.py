@@ -26,13 +26,20 @@ from neutron.agent.common import ovsdb_monitor
 
 LOG = logging.getLogger(__name__)
 
+OVSDB_MONITOR_CLIENT = 'ovsdb-client'
+OVSDB_MONITOR_NATIVE = 'native'
+
 
 @contextlib.contextmanager
 def get_polling_manager(minimize_polling=False,
                         ovsdb_monitor_respawn_interval=(
                             ovs_const.DEFAULT_OVSDBMON_RESPAWN),
-                        bridge_names=None, ovs=None):
-    if minimize_polling:
+                        bridge_names=None, ovs=None,
+                        ovsdb_monitor_backend=OVSDB_MONITOR_CLIENT):
+    if minimize_polling and ovsdb_monitor_backend == OVSDB_MONITOR_NATIVE:
+        pm = IdlInterfacePollingMinimizer(bridge_names=bridge_names, ovs=ovs)
+        pm.start()
+    elif minimize_polling:
         pm = InterfacePollingMinimizer(
             ovsdb_monitor_respawn_interval=ovsdb_monitor_respawn_interval,
             bridge_names=bridge_names, ovs=ovs)
@@ -80,6 +87,31 @@ class InterfacePollingMinimizer(base_polling.BasePollingManager):
         return self._monitor.get_events()
 
 
+class IdlInterfacePollingMinimizer(base_polling.BasePollingManager):
+    """Monitors the native OVSDB IDL to determine when polling is required.
+
+    The Interface events are received from the IDL connection of the agent,
+    so no "ovsdb-client monitor" process is spawned.
+    """
+
+    def __init__(self, bridge_names=None, ovs=None):
+        super().__init__()
+        self._monitor = ovsdb_monitor.IdlInterfaceMonitor(
+            ovs, bridge_names=bridge_names)
+
+    def start(self):
+        self._monitor.start()
+
+    def stop(self):
+        self._monitor.stop()
+
+    def _is_polling_required(self):
+        return self._monitor.has_updates
+
+    def get_events(self):
+        return self._monitor.get_events()
+
+
 def filter_bridge_names(br_names):
     """Bridge names to filter events received in the Interface monitor
 
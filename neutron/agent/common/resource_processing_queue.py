@@ -13,13 +13,37 @@
 #    under the License.
 #
 
+import bisect
+import collections
 import datetime
+import heapq
 import queue
+import threading
 import time
 
+from oslo_config import cfg
+from oslo_log import log as logging
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 
+from neutron.conf.agent import common as agent_config
+
+LOG = logging.getLogger(__name__)
+
+agent_config.register_resource_processing_opts(cfg.CONF)
+
+# Update classes, scheduled fairly against each other by the
+# ResourceProcessingQueue according to their weights.
+UPDATE_CLASS_HA = 'ha'
+UPDATE_CLASS_USER = 'user'
+UPDATE_CLASS_RESYNC = 'resync'
+DEFAULT_CLASS_WEIGHTS = {UPDATE_CLASS_HA: 4,
+                         UPDATE_CLASS_USER: 2,
+                         UPDATE_CLASS_RESYNC: 1}
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
 
 class ResourceUpdate:
     """Encapsulates a resource update
@@ -29,11 +53,15 @@ class ResourceUpdate:
 
     Priority values are ordered from higher (0) to lower (>0) by the caller,
     and are therefore not defined here, but must be done by the consumer.
+    The update class (UPDATE_CLASS_*) selects the queue the update waits in;
+    priorities are only compared between updates of the same class.
     """
 
     def __init__(self, id, priority,
-                 action=None, resource=None, timestamp=None, tries=5):
+                 action=None, resource=None, timestamp=None, tries=5,
+                 update_class=UPDATE_CLASS_USER):
         self.priority = priority
+        self.update_class = update_class
         self.timestamp = timestamp
         if not timestamp:
             self.timestamp = timeutils.utcnow()
@@ -46,6 +74,9 @@ class ResourceUpdate:
         # procedure.
         self.update_id = uuidutils.generate_uuid()
         self.create_time = self.start_time = time.time()
+        # Time of the last ResourceProcessingQueue.add() call; an update can
+        # be queued again (to be retried) after it has been processed.
+        self.queue_time = self.create_time
 
     def set_start_time(self):
         # Set the start_time to 'now' - can be used by callers to help
@@ -161,21 +192,188 @@ class ExclusiveResourceProcessor:
                 yield update
 
 
+class LatencyHistogram:
+    """Histogram of the latencies, in seconds, of the processed updates"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # The last count is for the latencies above the last bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, latency):
+        self.counts[bisect.bisect_left(self.buckets, latency)] += 1
+        self.count += 1
+        self.sum += latency
+
+    def to_dict(self):
+        bounds = self.buckets + (float('inf'),)
+        return {'count': self.count,
+                'sum': self.sum,
+                'buckets': dict(zip(bounds, self.counts))}
+
+
+class _UpdateClassQueue:
+    """The pending updates and the scheduling state of an update class"""
+
+    def __init__(self, weight=1, limit=0):
+        self.updates = []
+        # Number of pending updates of each resource ID
+        self.ids = collections.Counter()
+        self.weight = weight
+        # Maximum number of workers processing updates of this class, 0 for
+        # no limit.
+        self.limit = limit
+        self.in_flight = 0
+        self.credit = 0
+        self.wait_latency = LatencyHistogram()
+        self.processing_latency = LatencyHistogram()
+
+    def push(self, update):
+        heapq.heappush(self.updates, update)
+        self.ids[update.id] += 1
+
+    def pop(self):
+        update = heapq.heappop(self.updates)
+        self._forget(update.id)
+        return update
+
+    def pop_resource(self, id):
+        """Removes and returns the pending updates of a resource"""
+        if not self.ids[id]:
+            return []
+        popped = [update for update in self.updates if update.id == id]
+        self.updates = [update for update in self.updates if update.id != id]
+        heapq.heapify(self.updates)
+        del self.ids[id]
+        return popped
+
+    def _forget(self, id):
+        self.ids[id] -= 1
+        if self.ids[id] <= 0:
+            del self.ids[id]
+
+    def is_eligible(self):
+        return bool(self.updates) and (
+            not self.limit or self.in_flight < self.limit)
+
+
 class ResourceProcessingQueue:
-    """Manager of the queue of resources to process."""
+    """Manager of the queue of resources to process.
+
+    Updates are kept in one priority queue per update class. Workers pick the
+    class of the next update with a smooth weighted round robin over the
+    classes that have pending updates and have not reached their concurrency
+    limit, so that e.g. a full resync cannot starve the updates users are
+    waiting for. When an update is picked, the pending updates of the same
+    resource in the other classes are processed with it, in priority order,
+    so that e.g. a router delete is never overtaken by an older resync
+    update of that router. The time each update spent queued and being
+    processed is recorded in latency histograms per class, see get_stats().
+    """
 
-    def __init__(self):
-        self._queue = queue.PriorityQueue()
+    def __init__(self, class_weights=None, class_limits=None,
+                 stats_interval=0):
+        self._lock = threading.Condition()
+        self._classes = {}
+        weights = dict(DEFAULT_CLASS_WEIGHTS)
+        weights.update(class_weights or {})
+        for update_class, weight in weights.items():
+            self._get_class(update_class).weight = max(1, int(weight))
+        for update_class, limit in (class_limits or {}).items():
+            self._get_class(update_class).limit = max(0, int(limit))
+        self._stats_interval = stats_interval
+        self._stats_reported = time.time()
         self._run = True
 
+    def _get_class(self, update_class):
+        class_queue = self._classes.get(update_class)
+        if class_queue is None:
+            class_queue = self._classes[update_class] = _UpdateClassQueue()
+        return class_queue
+
     @property
     def qsize(self):
-        """Returns the number of elements stored in the PriorityQueue"""
-        return self._queue.qsize()
+        """Returns the number of updates waiting to be processed"""
+        with self._lock:
+            return sum(len(class_queue.updates)
+                       for class_queue in self._classes.values())
 
     def add(self, update):
         update.tries -= 1
-        self._queue.put(update)
+        update.queue_time = time.time()
+        with self._lock:
+            self._get_class(update.update_class).push(update)
+            self._lock.notify()
+
+    def _select_class(self):
+        eligible = [class_queue for class_queue in self._classes.values()
+                    if class_queue.is_eligible()]
+        if not eligible:
+            return None
+        total_weight = 0
+        for class_queue in eligible:
+            class_queue.credit += class_queue.weight
+            total_weight += class_queue.weight
+        selected = max(eligible, key=lambda class_queue: class_queue.credit)
+        selected.credit -= total_weight
+        return selected
+
+    def _get(self):
+        """Waits for the next update, taking a worker slot of its class"""
+        with self._lock:
+            class_queue = self._select_class()
+            while class_queue is None:
+                self._lock.wait()
+                class_queue = self._select_class()
+            class_queue.in_flight += 1
+            return class_queue, class_queue.pop()
+
+    def _pop_resource_updates(self, id, class_queue):
+        """Removes the pending updates of a resource in the other classes"""
+        with self._lock:
+            return [update
+                    for other_queue in self._classes.values()
+                    if other_queue is not class_queue
+                    for update in other_queue.pop_resource(id)]
+
+    def _release(self, class_queue):
+        with self._lock:
+            class_queue.in_flight -= 1
+            self._lock.notify()
+
+    def _update_started(self, update):
+        update.set_start_time()
+        with self._lock:
+            self._get_class(update.update_class).wait_latency.observe(
+                update.start_time - update.queue_time)
+
+    def _update_finished(self, update):
+        with self._lock:
+            self._get_class(update.update_class).processing_latency.observe(
+                update.time_elapsed_since_start)
+        if (self._stats_interval and
+                time.time() - self._stats_reported >= self._stats_interval):
+            self._stats_reported = time.time()
+            LOG.info("Resource processing queue statistics: %s",
+                     self.get_stats())
+
+    def get_stats(self):
+        """Returns the queue statistics of each update class
+
+        For each class: the number of pending and in-flight updates, and the
+        histograms of the time the updates waited in the queue (queued to
+        started) and were processed (started to finished).
+        """
+        with self._lock:
+            return {
+                update_class: {
+                    'pending': len(class_queue.updates),
+                    'in_flight': class_queue.in_flight,
+                    'wait': class_queue.wait_latency.to_dict(),
+                    'processing': class_queue.processing_latency.to_dict()}
+                for update_class, class_queue in self._classes.items()}
 
     def each_update_to_next_resource(self):
         """Grabs the next resource from the queue and processes
@@ -185,15 +383,24 @@ class ResourceProcessingQueue:
         """
         if not self._run:
             yield None, None
-        next_update = self._queue.get()
-
-        with ExclusiveResourceProcessor(next_update.id) as rp:
-            # Queue the update whether this worker is the primary or not.
-            rp.queue_update(next_update)
-
-            # Here, if the current worker is not the primary, the call to
-            # rp.updates() will not yield and so this will essentially be a
-            # noop.
-            for update in rp.updates():
-                update.set_start_time()
-                yield (rp, update)
+        class_queue, next_update = self._get()
+
+        try:
+            with ExclusiveResourceProcessor(next_update.id) as rp:
+                # Queue the update whether this worker is the primary or not.
+                rp.queue_update(next_update)
+                # The updates of the same resource waiting in the other
+                # classes are ordered against this one by the processor.
+                for update in self._pop_resource_updates(next_update.id,
+                                                         class_queue):
+                    rp.queue_update(update)
+
+                # Here, if the current worker is not the primary, the call to
+                # rp.updates() will not yield and so this will essentially be
+                # a noop.
+                for update in rp.updates():
+                    self._update_started(update)
+                    yield (rp, update)
+                    self._update_finished(update)
+        finally:
+            self._release(class_queue)
@@ -158,7 +158,10 @@ class DhcpAgent(manager.Manager):
             resource_type='dhcp')
         self._pool = utils.ThreadPoolExecutorWithBlock(
             max_workers=DHCP_PROCESS_THREADS)
-        self._queue = queue.ResourceProcessingQueue()
+        self._queue = queue.ResourceProcessingQueue(
+            class_weights=cfg.CONF.AGENT.resource_update_class_weights,
+            class_limits=cfg.CONF.AGENT.resource_update_class_limits,
+            stats_interval=cfg.CONF.AGENT.resource_processing_stats_interval)
 
         self.dhcp_driver_cls = importutils.import_class(self.conf.dhcp_driver)
         self.plugin_rpc = DhcpPluginApi(topics.PLUGIN, self.conf.host)
@@ -347,23 +350,23 @@ class DhcpAgent(manager.Manager):
         known_network_ids = set(self.cache.get_network_ids())
 
         try:
-            active_networks = self.plugin_rpc.get_active_networks_info(
-                enable_dhcp_filter=False)
-            LOG.info('All active networks have been fetched through RPC.')
-            active_network_ids = {network.id for network in active_networks}
-            for deleted_id in known_network_ids - active_network_ids:
-                try:
-                    self.disable_dhcp_helper(deleted_id)
-                except Exception as e:
-                    self.schedule_resync(e, deleted_id)
-                    LOG.exception('Unable to sync network state on '
-                                  'deleted network %s', deleted_id)
-
+            if self.conf.sync_state_page_size:
+                active_networks = self._get_active_networks_pages()
+            else:
+                active_networks = self.plugin_rpc.get_active_networks_info(
+                    enable_dhcp_filter=False)
+            active_network_ids = set()
+
+            # NOTE: when the networks are fetched by pages, the first ones
+            # are configured while the next pages are fetched; the pool
+            # blocks the submission, and the fetch of the next page, until a
+            # worker is available.
             with utils.ThreadPoolExecutorWithBlock(
                     max_workers=self.conf.num_sync_threads,
                     stopping_event=self._stopping_event) as pool:
                 fs = []
                 for network in active_networks:
+                    active_network_ids.add(network.id)
                     if (not only_nets or  # specifically resync all
                             # missing net
                             network.id not in known_network_ids or
@@ -372,7 +375,16 @@ class DhcpAgent(manager.Manager):
                         fs.append(pool.submit(
                             self.safe_configure_dhcp_for_network, network)
                         )
+                LOG.info('All active networks have been fetched through RPC.')
                 futures.wait(fs)
+
+            for deleted_id in known_network_ids - active_network_ids:
+                try:
+                    self.disable_dhcp_helper(deleted_id)
+                except Exception as e:
+                    self.schedule_resync(e, deleted_id)
+                    LOG.exception('Unable to sync network state on '
+                                  'deleted network %s', deleted_id)
             # we notify all ports in case some were created while the agent
             # was down
             self.dhcp_ready_ports |= set(self.cache.get_port_ids(only_nets))
@@ -386,6 +398,33 @@ class DhcpAgent(manager.Manager):
                 self.schedule_resync(e)
             LOG.exception('Unable to sync network state.')
 
+    def _get_active_networks_pages(self):
+        """Yields the active networks, fetched by pages
+
+        The networks are fetched by pages of sync_state_page_size networks,
+        sorted by ID. When the server fails to return a page in time, the
+        page is fetched again with half the page size, down to a single
+        network.
+        """
+        page_size = self.conf.sync_state_page_size
+        marker = None
+        while True:
+            try:
+                networks = self.plugin_rpc.get_active_networks_info(
+                    enable_dhcp_filter=False, limit=page_size, marker=marker)
+            except oslo_messaging.MessagingTimeout:
+                if page_size == 1:
+                    raise
+                page_size = max(page_size // 2, 1)
+                LOG.warning('Server failed to return the active networks in '
+                            'the required time, decreasing the page size to '
+                            '%s', page_size)
+                continue
+            yield from networks
+            if len(networks) < page_size:
+                return
+            marker = networks[-1].id
+
     def _dhcp_ready_ports_loop(self):
         """Notifies the server of any ports that had reservations setup."""
         @_wait_if_syncing
@@ -905,6 +944,8 @@ class DhcpPluginApi(base_agent_rpc.BasePluginApi):
         1.5 - Added dhcp_ready_on_ports
         1.7 - Added get_networks
         1.8 - Added get_dhcp_port
+        1.11 - Added the limit and marker arguments of
+               get_active_networks_info
     """
 
     def __init__(self, topic, host):
@@ -924,8 +965,13 @@ class DhcpPluginApi(base_agent_rpc.BasePluginApi):
         return context.get_admin_context_without_session()
 
     def get_active_networks_info(self, **kwargs):
-        """Make a remote process call to retrieve all network info."""
-        cctxt = self.client.prepare(version='1.1')
+        """Make a remote process call to retrieve all network info.
+
+        If a limit is passed, only the first "limit" networks, sorted by ID,
+        with an ID greater than the marker are returned.
+        """
+        version = '1.11' if kwargs.get('limit') else '1.1'
+        cctxt = self.client.prepare(version=version)
         networks = cctxt.call(self.context, 'get_active_networks_info',
                               host=self.host, **kwargs)
         return [dhcp.NetModel(n) for n in networks]
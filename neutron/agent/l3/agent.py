@@ -323,7 +323,10 @@ class L3NATAgent(ha.AgentMixin,
         # L3 agent router processing Thread Pool Executor
         self._pool = utils.ThreadPoolExecutorWithBlock(
             max_workers=ROUTER_PROCESS_THREADS)
-        self._queue = queue.ResourceProcessingQueue()
+        self._queue = queue.ResourceProcessingQueue(
+            class_weights=cfg.CONF.AGENT.resource_update_class_weights,
+            class_limits=cfg.CONF.AGENT.resource_update_class_limits,
+            stats_interval=cfg.CONF.AGENT.resource_processing_stats_interval)
 
         # Consume network updates to trigger router resync
         consumers = [[topics.NETWORK, topics.UPDATE]]
@@ -538,9 +541,9 @@ class L3NATAgent(ha.AgentMixin,
     def router_deleted(self, context, router_id):
         """Deal with router deletion RPC message."""
         LOG.debug('Got router deleted notification for %s', router_id)
-        update = queue.ResourceUpdate(router_id,
-                                      PRIORITY_RPC,
-                                      action=DELETE_ROUTER)
+        update = queue.ResourceUpdate(
+            router_id, PRIORITY_RPC, action=DELETE_ROUTER,
+            update_class=self._router_update_class(router_id))
         self._queue.add(update)
 
     def routers_updated(self, context, routers):
@@ -552,15 +555,16 @@ class L3NATAgent(ha.AgentMixin,
                 routers = [router['id'] for router in routers]
             for id in routers:
                 update = queue.ResourceUpdate(
-                    id, PRIORITY_RPC, action=ADD_UPDATE_ROUTER)
+                    id, PRIORITY_RPC, action=ADD_UPDATE_ROUTER,
+                    update_class=self._router_update_class(id))
                 self._queue.add(update)
 
     def router_removed_from_agent(self, context, payload):
         LOG.debug('Got router removed from agent :%r', payload)
         router_id = payload['router_id']
-        update = queue.ResourceUpdate(router_id,
-                                      PRIORITY_RPC,
-                                      action=DELETE_ROUTER)
+        update = queue.ResourceUpdate(
+            router_id, PRIORITY_RPC, action=DELETE_ROUTER,
+            update_class=self._router_update_class(router_id))
         self._queue.add(update)
 
     def router_added_to_agent(self, context, payload):
@@ -592,7 +596,8 @@ class L3NATAgent(ha.AgentMixin,
             ports.append(ri.ex_gw_port)
         if any(_port_belongs(p) for p in ports):
             update = queue.ResourceUpdate(
-                ri.router_id, PRIORITY_SYNC_ROUTERS_TASK)
+                ri.router_id, PRIORITY_SYNC_ROUTERS_TASK,
+                update_class=queue.UPDATE_CLASS_RESYNC)
             self._resync_router(update)
 
     def _process_router_if_compatible(self, router):
@@ -757,6 +762,7 @@ class L3NATAgent(ha.AgentMixin,
 
         if not routers:
             if self._safe_router_removed(update.id):
+                self._failover_routers.discard(update.id)
                 # need to update timestamp of removed router in case
                 # there are older events for the same router in the
                 # processing queue (like events from fullsync) in order to
@@ -775,6 +781,7 @@ class L3NATAgent(ha.AgentMixin,
             return
 
         rp.fetched_and_processed(update.timestamp)
+        self._failover_routers.discard(update.id)
         LOG.info("Finished a router update for %s, update_id %s. "
                  "Time elapsed: %.3f",
                  update.id, update.update_id,
@@ -792,7 +799,8 @@ class L3NATAgent(ha.AgentMixin,
                 new_update = queue.ResourceUpdate(
                     router['id'],
                     priority=PRIORITY_RELATED_ROUTER,
-                    action=new_action)
+                    action=new_action,
+                    update_class=update.update_class)
                 self._queue.add(new_update)
                 LOG.debug('Queued a router update for %(router_id)s '
                           '(related router %(related_router_id)s). '
@@ -885,7 +893,8 @@ class L3NATAgent(ha.AgentMixin,
                         PRIORITY_SYNC_ROUTERS_TASK,
                         resource=r,
                         action=ADD_UPDATE_ROUTER,
-                        timestamp=timestamp)
+                        timestamp=timestamp,
+                        update_class=queue.UPDATE_CLASS_RESYNC)
                     self._queue.add(update)
         except oslo_messaging.MessagingTimeout:
             if self.sync_routers_chunk_size > SYNC_ROUTERS_MIN_CHUNK_SIZE:
@@ -919,10 +928,9 @@ class L3NATAgent(ha.AgentMixin,
         # Delete routers that have disappeared since the last sync
         for router_id in prev_router_ids - curr_router_ids:
             ns_manager.keep_router(router_id)
-            update = queue.ResourceUpdate(router_id,
-                                          PRIORITY_SYNC_ROUTERS_TASK,
-                                          timestamp=timestamp,
-                                          action=DELETE_ROUTER)
+            update = queue.ResourceUpdate(
+                router_id, PRIORITY_SYNC_ROUTERS_TASK, timestamp=timestamp,
+                action=DELETE_ROUTER, update_class=queue.UPDATE_CLASS_RESYNC)
             self._queue.add(update)
 
     @property
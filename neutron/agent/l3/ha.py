@@ -26,6 +26,7 @@ from oslo_utils import fileutils
 from oslo_utils import netutils
 import webob
 
+from neutron.agent.common import resource_processing_queue as queue
 from neutron.agent.linux import utils as agent_utils
 from neutron.notifiers import batch_notifier
 
@@ -109,6 +110,8 @@ class AgentMixin:
         notifications_server.start()
         self._transition_states = {}
         self._transition_state_mutex = threading.Lock()
+        # Routers that failed over since they were last processed
+        self._failover_routers = set()
 
     def _get_router_info(self, router_id):
         try:
@@ -148,6 +151,17 @@ class AgentMixin:
                 self._transition_states.pop(router_id, None)
         return transition_state
 
+    def _router_update_class(self, router_id):
+        """Returns the class of the updates requested for a router
+
+        The updates of a router failing over, or that failed over since it
+        was last processed, are scheduled as HA failover updates.
+        """
+        if (router_id in self._failover_routers or
+                router_id in self._transition_states):
+            return queue.UPDATE_CLASS_HA
+        return queue.UPDATE_CLASS_USER
+
     def enqueue_state_change(self, router_id, state):
         """Inform the server about the new router state
 
@@ -202,6 +216,7 @@ class AgentMixin:
         # dependency that currently exists on l3-agent running for the IPv6
         # failover.
         ri.ha_state = state
+        self._failover_routers.add(router_id)
         self._configure_ipv6_params(ri, state)
         if self.conf.enable_metadata_proxy:
             self._update_metadata_proxy(ri, router_id, state)
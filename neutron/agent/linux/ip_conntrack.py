@@ -11,22 +11,41 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import collections
 import queue
 import re
 import threading
+import time
 
+import futurist
 import netaddr
 from neutron_lib import constants
 from neutron_lib import exceptions
 from oslo_concurrency import lockutils
+from oslo_config import cfg
 from oslo_log import log as logging
 
 from neutron.agent.linux import utils as linux_utils
+from neutron.conf.agent import common as config
+from neutron.privileged.agent.linux import netlink_lib
 
 LOG = logging.getLogger(__name__)
 CONTRACK_MGRS = {}
 MAX_CONNTRACK_ZONES = 65535
 ZONE_START = 4097
+# Position of the source and destination addresses of the original
+# direction in the entries returned by netlink_lib.list_entries().
+NL_ENTRY_SRC = 4
+NL_ENTRY_DST = 5
+
+config.register_conntrack_opts(cfg.CONF)
+
+# A conntrack state deletion of a device fixed IP in a zone, optionally
+# restricted to the connections with a remote IP.
+ConntrackDeletion = collections.namedtuple(
+    'ConntrackDeletion',
+    ['zone', 'ethertype', 'protocol', 'mark', 'direction', 'ip',
+     'remote_ip'])
 
 
 class IpConntrackUpdate:
@@ -40,6 +59,7 @@ class IpConntrackUpdate:
         self.device_info_list = device_info_list
         self.rule = rule
         self.remote_ips = remote_ips
+        self.timestamp = time.monotonic()
 
     def __repr__(self):
         return ('<IpConntrackUpdate(device_info_list=%s, rule=%s, '
@@ -74,6 +94,16 @@ class IpConntrackManager:
         self.zone_per_port = zone_per_port  # zone per port vs per network
         self._populate_initial_zone_map()
         self._queue = queue.Queue()
+        self._stats = {'processed_updates': 0, 'processed_batches': 0,
+                       'last_batch_size': 0, 'last_batch_latency': 0.0,
+                       'max_latency': 0.0}
+        self._use_netlink = (cfg.CONF.AGENT.conntrack_cleanup_netlink and
+                             not namespace)
+        if self._use_netlink and not netlink_lib.nfct_lib:
+            LOG.warning("The netfilter_conntrack library is not available, "
+                        "the conntrack state will be deleted with the "
+                        "conntrack command")
+            self._use_netlink = False
         LOG.debug('Starting the ip_conntrack _process_queue_worker() thread')
         # TODO(sahid): We have to revisit this part as this should have
         # some kind of termination event.
@@ -88,20 +118,47 @@ class IpConntrackManager:
             self._process_queue()
 
     def _process_queue(self):
-        update = None
+        updates = []
         try:
             # this will block until an entry gets added to the queue
-            update = self._queue.get()
-            if update.remote_ips:
-                for remote_ip in update.remote_ips:
-                    self._delete_conntrack_state(
-                        update.device_info_list, update.rule, remote_ip)
-            else:
-                self._delete_conntrack_state(
-                    update.device_info_list, update.rule)
+            updates.append(self._queue.get())
+            # coalesce all the updates queued in the meantime, to delete
+            # the conntrack state of each zone only once
+            while True:
+                try:
+                    updates.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._delete_zones_conntrack_state(
+                self._get_zone_deletions(updates))
         except Exception:
-            LOG.exception("Failed to process ip_conntrack queue entry: %s",
-                          update)
+            LOG.exception("Failed to process ip_conntrack queue entries: %s",
+                          updates)
+        if updates:
+            self._update_stats(updates)
+
+    def _update_stats(self, updates):
+        latency = time.monotonic() - min(
+            update.timestamp for update in updates)
+        self._stats['processed_updates'] += len(updates)
+        self._stats['processed_batches'] += 1
+        self._stats['last_batch_size'] = len(updates)
+        self._stats['last_batch_latency'] = latency
+        self._stats['max_latency'] = max(self._stats['max_latency'],
+                                         latency)
+        LOG.debug("Processed %(updates)d ip_conntrack queue entries, the "
+                  "oldest one was queued %(latency).3f seconds ago, "
+                  "%(depth)d entries left",
+                  {'updates': len(updates), 'latency': latency,
+                   'depth': self._queue.qsize()})
+
+    def get_stats(self):
+        """Return the statistics of the conntrack state deletion queue.
+
+        The latencies are the time, in seconds, between the queueing of an
+        update and the end of its processing.
+        """
+        return dict(self._stats, queue_depth=self._queue.qsize())
 
     def _process(self, device_info_list, rule, remote_ips=None):
         # queue the update to allow the caller to resume its work
@@ -130,9 +187,8 @@ class IpConntrackManager:
         cmd_ns.extend(cmd)
         return cmd_ns
 
-    def _get_conntrack_cmds(self, device_info_list, rule, remote_ip=None):
-        conntrack_cmds = set()
-        cmd = self._generate_conntrack_cmd_by_rule(rule, self.namespace)
+    def _get_conntrack_deletions(self, device_info_list, rule,
+                                 remote_ip=None):
         ethertype = rule.get('ethertype')
         for device_info in device_info_list:
             zone_id = self.get_device_zone(device_info, create=False)
@@ -147,28 +203,146 @@ class IpConntrackManager:
                 net = netaddr.IPNetwork(ip)
                 if str(net.version) not in ethertype:
                     continue
-                ip_cmd = [str(net.ip), '-w', zone_id]
+                deletion_remote_ip = None
                 if remote_ip and str(
                         netaddr.IPNetwork(remote_ip).version) in ethertype:
-                    if rule.get('direction') == 'ingress':
-                        direction = '-s'
-                    else:
-                        direction = '-d'
-                    ip_cmd.extend([direction, str(remote_ip)])
-                conntrack_cmds.add(tuple(cmd + ip_cmd))
-        return conntrack_cmds
-
-    def _delete_conntrack_state(self, device_info_list, rule, remote_ip=None):
-        conntrack_cmds = self._get_conntrack_cmds(device_info_list,
-                                                  rule, remote_ip)
-        for cmd in conntrack_cmds:
+                    deletion_remote_ip = str(remote_ip)
+                yield ConntrackDeletion(
+                    zone_id, ethertype, rule.get('protocol'),
+                    rule.get('mark'), rule.get('direction'), str(net.ip),
+                    deletion_remote_ip)
+
+    def _get_zone_deletions(self, updates):
+        """Coalesce the conntrack state deletions of updates per zone."""
+        zone_deletions = collections.defaultdict(dict)
+        for update in updates:
+            for remote_ip in update.remote_ips or [None]:
+                for deletion in self._get_conntrack_deletions(
+                        update.device_info_list, update.rule, remote_ip):
+                    # a dict is used as an ordered set
+                    zone_deletions[deletion.zone][deletion] = None
+        return zone_deletions
+
+    def _get_conntrack_cmd(self, deletion):
+        cmd = self._generate_conntrack_cmd_by_rule(deletion._asdict(),
+                                                   self.namespace)
+        cmd.extend([deletion.ip, '-w', deletion.zone])
+        if deletion.remote_ip:
+            cmd.extend(['-s' if deletion.direction == 'ingress' else '-d',
+                        deletion.remote_ip])
+        return cmd
+
+    def _delete_zones_conntrack_state(self, zone_deletions):
+        workers = min(cfg.CONF.AGENT.conntrack_cleanup_workers,
+                      len(zone_deletions))
+        if workers <= 1:
+            for zone, deletions in zone_deletions.items():
+                self._delete_zone_conntrack_state(zone, list(deletions))
+            return
+        with futurist.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._delete_zone_conntrack_state, zone,
+                                list(deletions))
+                for zone, deletions in zone_deletions.items()]
+            # Raise the errors of the workers, as the serial processing does
+            for future in futures:
+                future.result()
+
+    def _delete_zone_conntrack_state(self, zone, deletions):
+        cmd_deletions = deletions
+        if self._use_netlink:
+            nl_deletions = [deletion for deletion in deletions
+                            if self._is_netlink_deletion(deletion)]
+            cmd_deletions = [deletion for deletion in deletions
+                             if not self._is_netlink_deletion(deletion)]
+            try:
+                self._delete_zone_conntrack_entries(zone, nl_deletions)
+            except Exception:
+                LOG.warning("Failed to delete the conntrack state of zone "
+                            "%s with netlink, using the conntrack command",
+                            zone, exc_info=True)
+                cmd_deletions = deletions
+        for deletion in cmd_deletions:
+            cmd = self._get_conntrack_cmd(deletion)
             try:
-                self.execute(list(cmd), run_as_root=True, privsep_exec=True,
+                self.execute(cmd, run_as_root=True, privsep_exec=True,
                              check_exit_code=True,
                              extra_ok_codes=[1])
             except RuntimeError:
                 LOG.exception("Failed execute conntrack command %s", cmd)
 
+    def _delete_conntrack_state(self, device_info_list, rule, remote_ip=None):
+        update = IpConntrackUpdate(device_info_list, rule,
+                                   [remote_ip] if remote_ip else None)
+        self._delete_zones_conntrack_state(self._get_zone_deletions([update]))
+
+    @staticmethod
+    def _get_protocol_number(protocol):
+        """Return the protocol number, None for any protocol.
+
+        Raises ValueError for protocols unknown to netlink_lib.
+        """
+        if protocol is None or str(protocol) in ('0', 'ip'):
+            return None
+        try:
+            return int(protocol)
+        except ValueError:
+            return constants.IP_PROTOCOL_MAP[protocol]
+
+    def _is_netlink_deletion(self, deletion):
+        # the marks of the entries are not returned by netlink_lib
+        if deletion.mark is not None:
+            return False
+        try:
+            self._get_protocol_number(deletion.protocol)
+        except (KeyError, ValueError):
+            return False
+        return True
+
+    def _delete_zone_conntrack_entries(self, zone, deletions):
+        """Delete the conntrack entries of a zone matching the deletions.
+
+        The entries of the zone are listed and deleted with one netlink
+        dump and one batch of netlink deletions, instead of running the
+        conntrack command for each deletion.
+        """
+        if not deletions:
+            return
+        # index the deletions by the address of the device in the entries
+        deletions_by_address = collections.defaultdict(list)
+        for deletion in deletions:
+            position = (NL_ENTRY_DST if deletion.direction == 'ingress'
+                        else NL_ENTRY_SRC)
+            deletions_by_address[(position, deletion.ip)].append(
+                (self._get_protocol_number(deletion.protocol), deletion))
+
+        entries = []
+        for entry in netlink_lib.list_entries(zone):
+            entry_protocol = constants.IP_PROTOCOL_MAP.get(entry[1])
+            for position in (NL_ENTRY_SRC, NL_ENTRY_DST):
+                address = str(netaddr.IPAddress(entry[position]))
+                if any(self._match_entry(entry, entry_protocol, position,
+                                         protocol, deletion)
+                       for protocol, deletion in deletions_by_address.get(
+                           (position, address), [])):
+                    entries.append(entry)
+                    break
+        if entries:
+            netlink_lib.delete_entries(entries)
+        LOG.debug("Deleted %(entries)d conntrack entries of zone %(zone)s "
+                  "with netlink", {'entries': len(entries), 'zone': zone})
+
+    @staticmethod
+    def _match_entry(entry, entry_protocol, position, protocol, deletion):
+        if protocol is not None and protocol != entry_protocol:
+            return False
+        if not deletion.remote_ip:
+            return True
+        remote_position = (NL_ENTRY_SRC if position == NL_ENTRY_DST
+                           else NL_ENTRY_DST)
+        return (netaddr.IPAddress(entry[remote_position]) ==
+                netaddr.IPAddress(deletion.remote_ip))
+
     def delete_conntrack_state_by_rule(self, device_info_list, rule):
         self._process(device_info_list, rule)
 
@@ -11,9 +11,11 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import contextlib
 import copy
 
 import netaddr
+from oslo_utils import excutils
 
 from neutron.agent.linux import utils as linux_utils
 from oslo_concurrency import lockutils
@@ -28,13 +30,60 @@ class IpsetManager:
     """Smart wrapper for ipset.
 
        Keeps track of ip addresses per set, using bulk
-       or single ip add/remove for smaller changes.
+       or single ip add/remove for smaller changes. While the apply is
+       deferred, every set mutation is queued and they are all applied
+       with a single ipset restore call when the apply is resumed.
+       The ip addresses kept per set are the authoritative view of the
+       sets, they are never read back from the system.
     """
 
     def __init__(self, execute=None, namespace=None):
         self.execute = execute or linux_utils.execute
         self.namespace = namespace
         self.ipset_sets = {}
+        # ipset restore commands queued while the apply is deferred, and
+        # the sets they modify.
+        self._deferred_commands = None
+        self._deferred_sets = set()
+
+    @contextlib.contextmanager
+    def defer_apply(self):
+        """Defer apply context."""
+        self.defer_apply_on()
+        try:
+            yield
+        finally:
+            self.defer_apply_off()
+
+    def defer_apply_on(self):
+        if self._deferred_commands is None:
+            self._deferred_commands = []
+
+    def defer_apply_off(self):
+        commands = self._deferred_commands
+        set_names = self._deferred_sets
+        self._deferred_commands = None
+        self._deferred_sets = set()
+        if not commands:
+            return
+        with lockutils.lock('neutron-ipset-%s' % self.namespace,
+                            external=True):
+            try:
+                self._restore_sets(commands)
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    # The queued commands were not applied, forget about the
+                    # modified sets so they are fully refreshed next time.
+                    for set_name in set_names:
+                        self.ipset_sets.pop(set_name, None)
+
+    def _defer_commands(self, set_name, *commands):
+        """Queue ipset restore commands if the apply is deferred."""
+        if self._deferred_commands is None:
+            return False
+        self._deferred_commands.extend(commands)
+        self._deferred_sets.add(set_name)
+        return True
 
     def _sanitize_addresses(self, addresses):
         """This method converts any address to ipset format.
@@ -100,7 +149,11 @@ class IpsetManager:
             else:
                 add_ips = self._get_new_set_ips(set_name, member_ips)
                 del_ips = self._get_deleted_set_ips(set_name, member_ips)
-                if (len(add_ips) + len(del_ips) < IPSET_ADD_BULK_THRESHOLD):
+                # Queued changes are applied with a single call anyway, no
+                # need to swap the whole set.
+                if (self._deferred_commands is not None or
+                        len(add_ips) + len(del_ips) <
+                        IPSET_ADD_BULK_THRESHOLD):
                     self._add_members_to_set(set_name, add_ips)
                     self._del_members_from_set(set_name, del_ips)
                 else:
@@ -113,8 +166,10 @@ class IpsetManager:
             self._destroy(set_name, forced)
 
     def _add_member_to_set(self, set_name, member_ip):
-        cmd = ['ipset', 'add', '-exist', set_name, member_ip]
-        self._apply(cmd)
+        if not self._defer_commands(set_name,
+                                    f"add {set_name} {member_ip}"):
+            cmd = ['ipset', 'add', '-exist', set_name, member_ip]
+            self._apply(cmd)
         self.ipset_sets[set_name].append(member_ip)
 
     def _refresh_set(self, set_name, member_ips, ethertype):
@@ -125,20 +180,28 @@ class IpsetManager:
         for ip in member_ips:
             process_input.append(f"add {new_set_name} {ip}")
 
-        self._restore_sets(process_input)
-        self._swap_sets(new_set_name, set_name)
-        self._destroy(new_set_name, True)
+        if not self._defer_commands(set_name, *process_input,
+                                    f"swap {new_set_name} {set_name}",
+                                    f"destroy {new_set_name}"):
+            self._restore_sets(process_input)
+            self._swap_sets(new_set_name, set_name)
+            self._destroy(new_set_name, True)
         self.ipset_sets[set_name] = copy.copy(member_ips)
 
     def _del_member_from_set(self, set_name, member_ip):
-        cmd = ['ipset', 'del', set_name, member_ip]
-        self._apply(cmd, fail_on_errors=False)
+        if not self._defer_commands(set_name,
+                                    f"del {set_name} {member_ip}"):
+            cmd = ['ipset', 'del', set_name, member_ip]
+            self._apply(cmd, fail_on_errors=False)
         self.ipset_sets[set_name].remove(member_ip)
 
     def _create_set(self, set_name, ethertype):
-        cmd = ['ipset', 'create', '-exist', set_name, 'hash:net', 'family',
-               self._get_ipset_set_type(ethertype)]
-        self._apply(cmd)
+        set_type = self._get_ipset_set_type(ethertype)
+        if not self._defer_commands(
+                set_name, f"create {set_name} hash:net family {set_type}"):
+            cmd = ['ipset', 'create', '-exist', set_name, 'hash:net',
+                   'family', set_type]
+            self._apply(cmd)
         self.ipset_sets[set_name] = []
 
     def _apply(self, cmd, input=None, fail_on_errors=True):
@@ -183,6 +246,7 @@ class IpsetManager:
 
     def _destroy(self, set_name, forced=False):
         if set_name in self.ipset_sets or forced:
-            cmd = ['ipset', 'destroy', set_name]
-            self._apply(cmd, fail_on_errors=False)
+            if not self._defer_commands(set_name, f"destroy {set_name}"):
+                cmd = ['ipset', 'destroy', set_name]
+                self._apply(cmd, fail_on_errors=False)
             self.ipset_sets.pop(set_name, None)
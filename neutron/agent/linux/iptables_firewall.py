@@ -876,6 +876,7 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
     def filter_defer_apply_on(self):
         if not self._defer_apply:
             self.iptables.defer_apply_on()
+            self.ipset.defer_apply_on()
             self._pre_defer_filtered_ports = dict(self.filtered_ports)
             self._pre_defer_unfiltered_ports = dict(self.unfiltered_ports)
             self.pre_sg_members = dict(self.sg_members)
@@ -1040,11 +1041,18 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
                                       self._pre_defer_unfiltered_ports)
             self._setup_chains_apply(self.filtered_ports,
                                      self.unfiltered_ports)
-            self.iptables.defer_apply_off()
-            self._remove_conntrack_entries_from_sg_updates()
-            self._remove_unused_security_group_info()
-            self._pre_defer_filtered_ports = None
-            self._pre_defer_unfiltered_ports = None
+            # The ipsets have to be updated before applying the iptables
+            # rules referencing them. If the ipset restore fails, the
+            # iptables rules are still applied and the deferred state reset,
+            # as they were when each ipset change was applied on its own.
+            try:
+                self.ipset.defer_apply_off()
+            finally:
+                self.iptables.defer_apply_off()
+                self._remove_conntrack_entries_from_sg_updates()
+                self._remove_unused_security_group_info()
+                self._pre_defer_filtered_ports = None
+                self._pre_defer_unfiltered_ports = None
 
 
 class OVSHybridIptablesFirewallDriver(IptablesFirewallDriver):
@@ -18,12 +18,13 @@
 
 """Implements iptables rules using linux utilities."""
 
+import bisect
 import collections
 import contextlib
-import difflib
 import os
 import re
 import sys
+import time
 
 from neutron_lib import constants
 from neutron_lib import exceptions
@@ -312,6 +313,10 @@ class IptablesManager:
         self.iptables_apply_deferred = False
         self.wrap_name = binary_name[:16]
         self.external_lock = external_lock
+        # Rules applied by the last iptables-restore, per command and table,
+        # used as the current state by the incremental apply mode.
+        self._applied_rules = {}
+        self._last_full_sync = None
 
         self.ipv4 = {'filter': IptablesTable(binary_name=self.wrap_name)}
         self.ipv6 = {'filter': IptablesTable(binary_name=self.wrap_name)}
@@ -468,7 +473,7 @@ class IptablesManager:
             if not cfg.CONF.AGENT.debug_iptables_rules:
                 return first
             LOG.debug('List of IPTables Rules applied: %s', '\n'.join(first))
-            second = self._apply_synchronized()
+            second = self._apply_synchronized(full_sync=True)
             if second:
                 msg = (_("IPTables Rules did not converge. Diff: %s") %
                        '\n'.join(second))
@@ -564,48 +569,78 @@ class IptablesManager:
                   "following set of iptables rules:\n%s",
                   '\n'.join(log_lines))
 
-    def _apply_synchronized(self):
+    def _full_sync_required(self):
+        interval = cfg.CONF.AGENT.iptables_full_resync_interval
+        return bool(self._last_full_sync is None or (
+            interval and
+            time.monotonic() - self._last_full_sync >= interval))
+
+    def _save_rules(self, cmd):
+        args = [f'{cmd}-save']
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        try:
+            return linux_utils.execute(args, run_as_root=True,
+                                       privsep_exec=True).split('\n')
+        except RuntimeError:
+            # We could be racing with a cron job deleting namespaces.
+            # It is useless to try to apply iptables rules over and
+            # over again in a endless loop if the namespace does not
+            # exist.
+            with excutils.save_and_reraise_exception() as ctx:
+                if (self.namespace and not
+                        ip_lib.network_namespace_exists(self.namespace)):
+                    ctx.reraise = False
+                    LOG.error("Namespace %s was deleted during IPTables "
+                              "operations.", self.namespace)
+        return None
+
+    def _apply_synchronized(self, full_sync=False):
         """Apply the current in-memory set of iptables rules.
 
         This will create a diff between the rules from the previous runs
         and replace them with the current set of rules.
         This happens atomically, thanks to iptables-restore.
 
+        With the incremental apply mode, the rules of the previous run are
+        the ones applied by the last iptables-restore, kept in memory, and
+        iptables-save is only run for a full resync.
+
         Returns a list of the changes that were sent to iptables-save.
         """
+        incremental = cfg.CONF.AGENT.iptables_incremental_apply
+        if not incremental:
+            self._applied_rules.clear()
+        elif self._full_sync_required():
+            full_sync = True
         s = [('iptables', self.ipv4)]
         if self.use_ipv6:
             s += [('ip6tables', self.ipv6)]
         all_commands = []  # variable to keep track all commands for return val
         for cmd, tables in s:
-            args = [f'{cmd}-save']
-            if self.namespace:
-                args = ['ip', 'netns', 'exec', self.namespace] + args
-            try:
-                save_output = linux_utils.execute(args, run_as_root=True,
-                                                  privsep_exec=True)
-            except RuntimeError:
-                # We could be racing with a cron job deleting namespaces.
-                # It is useless to try to apply iptables rules over and
-                # over again in a endless loop if the namespace does not
-                # exist.
-                with excutils.save_and_reraise_exception() as ctx:
-                    if (self.namespace and not
-                            ip_lib.network_namespace_exists(self.namespace)):
-                        ctx.reraise = False
-                        LOG.error("Namespace %s was deleted during IPTables "
-                                  "operations.", self.namespace)
-                        return []
-            all_lines = save_output.split('\n')
+            cached_tables = None
+            if incremental and not full_sync:
+                cached_tables = self._applied_rules.get(cmd)
+            if cached_tables is None:
+                all_lines = self._save_rules(cmd)
+                if all_lines is None:
+                    self._applied_rules.clear()
+                    return []
             commands = []
+            applied_tables = {}
             # Traverse tables in sorted order for predictable dump output
             for table_name in sorted(tables):
                 table = tables[table_name]
-                # isolate the lines of the table we are modifying
-                start, end = self._find_table(all_lines, table_name)
-                old_rules = all_lines[start:end]
+                if cached_tables is not None:
+                    old_rules = cached_tables.get(table_name, [])
+                else:
+                    # isolate the lines of the table we are modifying
+                    start, end = self._find_table(all_lines, table_name)
+                    old_rules = all_lines[start:end]
+                    self._check_drift(cmd, table_name, old_rules)
                 # generate the new table state we want
                 new_rules = self._modify_rules(old_rules, table, table_name)
+                applied_tables[table_name] = new_rules
                 # generate the iptables commands to get between the old state
                 # and the new state
                 changes = _generate_path_between_rules(old_rules, new_rules)
@@ -615,26 +650,42 @@ class IptablesManager:
                     commands += (['# Generated by iptables_manager'] +
                                  ['*%s' % table_name] + changes +
                                  ['COMMIT', '# Completed by iptables_manager'])
-            if not commands:
-                continue
-            all_commands += commands
-
-            # always end with a new line
-            commands.append('')
-
-            args = [f'{cmd}-restore', '-n']
-            if self.namespace:
-                args = ['ip', 'netns', 'exec', self.namespace] + args
-
-            err = self._run_restore(args, commands)
-            if err:
-                self._log_restore_err(err, commands)
-                raise err
-
+            if commands:
+                all_commands += commands
+
+                # always end with a new line
+                commands.append('')
+
+                args = [f'{cmd}-restore', '-n']
+                if self.namespace:
+                    args = ['ip', 'netns', 'exec', self.namespace] + args
+
+                err = self._run_restore(args, commands)
+                if err:
+                    # The real state is unknown, resync it on the next apply
+                    self._applied_rules.clear()
+                    self._log_restore_err(err, commands)
+                    raise err
+            if incremental:
+                self._applied_rules[cmd] = applied_tables
+
+        if incremental and full_sync:
+            self._last_full_sync = time.monotonic()
         LOG.debug("IPTablesManager.apply completed with success. %d iptables "
                   "commands were issued", len(all_commands))
         return all_commands
 
+    def _check_drift(self, cmd, table_name, saved_rules):
+        cached_rules = self._applied_rules.get(cmd, {}).get(table_name)
+        if cached_rules is None:
+            return
+        drift = _generate_path_between_rules(saved_rules, cached_rules)
+        if drift:
+            LOG.warning("%(cmd)s %(table)s table rules changed outside of "
+                        "IPTablesManager, %(num)d commands are needed to "
+                        "resync them.",
+                        {'cmd': cmd, 'table': table_name, 'num': len(drift)})
+
     def _find_table(self, lines, table_name):
         if len(lines) < 3:
             # length only <2 when fake iptables
@@ -835,6 +886,9 @@ def _generate_path_between_rules(old_rules, new_rules):
             other_chains.append(chain)
 
     for chain in other_chains + sg_chains:
+        if old_by_chain[chain] == new_by_chain[chain]:
+            # unchanged chain, nothing to diff
+            continue
         statements += _generate_chain_diff_iptables_commands(
             chain, old_by_chain[chain], new_by_chain[chain])
     # unreferenced chains get the axe
@@ -871,6 +925,79 @@ def _ensure_all_mac_addresses_are_uppercase(rules):
     return new_rules
 
 
+def _longest_increasing_subsequence(matches):
+    """Return the longest subset of matches ordered on both sides.
+
+    matches is a list of (old index, new index) tuples sorted by old index.
+    """
+    if all(matches[idx][1] < matches[idx + 1][1]
+           for idx in range(len(matches) - 1)):
+        # rules were only inserted or deleted, not reordered
+        return matches
+    tails = []
+    tail_new_indexes = []
+    previous = [None] * len(matches)
+    for idx, (_old_index, new_index) in enumerate(matches):
+        pos = bisect.bisect_left(tail_new_indexes, new_index)
+        if pos:
+            previous[idx] = tails[pos - 1]
+        if pos == len(tails):
+            tails.append(idx)
+            tail_new_indexes.append(new_index)
+        else:
+            tails[pos] = idx
+            tail_new_indexes[pos] = new_index
+    result = []
+    idx = tails[-1] if tails else None
+    while idx is not None:
+        result.append(matches[idx])
+        idx = previous[idx]
+    result.reverse()
+    return result
+
+
+def _diff_chain_rules(old_rules, new_rules):
+    """Diff two lists of rules of a chain, using the rule text as key.
+
+    Returns a list of ('-', rule), ('+', rule) and (' ', rule) tuples, in the
+    order a difflib diff would return them. The common head and tail of the
+    chain are skipped, so inserting or deleting rules is done in linear
+    time; only reordered rules require an O(n log n) pass.
+    """
+    old_len, new_len = len(old_rules), len(new_rules)
+    head = 0
+    while (head < min(old_len, new_len) and
+           old_rules[head] == new_rules[head]):
+        head += 1
+    tail = 0
+    while (tail < min(old_len, new_len) - head and
+           old_rules[old_len - tail - 1] == new_rules[new_len - tail - 1]):
+        tail += 1
+    old_middle = old_rules[head:old_len - tail]
+    new_middle = new_rules[head:new_len - tail]
+
+    # duplicated rules are matched in order of appearance
+    new_indexes = collections.defaultdict(collections.deque)
+    for new_index, rule in enumerate(new_middle):
+        new_indexes[rule].append(new_index)
+    matches = []
+    for old_index, rule in enumerate(old_middle):
+        if new_indexes.get(rule):
+            matches.append((old_index, new_indexes[rule].popleft()))
+
+    diff = [(' ', rule) for rule in old_rules[:head]]
+    old_start = new_start = 0
+    for old_index, new_index in (_longest_increasing_subsequence(matches) +
+                                 [(len(old_middle), len(new_middle))]):
+        diff += [('-', rule) for rule in old_middle[old_start:old_index]]
+        diff += [('+', rule) for rule in new_middle[new_start:new_index]]
+        if old_index < len(old_middle):
+            diff.append((' ', old_middle[old_index]))
+        old_start, new_start = old_index + 1, new_index + 1
+    diff += [(' ', rule) for rule in old_rules[old_len - tail:]]
+    return diff
+
+
 def _generate_chain_diff_iptables_commands(chain, old_chain_rules,
                                            new_chain_rules):
     # keep track of the old index because we have to insert rules
@@ -884,18 +1011,15 @@ def _generate_chain_diff_iptables_commands(chain, old_chain_rules,
     # stored in the same way
     old_chain_rules = _ensure_all_mac_addresses_are_uppercase(old_chain_rules)
     new_chain_rules = _ensure_all_mac_addresses_are_uppercase(new_chain_rules)
-    for line in difflib.ndiff(old_chain_rules, new_chain_rules):
-        if line.startswith('?'):
-            # skip ? because that's a guide string for intraline differences
-            continue
-        if line.startswith('-'):  # line deleted
+    for op, line in _diff_chain_rules(old_chain_rules, new_chain_rules):
+        if op == '-':  # line deleted
             statements.append('-D %s %d' % (chain, old_index))
             # since we are removing a line from the old rules, we
             # backup the index by 1
             old_index -= 1
-        elif line.startswith('+'):  # line added
+        elif op == '+':  # line added
             # strip the chain name since we have to add it before the index
-            rule = line[5:].split(' ', 1)[-1]
+            rule = line[3:].split(' ', 1)[-1]
             # IptablesRule does not add trailing spaces for rules, so we
             # have to detect that here by making sure this chain isn't
             # referencing itself
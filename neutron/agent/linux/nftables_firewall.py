@@ -0,0 +1,565 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Security groups firewall driver based on nftables.
+
+The ports are filtered in a single "bridge" family table. The traffic of the
+filtered ports is dispatched to the port chains through verdict maps keyed
+on the interface name, and the remote security group members are kept in
+named sets. The changes are computed against the last applied ruleset and
+applied atomically with one "nft -f" transaction, which only contains the
+port chains, set elements and map elements that changed.
+"""
+
+import collections
+import re
+
+import netaddr
+from neutron_lib import constants
+from oslo_log import log as logging
+from oslo_utils import netutils
+
+from neutron.agent import firewall
+from neutron.agent.linux import ip_conntrack
+from neutron.agent.linux import iptables_firewall
+from neutron.agent.linux import utils as linux_utils
+from neutron.common import _constants as const
+from neutron.common import utils as c_utils
+
+LOG = logging.getLogger(__name__)
+
+TABLE = 'bridge neutron'
+INGRESS_PORTS_MAP = 'ingress-ports'
+EGRESS_PORTS_MAP = 'egress-ports'
+CT_ZONES_MAP = 'ct-zones'
+NOTRACK_PORTS_SET = 'notrack-ports'
+CHAIN_NAME_PREFIX = iptables_firewall.CHAIN_NAME_PREFIX
+SPOOF_FILTER = iptables_firewall.SPOOF_FILTER
+ETHER_TYPES = {constants.IPv4: 'ip', constants.IPv6: 'ip6'}
+SET_TYPES = {constants.IPv4: 'ipv4_addr', constants.IPv6: 'ipv6_addr'}
+IP_TRAFFIC = 'ether type { ip, ip6 }'
+
+# The base chains and maps of the table, the port chains, the remote group
+# sets and the map elements are added to it.
+TABLE_DEFINITION = """table %(table)s {
+    map %(ingress_map)s { type ifname : verdict; }
+    map %(egress_map)s { type ifname : verdict; }
+    map %(zones_map)s { typeof iifname : ct zone; }
+    set %(notrack_set)s { type ifname; }
+    chain prerouting {
+        type filter hook prerouting priority -300; policy accept;
+        %(ip)s iifname @%(notrack_set)s notrack
+        %(ip)s ct zone set iifname map @%(zones_map)s
+    }
+    chain forward {
+        type filter hook forward priority 0; policy accept;
+        %(ip)s oifname vmap @%(ingress_map)s
+        %(ip)s iifname vmap @%(egress_map)s
+    }
+    chain input {
+        type filter hook input priority 0; policy accept;
+        %(ip)s iifname vmap @%(egress_map)s
+    }
+}""" % {'table': TABLE, 'ingress_map': INGRESS_PORTS_MAP,
+        'egress_map': EGRESS_PORTS_MAP, 'zones_map': CT_ZONES_MAP,
+        'notrack_set': NOTRACK_PORTS_SET, 'ip': IP_TRAFFIC}
+
+
+class NftRuleset:
+    """The part of the table content managed by the driver.
+
+    chains: chain name -> list of rules
+    sets: set name -> (set type, frozenset of elements)
+    maps: map name -> {key: value}
+    """
+
+    def __init__(self):
+        self.chains = {}
+        self.sets = {NOTRACK_PORTS_SET: ('type ifname;', frozenset())}
+        self.maps = {INGRESS_PORTS_MAP: {}, EGRESS_PORTS_MAP: {},
+                     CT_ZONES_MAP: {}}
+
+
+def _quote(name):
+    return '"%s"' % name
+
+
+def _elements(elements):
+    return '{ %s }' % ', '.join(elements)
+
+
+def generate_nft_commands(old, new):
+    """Generate the nft commands to go from the old to the new ruleset.
+
+    The commands are ordered so that a set or a chain is always created
+    before being referenced, and only deleted once nothing references it.
+    """
+    commands = []
+    for name, (set_type, elements) in sorted(new.sets.items()):
+        old_elements = frozenset()
+        if name in old.sets:
+            old_elements = old.sets[name][1]
+        else:
+            commands.append(f'add set {TABLE} {name} {{ {set_type} }}')
+        # deleted elements first, a merged prefix can overlap the old ones
+        if old_elements - elements:
+            commands.append(f'delete element {TABLE} {name} ' +
+                            _elements(sorted(old_elements - elements)))
+        if elements - old_elements:
+            commands.append(f'add element {TABLE} {name} ' +
+                            _elements(sorted(elements - old_elements)))
+
+    changed_chains = sorted(name for name, rules in new.chains.items()
+                            if old.chains.get(name) != rules)
+    commands += [f'add chain {TABLE} {name}' for name in changed_chains
+                 if name not in old.chains]
+    for name in changed_chains:
+        if name in old.chains:
+            commands.append(f'flush chain {TABLE} {name}')
+        commands += [f'add rule {TABLE} {name} {rule}'
+                     for rule in new.chains[name]]
+
+    for name, elements in sorted(new.maps.items()):
+        old_elements = old.maps.get(name, {})
+        deleted = sorted(key for key, value in old_elements.items()
+                         if elements.get(key) != value)
+        added = sorted(f'{key} : {value}' for key, value in elements.items()
+                       if old_elements.get(key) != value)
+        if deleted:
+            commands.append(f'delete element {TABLE} {name} ' +
+                            _elements(deleted))
+        if added:
+            commands.append(f'add element {TABLE} {name} ' +
+                            _elements(added))
+
+    deleted_chains = sorted(set(old.chains) - set(new.chains))
+    commands += [f'flush chain {TABLE} {name}' for name in deleted_chains]
+    commands += [f'delete chain {TABLE} {name}' for name in deleted_chains]
+    commands += [f'delete set {TABLE} {name}'
+                 for name in sorted(set(old.sets) - set(new.sets))]
+    return commands
+
+
+class NftablesFirewallDriver(firewall.FirewallDriver):
+    """Driver which enforces security groups through nftables rules.
+
+    The ports are plugged in a Linux bridge, like with the hybrid iptables
+    driver, so the bridged traffic of the ports can be filtered by nftables.
+    """
+    OVS_HYBRID_PLUG_REQUIRED = True
+    CONNTRACK_ZONE_PER_PORT = True
+
+    def __init__(self, namespace=None):
+        self.namespace = namespace
+        self.filtered_ports = {}
+        self.unfiltered_ports = {}
+        self.trusted_ports = []
+        self.sg_rules = {}
+        self.sg_members = collections.defaultdict(
+            lambda: collections.defaultdict(list))
+        # last applied ruleset, None when the table has to be recreated
+        self._applied = None
+        self._defer_apply = False
+        self._pre_defer_filtered_ports = None
+        self._pre_defer_sg_rules = None
+        self.updated_rule_sg_ids = set()
+        self.updated_sg_members = set()
+        self.ipconntrack = ip_conntrack.get_conntrack(
+            self._get_zone_rules, self.filtered_ports,
+            self.unfiltered_ports, namespace=namespace,
+            zone_per_port=self.CONNTRACK_ZONE_PER_PORT)
+
+    @property
+    def ports(self):
+        return dict(self.filtered_ports, **self.unfiltered_ports)
+
+    def _execute(self, args, **kwargs):
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        return linux_utils.execute(args, run_as_root=True, privsep_exec=True,
+                                   **kwargs)
+
+    def _get_zone_rules(self, table):
+        """Return the conntrack zones of the devices as iptables rules.
+
+        The conntrack manager populates its zone map from the iptables
+        "raw" table rules; the zones of a previous run are read from the
+        zones map of the nftables table instead.
+        """
+        output = self._execute(
+            ['nft', 'list', 'map'] + TABLE.split() + [CT_ZONES_MAP],
+            check_exit_code=False, log_fail_as_error=False)
+        return ['-m physdev --physdev-in %s -j CT --zone %s' % match
+                for match in re.findall(r'"([\w.-]+)"\s*:\s*(\d+)',
+                                        output or '')]
+
+    def _get_device_name(self, port):
+        return iptables_firewall.get_hybrid_port_name(port['device'])
+
+    def _get_br_device_name(self, port):
+        return ('qvb' + port['device'])[:constants.LINUX_DEV_LEN]
+
+    def _port_chain_name(self, port, direction):
+        return '{}{}'.format(CHAIN_NAME_PREFIX[direction], port['device'])
+
+    @staticmethod
+    def _remote_set_name(remote_group_id, ethertype):
+        return f'{ethertype}-{remote_group_id}'
+
+    @staticmethod
+    def _get_any_remote_group_id_in_rule(rule):
+        return (rule.get('remote_group_id') or
+                rule.get('remote_address_group_id'))
+
+    def update_security_group_rules(self, sg_id, sg_rules):
+        LOG.debug("Update rules of security group (%s)", sg_id)
+        self.sg_rules[sg_id] = sg_rules
+
+    def update_security_group_members(self, sg_id, sg_members):
+        LOG.debug("Update members of security group (%s)", sg_id)
+        devices = [port for port in self.filtered_ports.values()
+                   if sg_id in port.get('security_group_source_groups', [])]
+        for ethertype, members in sg_members.items():
+            old_ips = {ip for ip, _mac in self.sg_members[sg_id][ethertype]}
+            deleted_ips = old_ips - {ip for ip, _mac in members}
+            if devices and deleted_ips:
+                self.ipconntrack.delete_conntrack_state_by_remote_ips(
+                    devices, ethertype,
+                    [str(netaddr.IPNetwork(ip).ip) for ip in deleted_ips])
+        self.sg_members[sg_id] = collections.defaultdict(list, sg_members)
+        self._apply()
+
+    def security_group_updated(self, action_type, sec_group_ids,
+                               device_ids=None):
+        if action_type == 'sg_rule':
+            self.updated_rule_sg_ids.update(sec_group_ids)
+        elif action_type == 'sg_member' and device_ids:
+            self.updated_sg_members.update(device_ids)
+
+    def process_trusted_ports(self, port_ids):
+        # the traffic of the ports not in the port maps is accepted
+        for port_id in port_ids:
+            if port_id not in self.trusted_ports:
+                self.trusted_ports.append(port_id)
+
+    def remove_trusted_ports(self, port_ids):
+        for port_id in port_ids:
+            if port_id in self.trusted_ports:
+                self.trusted_ports.remove(port_id)
+
+    def _set_ports(self, port):
+        if not firewall.port_sec_enabled(port):
+            self.unfiltered_ports[port['device']] = port
+            self.filtered_ports.pop(port['device'], None)
+        else:
+            self.filtered_ports[port['device']] = port
+            self.unfiltered_ports.pop(port['device'], None)
+
+    def _unset_ports(self, port):
+        self.unfiltered_ports.pop(port['device'], None)
+        self.filtered_ports.pop(port['device'], None)
+
+    def prepare_port_filter(self, port):
+        LOG.debug("Preparing device (%s) filter", port['device'])
+        self._set_ports(port)
+        self._apply()
+
+    def update_port_filter(self, port):
+        LOG.debug("Updating device (%s) filter", port['device'])
+        if port['device'] not in self.ports:
+            LOG.info('Attempted to update port filter which is not '
+                     'filtered %s', port['device'])
+            return
+        self._set_ports(port)
+        self._apply()
+
+    def remove_port_filter(self, port):
+        LOG.debug("Removing device (%s) filter", port['device'])
+        if port['device'] not in self.ports:
+            LOG.info('Attempted to remove port filter which is not '
+                     'filtered %r', port)
+            return
+        device_info = self.filtered_ports.get(port['device'])
+        if device_info:
+            for ethertype in (constants.IPv4, constants.IPv6):
+                self.ipconntrack.delete_conntrack_state_by_remote_ips(
+                    [device_info], ethertype, set())
+        self._unset_ports(port)
+        self._apply()
+
+    def filter_defer_apply_on(self):
+        if not self._defer_apply:
+            self._pre_defer_filtered_ports = dict(self.filtered_ports)
+            self._pre_defer_sg_rules = dict(self.sg_rules)
+            self._defer_apply = True
+
+    def filter_defer_apply_off(self):
+        if self._defer_apply:
+            self._defer_apply = False
+            self._apply()
+            self._remove_conntrack_entries_from_sg_updates()
+            self._remove_unused_security_group_info()
+            self._pre_defer_filtered_ports = None
+            self._pre_defer_sg_rules = None
+
+    def _remove_conntrack_entries_from_sg_updates(self):
+        for sg_id in self.updated_rule_sg_ids:
+            new_rules = self.sg_rules.get(sg_id, [])
+            deleted_rules = [rule for rule in
+                             self._pre_defer_sg_rules.get(sg_id, [])
+                             if rule not in new_rules]
+            if not deleted_rules:
+                continue
+            devices = [port for port in self.filtered_ports.values()
+                       if sg_id in port.get('security_groups', [])]
+            for rule in deleted_rules:
+                self.ipconntrack.delete_conntrack_state_by_rule(devices, rule)
+        self.updated_rule_sg_ids.clear()
+
+        for device in self.updated_sg_members:
+            device_info = self.filtered_ports.get(device)
+            pre_device_info = self._pre_defer_filtered_ports.get(device)
+            if not device_info or not pre_device_info:
+                continue
+            if set(pre_device_info.get('security_groups', [])) - set(
+                    device_info.get('security_groups', [])):
+                for ethertype in (constants.IPv4, constants.IPv6):
+                    self.ipconntrack.delete_conntrack_state_by_remote_ips(
+                        [device_info], ethertype, set())
+        self.updated_sg_members.clear()
+
+    def _remove_unused_security_group_info(self):
+        port_sg_ids = set()
+        remote_sg_ids = set()
+        for port in self.filtered_ports.values():
+            port_sg_ids.update(port.get('security_groups', []))
+            remote_sg_ids.update(self._get_remote_sg_ids(port))
+        for sg_id in set(self.sg_rules) - port_sg_ids:
+            del self.sg_rules[sg_id]
+        for sg_id in set(self.sg_members) - remote_sg_ids:
+            del self.sg_members[sg_id]
+
+    def _get_remote_sg_ids(self, port):
+        remote_sg_ids = set()
+        for sg_id in port.get('security_groups', []):
+            for rule in self.sg_rules.get(sg_id, []):
+                remote_sg_id = self._get_any_remote_group_id_in_rule(rule)
+                if remote_sg_id:
+                    remote_sg_ids.add(remote_sg_id)
+        return remote_sg_ids
+
+    def _apply(self):
+        if self._defer_apply:
+            return
+        ruleset = self._build_ruleset()
+        if self._applied is None:
+            # (re)create the table, removing anything left by a previous run
+            commands = ['add table %s' % TABLE, 'delete table %s' % TABLE,
+                        TABLE_DEFINITION]
+            commands += generate_nft_commands(NftRuleset(), ruleset)
+        else:
+            commands = generate_nft_commands(self._applied, ruleset)
+            if not commands:
+                return
+        try:
+            self._execute(['nft', '-f', '-'],
+                          process_input='\n'.join(commands) + '\n')
+        except Exception:
+            # the table content is unknown, recreate it on the next apply
+            self._applied = None
+            raise
+        LOG.debug("NftablesFirewallDriver applied %d nft commands",
+                  len(commands))
+        self._applied = ruleset
+
+    def _build_ruleset(self):
+        ruleset = NftRuleset()
+        ingress_map = ruleset.maps[INGRESS_PORTS_MAP]
+        egress_map = ruleset.maps[EGRESS_PORTS_MAP]
+        zones_map = ruleset.maps[CT_ZONES_MAP]
+        notrack_ports = set()
+        for port in self.filtered_ports.values():
+            device = _quote(self._get_device_name(port))
+            for direction, port_map in (
+                    (constants.INGRESS_DIRECTION, ingress_map),
+                    (constants.EGRESS_DIRECTION, egress_map)):
+                chain_name = self._port_chain_name(port, direction)
+                ruleset.chains[chain_name] = self._get_port_rules(
+                    port, direction)
+                port_map[device] = 'jump %s' % chain_name
+            spoof_rules = self._get_spoof_filter_rules(port)
+            if spoof_rules:
+                ruleset.chains[self._port_chain_name(
+                    port, SPOOF_FILTER)] = spoof_rules
+
+            devices = (device, _quote(self._get_br_device_name(port)))
+            if self._is_port_stateful(port):
+                zone = self.ipconntrack.get_device_zone(port)
+                for dev in devices:
+                    zones_map[dev] = zone
+            else:
+                notrack_ports.update(devices)
+        ruleset.sets[NOTRACK_PORTS_SET] = ('type ifname;',
+                                           frozenset(notrack_ports))
+
+        for port in self.filtered_ports.values():
+            for sg_id in self._get_remote_sg_ids(port):
+                for ethertype, set_type in SET_TYPES.items():
+                    set_name = self._remote_set_name(sg_id, ethertype)
+                    ruleset.sets[set_name] = (
+                        'type %s; flags interval;' % set_type,
+                        self._get_set_elements(sg_id, ethertype))
+        return ruleset
+
+    def _get_set_elements(self, sg_id, ethertype):
+        # overlapping prefixes are rejected by interval sets
+        members = netaddr.cidr_merge(
+            [ip for ip, _mac in self.sg_members[sg_id][ethertype]])
+        return frozenset(str(member.ip) if member.size == 1 else str(member)
+                         for member in members)
+
+    def _is_port_stateful(self, port):
+        for sg_id in port.get('security_groups', [])[:1]:
+            for rule in self.sg_rules.get(sg_id, []):
+                return rule.get('stateful', True)
+        return True
+
+    def _get_port_rules(self, port, direction):
+        rules = []
+        if direction == constants.EGRESS_DIRECTION:
+            rules += self._get_fixed_egress_rules(port)
+        else:
+            rules.append('icmpv6 type { %s } return' % ', '.join(
+                str(icmp_type) for icmp_type in
+                firewall.ICMPV6_ALLOWED_INGRESS_TYPES))
+        rules.append('ct state related,established return')
+        seen_rules = set()
+        for sg_rule in self._select_sg_rules_for_port(port, direction):
+            rule = self._convert_sg_rule(sg_rule)
+            if rule and rule not in seen_rules:
+                # the same rule can come from several security groups
+                seen_rules.add(rule)
+                rules.append(rule)
+        rules.append('ct state invalid drop')
+        rules.append('drop')
+        return rules
+
+    def _get_fixed_egress_rules(self, port):
+        # Allow dhcp client discovery and request, neighbor solicitation and
+        # multicast listener discovery from the unspecified address
+        rules = [
+            'ip saddr 0.0.0.0 ip daddr 255.255.255.255 udp sport 68 '
+            'udp dport 67 return',
+            'ip6 saddr :: ip6 daddr ff02::/16 icmpv6 type { %s } return' %
+            ', '.join(str(icmp_type) for icmp_type in
+                      constants.ICMPV6_ALLOWED_UNSPEC_ADDR_TYPES),
+        ]
+        if self._get_spoof_filter_rules(port):
+            rules.append('%s jump %s' % (
+                IP_TRAFFIC, self._port_chain_name(port, SPOOF_FILTER)))
+        rules += [
+            # Allow dhcp client renewal and rebinding
+            'ether type ip udp sport 68 udp dport 67 return',
+            # Drop router advertisements from the port
+            'icmpv6 type %s drop' % constants.ICMPV6_TYPE_RA,
+            'ether type ip6 meta l4proto ipv6-icmp return',
+            'ether type ip6 udp sport 546 udp dport 547 return',
+            # Drop dhcp packets from the port
+            'ether type ip udp sport 67 udp dport 68 drop',
+            'ether type ip6 udp sport 547 udp dport 546 drop',
+        ]
+        return rules
+
+    def _get_spoof_filter_rules(self, port):
+        pairs = [(pair['mac_address'], pair['ip_address'])
+                 for pair in port.get('allowed_address_pairs') or []]
+        pairs += [(port['mac_address'], ip) for ip in port['fixed_ips']]
+        rules = []
+        for mac, ip in pairs:
+            mac = str(netaddr.EUI(mac, dialect=netaddr.mac_unix_expanded))
+            version = netaddr.IPNetwork(ip).version
+            family = 'ip' if version == constants.IP_VERSION_4 else 'ip6'
+            rules.append(f'ether saddr {mac} {family} saddr '
+                         f'{c_utils.ip_to_cidr(ip)} return')
+            if version == constants.IP_VERSION_6:
+                lla = str(netutils.get_ipv6_addr_by_EUI64(
+                    constants.IPv6_LLA_PREFIX, mac))
+                rules.append(f'ether saddr {mac} ip6 saddr {lla} return')
+        if not port['fixed_ips']:
+            rules.append('ether saddr %s return' % str(
+                netaddr.EUI(port['mac_address'],
+                            dialect=netaddr.mac_unix_expanded)))
+        if not rules:
+            return []
+        # only add once the link local rules shared by several addresses
+        rules = list(dict.fromkeys(rules))
+        rules.append('drop')
+        return rules
+
+    def _select_sg_rules_for_port(self, port, direction):
+        sg_rules = [rule for rule in port.get('security_group_rules', [])
+                    if rule['direction'] == direction]
+        for sg_id in port.get('security_groups', []):
+            sg_rules += [rule for rule in self.sg_rules.get(sg_id, [])
+                         if rule['direction'] == direction]
+        return sg_rules
+
+    def _convert_sg_rule(self, sg_rule):
+        ethertype = sg_rule.get('ethertype')
+        if ethertype not in ETHER_TYPES:
+            return
+        family = ETHER_TYPES[ethertype]
+        match = ['ether type %s' % family]
+        for key, addr in (('source_ip_prefix', 'saddr'),
+                          ('dest_ip_prefix', 'daddr')):
+            ip_prefix = sg_rule.get(key)
+            if ip_prefix and not ip_prefix.endswith('/0'):
+                match.append(f'{family} {addr} {ip_prefix}')
+        remote_gid = self._get_any_remote_group_id_in_rule(sg_rule)
+        if remote_gid:
+            addr = ('saddr' if sg_rule['direction'] ==
+                    constants.INGRESS_DIRECTION else 'daddr')
+            match.append('{} {} @{}'.format(
+                family, addr, self._remote_set_name(remote_gid, ethertype)))
+
+        protocol = sg_rule.get('protocol')
+        if protocol in const.SG_RULE_PROTO_ANY or protocol == '0':
+            return ' '.join(match + ['return'])
+        protocol = constants.IPTABLES_PROTOCOL_NAME_MAP.get(protocol,
+                                                            protocol)
+        if (ethertype == constants.IPv6 and
+                protocol in const.IPV6_ICMP_LEGACY_PROTO_LIST):
+            protocol = constants.PROTO_NAME_IPV6_ICMP
+        match.append('meta l4proto %s' % protocol)
+        if protocol in const.SG_PORT_PROTO_NAMES:
+            for key, port_min, port_max in (
+                    ('sport', sg_rule.get('source_port_range_min'),
+                     sg_rule.get('source_port_range_max')),
+                    ('dport', sg_rule.get('port_range_min'),
+                     sg_rule.get('port_range_max'))):
+                if port_min is None:
+                    continue
+                if port_max is None or port_min == port_max:
+                    match.append(f'th {key} {port_min}')
+                else:
+                    match.append(f'th {key} {port_min}-{port_max}')
+        elif protocol in (constants.PROTO_NAME_ICMP,
+                          constants.PROTO_NAME_IPV6_ICMP):
+            icmp = 'icmp' if protocol == constants.PROTO_NAME_ICMP else (
+                'icmpv6')
+            # port_range_min/port_range_max represent the icmp type/code
+            if sg_rule.get('port_range_min') is not None:
+                match.append('%s type %s' % (icmp, sg_rule['port_range_min']))
+                if sg_rule.get('port_range_max') is not None:
+                    match.append('%s code %s' % (icmp,
+                                                 sg_rule['port_range_max']))
+        return ' '.join(match + ['return'])
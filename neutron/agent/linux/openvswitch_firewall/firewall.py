@@ -41,6 +41,7 @@ from neutron.agent.linux.openvswitch_firewall import constants as ovsfw_consts
 from neutron.agent.linux.openvswitch_firewall import exceptions
 from neutron.agent.linux.openvswitch_firewall import iptables
 from neutron.agent.linux.openvswitch_firewall import rules
+from neutron.agent.linux.openvswitch_firewall import rules_cache
 from neutron.common import utils as n_utils
 
 LOG = logging.getLogger(__name__)
@@ -371,6 +372,13 @@ class ConjIdMap:
         return result
 
 
+def _num_conj_ip_flows(conj_ids):
+    """Number of flows of an address matching the given conj_ids."""
+    # Two flows (one per CT state) per priority offset
+    return 2 * len({rules.flow_priority_offset_from_conj_id(conj_id)
+                    for conj_id in conj_ids})
+
+
 class ConjIPFlowManager:
     """Manage conj_id allocation and remote securitygroups derived
     conjunction flows.
@@ -393,6 +401,11 @@ class ConjIPFlowManager:
         self.conj_ids = collections.defaultdict(dict)
         self.flow_state = collections.defaultdict(
             lambda: collections.defaultdict(dict))
+        # Counters of the remote group member updates, reporting how many
+        # flow mods were saved by only updating the changed addresses.
+        self.member_update_stats = {'updates': 0,
+                                    'flow_mods': 0,
+                                    'flow_mods_saved': 0}
 
     def _build_addr_conj_id_map(self, ethertype, sg_ag_conj_id_map):
         """Build a map of addr -> list of conj_ids."""
@@ -411,8 +424,15 @@ class ConjIPFlowManager:
     def _update_flows_for_vlan_subr(self, direction, ethertype, vlan_tag,
                                     flow_state, addr_to_conj,
                                     conj_id_to_remove, ofport):
-        """Do the actual flow updates for given direction and ethertype."""
+        """Do the actual flow updates for given direction and ethertype.
+
+        Return the new flow state, a map of addr -> sorted list of conj_ids,
+        and the number of flow mods sent to the bridge.
+        """
         conj_id_to_remove = conj_id_to_remove or []
+        flow_mods = sum(
+            _num_conj_ip_flows(flow_state[addr])
+            for addr in set(flow_state) - set(addr_to_conj))
         # Delete any current flow related to any deleted IP address, before
         # creating the flows for the current IPs.
         self.driver.delete_flows_for_flow_state(
@@ -424,6 +444,7 @@ class ConjIPFlowManager:
                 self.driver.delete_flow_for_ip_and_mac(
                     current_ip, current_mac, direction, ethertype,
                     vlan_tag, conj_ids_to_remove)
+                flow_mods += _num_conj_ip_flows(conj_ids_to_remove)
 
         # NOTE(hangyang): Handle add/delete overlapped IPs among
         # remote security groups and remote address groups
@@ -437,6 +458,7 @@ class ConjIPFlowManager:
             # others from remote address groups have not.
             ip_to_conj[str(netaddr.IPNetwork(addr).cidr)].update(conj_ids)
 
+        new_flow_state = {}
         for addr, mac in addr_to_conj:
             ip_cidr = str(netaddr.IPNetwork(addr).cidr)
             # When the overlapped IP in remote security group and remote
@@ -446,6 +468,7 @@ class ConjIPFlowManager:
             # creation sequence.
             conj_ids = list(ip_to_conj[ip_cidr])
             conj_ids.sort()
+            new_flow_state[(addr, mac)] = conj_ids
             if (flow_state.get((addr, mac)) == conj_ids and
                     ip_cidr not in removed_ips):
                 # When there are IP overlaps among remote security groups
@@ -458,6 +481,8 @@ class ConjIPFlowManager:
             for flow in rules.create_flows_for_ip_address_and_mac(
                     addr, mac, direction, ethertype, vlan_tag, conj_ids):
                 self.driver._add_flow(flow_group_id=ofport, **flow)
+                flow_mods += 1
+        return new_flow_state, flow_mods
 
     def update_flows_for_vlan(self, vlan_tag, ofport, conj_id_to_remove=None):
         """Install action=conjunction(conj_id, 1/2) flows,
@@ -470,11 +495,67 @@ class ConjIPFlowManager:
             # no address overlaps.
             addr_to_conj = self._build_addr_conj_id_map(
                 ethertype, sg_ag_conj_id_map)
-            self._update_flows_for_vlan_subr(
-                direction, ethertype, vlan_tag,
-                self.flow_state[vlan_tag][(direction, ethertype)],
-                addr_to_conj, conj_id_to_remove, ofport)
-            self.flow_state[vlan_tag][(direction, ethertype)] = addr_to_conj
+            self.flow_state[vlan_tag][(direction, ethertype)], _ = (
+                self._update_flows_for_vlan_subr(
+                    direction, ethertype, vlan_tag,
+                    self.flow_state[vlan_tag][(direction, ethertype)],
+                    addr_to_conj, conj_id_to_remove, ofport))
+
+    def update_members(self, remote_id, old_members, new_members):
+        """Update the flows of the addresses changed in a remote group.
+
+        Only the address flows of the networks referencing the remote group
+        are updated, and only for the addresses added to or removed from
+        the group: the flows of the unchanged addresses are left untouched.
+        """
+        for ethertype in (lib_const.IPv4, lib_const.IPv6):
+            old_addrs = set(old_members.get(ethertype, []))
+            new_addrs = set(new_members.get(ethertype, []))
+            added = new_addrs - old_addrs
+            removed = old_addrs - new_addrs
+            if not added and not removed:
+                continue
+            LOG.debug("Remote group %(remote_id)s %(ethertype)s members "
+                      "changed: %(added)d added, %(removed)d removed",
+                      {'remote_id': remote_id, 'ethertype': ethertype,
+                       'added': len(added), 'removed': len(removed)})
+            for vlan_tag, vlan_conj_id_map in self.conj_ids.items():
+                for (direction, ethertype_), sg_ag_conj_id_map in (
+                        vlan_conj_id_map.items()):
+                    if (ethertype_ != ethertype or
+                            remote_id not in sg_ag_conj_id_map):
+                        continue
+                    self._update_members_for_vlan(
+                        vlan_tag, direction, ethertype, sg_ag_conj_id_map)
+
+    def _update_members_for_vlan(self, vlan_tag, direction, ethertype,
+                                 sg_ag_conj_id_map):
+        flow_state = self.flow_state[vlan_tag][(direction, ethertype)]
+        addr_to_conj = self._build_addr_conj_id_map(
+            ethertype, sg_ag_conj_id_map)
+        new_flow_state, flow_mods = self._update_flows_for_vlan_subr(
+            direction, ethertype, vlan_tag, flow_state, addr_to_conj,
+            None, None)
+        self.flow_state[vlan_tag][(direction, ethertype)] = new_flow_state
+
+        # Reinstalling the flows of the whole remote group means deleting
+        # the flows of the previous addresses and adding the current ones.
+        full_flow_mods = (
+            sum(_num_conj_ip_flows(conj_ids)
+                for conj_ids in flow_state.values()) +
+            sum(_num_conj_ip_flows(conj_ids)
+                for conj_ids in new_flow_state.values()))
+        saved = max(full_flow_mods - flow_mods, 0)
+        self.member_update_stats['updates'] += 1
+        self.member_update_stats['flow_mods'] += flow_mods
+        self.member_update_stats['flow_mods_saved'] += saved
+        LOG.debug("Updated %(direction)s %(ethertype)s remote group flows "
+                  "on VLAN %(vlan_tag)s with %(flow_mods)d flow mods, "
+                  "%(saved)d saved", {'direction': direction,
+                                      'ethertype': ethertype,
+                                      'vlan_tag': vlan_tag,
+                                      'flow_mods': flow_mods,
+                                      'saved': saved})
 
     def add(self, vlan_tag, sg_id, remote_id, direction, ethertype,
             priority_offset):
@@ -575,6 +656,7 @@ class OVSFirewallDriver(firewall.FirewallDriver):
     def _initialize_sg(self):
         self.sg_port_map = SGPortMap()
         self.conj_ip_manager = ConjIPFlowManager(self)
+        self.rules_cache = rules_cache.CompiledRulesCache()
         self.sg_to_delete = set()
 
     def _initialize_firewall(self):
@@ -599,10 +681,6 @@ class OVSFirewallDriver(firewall.FirewallDriver):
         class's method.
         """
 
-    def _accept_flow(self, **flow):
-        for f in rules.create_accept_flows(flow):
-            self._add_flow(**f)
-
     def _add_flow(self, flow_group_id=None, **kwargs):
         """Add a new flow.
 
@@ -637,7 +715,9 @@ class OVSFirewallDriver(firewall.FirewallDriver):
     @staticmethod
     def initialize_bridge(int_br):
         int_br.add_protocols(*OVSFirewallDriver.REQUIRED_PROTOCOLS)
-        return int_br.deferred(full_ordered=True, use_bundle=True)
+        return int_br.deferred(
+            full_ordered=True, use_bundle=True,
+            single_bundle=cfg.CONF.OVS.openflow_single_bundle)
 
     def _drop_all_unmatched_flows(self):
         for table in ovs_consts.OVS_FIREWALL_TABLES:
@@ -848,10 +928,20 @@ class OVSFirewallDriver(firewall.FirewallDriver):
                 self._schedule_sg_deletion_maybe(sec_group.id)
 
     def update_security_group_rules(self, sg_id, rules):
+        sec_group = self.sg_port_map.get_sg(sg_id)
+        old_raw_rules = sec_group.raw_rules if sec_group else None
         self.sg_port_map.update_rules(sg_id, rules)
+        # The compiled flows only depend on the raw rules, the remote rules
+        # and the members are handled by the ConjIPFlowManager.
+        if self.sg_port_map.get_sg(sg_id).raw_rules != old_raw_rules:
+            self.rules_cache.invalidate(sg_id)
 
     def update_security_group_members(self, sg_id, member_ips):
+        sec_group = self.sg_port_map.get_sg(sg_id)
+        old_member_ips = sec_group.members if sec_group else {}
         self.sg_port_map.update_members(sg_id, member_ips)
+        self.conj_ip_manager.update_members(sg_id, old_member_ips,
+                                            member_ips)
         if not member_ips:
             self._schedule_sg_deletion_maybe(sg_id)
 
@@ -877,6 +967,7 @@ class OVSFirewallDriver(firewall.FirewallDriver):
                 continue
 
             self.conj_ip_manager.sg_removed(sg_id)
+            self.rules_cache.invalidate(sg_id)
             self.sg_port_map.delete_sg(sg_id)
 
     def process_trusted_ports(self, port_ids):
@@ -1611,25 +1702,18 @@ class OVSFirewallDriver(firewall.FirewallDriver):
         self._initialize_tracked_egress(port)
         LOG.debug('Creating flow rules for port %s that is port %d in OVS',
                   port.id, port.ofport)
-        for rule in self._create_rules_generator_for_port(port):
-            # NOTE(toshii): A better version of merge_common_rules and
-            # its friend should be applied here in order to avoid
-            # overlapping flows.
-            flows = rules.create_flows_from_rule_and_port(rule, port)
-            LOG.debug("RULGEN: Rules generated for flow %s are %s",
-                      rule, flows)
-            for flow in flows:
-                self._accept_flow(**flow)
+        # NOTE(toshii): A better version of merge_common_rules and
+        # its friend should be applied here in order to avoid
+        # overlapping flows.
+        for ethertype in (lib_const.IPv4, lib_const.IPv6):
+            for flow in self.rules_cache.get_flows(port, ethertype):
+                self._add_flow(**flow)
 
         self._add_non_ip_conj_flows(port)
 
         self.conj_ip_manager.update_flows_for_vlan(port.vlan_tag,
                                                    port.ofport)
 
-    def _create_rules_generator_for_port(self, port):
-        for sec_group in port.sec_groups:
-            yield from sec_group.raw_rules
-
     def _create_remote_rules_generator_for_port(self, port):
         for sec_group in port.sec_groups:
             for rule in sec_group.remote_rules:
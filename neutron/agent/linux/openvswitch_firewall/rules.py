@@ -288,7 +288,7 @@ def create_icmp_flows(flow_template, rule):
     return [flow]
 
 
-def _flow_priority_offset_from_conj_id(conj_id):
+def flow_priority_offset_from_conj_id(conj_id):
     """Return a flow priority offset encoded in a conj_id."""
     # A base conj_id, which is returned by ConjIdMap.get_conj_id, is a
     # multiple of 8, and we use 2 conj_ids per offset.
@@ -307,7 +307,7 @@ def create_flows_for_ip_address_and_mac(ip_address, mac_address, direction,
     conj_id_lists = [[] for i in range(4)]
     for conj_id in conj_ids:
         conj_id_lists[
-            _flow_priority_offset_from_conj_id(conj_id)].append(conj_id)
+            flow_priority_offset_from_conj_id(conj_id)].append(conj_id)
 
     ip_prefix = str(netaddr.IPNetwork(ip_address).cidr)
 
@@ -373,7 +373,7 @@ def substitute_conjunction_actions(flows, dimension, conj_ids):
 def create_conj_flows(port, conj_id, direction, ethertype):
     """Generate "accept" flows for a given conjunction ID."""
     flow_template = {
-        'priority': 70 + _flow_priority_offset_from_conj_id(conj_id),
+        'priority': 70 + flow_priority_offset_from_conj_id(conj_id),
         'conj_id': conj_id,
         'dl_type': ovsfw_consts.ethertype_to_dl_type_map[ethertype],
         # This reg_port matching is for delete_all_port_flows.
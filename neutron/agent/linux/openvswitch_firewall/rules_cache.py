@@ -0,0 +1,93 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron_lib.agent.common import constants as agent_consts
+from oslo_log import log as logging
+
+from neutron.agent.linux.openvswitch_firewall import rules
+
+LOG = logging.getLogger(__name__)
+
+# OFPP_NONE in OpenFlow 1.0, never assigned to a real port by Open vSwitch.
+TEMPLATE_OFPORT = 0xffff
+_TEMPLATE_OUTPUT = 'output:%d' % TEMPLATE_OFPORT
+
+
+class _TemplatePort:
+    ofport = TEMPLATE_OFPORT
+
+
+def _fill_template(flow_template, ofport):
+    flow = flow_template.copy()
+    if flow.get(agent_consts.PORT_REG_NAME) == TEMPLATE_OFPORT:
+        flow[agent_consts.PORT_REG_NAME] = ofport
+    actions = flow.get('actions')
+    if actions and _TEMPLATE_OUTPUT in actions:
+        flow['actions'] = ','.join(
+            'output:%d' % ofport if action == _TEMPLATE_OUTPUT else action
+            for action in actions.split(','))
+    return flow
+
+
+class CompiledRulesCache:
+    """Accept flows of the raw rules of a set of security groups.
+
+    Ports sharing the same security groups get the same flows from their
+    raw rules (the rules without a remote group), except for the port
+    ofport. The flows are compiled once per (security group set,
+    ethertype) with a template ofport, which is then replaced by the ofport
+    of each port using them.
+    """
+
+    def __init__(self):
+        self._templates = {}
+
+    @staticmethod
+    def fingerprint(sec_groups):
+        return frozenset(sec_group.id for sec_group in sec_groups)
+
+    def _compile(self, sec_groups, ethertype):
+        flow_templates = []
+        for sec_group in sec_groups:
+            for rule in sec_group.raw_rules:
+                if rule['ethertype'] != ethertype:
+                    continue
+                for flow in rules.create_flows_from_rule_and_port(
+                        rule, _TemplatePort):
+                    flow_templates.extend(rules.create_accept_flows(flow))
+        return flow_templates
+
+    def get_flows(self, port, ethertype):
+        """Return the accept flows of the raw rules of a port."""
+        key = (self.fingerprint(port.sec_groups), ethertype)
+        try:
+            flow_templates = self._templates[key]
+        except KeyError:
+            flow_templates = self._compile(port.sec_groups, ethertype)
+            self._templates[key] = flow_templates
+            LOG.debug("Compiled %(num_flows)d %(ethertype)s flow templates "
+                      "for security groups %(sg_ids)s",
+                      {'num_flows': len(flow_templates),
+                       'ethertype': ethertype, 'sg_ids': sorted(key[0])})
+        return [_fill_template(flow_template, port.ofport)
+                for flow_template in flow_templates]
+
+    def invalidate(self, sg_id):
+        """Drop the templates compiled from the rules of a security group."""
+        for key in [key for key in self._templates if sg_id in key[0]]:
+            del self._templates[key]
+
+    def clear(self):
+        self._templates.clear()
+
+    def __len__(self):
+        return len(self._templates)
@@ -12,34 +12,75 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import gzip
+import os
+import tempfile
+
 from neutron_lib.callbacks import events
 from neutron_lib.callbacks import registry
 from neutron_lib import context as n_ctx
 from neutron_lib import rpc as n_rpc
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 
 from neutron._i18n import _
 from neutron.api.rpc.callbacks.consumer import registry as registry_rpc
 from neutron.api.rpc.callbacks import events as events_rpc
+from neutron.api.rpc.callbacks import resources as rpc_resources
 from neutron.api.rpc.handlers import resources_rpc
 from neutron import objects
 
 LOG = logging.getLogger(__name__)
 objects.register_objects()
 
+# Fields of the cached resources indexed to speed up the get_resources
+# queries filtering on them.
+INDEXED_FIELDS = {
+    'Port': ('security_group_ids', 'network_id', 'device_owner'),
+    'SecurityGroupRule': ('security_group_id', 'remote_group_id',
+                          'remote_address_group_id'),
+}
+# Version of the format of the cache snapshots, snapshots with another
+# version are ignored.
+SNAPSHOT_VERSION = 1
+# Maximum number of filter values of the server queries reconciling a
+# snapshot.
+SNAPSHOT_RECONCILE_CHUNK_SIZE = 500
+
 
 class RemoteResourceCache:
     """Retrieves and stashes logical resources in their OVO format.
 
     This is currently only compatible with OVO objects that have an ID.
+
+    The resources are indexed by the values of their fields listed in
+    indexed_fields (INDEXED_FIELDS by default). Each element of a list
+    field is indexed.
     """
 
-    def __init__(self, resource_types):
+    def __init__(self, resource_types, indexed_fields=None):
         self.resource_types = resource_types
         self._cache_by_type_and_id = {rt: {} for rt in self.resource_types}
         self._deleted_ids_by_type = {rt: set() for rt in self.resource_types}
+        if indexed_fields is None:
+            indexed_fields = INDEXED_FIELDS
+        self._indexed_fields = {rt: tuple(indexed_fields.get(rt, ()))
+                                for rt in self.resource_types}
+        # {rtype: {field: {value: {resource_id: None}}}}, the innermost
+        # dicts are used as ordered sets to keep the cache order
+        self._indexes = {rt: {field: collections.defaultdict(dict)
+                              for field in self._indexed_fields[rt]}
+                         for rt in self.resource_types}
+        # {rtype: {resource_id: {field: index values}}}, the values the
+        # resources were indexed with
+        self._indexed_values = {rt: {} for rt in self.resource_types}
         # track everything we've asked the server so we don't ask again
         self._satisfied_server_queries = set()
+        # server queries and resource IDs of the loaded snapshot, not
+        # reconciled yet
+        self._snapshot_queries = set()
+        self._snapshot_ids = {rt: set() for rt in self.resource_types}
         self._puller = resources_rpc.ResourcesPullRpcApi()
 
     def _type_cache(self, rtype):
@@ -47,6 +88,73 @@ class RemoteResourceCache:
             raise RuntimeError(_("Resource cache not tracking %s") % rtype)
         return self._cache_by_type_and_id[rtype]
 
+    @staticmethod
+    def _get_index_values(resource, field):
+        value = getattr(resource, field, None)
+        if isinstance(value, list | tuple | set):
+            return frozenset(value)
+        return frozenset((value, ))
+
+    def _set_resource(self, rtype, resource):
+        """Add or replace a resource in the cache and its indexes."""
+        self._type_cache(rtype)[resource.id] = resource
+        old_values = self._indexed_values[rtype].get(resource.id, {})
+        new_values = {}
+        for field, index in self._indexes[rtype].items():
+            values = self._get_index_values(resource, field)
+            old = old_values.get(field, frozenset())
+            for value in old - values:
+                self._remove_from_index(index, value, resource.id)
+            for value in values - old:
+                index[value][resource.id] = None
+            new_values[field] = values
+        if new_values:
+            self._indexed_values[rtype][resource.id] = new_values
+
+    def _pop_resource(self, rtype, resource_id):
+        """Remove a resource from the cache and its indexes."""
+        old_values = self._indexed_values[rtype].pop(resource_id, {})
+        for field, values in old_values.items():
+            for value in values:
+                self._remove_from_index(self._indexes[rtype][field], value,
+                                        resource_id)
+        return self._type_cache(rtype).pop(resource_id, None)
+
+    @staticmethod
+    def _remove_from_index(index, value, resource_id):
+        resource_ids = index.get(value)
+        if resource_ids is None:
+            return
+        resource_ids.pop(resource_id, None)
+        if not resource_ids:
+            del index[value]
+
+    def _get_candidate_ids(self, rtype, filters):
+        """Return the IDs of the resources possibly matching filters.
+
+        Returns None if no filter can be resolved with an index, the whole
+        cache has to be scanned then.
+        """
+        candidates = None
+        for key, values in filters.items():
+            if key == 'id':
+                ids = dict.fromkeys(values)
+            elif key in self._indexes[rtype]:
+                index = self._indexes[rtype][key]
+                ids = {}
+                for value in values:
+                    ids.update(index.get(value, {}))
+            else:
+                continue
+            if candidates is None:
+                candidates = ids
+            else:
+                candidates = {resource_id: None for resource_id in candidates
+                              if resource_id in ids}
+            if not candidates:
+                break
+        return candidates
+
     def start_watcher(self):
         self._watcher = RemoteResourceWatcher(self)
 
@@ -124,6 +232,10 @@ class RemoteResourceCache:
 
         The values in the dictionary for a single key are matched in an OR
         fashion.
+
+        Only the resources indexed with the filter values are checked when
+        filtering on the ID or on an indexed field, otherwise all the
+        resources of rtype are.
         """
         self._flood_cache_for_query(rtype, **filters)
 
@@ -142,11 +254,22 @@ class RemoteResourceCache:
                     # no match found for this key
                     return False
             return True
-        return self.match_resources_with_func(rtype, match)
+
+        type_cache = self._type_cache(rtype)
+        candidate_ids = self._get_candidate_ids(rtype, filters)
+        if candidate_ids is None:
+            return self.match_resources_with_func(rtype, match)
+        candidates = (type_cache.get(resource_id)
+                      for resource_id in candidate_ids)
+        return [r for r in candidates if r is not None and match(r)]
 
     def match_resources_with_func(self, rtype, matcher):
-        """Returns a list of all resources satisfying func matcher."""
-        # TODO(kevinbenton): this is O(N), offer better lookup functions
+        """Returns a list of all resources satisfying func matcher.
+
+        This scans all the cached resources of rtype, get_resources should
+        be preferred when the matching can be expressed with filters on
+        indexed fields.
+        """
         return [r for r in self._type_cache(rtype).values()
                 if matcher(r)]
 
@@ -166,6 +289,136 @@ class RemoteResourceCache:
             return True
         return False
 
+    def save_snapshot(self, path):
+        """Save the cached resources and server queries to a file.
+
+        The snapshot is a gzip compressed JSON document with the resources
+        in their OVO primitive format, revision numbers included.
+        """
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'resources': {
+                rtype: [resource.obj_to_primitive()
+                        for resource in self._type_cache(rtype).values()]
+                for rtype in self.resource_types},
+            'queries': sorted(self._satisfied_server_queries |
+                              self._snapshot_queries, key=str),
+        }
+        data = gzip.compress(jsonutils.dump_as_bytes(snapshot))
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=dirname, delete=False) as f:
+            f.write(data)
+        os.chmod(f.name, 0o600)
+        os.replace(f.name, path)
+        LOG.debug("Saved resource cache snapshot %(path)s with %(queries)d "
+                  "server queries", {'path': path,
+                                     'queries': len(snapshot['queries'])})
+
+    def load_snapshot(self, path):
+        """Warm the cache with a snapshot saved by save_snapshot.
+
+        The loaded resources are not notified. The snapshot has to be
+        reconciled with the server with reconcile_snapshot, until then the
+        server queries of the snapshot are not considered satisfied.
+        Returns True if the snapshot was loaded.
+        """
+        try:
+            with gzip.open(path) as f:
+                snapshot = jsonutils.loads(f.read())
+            if snapshot.get('version') != SNAPSHOT_VERSION:
+                LOG.info("Ignoring resource cache snapshot %(path)s with "
+                         "version %(version)s", {
+                             'path': path,
+                             'version': snapshot.get('version')})
+                return False
+            loaded = []
+            for rtype, primitives in snapshot['resources'].items():
+                if rtype not in self.resource_types:
+                    continue
+                resource_cls = rpc_resources.get_resource_cls(rtype)
+                loaded.extend(
+                    (rtype, resource_cls.clean_obj_from_primitive(primitive))
+                    for primitive in primitives)
+            queries = {self._query_id_from_snapshot(query_id)
+                       for query_id in snapshot['queries']}
+        except FileNotFoundError:
+            return False
+        except Exception:
+            LOG.warning("Failed to load resource cache snapshot %s",
+                        path, exc_info=True)
+            return False
+        for rtype, resource in loaded:
+            self._set_resource(rtype, resource)
+            self._snapshot_ids[rtype].add(resource.id)
+        self._snapshot_queries = {query_id for query_id in queries
+                                  if query_id[0] in self.resource_types}
+        LOG.info("Loaded %(resources)d resources from resource cache "
+                 "snapshot %(path)s", {'resources': len(loaded),
+                                       'path': path})
+        return True
+
+    @staticmethod
+    def _query_id_from_snapshot(query_id):
+        # JSON turned the tuples of the query IDs into lists
+        return (query_id[0], ) + tuple((key, tuple(values))
+                                       for key, values in query_id[1:])
+
+    def _get_reconcile_queries(self, query_ids):
+        """Merge the single value query IDs on the same field.
+
+        Returns a list of (rtype, filter_kwargs) server queries.
+        """
+        values_by_field = collections.defaultdict(list)
+        queries = []
+        for query_id in query_ids:
+            rtype, filters = query_id[0], query_id[1:]
+            if len(filters) == 1 and len(filters[0][1]) == 1:
+                key, values = filters[0]
+                values_by_field[(rtype, key)].extend(values)
+            else:
+                queries.append((rtype, dict(filters)))
+        chunk_size = SNAPSHOT_RECONCILE_CHUNK_SIZE
+        for (rtype, key), values in values_by_field.items():
+            for i in range(0, len(values), chunk_size):
+                queries.append((rtype, {key: tuple(values[i:i + chunk_size])}))
+        return queries
+
+    def reconcile_snapshot(self):
+        """Update the resources loaded from a snapshot from the server.
+
+        The server queries of the snapshot are merged per resource type and
+        filter field, the resources returned by the server are recorded as
+        updates and the loaded resources not returned anymore are removed.
+        If the server can't be queried, the resources loaded from the
+        snapshot are removed and the cache is filled on demand.
+        """
+        query_ids = self._snapshot_queries
+        loaded_ids = self._snapshot_ids
+        self._snapshot_queries = set()
+        self._snapshot_ids = {rt: set() for rt in self.resource_types}
+        context = n_ctx.get_admin_context()
+        queries = self._get_reconcile_queries(query_ids)
+        try:
+            for rtype, filter_kwargs in queries:
+                for resource in self._puller.bulk_pull(
+                        context, rtype, filter_kwargs=filter_kwargs):
+                    loaded_ids[rtype].discard(resource.id)
+                    self.record_resource_update(context, rtype, resource,
+                                                agent_restarted=True)
+        except Exception:
+            LOG.warning("Failed to reconcile the resource cache snapshot, "
+                        "dropping it", exc_info=True)
+            query_ids = set()
+        for rtype, resource_ids in loaded_ids.items():
+            for resource_id in resource_ids:
+                self._pop_resource(rtype, resource_id)
+        self._satisfied_server_queries.update(query_ids)
+        LOG.info("Reconciled resource cache snapshot with %(queries)d server "
+                 "queries, %(removed)d resources removed",
+                 {'queries': len(queries),
+                  'removed': sum(len(ids) for ids in loaded_ids.values())})
+
     def record_resource_update(self, context, rtype, resource,
                                agent_restarted=False):
         """Takes in an OVO and generates an event on relevant changes.
@@ -179,7 +432,7 @@ class RemoteResourceCache:
             LOG.debug("Ignoring stale update for %s: %s", rtype, resource)
             return
         existing = self._type_cache(rtype).get(resource.id)
-        self._type_cache(rtype)[resource.id] = resource
+        self._set_resource(rtype, resource)
         changed_fields = self._get_changed_fields(existing, resource)
         if not changed_fields:
             LOG.debug("Received resource %s update without any changes: %s",
@@ -212,7 +465,7 @@ class RemoteResourceCache:
                 continue
         LOG.debug("Remove resource cache for resource %s: %s",
                   rtype, resource_id)
-        self._type_cache(rtype).pop(resource_id, None)
+        self._pop_resource(rtype, resource_id)
 
     def record_resource_delete(self, context, rtype, resource_id):
         # deletions are final, record them so we never
@@ -224,7 +477,7 @@ class RemoteResourceCache:
             LOG.debug("Skipped duplicate delete event for %s", resource_id)
             return
         self._deleted_ids_by_type[rtype].add(resource_id)
-        existing = self._type_cache(rtype).pop(resource_id, None)
+        existing = self._pop_resource(rtype, resource_id)
         # local notification for agent internals to subscribe to
         registry.publish(rtype, events.AFTER_DELETE, self,
                          payload=events.DBEventPayload(
@@ -15,6 +15,7 @@
 
 import collections
 import itertools
+import os
 
 import netaddr
 from neutron_lib.agent import topics
@@ -35,9 +36,13 @@ from oslo_utils import uuidutils
 
 from neutron.agent import resource_cache
 from neutron.api.rpc.callbacks import resources
+from neutron.conf.agent import common as agent_config
 from neutron import objects
 
 LOG = logging.getLogger(__name__)
+
+agent_config.register_resource_cache_opts(cfg.CONF)
+
 BINDING_DEACTIVATE = 'binding_deactivate'
 DeviceInfo = collections.namedtuple('DeviceInfo', 'mac pci_slot')
 
@@ -159,13 +164,28 @@ class PluginApi:
 
         This method returns the devices details. If an error is thrown when
         retrieving the devices details, the device is put in a list of
-        failed devices.
+        failed devices. The devices are requested in chunks of
+        rpc_resources_processing_step devices, so a single call does not
+        hold a server RPC worker for too long.
         """
         cctxt = self.client.prepare(version='1.5')
-        return cctxt.call(
-            context,
-            'get_devices_details_list_and_failed_devices',
-            devices=devices, agent_id=agent_id, host=host)
+
+        ret_devices = []
+        failed_devices = []
+
+        step = cfg.CONF.rpc_resources_processing_step
+        devices = list(devices)
+        for i in range(0, len(devices), step):
+            # Divide-and-conquer RPC timeout
+            ret = cctxt.call(
+                context,
+                'get_devices_details_list_and_failed_devices',
+                devices=devices[i:i + step], agent_id=agent_id, host=host)
+            ret_devices.extend(ret.get('devices', []))
+            failed_devices.extend(ret.get('failed_devices', []))
+
+        return {'devices': ret_devices,
+                'failed_devices': failed_devices}
 
     def get_network_details(self, context, network, agent_id, host=None):
         cctxt = self.client.prepare(version='1.6')
@@ -230,6 +250,7 @@ class CacheBackedPluginApi(PluginApi):
                       resources.NETWORK,
                       resources.SUBNET,
                       resources.ADDRESSGROUP]
+    RESOURCE_CACHE_SNAPSHOT = 'l2-agent-resource-cache.json.gz'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -406,11 +427,28 @@ class CacheBackedPluginApi(PluginApi):
         """Create a push-notifications cache for L2 agent related resources."""
         objects.register_objects()
         rcache = resource_cache.RemoteResourceCache(self.RESOURCE_TYPES)
+        snapshot = cfg.CONF.AGENT.resource_cache_snapshot
+        if snapshot:
+            rcache.load_snapshot(self._resource_cache_snapshot_path())
         rcache.start_watcher()
+        if snapshot:
+            # the watcher is started first to not miss the updates pushed
+            # while the snapshot is reconciled
+            rcache.reconcile_snapshot()
         self.remote_resource_cache = rcache
 
+    def _resource_cache_snapshot_path(self):
+        return os.path.join(cfg.CONF.state_path, self.RESOURCE_CACHE_SNAPSHOT)
+
     def stop(self):
         self.remote_resource_cache.stop_watcher()
+        if cfg.CONF.AGENT.resource_cache_snapshot:
+            try:
+                self.remote_resource_cache.save_snapshot(
+                    self._resource_cache_snapshot_path())
+            except Exception:
+                LOG.warning("Failed to save the resource cache snapshot",
+                            exc_info=True)
 
 
 # TODO(ralonsoh): move this method to neutron_lib.plugins.utils
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import bisect
 import copy
 import itertools
 import operator
@@ -77,19 +78,33 @@ class DhcpRpcCallback:
     #     1.9 - get_network_info returns info with only DHCP enabled subnets
     #     1.10 - get_network_info returns segments details when plugin is
     #            enabled
+    #     1.11 - get_active_networks_info accepts limit and marker to return
+    #            the active networks by pages
 
     target = oslo_messaging.Target(
         namespace=constants.RPC_NAMESPACE_DHCP_PLUGIN,
-        version='1.10')
+        version='1.11')
 
     def _get_active_networks(self, context, **kwargs):
-        """Retrieve and return a list of the active networks."""
+        """Retrieve and return a list of the active networks.
+
+        If a limit is passed, only the first "limit" networks, sorted by ID,
+        with an ID greater than the marker are returned.
+        """
         host = kwargs.get('host')
+        limit = kwargs.get('limit')
+        marker = kwargs.get('marker')
         plugin = directory.get_plugin()
         if extensions.is_extension_supported(
                 plugin, constants.DHCP_AGENT_SCHEDULER_EXT_ALIAS):
-            if cfg.CONF.network_auto_schedule:
+            # When paging, the networks are scheduled with the first page
+            if cfg.CONF.network_auto_schedule and not marker:
                 plugin.auto_schedule_networks(context, host)
+            if limit:
+                net_ids = plugin.list_active_network_ids_on_active_dhcp_agent(
+                    context, host)
+                return self._get_networks_page(context, net_ids, limit,
+                                               marker)
             nets = plugin.list_active_networks_on_active_dhcp_agent(
                 context, host)
         else:
@@ -107,10 +122,29 @@ class DhcpRpcCallback:
                 LOG.debug("DHCP Agent admin state is down on host %s", host)
                 return []
 
+            if limit:
+                net_ids = network_obj.Network.get_values(
+                    context, 'id', admin_state_up=[True])
+                return self._get_networks_page(context, net_ids, limit,
+                                               marker)
             nets = network_obj.Network.get_objects(context,
                                                    admin_state_up=[True])
         return nets
 
+    @staticmethod
+    def _get_networks_page(context, net_ids, limit, marker):
+        # The page is selected from the IDs of the active networks rather
+        # than with a pager on the networks query, so that a marker network
+        # deleted since the previous page does not restart the paging.
+        net_ids = sorted(net_ids)
+        if marker:
+            net_ids = net_ids[bisect.bisect_right(net_ids, marker):]
+        net_ids = net_ids[:limit]
+        if not net_ids:
+            return []
+        nets = network_obj.Network.get_objects(context, id=net_ids)
+        return sorted(nets, key=operator.attrgetter('id'))
+
     def _port_action(self, plugin, context, port, action):
         """Perform port operations taking care of concurrency issues."""
         try:
@@ -153,7 +187,12 @@ class DhcpRpcCallback:
         return grouped
 
     def get_active_networks_info(self, context, **kwargs):
-        """Returns all the networks/subnets/ports in system."""
+        """Returns all the networks/subnets/ports in system.
+
+        The optional "limit" and "marker" arguments return the networks by
+        pages, sorted by ID: the first "limit" networks with an ID greater
+        than the marker, usually the last network ID of the previous page.
+        """
         host = kwargs.get('host')
         LOG.debug('get_active_networks_info from %s', host)
         networks = self._get_active_networks(context, **kwargs)
@@ -115,6 +115,74 @@ IPTABLES_OPTS = [
     cfg.BoolOpt('use_random_fully',
                 default=True,
                 help=_("Use random-fully in SNAT masquerade rules.")),
+    cfg.BoolOpt('iptables_incremental_apply', default=False,
+                help=_("Keep in memory the iptables rules applied by the "
+                       "last iptables-restore and compute the next changes "
+                       "from them, instead of running iptables-save before "
+                       "every apply. Only the commands for the chains that "
+                       "changed are sent to iptables-restore. A full resync "
+                       "from iptables-save is done when iptables-restore "
+                       "fails and every ``iptables_full_resync_interval`` "
+                       "seconds.")),
+    cfg.IntOpt('iptables_full_resync_interval', default=300, min=0,
+               help=_("Interval, in seconds, between two full resyncs of "
+                      "the iptables rules from iptables-save when "
+                      "``iptables_incremental_apply`` is enabled. Use 0 to "
+                      "disable the periodic resync.")),
+]
+
+CONNTRACK_OPTS = [
+    cfg.IntOpt('conntrack_cleanup_workers', default=1, min=1,
+               help=_("Maximum number of threads deleting in parallel the "
+                      "conntrack state of different conntrack zones, when "
+                      "the security groups of the ports change. The "
+                      "deletions queued for the same zone are always "
+                      "coalesced and run by the same thread. The default, "
+                      "1, deletes the conntrack state of the zones one "
+                      "after the other, without a thread pool.")),
+    cfg.BoolOpt('conntrack_cleanup_netlink', default=False,
+                help=_("Delete the conntrack state through netlink, with the "
+                       "netfilter_conntrack library, instead of running the "
+                       "conntrack command for each deletion. The entries of "
+                       "each conntrack zone are then listed and deleted "
+                       "once per batch of deletions. The conntrack command "
+                       "is still used for the deletions filtered by "
+                       "connection mark, for the ports in a namespace and "
+                       "when the netlink calls fail.")),
+]
+
+RESOURCE_CACHE_OPTS = [
+    cfg.BoolOpt('resource_cache_snapshot', default=False,
+                help=_("Save a snapshot of the resources cached by the agent "
+                       "under state_path when the agent stops, and warm the "
+                       "cache with it when the agent starts. The snapshot is "
+                       "then reconciled with the server with one query per "
+                       "resource type and filtered field, instead of one "
+                       "query per resource requested by the agent.")),
+]
+
+RESOURCE_PROCESSING_OPTS = [
+    cfg.DictOpt('resource_update_class_weights',
+                default={'ha': 4, 'user': 2, 'resync': 1},
+                help=_("Weights of the classes of resource updates processed "
+                       "by the L3 and DHCP agents: 'ha' (HA router "
+                       "failover), 'user' (changes requested through the "
+                       "API) and 'resync' (full synchronization with the "
+                       "server). When there are pending updates of several "
+                       "classes, the agent processes them proportionally to "
+                       "these weights.")),
+    cfg.DictOpt('resource_update_class_limits',
+                default={},
+                help=_("Maximum number of workers that can process updates "
+                       "of a class at the same time, for instance "
+                       "'resync:16' to keep workers available for user "
+                       "updates during a full synchronization. Classes not "
+                       "listed are not limited.")),
+    cfg.IntOpt('resource_processing_stats_interval', default=0, min=0,
+               help=_("Interval, in seconds, between the logs of the "
+                      "resource processing queue statistics (pending "
+                      "updates and latency histograms per update class). "
+                      "Use 0 to disable them.")),
 ]
 
 PROCESS_MONITOR_OPTS = [
@@ -181,6 +249,18 @@ def register_iptables_opts(conf):
     conf.register_opts(IPTABLES_OPTS, 'AGENT')
 
 
+def register_conntrack_opts(conf):
+    conf.register_opts(CONNTRACK_OPTS, 'AGENT')
+
+
+def register_resource_cache_opts(conf):
+    conf.register_opts(RESOURCE_CACHE_OPTS, 'AGENT')
+
+
+def register_resource_processing_opts(conf):
+    conf.register_opts(RESOURCE_PROCESSING_OPTS, 'AGENT')
+
+
 def register_process_monitor_opts(conf):
     conf.register_opts(PROCESS_MONITOR_OPTS, 'AGENT')
 
@@ -70,6 +70,14 @@ DHCP_AGENT_OPTS = [
                help=_('Number of threads to use during sync process. '
                       'Should not exceed connection pool size configured on '
                       'server.')),
+    cfg.IntOpt('sync_state_page_size', default=100, min=0,
+               help=_('Number of networks fetched from the server per RPC '
+                      'call during a full synchronization. The agent starts '
+                      'configuring the networks of a page while the next '
+                      'pages are fetched, and a page that times out is '
+                      'retried with a smaller page size instead of '
+                      'restarting the synchronization. Use 0 to fetch all '
+                      'the networks in a single call.')),
     cfg.IntOpt('bulk_reload_interval', default=0, min=0,
                help=_('Time to sleep between reloading the DHCP allocations. '
                       'This will only be invoked if the value is not 0. '
@@ -0,0 +1,33 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_config import cfg
+
+from neutron._i18n import _
+
+
+SG_INFO_CACHE_OPTS = [
+    cfg.BoolOpt('security_group_info_cache', default=False,
+                help=_("Cache the security group rules and the remote "
+                       "security group member IPs used to build the "
+                       "security group information sent to the agents. The "
+                       "cache region is configured in the [cache] section, "
+                       "which must be enabled too. When several API or RPC "
+                       "workers or servers are running, a shared backend "
+                       "(e.g. memcached) must be used so the cache "
+                       "invalidations done by one worker are seen by all of "
+                       "them.")),
+]
+
+
+def register_db_securitygroups_rpc_opts(conf=cfg.CONF):
+    conf.register_opts(SG_INFO_CACHE_OPTS)
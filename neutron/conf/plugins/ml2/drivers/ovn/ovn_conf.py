@@ -91,6 +91,24 @@ ovn_opts = [
                default=180,
                help=_('Max interval, in seconds ,between '
                       'each retry to get the OVN NB and SB IDLs')),
+    cfg.IntOpt('nb_txn_coalesce_window',
+               min=0,
+               default=0,
+               help=_('Time window, in milliseconds, during which the OVN '
+                      'Northbound transactions of concurrent API requests '
+                      'of a worker are coalesced into a single transaction. '
+                      'Each request still gets its own result or error: if '
+                      'the coalesced transaction fails, the transactions '
+                      'are committed again one by one. If this is zero, the '
+                      'transactions are not coalesced.')),
+    cfg.IntOpt('nb_txn_coalesce_max_commands',
+               min=1,
+               default=500,
+               help=_('Maximum number of commands of a coalesced OVN '
+                      'Northbound transaction. A coalesced transaction is '
+                      'committed without waiting for the end of '
+                      'nb_txn_coalesce_window once it reaches this number of '
+                      'commands.')),
     cfg.IntOpt('ovsdb_probe_interval',
                min=0,
                default=60000,
@@ -119,6 +137,15 @@ ovn_opts = [
                          "OVS to OVN.")],
                help=_('The synchronization mode of OVN_Northbound OVSDB '
                       'with Neutron DB.')),
+    cfg.IntOpt('neutron_sync_batch_size',
+               min=1,
+               default=1000,
+               help=_('Number of Neutron ports read at once by the '
+                      'synchronization of the OVN_Northbound OVSDB with the '
+                      'Neutron DB, which walks the ports by pages instead of '
+                      'loading all of them in memory. This is also the '
+                      'maximum number of ports created or deleted by an '
+                      'OVN NB transaction of the synchronization.')),
     cfg.StrOpt("ovn_l3_scheduler",
                default=ovn_const.OVN_L3_SCHEDULER_LEASTLOADED,
                choices=[(ovn_const.OVN_L3_SCHEDULER_LEASTLOADED,
@@ -321,6 +348,30 @@ nb_global_opts = [
                       'The default is 0 which is unlimited. When the limit '
                       'is reached, the next batch removal is delayed by '
                       '5 seconds.')),
+    cfg.IntOpt('inconsistencies_batch_size',
+               min=1,
+               default=100,
+               help=_('Number of inconsistent resources of the same type '
+                      'that the maintenance task loads from the Neutron '
+                      'database and fixes together. The revision numbers of '
+                      'a batch are bumped at once and the missing ports of '
+                      'a batch are created in a single OVN Northbound '
+                      'transaction.')),
+    cfg.IntOpt('inconsistencies_fix_workers',
+               min=1,
+               default=1,
+               help=_('Number of batches of inconsistent resources of the '
+                      'same type that the maintenance task fixes '
+                      'concurrently. The resource types are still fixed one '
+                      'after the other, in dependency order.')),
+    cfg.IntOpt('inconsistencies_max_per_run',
+               min=0,
+               default=0,
+               help=_('Maximum number of inconsistent resources fixed by a '
+                      'run of the maintenance task, so that a run does not '
+                      'hold the maintenance lock for too long. The next run '
+                      'resumes after the last resource fixed. Zero (0) '
+                      'means unlimited.')),
 ]
 
 
@@ -378,6 +429,26 @@ def get_ovn_ovsdb_retry_max_interval():
     return cfg.CONF.ovn.ovsdb_retry_max_interval
 
 
+def get_ovn_nb_txn_coalesce_window():
+    return cfg.CONF.ovn.nb_txn_coalesce_window
+
+
+def get_ovn_nb_txn_coalesce_max_commands():
+    return cfg.CONF.ovn.nb_txn_coalesce_max_commands
+
+
+def get_ovn_inconsistencies_batch_size():
+    return cfg.CONF.ovn.inconsistencies_batch_size
+
+
+def get_ovn_inconsistencies_fix_workers():
+    return cfg.CONF.ovn.inconsistencies_fix_workers
+
+
+def get_ovn_inconsistencies_max_per_run():
+    return cfg.CONF.ovn.inconsistencies_max_per_run
+
+
 def get_ovn_ovsdb_probe_interval():
     return cfg.CONF.ovn.ovsdb_probe_interval
 
@@ -386,6 +457,10 @@ def get_ovn_neutron_sync_mode():
     return cfg.CONF.ovn.neutron_sync_mode
 
 
+def get_ovn_neutron_sync_batch_size():
+    return cfg.CONF.ovn.neutron_sync_batch_size
+
+
 def get_ovn_l3_scheduler():
     return cfg.CONF.ovn.ovn_l3_scheduler
 
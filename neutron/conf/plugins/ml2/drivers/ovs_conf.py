@@ -180,6 +180,16 @@ ovs_opts = [
                        'If disabled, the flows will be processed in batches '
                        'of ``_constants.AGENT_RES_PROCESSING_STEP`` number of '
                        'OpenFlow rules.')),
+    cfg.BoolOpt('openflow_single_bundle',
+                default=False,
+                help=_('If enabled, all the OpenFlow rules added and deleted '
+                       'by the Open vSwitch firewall driver while applying '
+                       'the port filters are sent in one single OpenFlow '
+                       'bundle, atomically. This reduces the number of '
+                       'requests sent to ovs-vswitchd, but a rule rejected '
+                       'by ovs-vswitchd discards the whole bundle. It takes '
+                       'precedence over ``openflow_processed_per_port`` for '
+                       'the firewall rules.')),
     cfg.BoolOpt('qos_meter_bandwidth', default=False,
                 help="Whether to enable the Openvswitch meter bandwidth "
                      "limit features which will add meter kbps rules "
@@ -201,6 +211,35 @@ agent_opts = [
                default=ovs_constants.DEFAULT_OVSDBMON_RESPAWN,
                help=_("The number of seconds to wait before respawning the "
                       "OVSDB monitor after losing communication with it.")),
+    cfg.StrOpt('ovsdb_monitor_backend',
+               default='ovsdb-client',
+               choices=['ovsdb-client', 'native'],
+               help=_("The OVSDB Interface monitor used when "
+                      "'minimize_polling' is enabled. 'ovsdb-client' spawns "
+                      "an 'ovsdb-client monitor' process and parses its "
+                      "output; 'native' receives the Interface events from "
+                      "the native OVSDB IDL connection of the agent.")),
+    cfg.BoolOpt('adaptive_polling', default=False,
+                help=_("Schedule the rpc_loop iterations adaptively. When "
+                       "enabled, a new iteration starts as soon as port "
+                       "events or port updates are pending, once a burst of "
+                       "events has been coalesced for "
+                       "'polling_debounce_interval' seconds, instead of "
+                       "waiting for the end of 'polling_interval'. When OVS "
+                       "is dead, an iteration fails or takes longer than "
+                       "'polling_interval', the next iterations are delayed "
+                       "exponentially up to 'max_polling_backoff' "
+                       "seconds.")),
+    cfg.FloatOpt('polling_debounce_interval', default=0.2, min=0.05,
+                 help=_("Seconds to wait, when 'adaptive_polling' is "
+                        "enabled, for more port events after the first one "
+                        "before starting a new rpc_loop iteration. It is "
+                        "also the period at which pending events are "
+                        "checked.")),
+    cfg.IntOpt('max_polling_backoff', default=30, min=1,
+               help=_("Maximum number of seconds to wait between two "
+                      "rpc_loop iterations when 'adaptive_polling' is "
+                      "enabled and the agent backs off.")),
     cfg.ListOpt('tunnel_types', default=DEFAULT_TUNNEL_TYPES,
                 help=_("Network types supported by the agent "
                        "(gre, vxlan and/or geneve).")),
@@ -242,6 +281,12 @@ agent_opts = [
                        "traffic. This will aslo change the pipleline for "
                        "ingress traffic to ports without security, the final "
                        "output action will be hit in table 94. ")),
+    cfg.IntOpt('port_processing_workers', default=1, min=1,
+               help=_("Number of workers used to wire the added and updated "
+                      "ports of an agent loop iteration. The ports are split "
+                      "in shards, one per network, and the shards are "
+                      "processed concurrently. With the default value of 1, "
+                      "the ports are processed sequentially.")),
 ]
 
 dhcp_opts = [
@@ -445,7 +445,7 @@ class DhcpAgentSchedulerDbMixin(dhcpagentscheduler
         self._get_agent(context, id)
         return {'networks': []}
 
-    def list_active_networks_on_active_dhcp_agent(self, context, host):
+    def _list_network_ids_on_active_dhcp_agent(self, context, host):
         try:
             agent = self._get_agent_by_type_and_host(
                 context, constants.AGENT_TYPE_DHCP, host)
@@ -458,13 +458,22 @@ class DhcpAgentSchedulerDbMixin(dhcpagentscheduler
 
         query = network.NetworkDhcpAgentBinding.get_objects(
             context, dhcp_agent_id=agent.id)
+        return [item.network_id for item in query]
 
-        net_ids = [item.network_id for item in query]
+    def list_active_networks_on_active_dhcp_agent(self, context, host):
+        net_ids = self._list_network_ids_on_active_dhcp_agent(context, host)
         if net_ids:
             return network.Network.get_objects(context, id=net_ids,
                                                admin_state_up=[True])
         return []
 
+    def list_active_network_ids_on_active_dhcp_agent(self, context, host):
+        net_ids = self._list_network_ids_on_active_dhcp_agent(context, host)
+        if net_ids:
+            return network.Network.get_values(context, 'id', id=net_ids,
+                                              admin_state_up=[True])
+        return []
+
     def list_dhcp_agents_hosting_network(self, context, network_id):
         dhcp_agents = self.get_dhcp_agents_hosting_networks(
             context, [network_id])
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import datetime
 
 from neutron_lib.db import api as db_api
@@ -23,6 +24,7 @@ from oslo_log import log
 from oslo_utils import timeutils
 import sqlalchemy as sa
 from sqlalchemy.orm import exc
+from sqlalchemy.orm import util as orm_util
 
 from neutron.common.ovn import constants as ovn_const
 from neutron.common.ovn import utils as ovn_utils
@@ -208,6 +210,115 @@ def bump_revision(context, resource, resource_type):
               'rev_num': revision_number})
 
 
+def _get_standard_attr_ids(context, model, resource_uuids):
+    rows = context.session.query(model.id, model.standard_attr_id).filter(
+        model.id.in_(resource_uuids)).all()
+    std_attr_ids = dict(rows)
+    for resource_uuid in resource_uuids:
+        if resource_uuid not in std_attr_ids:
+            raise StandardAttributeIDNotFound(resource_uuid=resource_uuid)
+    return std_attr_ids
+
+
+@db_api.retry_if_session_inactive()
+def bump_revisions(context, resources):
+    """Bump the revision numbers of many resources at once
+
+    The bulk version of bump_revision, for a list of (resource,
+    resource_type) tuples. It runs a constant number of SQL statements: one
+    query per model for the standard attribute IDs, one query for the
+    revision rows, one insert for the missing rows and one update. As in
+    bump_revision, a revision number is never decreased.
+    """
+    revisions = {}
+    for resource, resource_type in resources:
+        key = (resource['id'], resource_type)
+        revision_number = ovn_utils.get_revision_number(resource,
+                                                        resource_type)
+        revisions[key] = max(revision_number,
+                             revisions.get(key, revision_number))
+    if not revisions:
+        return
+
+    table = ovn_models.OVNRevisionNumbers.__table__
+    with db_api.CONTEXT_WRITER.using(context):
+        # The Neutron ports and the router ports share the same model
+        uuids_by_model = collections.defaultdict(set)
+        for resource_uuid, resource_type in revisions:
+            uuids_by_model[STD_ATTR_MAP[resource_type]].add(resource_uuid)
+        std_attr_ids = {}
+        for model, resource_uuids in uuids_by_model.items():
+            std_attr_ids.update(
+                _get_standard_attr_ids(context, model, resource_uuids))
+
+        query = context.session.query(
+            table.c.resource_uuid, table.c.resource_type,
+            table.c.revision_number).filter(
+            table.c.resource_uuid.in_({key[0] for key in revisions}))
+        current = {(row.resource_uuid, row.resource_type):
+                   row.revision_number for row in query}
+
+        new_rows = []
+        updated_rows = []
+        for (resource_uuid, resource_type), revision_number in (
+                revisions.items()):
+            row = {'b_uuid': resource_uuid, 'b_type': resource_type,
+                   'b_std_attr_id': std_attr_ids[resource_uuid],
+                   'b_rev_num': revision_number}
+            current_revision_number = current.get(
+                (resource_uuid, resource_type))
+            if current_revision_number is None:
+                LOG.warning(
+                    'No revision row found for %(res_uuid)s (type: '
+                    '%(res_type)s) when bumping the revision number. '
+                    'Creating one.', {'res_uuid': resource_uuid,
+                                      'res_type': resource_type})
+                new_rows.append(row)
+            elif revision_number > current_revision_number:
+                updated_rows.append(row)
+            elif revision_number < current_revision_number:
+                LOG.debug(
+                    'Skip bumping the revision number for %(res_uuid)s '
+                    '(type: %(res_type)s) to %(rev_num)d. A higher version '
+                    'is already registered in the database (%(new_rev)d)',
+                    {'res_type': resource_type, 'res_uuid': resource_uuid,
+                     'rev_num': revision_number,
+                     'new_rev': current_revision_number})
+
+        if new_rows:
+            context.session.execute(
+                table.insert().values(
+                    resource_uuid=sa.bindparam('b_uuid'),
+                    resource_type=sa.bindparam('b_type'),
+                    standard_attr_id=sa.bindparam('b_std_attr_id'),
+                    revision_number=sa.bindparam('b_rev_num')),
+                new_rows)
+        if updated_rows:
+            # Keep the revision numbers bumped concurrently, since they were
+            # read, from decreasing
+            context.session.execute(
+                table.update().where(
+                    table.c.resource_uuid == sa.bindparam('b_uuid'),
+                    table.c.resource_type == sa.bindparam('b_type'),
+                    table.c.revision_number < sa.bindparam('b_rev_num')
+                ).values(
+                    standard_attr_id=sa.bindparam('b_std_attr_id'),
+                    revision_number=sa.bindparam('b_rev_num')),
+                updated_rows)
+
+        # The statements above bypass the ORM: expire the revision rows
+        # already loaded in the session
+        for key in revisions:
+            row = context.session.identity_map.get(orm_util.identity_key(
+                ovn_models.OVNRevisionNumbers, key))
+            if row is not None:
+                context.session.expire(row)
+
+    if new_rows or updated_rows:
+        LOG.info('Successfully bumped the revision number of %d resources',
+                 len(new_rows) + len(updated_rows))
+
+
 def get_inconsistent_resources(context):
     """Get a list of inconsistent resources.
 
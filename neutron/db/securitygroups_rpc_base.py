@@ -19,9 +19,15 @@ from neutron_lib.callbacks import registry
 from neutron_lib.callbacks import resources
 from neutron_lib import constants as const
 from neutron_lib.db import api as db_api
+from neutron_lib.db import standard_attr
 from neutron_lib.utils import helpers
+from oslo_cache import core as cache
+from oslo_config import cfg
+from oslo_utils import uuidutils
 
 from neutron._i18n import _
+from neutron.common import cache_utils
+from neutron.conf.db import securitygroups_rpc_base as sg_rpc_conf
 from neutron.db.models import address_group as ag_models
 from neutron.db.models import allowed_address_pair as aap_models
 from neutron.db.models import securitygroup as sg_models
@@ -36,6 +42,38 @@ DIRECTION_IP_PREFIX = {'ingress': 'source_ip_prefix',
 
 DHCP_RULE_PORT = {4: (67, 68, const.IPv4), 6: (547, 546, const.IPv6)}
 
+# The rules of a security group are cached per revision number, which is
+# bumped on any rule change. The member IPs are cached per generation, a
+# random token dropped when a port of the group changes; a response built
+# from data read before the invalidation is stored under the old generation
+# and never read again.
+SG_RULES_CACHE_KEY = 'sg-info-rules:%(sg_id)s:%(revision_number)s'
+SG_MEMBERS_CACHE_KEY = 'sg-info-members:%(sg_id)s:%(generation)s'
+SG_MEMBERS_GENERATION_KEY = 'sg-info-members-generation:%s'
+
+cache_utils.register_oslo_configs(cfg.CONF)
+sg_rpc_conf.register_db_securitygroups_rpc_opts()
+
+
+def _make_rule_dict(rule_in_db):
+    direction = rule_in_db['direction']
+    rule_dict = {
+        'direction': direction,
+        'ethertype': rule_in_db['ethertype'],
+    }
+    for key in ('protocol', 'port_range_min', 'port_range_max',
+                'remote_ip_prefix', 'remote_group_id',
+                'remote_address_group_id'):
+        if rule_in_db.get(key) is not None:
+            if key == 'remote_ip_prefix':
+                normalized_cidr = rule_in_db.get('normalized_cidr')
+                direction_ip_prefix = DIRECTION_IP_PREFIX[direction]
+                rule_dict[direction_ip_prefix] = (
+                    normalized_cidr or rule_in_db[key])
+                continue
+            rule_dict[key] = rule_in_db[key]
+    return rule_dict
+
 
 class SecurityGroupServerNotifierRpcMixin(sg_db.SecurityGroupDbMixin):
     """Mixin class to add agent-based security group implementation."""
@@ -211,23 +249,7 @@ class SecurityGroupInfoAPIMixin:
                 if ethertype not in remote_address_group_info[remote_ag_id]:
                     # this set will be serialized into a list by rpc code
                     remote_address_group_info[remote_ag_id][ethertype] = set()
-            direction = rule_in_db['direction']
-            rule_dict = {
-                'direction': direction,
-                'ethertype': ethertype,
-            }
-
-            for key in ('protocol', 'port_range_min', 'port_range_max',
-                        'remote_ip_prefix', 'remote_group_id',
-                        'remote_address_group_id'):
-                if rule_in_db.get(key) is not None:
-                    if key == 'remote_ip_prefix':
-                        normalized_cidr = rule_in_db.get('normalized_cidr')
-                        direction_ip_prefix = DIRECTION_IP_PREFIX[direction]
-                        rule_dict[direction_ip_prefix] = (
-                            normalized_cidr or rule_in_db[key])
-                        continue
-                    rule_dict[key] = rule_in_db[key]
+            rule_dict = _make_rule_dict(rule_in_db)
             if security_group_id not in sg_info['security_groups']:
                 sg_info['security_groups'][security_group_id] = []
             if rule_dict not in sg_info['security_groups'][security_group_id]:
@@ -383,23 +405,8 @@ class SecurityGroupInfoAPIMixin:
         rules_in_db = self._select_rules_for_ports(context, ports)
         for (port_id, rule_in_db) in rules_in_db:
             port = ports[port_id]
-            direction = rule_in_db['direction']
-            rule_dict = {
-                'security_group_id': rule_in_db['security_group_id'],
-                'direction': direction,
-                'ethertype': rule_in_db['ethertype'],
-            }
-            for key in ('protocol', 'port_range_min', 'port_range_max',
-                        'remote_ip_prefix', 'remote_group_id',
-                        'remote_address_group_id'):
-                if rule_in_db.get(key) is not None:
-                    if key == 'remote_ip_prefix':
-                        normalized_cidr = rule_in_db.get('normalized_cidr')
-                        direction_ip_prefix = DIRECTION_IP_PREFIX[direction]
-                        rule_dict[direction_ip_prefix] = (
-                            normalized_cidr or rule_in_db[key])
-                        continue
-                    rule_dict[key] = rule_in_db[key]
+            rule_dict = _make_rule_dict(rule_in_db)
+            rule_dict['security_group_id'] = rule_in_db['security_group_id']
             port['security_group_rules'].append(rule_dict)
         self._apply_provider_rule(context, ports)
         return self._convert_remote_id_to_ip_prefix(context, ports)
@@ -446,6 +453,182 @@ class SecurityGroupServerRpcMixin(SecurityGroupInfoAPIMixin,
                                   SecurityGroupServerNotifierRpcMixin):
     """Server-side RPC mixin using DB for SG notifications and responses."""
 
+    def _get_sg_info_cache(self):
+        """Return the security group info cache region, if enabled."""
+        if not hasattr(self, '_sg_info_cache'):
+            self._sg_info_cache = (cfg.CONF.security_group_info_cache and
+                                   cache_utils.get_cache(cfg.CONF))
+        return self._sg_info_cache
+
+    def _notify_sg_on_port_change(self, resource, event, trigger, payload):
+        sg_ids = set()
+        for port in payload.states:
+            sg_ids.update(port.get(ext_sg.SECURITYGROUPS) or [])
+        self._invalidate_sg_member_ips(sg_ids)
+        super()._notify_sg_on_port_change(resource, event, trigger, payload)
+
+    def _invalidate_sg_member_ips(self, sg_ids):
+        sg_cache = self._get_sg_info_cache()
+        if sg_cache and sg_ids:
+            sg_cache.delete_multi([SG_MEMBERS_GENERATION_KEY % sg_id
+                                   for sg_id in sg_ids])
+
+    def security_group_info_for_ports(self, context, ports):
+        sg_cache = self._get_sg_info_cache()
+        if not sg_cache:
+            return super().security_group_info_for_ports(context, ports)
+
+        sg_ids = set()
+        for port in ports.values():
+            sg_ids.update(port.get(ext_sg.SECURITYGROUPS) or [])
+        sg_rules = self._get_cached_sg_rules(context, sg_cache, sg_ids)
+
+        remote_security_group_info = {}
+        remote_address_group_info = {}
+        for port in ports.values():
+            source_groups = port.setdefault('security_group_source_groups',
+                                            [])
+            remote_ags = port.setdefault(
+                'security_group_remote_address_groups', [])
+            for sg_id in port.get(ext_sg.SECURITYGROUPS) or []:
+                for rule in sg_rules.get(sg_id, []):
+                    remote_gid = rule.get('remote_group_id')
+                    remote_ag_id = rule.get('remote_address_group_id')
+                    if remote_gid:
+                        if remote_gid not in source_groups:
+                            source_groups.append(remote_gid)
+                        # this set will be serialized into a list by rpc
+                        # code
+                        remote_security_group_info.setdefault(
+                            remote_gid, {}).setdefault(
+                                rule['ethertype'], set())
+                    elif remote_ag_id:
+                        if remote_ag_id not in remote_ags:
+                            remote_ags.append(remote_ag_id)
+                        remote_address_group_info.setdefault(
+                            remote_ag_id, {}).setdefault(
+                                rule['ethertype'], set())
+
+        sg_info = {'devices': ports,
+                   'security_groups': {
+                       sg_id: [dict(rule) for rule in sg_rules.get(sg_id, [])]
+                       for sg_id in sg_ids},
+                   'sg_member_ips': remote_security_group_info}
+        self._apply_provider_rule(context, sg_info['devices'])
+
+        member_ips = self._get_cached_sg_member_ips(
+            context, sg_cache, remote_security_group_info.keys())
+        for sg_id, ips in member_ips.items():
+            for ip in ips:
+                ethertype = 'IPv%d' % netaddr.IPNetwork(ip[0]).version
+                if ethertype in remote_security_group_info[sg_id]:
+                    remote_security_group_info[sg_id][ethertype].add(ip)
+
+        sg_info['sg_member_ips'].update(remote_address_group_info)
+        return self._get_address_group_ips(context, sg_info,
+                                           remote_address_group_info)
+
+    def _get_cached_sg_rules(self, context, sg_cache, sg_ids):
+        """Return the rules of the security groups, keyed by group ID.
+
+        The revision numbers are read before the rules, so a cache entry
+        never holds rules older than its revision number.
+        """
+        keys = {sg_id: SG_RULES_CACHE_KEY % {'sg_id': sg_id,
+                                             'revision_number': revision}
+                for sg_id, revision in self._select_sg_revision_numbers(
+                    context, sg_ids).items()}
+        sg_ids = list(keys)
+        sg_rules = {}
+        for sg_id, rules in zip(sg_ids,
+                                sg_cache.get_multi([keys[sg_id]
+                                                    for sg_id in sg_ids])):
+            if rules is not cache.NO_VALUE:
+                sg_rules[sg_id] = rules
+        missing_ids = [sg_id for sg_id in sg_ids if sg_id not in sg_rules]
+        if missing_ids:
+            missing_rules = self._select_rules_for_sgs(context, missing_ids)
+            sg_cache.set_multi({keys[sg_id]: rules
+                                for sg_id, rules in missing_rules.items()})
+            sg_rules.update(missing_rules)
+        return sg_rules
+
+    def _get_cached_sg_member_ips(self, context, sg_cache, sg_ids):
+        """Return the member IPs of the security groups, keyed by group ID.
+
+        The generation of each group is read (or created) before the member
+        IPs are queried, see SG_MEMBERS_CACHE_KEY.
+        """
+        sg_ids = list(sg_ids)
+        if not sg_ids:
+            return {}
+        generations = dict(zip(sg_ids, sg_cache.get_multi(
+            [SG_MEMBERS_GENERATION_KEY % sg_id for sg_id in sg_ids])))
+        new_generations = {sg_id: uuidutils.generate_uuid()
+                           for sg_id, generation in generations.items()
+                           if generation is cache.NO_VALUE}
+        if new_generations:
+            sg_cache.set_multi({SG_MEMBERS_GENERATION_KEY % sg_id: generation
+                                for sg_id, generation in
+                                new_generations.items()})
+            generations.update(new_generations)
+        keys = {sg_id: SG_MEMBERS_CACHE_KEY % {'sg_id': sg_id,
+                                               'generation': generation}
+                for sg_id, generation in generations.items()}
+        member_ips = {}
+        for sg_id, ips in zip(sg_ids, sg_cache.get_multi(
+                [keys[sg_id] for sg_id in sg_ids])):
+            if ips is not cache.NO_VALUE:
+                member_ips[sg_id] = ips
+        missing_ids = [sg_id for sg_id in sg_ids if sg_id not in member_ips]
+        if missing_ids:
+            missing_ips = self._select_ips_for_remote_group(context,
+                                                            missing_ids)
+            sg_cache.set_multi({keys[sg_id]: ips
+                                for sg_id, ips in missing_ips.items()})
+            member_ips.update(missing_ips)
+        return member_ips
+
+    @db_api.retry_if_session_inactive()
+    @db_api.CONTEXT_READER
+    def _select_sg_revision_numbers(self, context, sg_ids):
+        if not sg_ids:
+            return {}
+        query = context.session.query(
+            sg_models.SecurityGroup.id,
+            standard_attr.StandardAttribute.revision_number)
+        query = query.join(standard_attr.StandardAttribute,
+                           sg_models.SecurityGroup.standard_attr_id ==
+                           standard_attr.StandardAttribute.id)
+        query = query.filter(sg_models.SecurityGroup.id.in_(sg_ids))
+        return dict(query.all())
+
+    def _select_rules_for_sgs(self, context, sg_ids):
+        """Return the rule dicts of the security groups, keyed by group ID.
+
+        The rule dicts have the format of security_group_info_for_ports(),
+        including the security group "stateful" flag.
+        """
+        sg_rules = {sg_id: [] for sg_id in sg_ids}
+        for rule_in_db in self._select_rules_for_sg_ids(context, sg_ids):
+            rule_dict = _make_rule_dict(rule_in_db)
+            rules = sg_rules[rule_in_db['security_group_id']]
+            if rule_dict not in rules:
+                rules.append(rule_dict)
+        for sg_id, stateful in self._get_sgs_stateful_flag(
+                context, sg_ids).items():
+            for rule in sg_rules[sg_id]:
+                rule['stateful'] = stateful
+        return sg_rules
+
+    @db_api.retry_if_session_inactive()
+    @db_api.CONTEXT_READER
+    def _select_rules_for_sg_ids(self, context, sg_ids):
+        sgr_sgid = sg_models.SecurityGroupRule.security_group_id
+        query = context.session.query(sg_models.SecurityGroupRule)
+        query = query.filter(sgr_sgid.in_(sg_ids))
+        return query.all()
+
     @db_api.retry_if_session_inactive()
     @db_api.CONTEXT_READER
     def _select_sg_ids_for_ports(self, context, ports):
@@ -42,6 +42,7 @@ import neutron.conf.db.l3_dvr_db
 import neutron.conf.db.l3_extra_gws_db
 import neutron.conf.db.l3_gwmode_db
 import neutron.conf.db.l3_hamode_db
+import neutron.conf.db.securitygroups_rpc_base
 import neutron.conf.experimental
 import neutron.conf.extensions.allowedaddresspairs
 import neutron.conf.extensions.conntrack_helper
@@ -133,6 +134,9 @@ def list_agent_opts():
              neutron.conf.agent.common.ROOT_HELPER_OPTS,
              neutron.conf.agent.common.AGENT_STATE_OPTS,
              neutron.conf.agent.common.IPTABLES_OPTS,
+             neutron.conf.agent.common.CONNTRACK_OPTS,
+             neutron.conf.agent.common.RESOURCE_CACHE_OPTS,
+             neutron.conf.agent.common.RESOURCE_PROCESSING_OPTS,
              neutron.conf.agent.common.PROCESS_MONITOR_OPTS,
              neutron.conf.agent.common.AVAILABILITY_ZONE_OPTS)
          ),
@@ -173,7 +177,8 @@ def list_db_opts():
              neutron.conf.db.l3_dvr_db.ROUTER_DISTRIBUTED_OPTS,
              neutron.conf.db.l3_agentschedulers_db.L3_AGENTS_SCHEDULER_OPTS,
              neutron.conf.db.l3_hamode_db.L3_HA_OPTS,
-             neutron.conf.db.l3_extra_gws_db.L3_EXTRA_GWS_OPTS)
+             neutron.conf.db.l3_extra_gws_db.L3_EXTRA_GWS_OPTS,
+             neutron.conf.db.securitygroups_rpc_base.SG_INFO_CACHE_OPTS)
          ),
         ('database',
          neutron.db.migration.cli.get_engine_config())
@@ -257,6 +257,22 @@ def get_distributed_port_binding_by_host(context, port_id, host):
     return binding
 
 
+def get_distributed_port_bindings_by_host(context, port_ids, host):
+    """Return the distributed bindings of the ports on a host.
+
+    Return format is a dictionary keyed by port ID; the ports without a
+    binding on the host are not included.
+    """
+    if not port_ids:
+        return {}
+    with db_api.CONTEXT_READER.using(context):
+        bindings = (
+            context.session.query(models.DistributedPortBinding).
+            filter(models.DistributedPortBinding.port_id.in_(port_ids),
+                   models.DistributedPortBinding.host == host).all())
+    return {binding.port_id: binding for binding in bindings}
+
+
 def update_distributed_port_binding_by_host(context, port_id, host, router_id):
     with db_api.CONTEXT_WRITER.using(context):
         bindings = (
@@ -286,11 +302,22 @@ def partial_port_ids_to_full_ids(context, partial_ids):
     is found.
     """
     result = {}
+    # partial UUIDs must be individually matched with startswith.
+    # full UUIDs may be matched directly in an IN statement
+    full_uuids = {partial_id for partial_id in partial_ids
+                  if uuidutils.is_uuid_like(partial_id)}
+    or_criteria = [models_v2.Port.id.startswith(partial_id)
+                   for partial_id in set(partial_ids) - full_uuids]
+    if full_uuids:
+        or_criteria.append(models_v2.Port.id.in_(full_uuids))
     to_full_query = (context.session.query(models_v2.Port.id).
-                     filter(or_(*[models_v2.Port.id.startswith(p)
-                                  for p in partial_ids])))
+                     filter(or_(*or_criteria)))
     candidates = [match[0] for match in to_full_query]
+    full_candidates = full_uuids.intersection(candidates)
     for partial_id in partial_ids:
+        if partial_id in full_candidates:
+            result[partial_id] = partial_id
+            continue
         matching = [c for c in candidates if c.startswith(partial_id)]
         if len(matching) == 1:
             result[partial_id] = matching[0]
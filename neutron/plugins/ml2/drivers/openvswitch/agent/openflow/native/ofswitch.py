@@ -14,6 +14,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import contextlib
 import functools
 import queue
 import secrets
@@ -42,6 +44,65 @@ class ActiveBundleRunning(exceptions.NeutronException):
     message = _("Another active bundle 0x%(bundle_id)x is running")
 
 
+class FlowIndex:
+    """Local view of the (cookie, table) pairs installed on a bridge.
+
+    The index is populated from a single dump of all the tables and then
+    kept up to date by install_instructions() and uninstall_flows(), so
+    that stale flow cleanup only has to act on the cookies which are not
+    reserved anymore instead of dumping every table again.
+
+    There is one index per bridge object; the threads programming flows on
+    that bridge share it, so its methods are serialized by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables_by_cookie = collections.defaultdict(set)
+        self.populated = False
+
+    def populate(self, flows):
+        with self._lock:
+            self._tables_by_cookie.clear()
+            for flow in flows:
+                self._tables_by_cookie[flow.cookie].add(flow.table_id)
+            self.populated = True
+
+    def invalidate(self):
+        with self._lock:
+            self._tables_by_cookie.clear()
+            self.populated = False
+
+    def add(self, cookie, table_id):
+        with self._lock:
+            if self.populated:
+                self._tables_by_cookie[cookie].add(table_id)
+
+    def remove(self, cookie, table_id=None):
+        with self._lock:
+            if not self.populated or cookie not in self._tables_by_cookie:
+                return
+            if table_id is None:
+                del self._tables_by_cookie[cookie]
+                return
+            tables = self._tables_by_cookie[cookie]
+            tables.discard(table_id)
+            if not tables:
+                del self._tables_by_cookie[cookie]
+
+    def clear(self):
+        with self._lock:
+            self._tables_by_cookie.clear()
+
+    def cookies(self):
+        with self._lock:
+            return set(self._tables_by_cookie)
+
+    def tables(self, cookie):
+        with self._lock:
+            return set(self._tables_by_cookie.get(cookie, ()))
+
+
 class OpenFlowSwitchMixin:
     """Mixin to provide common convenient routines for an openflow switch.
 
@@ -59,6 +120,9 @@ class OpenFlowSwitchMixin:
     def __init__(self, *args, **kwargs):
         self._app = kwargs.pop('os_ken_app')
         self.active_bundles = set()
+        # The bundle opened by bundle_flow_mods() in each thread
+        self._thread_bundle = threading.local()
+        self.flow_index = FlowIndex()
         super().__init__(*args, **kwargs)
 
     def _get_dp_by_dpid(self, dpid_int):
@@ -155,10 +219,16 @@ class OpenFlowSwitchMixin:
             return match
         return ofpp.OFPMatch(**match_kwargs)
 
+    def _get_active_bundle(self, active_bundle):
+        if active_bundle is not None:
+            return active_bundle
+        return getattr(self._thread_bundle, 'active_bundle', None)
+
     def uninstall_flows(self, table_id=None, strict=False, priority=0,
                         cookie=COOKIE_DEFAULT, cookie_mask=0,
                         match=None, active_bundle=None, **match_kwargs):
         (dp, ofp, ofpp) = self._get_dp()
+        active_bundle = self._get_active_bundle(active_bundle)
         if table_id is None:
             table_id = ofp.OFPTT_ALL
 
@@ -172,6 +242,7 @@ class OpenFlowSwitchMixin:
             cookie = self._default_cookie
             cookie_mask = ovs_lib.UINT64_BITMASK
 
+        whole_cookie = (not strict and match is None and not match_kwargs)
         match = self._match(ofp, ofpp, match, **match_kwargs)
         if strict:
             cmd = ofp.OFPFC_DELETE_STRICT
@@ -187,6 +258,20 @@ class OpenFlowSwitchMixin:
                               out_group=ofp.OFPG_ANY,
                               out_port=ofp.OFPP_ANY)
         self._send_msg(msg, active_bundle=active_bundle)
+        if whole_cookie:
+            self._update_flow_index_on_delete(ofp, table_id, cookie,
+                                              cookie_mask)
+
+    def _update_flow_index_on_delete(self, ofp, table_id, cookie,
+                                     cookie_mask):
+        # Only deletions removing every flow of a cookie (or every flow of
+        # the bridge) can be reflected without dumping the flows again.
+        table_id = None if table_id == ofp.OFPTT_ALL else table_id
+        if cookie_mask == 0:
+            if table_id is None:
+                self.flow_index.clear()
+        elif cookie_mask == ovs_lib.UINT64_BITMASK:
+            self.flow_index.remove(cookie, table_id)
 
     def dump_flows(self, table_id=None):
         (dp, ofp, ofpp) = self._get_dp()
@@ -201,21 +286,23 @@ class OpenFlowSwitchMixin:
             flows += rep.body
         return flows
 
-    def _dump_and_clean(self, table_id=None):
-        cookies = {f.cookie for f in self.dump_flows(table_id)} - \
-                      self.reserved_cookies
-        for c in cookies:
-            LOG.warning("Deleting flow with cookie 0x%(cookie)x",
-                        {'cookie': c})
-            self.uninstall_flows(table_id=table_id,
-                                 cookie=c, cookie_mask=ovs_lib.UINT64_BITMASK)
-
     def cleanup_flows(self):
+        reserved_cookies = self.reserved_cookies
         LOG.info("Reserved cookies for %s: %s", self.br_name,
-                 self.reserved_cookies)
+                 reserved_cookies)
+
+        if not self.flow_index.populated:
+            # One streaming dump of all the tables instead of one per table.
+            self.flow_index.populate(self.dump_flows())
 
-        for table_id in self.of_tables:
-            self._dump_and_clean(table_id)
+        of_tables = set(self.of_tables)
+        for cookie in self.flow_index.cookies() - reserved_cookies:
+            for table_id in sorted(self.flow_index.tables(cookie) &
+                                   of_tables):
+                LOG.warning("Deleting flow with cookie 0x%(cookie)x",
+                            {'cookie': cookie})
+                self.uninstall_flows(table_id=table_id, cookie=cookie,
+                                     cookie_mask=ovs_lib.UINT64_BITMASK)
 
     def install_goto_next(self, table_id, active_bundle=None):
         self.install_goto(table_id=table_id, dest_table_id=table_id + 1,
@@ -254,6 +341,7 @@ class OpenFlowSwitchMixin:
                              table_id=0, priority=0,
                              match=None, active_bundle=None, **match_kwargs):
         (dp, ofp, ofpp) = self._get_dp()
+        active_bundle = self._get_active_bundle(active_bundle)
         match = self._match(ofp, ofpp, match, **match_kwargs)
         msg = ofpp.OFPFlowMod(dp,
                               table_id=table_id,
@@ -262,6 +350,7 @@ class OpenFlowSwitchMixin:
                               priority=priority,
                               instructions=instructions)
         self._send_msg(msg, active_bundle=active_bundle)
+        self.flow_index.add(self.default_cookie, table_id)
 
     def install_apply_actions(self, actions,
                               table_id=0, priority=0,
@@ -279,6 +368,27 @@ class OpenFlowSwitchMixin:
     def bundled(self, atomic=False, ordered=False):
         return BundledOpenFlowBridge(self, atomic, ordered)
 
+    @contextlib.contextmanager
+    def bundle_flow_mods(self, atomic=False, ordered=False):
+        """Send the flow mods of the calling thread in a single bundle.
+
+        Unlike bundled(), any flow method of the bridge, like
+        install_flood_to_tun(), can be used: the flows installed or
+        uninstalled by the calling thread until the context exits are added
+        to one bundle, committed on exit. Nested calls use the outer bundle.
+        """
+        if self._get_active_bundle(None) is not None:
+            yield self
+            return
+        with self.bundled(atomic=atomic, ordered=ordered) as bundled_br:
+            self._thread_bundle.active_bundle = dict(
+                id=bundled_br.active_bundle,
+                bundle_flags=bundled_br.bundle_flags)
+            try:
+                yield self
+            finally:
+                self._thread_bundle.active_bundle = None
+
 
 class BundledOpenFlowBridge:
     def __init__(self, br, atomic, ordered):
@@ -15,6 +15,7 @@
 
 import base64
 import collections
+import contextlib
 import functools
 import hashlib
 import signal
@@ -22,6 +23,7 @@ import sys
 import threading
 import time
 
+import futurist
 import netaddr
 from neutron_lib.agent import constants as agent_consts
 from neutron_lib.agent import topics
@@ -72,6 +74,7 @@ from neutron.plugins.ml2.drivers.openvswitch.agent \
     import ovs_capabilities
 from neutron.plugins.ml2.drivers.openvswitch.agent \
     import ovs_dvr_neutron_agent
+from neutron.plugins.ml2.drivers.openvswitch.agent import port_state
 from neutron.plugins.ml2.drivers.openvswitch.agent import vlanmanager
 
 
@@ -87,11 +90,41 @@ PORT_HINTS_TX_STEERING = 'tx-steering'
 PORT_HINTS_TX_STEERING_HASH = 'hash'
 PORT_HINTS_TX_STEERING_THREAD = 'thread'
 
+# Callback resource published with the statistics of each rpc_loop iteration
+RPC_LOOP_ITERATION = 'ovs_agent_rpc_loop_iteration'
+
+# rpc_loop iteration phases timed and published in the iteration statistics
+PHASE_SCAN = 'scan'
+PHASE_PROCESS = 'process'
+PHASE_FIREWALL = 'firewall'
+PHASE_BIND = 'bind'
+
 
 class _mac_mydialect(netaddr.mac_unix):
     word_fmt = '%.2x'
 
 
+class _DevicesShardResult:
+    """Outcome of processing a shard of added or updated devices."""
+
+    def __init__(self):
+        self.skipped_devices = []
+        self.need_binding_devices = []
+        self.bound_devices = []
+        self.binding_no_activated_devices = set()
+        self.devices_not_in_datapath = set()
+        self.migrating_devices = set()
+
+    def merge(self, other):
+        self.skipped_devices += other.skipped_devices
+        self.need_binding_devices += other.need_binding_devices
+        self.bound_devices += other.bound_devices
+        self.binding_no_activated_devices |= (
+            other.binding_no_activated_devices)
+        self.devices_not_in_datapath |= other.devices_not_in_datapath
+        self.migrating_devices |= other.migrating_devices
+
+
 class OVSPluginApi(agent_rpc.CacheBackedPluginApi):
     pass
 
@@ -204,6 +237,9 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
 
         self.int_br = self.br_int_cls(ovs_conf.integration_bridge)
         self.setup_integration_br()
+        # The state of the ports wired by the agent. The port ID sets below
+        # hold the interned IDs of the table.
+        self.port_states = port_state.PortStateTable()
         # Stores port update notifications for processing in main rpc loop
         self.updated_ports = set()
         # Stores port delete notifications
@@ -218,12 +254,19 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
         self.current_smartnic_ports_map = {}
 
         # Data structure that is storing ports which belong to a segmentation
-        # id of a network.
+        # id of a network, indexed by the port state table.
         # Example: {net1: {seg1: {port1, port2, },
         #                  seg2: {port3, }},
         #           net2: {seg3: {port4, port5, }}}
-        self.network_ports = collections.defaultdict(
-            lambda: collections.defaultdict(set))
+        self.network_ports = self.port_states.network_ports
+        # Protects the local VLAN allocation and the network_ports mapping
+        # when the ports are processed in parallel shards.
+        self._port_state_lock = threading.RLock()
+        # The DVR agent state (local DVR and CSNAT maps, local ports and
+        # registered DVR MACs) is not thread safe, and the ports of the
+        # subnet of a distributed router can be in different shards.
+        self._dvr_lock = threading.Lock()
+        self.port_processing_workers = agent_conf.port_processing_workers
 
         # keeps association between ports and ofports to detect ofport change
         self.vifname_to_ofport_map = {}
@@ -283,6 +326,11 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
         self.ovsdb_monitor_respawn_interval = (
             agent_conf.ovsdb_monitor_respawn_interval or
             ovs_const.DEFAULT_OVSDBMON_RESPAWN)
+        self.ovsdb_monitor_backend = agent_conf.ovsdb_monitor_backend
+        self.adaptive_polling = agent_conf.adaptive_polling
+        self.polling_debounce_interval = agent_conf.polling_debounce_interval
+        self.max_polling_backoff = agent_conf.max_polling_backoff
+        self.polling_backoff = 0
         self.local_ip = ovs_conf.local_ip
         self.tunnel_count = 0
         self.vxlan_udp_port = agent_conf.vxlan_udp_port
@@ -423,6 +471,7 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
 
         # Initialize iteration counter
         self.iter_num = 0
+        self.iteration_phases = {}
         self.run_daemon_loop = True
 
         self.catch_sigterm = False
@@ -627,7 +676,7 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
             # will cause all these ports to be processed again in next RPC
             # loop as 'updated'. So here we just ignore such local update
             # notification.
-            self.updated_ports.add(port['id'])
+            self.updated_ports.add(port_state.intern_id(port['id']))
 
         if not self.conf.AGENT.baremetal_smartnic:
             return
@@ -726,7 +775,7 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
 
     @profiler.trace("rpc")
     def port_delete(self, context, **kwargs):
-        port_id = kwargs.get('port_id')
+        port_id = port_state.intern_id(kwargs.get('port_id'))
         self.deleted_ports.add(port_id)
         self.updated_ports.discard(port_id)
 
@@ -754,28 +803,19 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
     def binding_deactivate(self, context, **kwargs):
         if kwargs.get('host') != self.conf.host:
             return
-        port_id = kwargs.get('port_id')
+        port_id = port_state.intern_id(kwargs.get('port_id'))
         self.deactivated_bindings.add(port_id)
 
     @profiler.trace("rpc")
     def binding_activate(self, context, **kwargs):
         if kwargs.get('host') != self.conf.host:
             return
-        port_id = kwargs.get('port_id')
+        port_id = port_state.intern_id(kwargs.get('port_id'))
         self.activated_bindings.add(port_id)
 
     def _clean_network_ports(self, port_id):
-        # TODO(sahid): We should certainly have at least the net-id passed to
-        # the RPC port_delete so we can refine the whole datastruture to handle
-        # deleted ports with at least the network id.
-        for data in self.network_ports.values():
-            for port_set in data.values():
-                if port_id in port_set:
-                    port_set.remove(port_id)
-                    break
-
-    def _add_network_ports(self, network_id, segmentation_id, port_id):
-        self.network_ports[network_id][segmentation_id].add(port_id)
+        with self._port_state_lock:
+            self.port_states.remove(port_id)
 
     def _get_net_local_vlan_or_none(self, net_id, segmentation_id):
         try:
@@ -946,11 +986,33 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
 
     def fdb_add(self, context, fdb_entries):
         LOG.debug("fdb_add received, fdb_entries=%s", fdb_entries)
+        lvm_agent_ports = []
+        missing_tunnels = set()
         for lvm, agent_ports in self.get_agent_ports(fdb_entries):
             agent_ports.pop(self.local_ip, None)
-            if len(agent_ports):
-                self.fdb_add_tun(context, self.tun_br, lvm,
-                                 agent_ports, self._tunnel_port_lookup)
+            if not len(agent_ports):
+                continue
+            lvm_agent_ports.append((lvm, agent_ports))
+            missing_tunnels.update(
+                (lvm.network_type, remote_ip) for remote_ip in agent_ports
+                if not self._tunnel_port_lookup(lvm.network_type, remote_ip))
+        if not lvm_agent_ports:
+            return
+        # NOTE: a new network can spread to hundreds of hypervisors at once:
+        # the missing tunnel ports are created together and all the flows
+        # of the entries are installed in one bundle.
+        if missing_tunnels:
+            self._setup_tunnel_ports(self.tun_br, missing_tunnels)
+        with self.tun_br.bundle_flow_mods(ordered=True):
+            for lvm, agent_ports in lvm_agent_ports:
+                for remote_ip, ports in agent_ports.items():
+                    ofport = self._tunnel_port_lookup(lvm.network_type,
+                                                      remote_ip)
+                    if not ofport:
+                        continue
+                    for port in ports:
+                        self.add_fdb_flow(self.tun_br, port, remote_ip, lvm,
+                                          ofport)
 
     def fdb_remove(self, context, fdb_entries):
         LOG.debug("fdb_remove received, fdb_entries=%s", fdb_entries)
@@ -1044,34 +1106,35 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
         new one. If the VLAN tag is not used, check if there are local VLAN
         tags available.
         """
-        try:
-            lvm = self.vlan_manager.get(net_uuid, segmentation_id)
-        except vlanmanager.MappingNotFound:
-            # TODO(sahid): This local_vlan_hints should have its own
-            # datastructure and model to be manipulated.
-            key = f"{net_uuid}/{segmentation_id}"
-            data = self._local_vlan_hints.pop(
-                key, {'vlan': None, 'tun_ofports': set()})
-            lvid = data['vlan']
-            tun_ofports = data['tun_ofports']
-            if lvid is None:
-                if not self.available_local_vlans:
-                    LOG.error("No local VLAN available for net-id=%s, "
-                              "seg-id=%s",
-                              net_uuid, segmentation_id)
-                    return
-                lvid = self.available_local_vlans.pop()
-            self.vlan_manager.add(
-                net_uuid, lvid, network_type, physical_network,
-                segmentation_id, tun_ofports=tun_ofports)
-            lvm = self.vlan_manager.get(net_uuid, segmentation_id)
-            LOG.info(
-                "Assigning %(vlan_id)s as local vlan for net-id=%(net_uuid)s, "
-                "seg-id=%(seg_id)s",
-                {'vlan_id': lvm.vlan, 'net_uuid': net_uuid,
-                 'seg_id': segmentation_id})
-
-        return lvm
+        with self._port_state_lock:
+            try:
+                lvm = self.vlan_manager.get(net_uuid, segmentation_id)
+            except vlanmanager.MappingNotFound:
+                # TODO(sahid): This local_vlan_hints should have its own
+                # datastructure and model to be manipulated.
+                key = f"{net_uuid}/{segmentation_id}"
+                data = self._local_vlan_hints.pop(
+                    key, {'vlan': None, 'tun_ofports': set()})
+                lvid = data['vlan']
+                tun_ofports = data['tun_ofports']
+                if lvid is None:
+                    if not self.available_local_vlans:
+                        LOG.error("No local VLAN available for net-id=%s, "
+                                  "seg-id=%s",
+                                  net_uuid, segmentation_id)
+                        return
+                    lvid = self.available_local_vlans.pop()
+                self.vlan_manager.add(
+                    net_uuid, lvid, network_type, physical_network,
+                    segmentation_id, tun_ofports=tun_ofports)
+                lvm = self.vlan_manager.get(net_uuid, segmentation_id)
+                LOG.info(
+                    "Assigning %(vlan_id)s as local vlan for "
+                    "net-id=%(net_uuid)s, seg-id=%(seg_id)s",
+                    {'vlan_id': lvm.vlan, 'net_uuid': net_uuid,
+                     'seg_id': segmentation_id})
+
+            return lvm
 
     def provision_local_vlan(self, net_uuid, network_type, physical_network,
                              segmentation_id):
@@ -1247,9 +1310,10 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
 
         lvm.vif_ports[port.vif_id] = port
 
-        self.dvr_agent.bind_port_to_dvr(port, lvm,
-                                        fixed_ips,
-                                        device_owner)
+        with self._dvr_lock:
+            self.dvr_agent.bind_port_to_dvr(port, lvm,
+                                            fixed_ips,
+                                            device_owner)
         port_other_config = self.int_br.db_get_val("Port", port.port_name,
                                                    "other_config")
         if port_other_config is None:
@@ -1484,7 +1548,8 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
             return
 
         if vif_port and vif_id in lvm.vif_ports:
-            self.dvr_agent.unbind_port_from_dvr(vif_port, lvm)
+            with self._dvr_lock:
+                self.dvr_agent.unbind_port_from_dvr(vif_port, lvm)
         lvm.vif_ports.pop(vif_id, None)
         if not lvm.vif_ports:
             self.reclaim_local_vlan(net_uuid, lvm.segmentation_id)
@@ -1994,18 +2059,23 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
             port_needs_binding = False
         return port_needs_binding
 
-    def _setup_tunnel_port(self, br, port_name, remote_ip, tunnel_type):
+    def _check_tunnel_remote_ip(self, remote_ip):
         try:
             if (netaddr.IPAddress(self.local_ip).version !=
                     netaddr.IPAddress(remote_ip).version):
                 LOG.error("IP version mismatch, cannot create tunnel: "
                           "local_ip=%(lip)s remote_ip=%(rip)s",
                           {'lip': self.local_ip, 'rip': remote_ip})
-                return 0
+                return False
         except Exception:
             LOG.error("Invalid local or remote IP, cannot create tunnel: "
                       "local_ip=%(lip)s remote_ip=%(rip)s",
                       {'lip': self.local_ip, 'rip': remote_ip})
+            return False
+        return True
+
+    def _setup_tunnel_port(self, br, port_name, remote_ip, tunnel_type):
+        if not self._check_tunnel_remote_ip(remote_ip):
             return 0
         ofport = br.add_tunnel_port(port_name,
                                     remote_ip,
@@ -2026,6 +2096,39 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
         br.setup_tunnel_port(tunnel_type, ofport)
         return ofport
 
+    def _setup_tunnel_ports(self, br, tunnels):
+        """Set up the tunnel ports to several remote IPs at once.
+
+        The ports are created in a single OVSDB transaction and their
+        ofports are waited for together.
+
+        :param tunnels: set of (tunnel_type, remote_ip) tuples.
+        """
+        tunnel_ports = {}
+        for tunnel_type, remote_ip in tunnels:
+            port_name = self.get_tunnel_name(
+                tunnel_type, self.local_ip, remote_ip)
+            if (port_name is not None and
+                    self._check_tunnel_remote_ip(remote_ip)):
+                tunnel_ports[port_name] = (remote_ip, tunnel_type)
+        ofports = br.add_tunnel_ports(tunnel_ports,
+                                      self.local_ip,
+                                      self.vxlan_udp_port,
+                                      self.dont_fragment,
+                                      self.tunnel_csum,
+                                      self.tos)
+        with br.bundle_flow_mods(ordered=True):
+            for port_name, ofport in ofports.items():
+                remote_ip, tunnel_type = tunnel_ports[port_name]
+                if ofport == ovs_lib.INVALID_OFPORT:
+                    LOG.error("Failed to set-up %(type)s tunnel port to "
+                              "%(ip)s", {'type': tunnel_type, 'ip': remote_ip})
+                    continue
+                self.tun_br_ofports[tunnel_type][remote_ip] = ofport
+                # Add flow in default table to resubmit to the right
+                # tunneling table (lvid will be set in the latter)
+                br.setup_tunnel_port(tunnel_type, ofport)
+
     def _setup_tunnel_flood_flow(self, br, tunnel_type):
         ofports = self.tun_br_ofports[tunnel_type].values()
         if ofports and not self.l2_pop:
@@ -2069,10 +2172,6 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
 
     def treat_devices_added_or_updated(self, devices, provisioning_needed,
                                        re_added):
-        skipped_devices = []
-        need_binding_devices = []
-        binding_no_activated_devices = set()
-        migrating_devices = set()
         agent_restarted = self.iter_num == 0
         devices_details_list = (
             self.plugin_rpc.get_devices_details_list_and_failed_devices(
@@ -2086,7 +2185,56 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
         devices = devices_details_list.get('devices')
         vif_by_id = self.int_br.get_vifs_by_ids(
             [vif['device'] for vif in devices])
-        devices_not_in_datapath = set()
+        shards = self._shard_devices_by_network(devices)
+        if len(shards) > 1 and self.port_processing_workers > 1:
+            workers = min(self.port_processing_workers, len(shards))
+            LOG.debug("Processing %(num_devices)d devices in %(num_shards)d "
+                      "network shards with %(workers)d workers",
+                      {'num_devices': len(devices),
+                       'num_shards': len(shards), 'workers': workers})
+            with futurist.ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self._treat_devices_shard, shard,
+                                    vif_by_id, provisioning_needed)
+                    for shard in shards]
+            results = [future.result() for future in futures]
+        else:
+            results = [self._treat_devices_shard(devices, vif_by_id,
+                                                 provisioning_needed)]
+
+        result = _DevicesShardResult()
+        for shard_result in results:
+            result.merge(shard_result)
+
+        # NOTE: the agent extensions are not required to be thread safe, so
+        # they are always called from this thread once all the shards are
+        # processed.
+        for device in result.skipped_devices:
+            self.ext_manager.delete_port(self.context, {'port_id': device})
+        for details in result.bound_devices:
+            if details['device'] in re_added:
+                self.ext_manager.delete_port(self.context, details)
+            if details['device'] not in result.devices_not_in_datapath:
+                self.ext_manager.handle_port(self.context, details)
+        return (result.skipped_devices, result.binding_no_activated_devices,
+                result.need_binding_devices, failed_devices,
+                result.devices_not_in_datapath, result.migrating_devices)
+
+    @staticmethod
+    def _shard_devices_by_network(devices):
+        """Split the devices details in shards, one per network.
+
+        The devices of a network are always kept in the same shard, so the
+        local VLAN of the network is provisioned only once and the flows
+        of its ports are installed in order.
+        """
+        shards = collections.defaultdict(list)
+        for details in devices:
+            shards[details.get('network_id')].append(details)
+        return list(shards.values())
+
+    def _treat_devices_shard(self, devices, vif_by_id, provisioning_needed):
+        result = _DevicesShardResult()
         for details in devices:
             device = details['device']
             LOG.debug("Processing port: %s", device)
@@ -2095,18 +2243,17 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                 # The port disappeared and cannot be processed
                 LOG.info("Port %s was not found on the integration bridge "
                          "and will therefore not be processed", device)
-                self.ext_manager.delete_port(self.context, {'port_id': device})
-                skipped_devices.append(device)
+                result.skipped_devices.append(device)
                 continue
 
             if not port.ofport or port.ofport == ovs_lib.INVALID_OFPORT:
-                devices_not_in_datapath.add(device)
+                result.devices_not_in_datapath.add(device)
 
             migrating_to = details.get('migrating_to')
             if migrating_to and migrating_to != self.host:
                 LOG.info('Port %(device)s is being migrated to host %(host)s.',
                          {'device': device, 'host': migrating_to})
-                migrating_devices.add(device)
+                result.migrating_devices.add(device)
 
             if 'port_id' in details:
                 details['vif_port'] = port
@@ -2124,21 +2271,18 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                                                    details['device_owner'],
                                                    provisioning_needed)
                 if need_binding:
-                    need_binding_devices.append(details)
+                    result.need_binding_devices.append(details)
                 self._update_port_network(details['port_id'],
                                           details['network_id'],
                                           details['segmentation_id'])
-                if details['device'] in re_added:
-                    self.ext_manager.delete_port(self.context, details)
-                if device not in devices_not_in_datapath:
-                    self.ext_manager.handle_port(self.context, details)
+                result.bound_devices.append(details)
 
             else:
                 if n_const.NO_ACTIVE_BINDING in details:
                     # Port was added to the bridge, but its binding in this
                     # agent hasn't been activated yet. It will be treated as
                     # added when binding is activated
-                    binding_no_activated_devices.add(device)
+                    result.binding_no_activated_devices.add(device)
                     LOG.debug("Device %s has no active binding in host",
                               device)
                 else:
@@ -2147,14 +2291,12 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                         device)
                 if (port and port.ofport != -1):
                     self.port_dead(port)
-        return (skipped_devices, binding_no_activated_devices,
-                need_binding_devices, failed_devices, devices_not_in_datapath,
-                migrating_devices)
+        return result
 
     def _update_port_network(self, port_id, network_id, segmentation_id):
-        # TODO(sahid): This clean_network_ports should accept a net-id/seg_id.
-        self._clean_network_ports(port_id)
-        self._add_network_ports(network_id, segmentation_id, port_id)
+        with self._port_state_lock:
+            self.port_states.update_network(port_id, network_id,
+                                            segmentation_id)
 
     def treat_ancillary_devices_added(self, devices):
         devices_details_list = (
@@ -2195,6 +2337,7 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
             self.ext_manager.delete_port(self.context, {'port_id': device})
             self.port_unbound(device)
             if device:
+                self._clean_network_ports(device)
                 rcache_rpc.record_resource_remove(resources.PORT, device)
 
         return failed_devices
@@ -2276,11 +2419,13 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                       're_added': len(re_added),
                       'elapsed': time.time() - start})
         if devices_added_updated:
-            (skipped_devices, binding_no_activated_devices,
-             need_binding_devices, failed_devices['added'],
-             devices_not_in_datapath, migrating_devices) = (
-                 self.treat_devices_added_or_updated(
-                     devices_added_updated, provisioning_needed, re_added))
+            with self._iteration_phase(PHASE_PROCESS):
+                (skipped_devices, binding_no_activated_devices,
+                 need_binding_devices, failed_devices['added'],
+                 devices_not_in_datapath, migrating_devices) = (
+                     self.treat_devices_added_or_updated(
+                         devices_added_updated, provisioning_needed,
+                         re_added))
             LOG.info("process_network_ports - iteration:%(iter_num)d - "
                      "treat_devices_added_or_updated completed. "
                      "Skipped %(num_skipped)d and no activated binding "
@@ -2304,20 +2449,25 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                        binding_no_activated_devices - migrating_devices)
         self.process_install_ports_egress_flows(need_binding_devices)
         added_to_datapath = added_ports - devices_not_in_datapath
-        self.sg_agent.setup_port_filters(
-            added_to_datapath,
-            port_info.get('updated', set()) - binding_no_activated_devices)
+        with self._iteration_phase(PHASE_FIREWALL):
+            self.sg_agent.setup_port_filters(
+                added_to_datapath,
+                port_info.get('updated', set()) -
+                binding_no_activated_devices)
 
         LOG.info("process_network_ports - iteration:%(iter_num)d - "
                  "agent port security group processed in %(elapsed).3f",
                  {'iter_num': self.iter_num,
                   'elapsed': time.time() - start})
-        failed_devices['added'] |= self._bind_devices(need_binding_devices)
+        with self._iteration_phase(PHASE_BIND):
+            failed_devices['added'] |= self._bind_devices(
+                need_binding_devices)
 
         if 'removed' in port_info and port_info['removed']:
             start = time.time()
-            failed_devices['removed'] |= self.treat_devices_removed(
-                port_info['removed'])
+            with self._iteration_phase(PHASE_PROCESS):
+                failed_devices['removed'] |= self.treat_devices_removed(
+                    port_info['removed'])
             LOG.info("process_network_ports - iteration:%(iter_num)d - "
                      "treat_devices_removed completed in %(elapsed).3f",
                      {'iter_num': self.iter_num,
@@ -2575,16 +2725,75 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                         "and checking OVS status periodically.")
         return status
 
-    def loop_count_and_wait(self, start_time, port_stats):
+    @contextlib.contextmanager
+    def _iteration_phase(self, phase):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.iteration_phases[phase] = (
+                self.iteration_phases.get(phase, 0) + time.time() - start)
+
+    def publish_iteration_stats(self, elapsed, port_stats):
+        stats = {'iteration': self.iter_num,
+                 'elapsed': elapsed,
+                 'phases': dict(self.iteration_phases),
+                 'port_stats': port_stats,
+                 'polling_backoff': self.polling_backoff}
+        registry.publish(RPC_LOOP_ITERATION, callback_events.AFTER_UPDATE,
+                         self, payload=callback_events.EventPayload(
+                             context=None, states=(stats,)))
+
+    def _has_pending_work(self, polling_manager):
+        # Without an OVSDB monitor (AlwaysPoll) polling is always required,
+        # so only the end of the polling interval starts a new iteration.
+        if not hasattr(polling_manager, 'get_events'):
+            return False
+        return bool(self._agent_has_updates(polling_manager))
+
+    def _adaptive_wait(self, start_time, elapsed, polling_manager, backoff):
+        if backoff or elapsed > self.polling_interval:
+            # OVS or the Neutron server is dead, failing or slow: do not
+            # pile more load on them, whatever the pending work.
+            self.polling_backoff = min(
+                max(self.polling_backoff * 2, self.polling_interval),
+                self.max_polling_backoff)
+            LOG.debug("Agent rpc_loop - iteration:%(iter_num)d - backing "
+                      "off for %(backoff)s seconds",
+                      {'iter_num': self.iter_num,
+                       'backoff': self.polling_backoff})
+            time.sleep(self.polling_backoff)
+            return
+        self.polling_backoff = 0
+        deadline = start_time + self.polling_interval
+        remaining = deadline - time.time()
+        while remaining > 0:
+            # Once work is pending, this last sleep coalesces the burst of
+            # events it belongs to.
+            pending = self._has_pending_work(polling_manager)
+            time.sleep(min(self.polling_debounce_interval, remaining))
+            if pending:
+                return
+            remaining = deadline - time.time()
+
+    def loop_count_and_wait(self, start_time, port_stats,
+                            polling_manager=None, backoff=False):
         # sleep till end of polling interval
         elapsed = time.time() - start_time
         LOG.info("Agent rpc_loop - iteration:%(iter_num)d "
                  "completed. Processed ports statistics: "
-                 "%(port_stats)s. Elapsed:%(elapsed).3f",
+                 "%(port_stats)s. Phase timings: %(phases)s. "
+                 "Elapsed:%(elapsed).3f",
                  {'iter_num': self.iter_num,
                   'port_stats': port_stats,
+                  'phases': {phase: round(phase_elapsed, 3)
+                             for phase, phase_elapsed in
+                             self.iteration_phases.items()},
                   'elapsed': elapsed})
-        if elapsed < self.polling_interval:
+        self.publish_iteration_stats(elapsed, port_stats)
+        if self.adaptive_polling and polling_manager is not None:
+            self._adaptive_wait(start_time, elapsed, polling_manager, backoff)
+        elif elapsed < self.polling_interval:
             time.sleep(self.polling_interval - elapsed)
         else:
             time.sleep(0)
@@ -2741,11 +2950,14 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
         return new_failed_devices_retries_map
 
     def _handle_ovs_restart(self, polling_manager):
+        # The flows known by the bridges are gone with the OVS restart
+        self.int_br.flow_index.invalidate()
         self.setup_integration_br()
         self.install_ingress_direct_goto_flows()
         self.setup_physical_bridges(self.bridge_mappings)
         if self.enable_tunneling:
             self._reset_tunnel_ofports()
+            self.tun_br.flow_index.invalidate()
             self.setup_tunnel_br()
             self.setup_tunnel_br_flows()
             self.agent_state['start_flag'] = True
@@ -2766,7 +2978,9 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
         # REVISIT (rossella_s) Define a method "reset" in
         # BasePollingManager that will be implemented by AlwaysPoll as
         # no action and by InterfacePollingMinimizer as start/stop
-        if isinstance(polling_manager, polling.InterfacePollingMinimizer):
+        if isinstance(polling_manager,
+                      (polling.InterfacePollingMinimizer,
+                       polling.IdlInterfacePollingMinimizer)):
             polling_manager.stop()
             polling_manager.start()
 
@@ -2795,6 +3009,7 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                 self.fullsync = False
             port_info = {}
             ancillary_port_info = {}
+            self.iteration_phases = {}
             start = time.time()
             LOG.info("Agent rpc_loop - iteration:%d started",
                      self.iter_num)
@@ -2808,7 +3023,8 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                 # prevent unexpected failure or crash. Sleep and continue
                 # loop in which ovs status will be checked periodically.
                 port_stats = self.get_port_stats({}, {})
-                self.loop_count_and_wait(start, port_stats)
+                self.loop_count_and_wait(start, port_stats, polling_manager,
+                                         backoff=True)
                 continue
             else:
                 # Check if any physical bridge wasn't recreated recently,
@@ -2857,12 +3073,14 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                     self.updated_ports = set()
                     activated_bindings_copy = self.activated_bindings
                     self.activated_bindings = set()
-                    (port_info, ancillary_port_info, consecutive_resyncs,
-                     ports_not_ready_yet) = (self.process_port_info(
-                         start, polling_manager, sync,
-                         ports, ancillary_ports, updated_ports_copy,
-                         consecutive_resyncs, ports_not_ready_yet,
-                         failed_devices, failed_ancillary_devices))
+                    with self._iteration_phase(PHASE_SCAN):
+                        (port_info, ancillary_port_info,
+                         consecutive_resyncs, ports_not_ready_yet) = (
+                             self.process_port_info(
+                                 start, polling_manager, sync,
+                                 ports, ancillary_ports, updated_ports_copy,
+                                 consecutive_resyncs, ports_not_ready_yet,
+                                 failed_devices, failed_ancillary_devices))
                     sync = False
                     self.process_deleted_ports(port_info)
                     self.process_deactivated_bindings(port_info)
@@ -2940,7 +3158,9 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                     sync = True
             self.ovs_restarted = False
             port_stats = self.get_port_stats(port_info, ancillary_port_info)
-            self.loop_count_and_wait(start, port_stats)
+            # A pending resync at this point means the iteration failed
+            self.loop_count_and_wait(start, port_stats, polling_manager,
+                                     backoff=sync)
 
     def daemon_loop(self):
         # Start everything.
@@ -2958,7 +3178,8 @@ class OVSNeutronAgent(l2population_rpc.L2populationRpcCallBackTunnelMixin,
                 self.minimize_polling,
                 self.ovsdb_monitor_respawn_interval,
                 bridge_names=bridge_names,
-                ovs=self.ovs) as pm:
+                ovs=self.ovs,
+                ovsdb_monitor_backend=self.ovsdb_monitor_backend) as pm:
             self.rpc_loop(polling_manager=pm)
         if self.plugin_rpc:
             self.plugin_rpc.stop()
@@ -0,0 +1,110 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import sys
+
+
+def intern_id(value):
+    """Return the canonical copy of a port, network or segmentation ID.
+
+    The same IDs arrive many times, through RPC notifications, OVSDB events
+    and device details. Interning them makes every set and dict of the agent
+    share one string per ID instead of one copy per message.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+class PortState:
+    """The state of a port wired by the OVS agent."""
+
+    __slots__ = ('port_id', 'network_id', 'segmentation_id')
+
+    def __init__(self, port_id, network_id=None, segmentation_id=None):
+        self.port_id = port_id
+        self.network_id = network_id
+        self.segmentation_id = segmentation_id
+
+    def __repr__(self):
+        return ('PortState(port_id=%s, network_id=%s, segmentation_id=%s)' %
+                (self.port_id, self.network_id, self.segmentation_id))
+
+
+class PortStateTable:
+    """The port states owned by the OVS agent.
+
+    Lifecycle of a port state:
+
+    * it is created by update_network() when the agent wires the port
+      (treat_devices_added_or_updated), and moved to its new network or
+      segment when the port is wired again;
+    * it is dropped by remove() when the port is deleted
+      (process_deleted_ports) or removed from the integration bridge
+      (treat_devices_removed).
+
+    The states are also indexed by network and segmentation ID, as
+    network_ports::
+
+        {net1: {seg1: {port1, port2, },
+                seg2: {port3, }},
+         net2: {seg3: {port4, port5, }}}
+
+    so that a network update does not have to go through all the ports.
+    """
+
+    def __init__(self):
+        self._ports = {}
+        self.network_ports = collections.defaultdict(
+            lambda: collections.defaultdict(set))
+
+    def __contains__(self, port_id):
+        return port_id in self._ports
+
+    def __len__(self):
+        return len(self._ports)
+
+    def __iter__(self):
+        return iter(self._ports.values())
+
+    def get(self, port_id):
+        return self._ports.get(port_id)
+
+    def _discard_from_network(self, state):
+        if state.network_id is None:
+            return
+        port_ids = self.network_ports.get(state.network_id, {}).get(
+            state.segmentation_id)
+        if port_ids is not None:
+            port_ids.discard(state.port_id)
+
+    def update_network(self, port_id, network_id, segmentation_id):
+        """Record the network and segment a port is wired to."""
+        port_id = intern_id(port_id)
+        state = self._ports.get(port_id)
+        if state is None:
+            state = self._ports[port_id] = PortState(port_id)
+        else:
+            self._discard_from_network(state)
+        state.network_id = intern_id(network_id)
+        state.segmentation_id = intern_id(segmentation_id)
+        self.network_ports[state.network_id][state.segmentation_id].add(
+            port_id)
+        return state
+
+    def remove(self, port_id):
+        """Drop the state of a port, returning it if it was known."""
+        state = self._ports.pop(port_id, None)
+        if state is not None:
+            self._discard_from_network(state)
+        return state
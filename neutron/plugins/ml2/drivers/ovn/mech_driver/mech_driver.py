@@ -977,6 +977,27 @@ class OVNMechanismDriver(api.MechanismDriver):
         self._ovn_client.create_port(context.plugin_context, port)
         self._notify_dhcp_updated(context.plugin_context, port['id'])
 
+    def create_port_bulk_postcommit(self, contexts):
+        """Create a batch of ports.
+
+        :param contexts: list of PortContext instances, one per port
+        created by the same create_port_bulk call.
+
+        Same as create_port_postcommit, but all the ports are created in a
+        single OVN NB transaction.
+        """
+        if not contexts:
+            return
+        plugin_context = contexts[0].plugin_context
+        ports = []
+        for context in contexts:
+            port = copy.deepcopy(context.current)
+            port['network'] = context.network.current
+            ports.append(port)
+        self._ovn_client.create_ports(plugin_context, ports)
+        for port in ports:
+            self._notify_dhcp_updated(plugin_context, port['id'])
+
     def update_port_precommit(self, context):
         """Update resources of a port.
 
@@ -40,6 +40,7 @@ from neutron.common import utils as n_utils
 from neutron.conf.plugins.ml2.drivers.ovn import ovn_conf as cfg
 from neutron.plugins.ml2.drivers.ovn.mech_driver.ovsdb import commands as cmd
 from neutron.plugins.ml2.drivers.ovn.mech_driver.ovsdb import ovsdb_monitor
+from neutron.plugins.ml2.drivers.ovn.mech_driver.ovsdb import txn_coalescer
 from neutron.plugins.ml2.drivers.ovn.mech_driver.ovsdb import worker
 from neutron.services.portforwarding import constants as pf_const
 
@@ -73,6 +74,15 @@ class OvnNbTransaction(idl_trans.Transaction):
             return
         self.api.nb_global.increment('nb_cfg')
 
+    def commit(self):
+        coalescer = getattr(self.api, 'txn_coalescer', None)
+        if coalescer is None or self.bump_nb_cfg:
+            return self.commit_uncoalesced()
+        return coalescer.commit(self)
+
+    def commit_uncoalesced(self):
+        return super().commit()
+
 
 def add_keepalives(fn):
     @functools.wraps(fn)
@@ -234,6 +244,10 @@ def get_ovn_idls(driver, trigger):
 
 
 class OvsdbNbOvnIdl(nb_impl_idl.OvnNbApiIdlImpl, Backend):
+    # Coalesces the transactions of concurrent API requests, see
+    # [ovn] nb_txn_coalesce_window
+    txn_coalescer = None
+
     @n_utils.classproperty
     def connection_string(cls):
         return cfg.get_ovn_nb_connection()
@@ -246,7 +260,13 @@ class OvsdbNbOvnIdl(nb_impl_idl.OvnNbApiIdlImpl, Backend):
         else:
             idl_ = ovsdb_monitor.OvnNbIdl.from_server(*args, driver=driver)
         conn = connection.Connection(idl_, timeout=cfg.get_ovn_ovsdb_timeout())
-        return cls(conn)
+        nb_idl = cls(conn)
+        window = cfg.get_ovn_nb_txn_coalesce_window()
+        if window and worker_class != worker.MaintenanceWorker:
+            nb_idl.txn_coalescer = txn_coalescer.TransactionCoalescer(
+                nb_idl, window / 1000.0,
+                cfg.get_ovn_nb_txn_coalesce_max_commands())
+        return nb_idl
 
     @property
     def nb_global(self):
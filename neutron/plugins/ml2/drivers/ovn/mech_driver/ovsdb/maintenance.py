@@ -14,6 +14,7 @@
 #    under the License.
 
 import abc
+import bisect
 import functools
 import inspect
 import threading
@@ -51,6 +52,8 @@ LOG = log.getLogger(__name__)
 
 INCONSISTENCY_TYPE_CREATE_UPDATE = 'create/update'
 INCONSISTENCY_TYPE_DELETE = 'delete'
+_FIX_DBG_LOG_MSG = ('Maintenance task: Fixing resource %(res_uuid)s '
+                    '(type: %(res_type)s) at %(type_)s')
 # TODO(bpetermann): move MAINTENANCE_NB_IDL_LOCK_NAME to neutron-lib
 MAINTENANCE_NB_IDL_LOCK_NAME = "ovn_db_inconsistencies_periodics"
 
@@ -166,6 +169,33 @@ class SchemaAwarePeriodicsBase:
         """Hook invoked upon OVN NB schema is updated."""
 
 
+class _FixProgress:
+    """Progress of the inconsistencies fixed by a maintenance task run"""
+
+    def __init__(self, total):
+        self.total = total
+        self.processed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._timer = timeutils.StopWatch().start()
+
+    def update(self, inconsistency_type, resource_type, processed, failed):
+        with self._lock:
+            self.processed += processed
+            self.failed += failed
+            elapsed = self._timer.elapsed()
+            rate = self.processed / elapsed if elapsed else 0.0
+            eta = (self.total - self.processed) / rate if rate else 0.0
+            LOG.info('Maintenance task: Processed %(processed)d of '
+                     '%(total)d inconsistencies (%(failed)d failed, last '
+                     'batch: %(res_type)s at %(type_)s), %(rate).1f per '
+                     'second, ETA %(eta).0f seconds',
+                     {'processed': self.processed, 'total': self.total,
+                      'failed': self.failed, 'res_type': resource_type,
+                      'type_': inconsistency_type, 'rate': rate,
+                      'eta': eta})
+
+
 class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
 
     def __init__(self, ovn_client):
@@ -178,11 +208,15 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
         self._idl = self._nb_idl.idl
         self._idl.set_lock(MAINTENANCE_NB_IDL_LOCK_NAME)
         self._sync_timer = timeutils.StopWatch()
+        # The last resource fixed, by inconsistency and resource type, when
+        # a run stops at [ovn] inconsistencies_max_per_run
+        self._resume_markers = {}
         super().__init__(ovn_client)
 
         self._resources_func_map = {
             ovn_const.TYPE_NETWORKS: {
                 'neutron_get': self._ovn_client._plugin.get_network,
+                'neutron_get_all': self._ovn_client._plugin.get_networks,
                 'ovn_get': self._nb_idl.get_lswitch,
                 'ovn_create': self._ovn_client.create_network,
                 'ovn_update': self._ovn_client.update_network,
@@ -190,6 +224,7 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
             },
             ovn_const.TYPE_PORTS: {
                 'neutron_get': self._ovn_client._plugin.get_port,
+                'neutron_get_all': self._ovn_client._plugin.get_ports,
                 'ovn_get': self._nb_idl.get_lswitch_port,
                 'ovn_create': self._ovn_client.create_port,
                 'ovn_update': self._ovn_client.update_port,
@@ -197,6 +232,8 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
             },
             ovn_const.TYPE_FLOATINGIPS: {
                 'neutron_get': self._ovn_client._l3_plugin.get_floatingip,
+                'neutron_get_all':
+                    self._ovn_client._l3_plugin.get_floatingips,
                 'ovn_get': self._nb_idl.get_floatingip_in_nat_or_lb,
                 'ovn_create': self._create_floatingip_and_pf,
                 'ovn_update': self._update_floatingip_and_pf,
@@ -204,6 +241,7 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
             },
             ovn_const.TYPE_ROUTERS: {
                 'neutron_get': self._ovn_client._l3_plugin.get_router,
+                'neutron_get_all': self._ovn_client._l3_plugin.get_routers,
                 'ovn_get': self._nb_idl.get_lrouter,
                 'ovn_create': self._ovn_client.create_router,
                 'ovn_update': self._ovn_client.update_router,
@@ -211,6 +249,8 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
             },
             ovn_const.TYPE_ADDRESS_GROUPS: {
                 'neutron_get': self._ovn_client._plugin.get_address_group,
+                'neutron_get_all':
+                    self._ovn_client._plugin.get_address_groups,
                 'ovn_get': self._nb_idl.get_address_set,
                 'ovn_create': self._ovn_client.create_address_group,
                 'ovn_update': self._ovn_client.update_address_group,
@@ -218,6 +258,8 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
             },
             ovn_const.TYPE_SECURITY_GROUPS: {
                 'neutron_get': self._ovn_client._plugin.get_security_group,
+                'neutron_get_all':
+                    self._ovn_client._plugin.get_security_groups,
                 'ovn_get': self._nb_idl.get_port_group,
                 'ovn_create': self._ovn_client.create_security_group,
                 'ovn_delete': self._ovn_client.delete_security_group,
@@ -225,6 +267,8 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
             ovn_const.TYPE_SECURITY_GROUP_RULES: {
                 'neutron_get':
                     self._ovn_client._plugin.get_security_group_rule,
+                'neutron_get_all':
+                    self._ovn_client._plugin.get_security_group_rules,
                 'ovn_get': self._nb_idl.get_acl_by_id,
                 'ovn_create': self._ovn_client.create_security_group_rule,
                 'ovn_delete': self._ovn_client.delete_security_group_rule,
@@ -232,6 +276,7 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
             ovn_const.TYPE_ROUTER_PORTS: {
                 'neutron_get':
                     self._ovn_client._plugin.get_port,
+                'neutron_get_all': self._ovn_client._plugin.get_ports,
                 'ovn_get': self._nb_idl.get_lrouter_port,
                 'ovn_create': self._create_lrouter_port,
                 'ovn_update': self._ovn_client.update_router_port,
@@ -258,12 +303,30 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
                 LOG.exception(
                     'Unknown error while executing "%s"', func.__name__)
 
-    def _fix_create_update(self, context, row):
+    @staticmethod
+    def _bump_revision(context, n_obj, resource_type, bumps=None):
+        if bumps is None:
+            revision_numbers_db.bump_revision(context, n_obj, resource_type)
+        else:
+            bumps.append((n_obj, resource_type))
+
+    def _fix_create_update(self, context, row, n_objs=None, bumps=None):
+        """Fix the create/update inconsistency of a resource
+
+        :param n_objs: optional dict of the Neutron objects of a batch, by
+                       ID, loaded at once.
+        :param bumps: optional list the revision numbers to bump are added
+                      to, as (resource, resource_type) tuples, instead of
+                      being bumped one by one.
+        """
         res_map = self._resources_func_map[row.resource_type]
         try:
             # Get the latest version of the resource in Neutron DB
-            n_obj = res_map['neutron_get'](context, row.resource_uuid)
-        except n_exc.NotFound:
+            if n_objs is None:
+                n_obj = res_map['neutron_get'](context, row.resource_uuid)
+            else:
+                n_obj = n_objs[row.resource_uuid]
+        except (n_exc.NotFound, KeyError):
             LOG.warning('Skip fixing resource %(res_uuid)s (type: '
                         '%(res_type)s). Resource does not exist in Neutron '
                         'database anymore', {'res_uuid': row.resource_uuid,
@@ -283,8 +346,8 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
                     # In OVN, we don't care about updates to security groups,
                     # so just bump the revision number to whatever it's
                     # supposed to be.
-                    revision_numbers_db.bump_revision(context, n_obj,
-                                                      row.resource_type)
+                    self._bump_revision(context, n_obj, row.resource_type,
+                                        bumps)
                 elif row.resource_type == ovn_const.TYPE_ADDRESS_GROUPS:
                     need_bump = False
                     for obj in ovn_obj:
@@ -306,8 +369,8 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
                             break
                         need_bump = True
                     if need_bump:
-                        revision_numbers_db.bump_revision(context, n_obj,
-                                                          row.resource_type)
+                        self._bump_revision(context, n_obj,
+                                            row.resource_type, bumps)
                 else:
                     ext_ids = getattr(ovn_obj, 'external_ids', {})
                     ovn_revision = int(ext_ids.get(
@@ -320,8 +383,8 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
                         # If the resource exist and the revision number
                         # is equal on both databases just bump the revision on
                         # the cache table.
-                        revision_numbers_db.bump_revision(context, n_obj,
-                                                          row.resource_type)
+                        self._bump_revision(context, n_obj,
+                                            row.resource_type, bumps)
         except revision_numbers_db.StandardAttributeIDNotFound:
             LOG.error('Standard attribute ID not found for object ID %s',
                       n_obj['id'])
@@ -335,12 +398,20 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
         else:
             res_map['ovn_delete'](context, row.resource_uuid)
 
-    def _fix_create_update_subnet(self, context, row):
+    def _fix_create_update_subnet(self, context, row, n_objs=None,
+                                  networks=None):
         # Get the lasted version of the port in Neutron DB
-        sn_db_obj = self._ovn_client._plugin.get_subnet(
-            context, row.resource_uuid)
-        n_db_obj = self._ovn_client._plugin.get_network(
-            context, sn_db_obj['network_id'])
+        if n_objs is None:
+            sn_db_obj = self._ovn_client._plugin.get_subnet(
+                context, row.resource_uuid)
+        else:
+            sn_db_obj = n_objs.get(row.resource_uuid)
+            if sn_db_obj is None:
+                raise n_exc.SubnetNotFound(subnet_id=row.resource_uuid)
+        n_db_obj = (networks or {}).get(sn_db_obj['network_id'])
+        if n_db_obj is None:
+            n_db_obj = self._ovn_client._plugin.get_network(
+                context, sn_db_obj['network_id'])
 
         if row.revision_number == ovn_const.INITIAL_REV_NUM:
             self._ovn_client.create_subnet(context, sn_db_obj, n_db_obj)
@@ -371,31 +442,98 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
         _log(create_update_inconsistencies, INCONSISTENCY_TYPE_CREATE_UPDATE)
         _log(delete_inconsistencies, INCONSISTENCY_TYPE_DELETE)
 
-    @has_lock_periodic(spacing=ovn_const.DB_CONSISTENCY_CHECK_INTERVAL,
-                       run_immediately=True)
-    def check_for_inconsistencies(self):
-        admin_context = n_context.get_admin_context()
-        create_update_inconsistencies = (
-            revision_numbers_db.get_inconsistent_resources(admin_context))
-        delete_inconsistencies = (
-            revision_numbers_db.get_deleted_resources(admin_context))
-        if not any([create_update_inconsistencies, delete_inconsistencies]):
-            LOG.debug('Maintenance task: No inconsistencies found. Skipping')
-            return
+    def _get_neutron_objects(self, context, resource_type, rows):
+        """Load the Neutron objects of a batch of rows at once, by ID"""
+        if resource_type == ovn_const.TYPE_SUBNETS:
+            get_all = self._ovn_client._plugin.get_subnets
+        else:
+            get_all = self._resources_func_map[resource_type][
+                'neutron_get_all']
+        n_objs = get_all(
+            context, filters={'id': [row.resource_uuid for row in rows]})
+        return {n_obj['id']: n_obj for n_obj in n_objs}
 
-        LOG.debug('Maintenance task: Synchronizing Neutron '
-                  'and OVN databases started')
-        self._log_maintenance_inconsistencies(create_update_inconsistencies,
-                                              delete_inconsistencies)
-        self._sync_timer.restart()
+    def _create_missing_ports(self, context, rows, n_objs):
+        """Create the missing Logical_Switch_Ports of a batch at once
 
-        dbg_log_msg = ('Maintenance task: Fixing resource %(res_uuid)s '
-                       '(type: %(res_type)s) at %(type_)s')
-        # Fix the create/update resources inconsistencies
-        for row in create_update_inconsistencies:
-            LOG.debug(dbg_log_msg, {'res_uuid': row.resource_uuid,
-                                    'res_type': row.resource_type,
-                                    'type_': INCONSISTENCY_TYPE_CREATE_UPDATE})
+        Returns the rows left to fix, the rows of the ports created are
+        removed.
+        """
+        missing = {row.resource_uuid for row in rows
+                   if row.resource_uuid in n_objs and
+                   not self._nb_idl.get_lswitch_port(row.resource_uuid)}
+        if len(missing) < 2:
+            return rows
+        try:
+            self._ovn_client.create_ports(
+                context, [n_objs[port_id] for port_id in missing])
+        except Exception:
+            LOG.warning('Maintenance task: Failed to create %d ports at '
+                        'once, creating them one by one', len(missing),
+                        exc_info=True)
+            return rows
+        return [row for row in rows if row.resource_uuid not in missing]
+
+    def _bump_revisions(self, context, bumps):
+        """Bump the revision numbers of a batch, returns the failures"""
+        try:
+            revision_numbers_db.bump_revisions(context, bumps)
+            return 0
+        except Exception:
+            LOG.warning('Maintenance task: Failed to bump %d revision '
+                        'numbers at once, bumping them one by one',
+                        len(bumps), exc_info=True)
+        failed = 0
+        for n_obj, resource_type in bumps:
+            try:
+                revision_numbers_db.bump_revision(context, n_obj,
+                                                  resource_type)
+            except revision_numbers_db.StandardAttributeIDNotFound:
+                LOG.error('Standard attribute ID not found for object ID %s',
+                          n_obj['id'])
+                failed += 1
+            except Exception:
+                LOG.exception('Maintenance task: Failed to bump the '
+                              'revision number of resource %(res_uuid)s '
+                              '(type: %(res_type)s)',
+                              {'res_uuid': n_obj['id'],
+                               'res_type': resource_type})
+                failed += 1
+        return failed
+
+    def _fix_create_update_batch(self, rows):
+        """Fix the create/update inconsistencies of a batch of rows
+
+        All the rows have the same resource type. Returns the number of rows
+        that could not be fixed.
+        """
+        context = n_context.get_admin_context()
+        resource_type = rows[0].resource_type
+        try:
+            n_objs = self._get_neutron_objects(context, resource_type, rows)
+        except Exception:
+            LOG.warning('Maintenance task: Failed to load %(num)d resources '
+                        '(type: %(res_type)s) at once, loading them one by '
+                        'one', {'num': len(rows), 'res_type': resource_type},
+                        exc_info=True)
+            n_objs = None
+
+        networks = None
+        if resource_type == ovn_const.TYPE_SUBNETS and n_objs:
+            network_ids = {sn['network_id'] for sn in n_objs.values()}
+            networks = {net['id']: net for net in
+                        self._ovn_client._plugin.get_networks(
+                            context, filters={'id': list(network_ids)})}
+        elif resource_type == ovn_const.TYPE_PORTS and n_objs:
+            rows = self._create_missing_ports(context, rows, n_objs)
+
+        failed = 0
+        bumps = []
+        for row in rows:
+            LOG.debug(_FIX_DBG_LOG_MSG,
+                      {'res_uuid': row.resource_uuid,
+                       'res_type': row.resource_type,
+                       'type_': INCONSISTENCY_TYPE_CREATE_UPDATE})
             try:
                 # NOTE(lucasagomes): The way to fix subnets is bit
                 # different than other resources. A subnet in OVN language
@@ -404,38 +542,171 @@ class DBInconsistenciesPeriodics(SchemaAwarePeriodicsBase):
                 # to True. So, it's possible to have a consistent subnet
                 # resource even when it does not exist in the OVN database.
                 if row.resource_type == ovn_const.TYPE_SUBNETS:
-                    self._fix_create_update_subnet(admin_context, row)
+                    self._fix_create_update_subnet(
+                        context, row, n_objs=n_objs, networks=networks)
                 else:
-                    self._fix_create_update(admin_context, row)
+                    self._fix_create_update(context, row, n_objs=n_objs,
+                                            bumps=bumps)
             except Exception:
+                failed += 1
                 LOG.exception('Maintenance task: Failed to fix resource '
                               '%(res_uuid)s (type: %(res_type)s)',
                               {'res_uuid': row.resource_uuid,
                                'res_type': row.resource_type})
+        if bumps:
+            failed += self._bump_revisions(context, bumps)
+        return failed
 
-        # Fix the deleted resources inconsistencies
-        for row in delete_inconsistencies:
-            LOG.debug(dbg_log_msg, {'res_uuid': row.resource_uuid,
-                                    'res_type': row.resource_type,
-                                    'type_': INCONSISTENCY_TYPE_DELETE})
+    def _fix_delete_batch(self, rows):
+        """Fix the delete inconsistencies of a batch of rows
+
+        All the rows have the same resource type. Returns the number of rows
+        that could not be fixed.
+        """
+        context = n_context.get_admin_context()
+        resource_type = rows[0].resource_type
+        if resource_type not in (ovn_const.TYPE_SUBNETS,
+                                 ovn_const.TYPE_PORTS):
+            # The revision rows of the resources already deleted from OVN
+            # are deleted at once
+            ovn_get = self._resources_func_map[resource_type]['ovn_get']
+            deleted = {row.resource_uuid for row in rows
+                       if not ovn_get(row.resource_uuid)}
+            if deleted:
+                try:
+                    revision_numbers_db.delete_revisions(
+                        context, list(deleted), resource_type)
+                    rows = [row for row in rows
+                            if row.resource_uuid not in deleted]
+                except Exception:
+                    LOG.warning('Maintenance task: Failed to delete %d '
+                                'revision rows at once, deleting them one '
+                                'by one', len(deleted), exc_info=True)
+
+        failed = 0
+        for row in rows:
+            LOG.debug(_FIX_DBG_LOG_MSG,
+                      {'res_uuid': row.resource_uuid,
+                       'res_type': row.resource_type,
+                       'type_': INCONSISTENCY_TYPE_DELETE})
             try:
                 if row.resource_type == ovn_const.TYPE_SUBNETS:
-                    self._ovn_client.delete_subnet(admin_context,
+                    self._ovn_client.delete_subnet(context,
                                                    row.resource_uuid)
                 elif row.resource_type == ovn_const.TYPE_PORTS:
-                    self._ovn_client.delete_port(admin_context,
+                    self._ovn_client.delete_port(context,
                                                  row.resource_uuid)
                 else:
-                    self._fix_delete(admin_context, row)
+                    self._fix_delete(context, row)
             except Exception:
+                failed += 1
                 LOG.exception('Maintenance task: Failed to fix deleted '
                               'resource %(res_uuid)s (type: %(res_type)s)',
                               {'res_uuid': row.resource_uuid,
                                'res_type': row.resource_type})
+        return failed
+
+    def _group_inconsistencies(self, inconsistency_type, rows):
+        """Group the inconsistent rows by resource type
+
+        The groups keep the order of the rows, which is the order the
+        resource types must be fixed in. The rows of a group are sorted by
+        resource ID, starting after the resume marker of the group, if any.
+        """
+        groups = {}
+        for row in rows:
+            groups.setdefault(row.resource_type, []).append(row)
+        for resource_type, type_rows in groups.items():
+            type_rows.sort(key=lambda row: row.resource_uuid)
+            marker = self._resume_markers.get(
+                (inconsistency_type, resource_type))
+            if marker is not None:
+                index = bisect.bisect_right(
+                    [row.resource_uuid for row in type_rows], marker)
+                type_rows[:] = type_rows[index:] + type_rows[:index]
+        return groups.items()
+
+    def _fix_inconsistencies(self, inconsistency_type, rows, fix_batch,
+                             progress):
+        """Fix the inconsistencies of a resource type, by batches
+
+        The batches are fixed concurrently if [ovn]
+        inconsistencies_fix_workers is greater than one.
+        """
+        batch_size = ovn_conf.get_ovn_inconsistencies_batch_size()
+        batches = [rows[i:i + batch_size]
+                   for i in range(0, len(rows), batch_size)]
+
+        def _fix_batch(batch):
+            failed = fix_batch(batch)
+            progress.update(inconsistency_type, batch[0].resource_type,
+                            len(batch), failed)
+
+        workers = min(ovn_conf.get_ovn_inconsistencies_fix_workers(),
+                      len(batches))
+        if workers > 1:
+            with futurist.ThreadPoolExecutor(max_workers=workers) as executor:
+                # Wait for all the batches of this resource type before
+                # fixing the next one, that might depend on it
+                list(executor.map(_fix_batch, batches))
+        else:
+            for batch in batches:
+                _fix_batch(batch)
+
+    @has_lock_periodic(spacing=ovn_const.DB_CONSISTENCY_CHECK_INTERVAL,
+                       run_immediately=True)
+    def check_for_inconsistencies(self):
+        admin_context = n_context.get_admin_context()
+        create_update_inconsistencies = (
+            revision_numbers_db.get_inconsistent_resources(admin_context))
+        delete_inconsistencies = (
+            revision_numbers_db.get_deleted_resources(admin_context))
+        if not any([create_update_inconsistencies, delete_inconsistencies]):
+            LOG.debug('Maintenance task: No inconsistencies found. Skipping')
+            return
+
+        LOG.debug('Maintenance task: Synchronizing Neutron '
+                  'and OVN databases started')
+        self._log_maintenance_inconsistencies(create_update_inconsistencies,
+                                              delete_inconsistencies)
+        self._sync_timer.restart()
+
+        total = (len(create_update_inconsistencies) +
+                 len(delete_inconsistencies))
+        max_per_run = ovn_conf.get_ovn_inconsistencies_max_per_run()
+        left = min(total, max_per_run) if max_per_run else total
+        progress = _FixProgress(left)
+        for inconsistency_type, rows, fix_batch in (
+                (INCONSISTENCY_TYPE_CREATE_UPDATE,
+                 create_update_inconsistencies,
+                 self._fix_create_update_batch),
+                (INCONSISTENCY_TYPE_DELETE, delete_inconsistencies,
+                 self._fix_delete_batch)):
+            for resource_type, type_rows in self._group_inconsistencies(
+                    inconsistency_type, rows):
+                if not left:
+                    break
+                marker_key = (inconsistency_type, resource_type)
+                if len(type_rows) > left:
+                    # Resume from here in the next run
+                    type_rows = type_rows[:left]
+                    self._resume_markers[marker_key] = (
+                        type_rows[-1].resource_uuid)
+                else:
+                    self._resume_markers.pop(marker_key, None)
+                self._fix_inconsistencies(inconsistency_type, type_rows,
+                                          fix_batch, progress)
+                left -= len(type_rows)
 
         self._sync_timer.stop()
+        if progress.total < total:
+            LOG.info('Maintenance task: Reached the maximum number of '
+                     'inconsistencies fixed per run, %d left for the next '
+                     'runs', total - progress.total)
         LOG.info('Maintenance task: Synchronization completed '
-                 '(took %.2f seconds)', self._sync_timer.elapsed())
+                 '(took %.2f seconds, %d of %d inconsistencies fixed)',
+                 self._sync_timer.elapsed(),
+                 progress.processed - progress.failed, progress.processed)
 
     def _create_lrouter_port(self, context, port):
         router_id = port['device_id']
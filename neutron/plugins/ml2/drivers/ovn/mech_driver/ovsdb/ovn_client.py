@@ -379,7 +379,12 @@ class OVNClient:
                 (6, 3, 0))
         return self._is_mcast_flood_broken
 
-    def _get_port_options(self, context, port):
+    def _get_port_options(self, context, port, subnets_cache=None):
+        """Return the OvnPortInfo of a port
+
+        subnets_cache is an optional dict of the subnets, by ID, of a batch
+        of ports, used instead of fetching the subnets of each port.
+        """
         admin_context = context.elevated()
         bp_info = utils.validate_and_get_data_from_binding_profile(port)
         vtep_physical_switch = bp_info.bp_param.get('vtep-physical-switch')
@@ -413,9 +418,14 @@ class OVNClient:
                 for ip in port_fixed_ips
                 if 'subnet_id' in ip
             ]
-            subnets = self._plugin.get_subnets(admin_context,
-                                               filters={'id': subnet_ids})
-            subnets_by_id = {subnet['id']: subnet for subnet in subnets}
+            if subnets_cache is None:
+                subnets = self._plugin.get_subnets(admin_context,
+                                                   filters={'id': subnet_ids})
+                subnets_by_id = {subnet['id']: subnet for subnet in subnets}
+            else:
+                subnets_by_id = {subnet_id: subnets_cache[subnet_id]
+                                 for subnet_id in subnet_ids
+                                 if subnet_id in subnets_cache}
             address4_scope_id, address6_scope_id = (
                 utils.get_subnets_address_scopes(admin_context, subnets_by_id,
                                                  port_fixed_ips,
@@ -550,8 +560,9 @@ class OVNClient:
 
         return (dhcpv4_options, dhcpv6_options)
 
-    def get_external_ids_from_port(self, context, port):
-        port_info = self._get_port_options(context, port)
+    def get_external_ids_from_port(self, context, port, subnets_cache=None):
+        port_info = self._get_port_options(context, port,
+                                           subnets_cache=subnets_cache)
         external_ids = {
             ovn_const.OVN_PORT_NAME_EXT_ID_KEY: port['name'],
             ovn_const.OVN_DEVID_EXT_ID_KEY: port['device_id'],
@@ -574,14 +585,7 @@ class OVNClient:
         }
         return port_info, external_ids
 
-    def create_port(self, context, port):
-        if utils.is_lsp_ignored(port):
-            return
-
-        port_info, external_ids = self.get_external_ids_from_port(
-            context, port)
-        lswitch_name = utils.ovn_name(port['network_id'])
-
+    def _check_lswitch_exists(self, network_id):
         # It's possible to have a network created on one controller and then a
         # port created on a different controller quickly enough that the second
         # controller does not yet see that network in its local cache of the
@@ -591,75 +595,138 @@ class OVNClient:
         # persist_uuid support, this can be removed.
         if not utils.ovs_persist_uuid_supported(self._nb_idl):
             self._nb_idl.check_for_row_by_value_and_retry(
-                'Logical_Switch', 'name', lswitch_name)
+                'Logical_Switch', 'name', utils.ovn_name(network_id))
 
-        with self._nb_idl.transaction(check_error=True) as txn:
-            dhcpv4_options, dhcpv6_options = self.update_port_dhcp_options(
-                port_info, txn=txn)
-            # The lport_name *must* be neutron port['id'].  It must match the
-            # iface-id set in the Interfaces table of the Open_vSwitch
-            # database which nova sets to be the port ID.
-
-            kwargs = {
-                'lport_name': port['id'],
-                'lswitch_name': lswitch_name,
-                'network_id': port['network_id'],
-                'addresses': port_info.addresses,
-                'external_ids': external_ids,
-                'parent_name': port_info.parent_name,
-                'tag': port_info.tag,
-                'enabled': port.get('admin_state_up'),
-                'options': port_info.options,
-                'type': port_info.type,
-                'port_security': port_info.port_security,
-                'dhcpv4_options': dhcpv4_options,
-                'dhcpv6_options': dhcpv6_options
-            }
+    def _add_create_lswitch_port(self, context, txn, port, port_info,
+                                 external_ids):
+        """Add the creation of the Logical_Switch_Port of a port to txn
 
-            if port_info.type == ovn_const.LSP_TYPE_EXTERNAL:
-                kwargs['ha_chassis_group'], _ = (
-                    utils.sync_ha_chassis_group_network(
-                        context, self._nb_idl, self._sb_idl, port['id'],
-                        port['network_id'], txn))
+        Returns the command creating the Logical_Switch_Port. Adding the
+        port to its Port Groups is left to the caller.
+        """
+        dhcpv4_options, dhcpv6_options = self.update_port_dhcp_options(
+            port_info, txn=txn)
+        # The lport_name *must* be neutron port['id'].  It must match the
+        # iface-id set in the Interfaces table of the Open_vSwitch
+        # database which nova sets to be the port ID.
+
+        kwargs = {
+            'lport_name': port['id'],
+            'lswitch_name': utils.ovn_name(port['network_id']),
+            'network_id': port['network_id'],
+            'addresses': port_info.addresses,
+            'external_ids': external_ids,
+            'parent_name': port_info.parent_name,
+            'tag': port_info.tag,
+            'enabled': port.get('admin_state_up'),
+            'options': port_info.options,
+            'type': port_info.type,
+            'port_security': port_info.port_security,
+            'dhcpv4_options': dhcpv4_options,
+            'dhcpv6_options': dhcpv6_options
+        }
 
-            # NOTE(mjozefcz): Do not set addresses if the port is not
-            # bound, has no device_owner and it is OVN LB VIP port.
-            # For more details check related bug #1789686.
-            if (port.get('name').startswith(ovn_const.LB_VIP_PORT_PREFIX) and
-                    not port.get('device_owner') and
-                    port.get(portbindings.VIF_TYPE) ==
-                    portbindings.VIF_TYPE_UNBOUND):
-                kwargs['addresses'] = []
-
-            # Check if the parent port was created with the
-            # allowed_address_pairs already set
-            allowed_address_pairs = port.get('allowed_address_pairs', [])
-            if (allowed_address_pairs and
-                    port_info.type != ovn_const.LSP_TYPE_VIRTUAL):
-                addrs = [addr['ip_address'] for addr in allowed_address_pairs]
-                self._set_unset_virtual_port_type(context, txn, port, addrs)
-
-            port_cmd = txn.add(self._nb_idl.create_lswitch_port(
-                **kwargs))
-
-            sg_ids = utils.get_lsp_security_groups(port)
-            # If this is not a trusted port and port security is enabled,
-            # add it to the default drop Port Group so that all traffic
-            # is dropped by default.
-            if not utils.is_lsp_trusted(port) and port_info.port_security:
-                self._add_port_to_drop_port_group(port_cmd, txn)
-            # Just add the port to its Port Group.
-            for sg in sg_ids:
-                txn.add(self._nb_idl.pg_add_ports(
-                    utils.ovn_port_group_name(sg), port_cmd))
+        if port_info.type == ovn_const.LSP_TYPE_EXTERNAL:
+            kwargs['ha_chassis_group'], _ = (
+                utils.sync_ha_chassis_group_network(
+                    context, self._nb_idl, self._sb_idl, port['id'],
+                    port['network_id'], txn))
+
+        # NOTE(mjozefcz): Do not set addresses if the port is not
+        # bound, has no device_owner and it is OVN LB VIP port.
+        # For more details check related bug #1789686.
+        if (port.get('name').startswith(ovn_const.LB_VIP_PORT_PREFIX) and
+                not port.get('device_owner') and
+                port.get(portbindings.VIF_TYPE) ==
+                portbindings.VIF_TYPE_UNBOUND):
+            kwargs['addresses'] = []
+
+        # Check if the parent port was created with the
+        # allowed_address_pairs already set
+        allowed_address_pairs = port.get('allowed_address_pairs', [])
+        if (allowed_address_pairs and
+                port_info.type != ovn_const.LSP_TYPE_VIRTUAL):
+            addrs = [addr['ip_address'] for addr in allowed_address_pairs]
+            self._set_unset_virtual_port_type(context, txn, port, addrs)
+
+        return txn.add(self._nb_idl.create_lswitch_port(**kwargs))
+
+    @staticmethod
+    def _get_lsp_port_group_names(port, port_info):
+        pg_names = []
+        # If this is not a trusted port and port security is enabled,
+        # add it to the default drop Port Group so that all traffic
+        # is dropped by default.
+        if not utils.is_lsp_trusted(port) and port_info.port_security:
+            pg_names.append(ovn_const.OVN_DROP_PORT_GROUP_NAME)
+        # Just add the port to its Port Group.
+        pg_names.extend(utils.ovn_port_group_name(sg)
+                        for sg in utils.get_lsp_security_groups(port))
+        return pg_names
+
+    def _add_create_port_extras(self, context, txn, port, port_cmd):
+        if self.is_dns_required_for_port(port):
+            self.add_txns_to_sync_port_dns_records(txn, port)
+
+        self._qos_driver.create_port(context, txn, port, port_cmd)
 
-            if self.is_dns_required_for_port(port):
-                self.add_txns_to_sync_port_dns_records(txn, port)
+    def create_port(self, context, port):
+        if utils.is_lsp_ignored(port):
+            return
 
-            self._qos_driver.create_port(context, txn, port, port_cmd)
+        port_info, external_ids = self.get_external_ids_from_port(
+            context, port)
+        self._check_lswitch_exists(port['network_id'])
+
+        with self._nb_idl.transaction(check_error=True) as txn:
+            port_cmd = self._add_create_lswitch_port(
+                context, txn, port, port_info, external_ids)
+            for pg_name in self._get_lsp_port_group_names(port, port_info):
+                txn.add(self._nb_idl.pg_add_ports(pg_name, port_cmd))
+            self._add_create_port_extras(context, txn, port, port_cmd)
 
         db_rev.bump_revision(context, port, ovn_const.TYPE_PORTS)
 
+    def create_ports(self, context, ports):
+        """Create the Logical_Switch_Ports of a batch of ports
+
+        The bulk version of create_port: the subnets of the ports are
+        fetched at once, all the Logical_Switch_Ports are created in a single
+        OVN NB transaction, with a single command per Port Group adding all
+        its new ports, and the revision numbers are bumped at once.
+        """
+        ports = [port for port in ports if not utils.is_lsp_ignored(port)]
+        if not ports:
+            return
+
+        subnet_ids = {ip['subnet_id'] for port in ports
+                      for ip in port.get('fixed_ips', [])
+                      if 'subnet_id' in ip}
+        subnets_cache = {}
+        if subnet_ids:
+            subnets_cache = {
+                subnet['id']: subnet for subnet in self._plugin.get_subnets(
+                    context.elevated(), filters={'id': list(subnet_ids)})}
+        ports_info = [self.get_external_ids_from_port(
+            context, port, subnets_cache=subnets_cache) for port in ports]
+        for network_id in {port['network_id'] for port in ports}:
+            self._check_lswitch_exists(network_id)
+
+        pg_ports = collections.defaultdict(list)
+        with self._nb_idl.transaction(check_error=True) as txn:
+            for port, (port_info, external_ids) in zip(ports, ports_info):
+                port_cmd = self._add_create_lswitch_port(
+                    context, txn, port, port_info, external_ids)
+                for pg_name in self._get_lsp_port_group_names(port,
+                                                              port_info):
+                    pg_ports[pg_name].append(port_cmd)
+                self._add_create_port_extras(context, txn, port, port_cmd)
+            for pg_name, port_cmds in pg_ports.items():
+                txn.add(self._nb_idl.pg_add_ports(pg_name, port_cmds))
+
+        db_rev.bump_revisions(
+            context, [(port, ovn_const.TYPE_PORTS) for port in ports])
+
     def _set_unset_virtual_port_type(self, context, txn, parent_port,
                                      addresses, unset=False):
         cmd = self._nb_idl.set_lswitch_port_to_virtual_type
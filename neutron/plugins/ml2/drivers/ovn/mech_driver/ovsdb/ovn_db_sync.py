@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
 from datetime import datetime
 
 from neutron_lib.api.definitions import segment as segment_def
@@ -24,12 +25,14 @@ from neutron_lib.plugins import directory
 from neutron_lib.utils import helpers
 from oslo_log import log
 from oslo_utils import strutils
+from oslo_utils import timeutils
 from ovsdbapp.backend.ovs_idl import idlutils
 
 from neutron.common.ovn import acl as acl_utils
 from neutron.common.ovn import constants as ovn_const
 from neutron.common.ovn import utils
 from neutron.conf.plugins.ml2.drivers.ovn import ovn_conf
+from neutron.db import models_v2
 from neutron import manager
 from neutron.objects.port_forwarding import PortForwarding
 from neutron.plugins.ml2.drivers.ovn.agent import neutron_agent
@@ -997,9 +1000,12 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
 
     def _sync_port_dhcp_options(self, ports_need_sync_dhcp_opts,
                                 ovn_port_dhcpv4_opts, ovn_port_dhcpv6_opts):
-        LOG.debug('OVN-NB Sync DHCP options for Neutron ports with extra '
-                  'dhcp options assigned started')
+        """Sync the DHCP options of a page of ports found in OVN NB DB
 
+        The port DHCP options set are popped from ``ovn_port_dhcpv4_opts``
+        and ``ovn_port_dhcpv6_opts``, so that the ones left once all the
+        ports have been synced are deleted by _delete_port_dhcp_options.
+        """
         txn_commands = []
         lsp_dhcp_key = {constants.IP_VERSION_4: 'dhcpv4_options',
                         constants.IP_VERSION_6: 'dhcpv6_options'}
@@ -1035,6 +1041,19 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
                     txn_commands.append(self.ovn_nb_api.set_lswitch_port(
                         lport_name=port['id'], **set_lsp))
 
+        if txn_commands:
+            with self.ovn_nb_api.transaction(check_error=True) as txn:
+                for cmd in txn_commands:
+                    txn.add(cmd)
+
+    def _delete_port_dhcp_options(self, ovn_port_dhcpv4_opts,
+                                  ovn_port_dhcpv6_opts):
+        LOG.debug('OVN-NB Sync stale DHCP options of Neutron ports '
+                  'started')
+
+        txn_commands = []
+        ovn_port_dhcp_opts = {constants.IP_VERSION_4: ovn_port_dhcpv4_opts,
+                              constants.IP_VERSION_6: ovn_port_dhcpv6_opts}
         for ip_v in [constants.IP_VERSION_4, constants.IP_VERSION_6]:
             for port_id, dhcp_opt in ovn_port_dhcp_opts[ip_v].items():
                 LOG.warning(
@@ -1052,21 +1071,27 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
                     txn_commands.append(self.ovn_nb_api.delete_dhcp_options(
                         dhcp_opt['uuid']))
 
-        if txn_commands:
+        batch_size = ovn_conf.get_ovn_neutron_sync_batch_size()
+        for index in range(0, len(txn_commands), batch_size):
             with self.ovn_nb_api.transaction(check_error=True) as txn:
-                for cmd in txn_commands:
+                for cmd in txn_commands[index:index + batch_size]:
                     txn.add(cmd)
-        LOG.debug('OVN-NB Sync DHCP options for Neutron ports with extra '
-                  'dhcp options assigned completed')
+        LOG.debug('OVN-NB Sync stale DHCP options of Neutron ports '
+                  'completed')
 
-    def _sync_metadata_ports(self, ctx, db_ports):
+    def _sync_metadata_ports(self, ctx, ovn_ports):
         """Ensure metadata ports in all Neutron networks.
 
         This method will ensure that all networks have one and only one
-        metadata port.
+        metadata port. ``ovn_ports`` are the name and Logical_Switch of the
+        Logical_Switch_Ports of the Neutron networks, sorted by name.
+
+        Returns the IDs of the metadata ports created or deleted, that the
+        sync of the other ports must skip.
         """
+        synced_port_ids = set()
         if not ovn_conf.is_ovn_metadata_enabled():
-            return
+            return synced_port_ids
         LOG.debug('OVN-NB Sync metadata ports started')
         for net in self.core_plugin.get_networks(ctx):
             metadata_ports = self.core_plugin.get_ports(
@@ -1083,7 +1108,10 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
                         LOG.warning('Creating missing metadata port in '
                                     'Neutron and OVN NB DB for network %s',
                                     net['id'])
-                        self._ovn_client.create_metadata_port(ctx, net)
+                        metadata_port = self._ovn_client.create_metadata_port(
+                            ctx, net)
+                        if metadata_port:
+                            synced_port_ids.add(metadata_port['id'])
                     except n_exc.IpAddressGenerationFailure:
                         LOG.error('Could not allocate IP address for '
                                   'metadata port in network %s', net['id'])
@@ -1098,9 +1126,9 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
                         LOG.warning('Deleting unnecessary DHCP port %s for '
                                     'network %s', port['id'], net['id'])
                         self.core_plugin.delete_port(ctx, port['id'])
-                    db_ports.pop(port['id'], None)
+                    synced_port_ids.add(port['id'])
                 port = metadata_ports[0]
-                if port['id'] in db_ports.keys():
+                if not self._is_lsp_in_ovn(ovn_ports, port['id']):
                     LOG.warning('Metadata port %s for network %s found in '
                                 'Neutron but not in OVN NB DB',
                                 port['id'], net['id'])
@@ -1109,7 +1137,7 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
                                     '%s in OVN NB DB',
                                     port['id'], net['id'])
                         self._create_port_in_ovn(ctx, port)
-                    db_ports.pop(port['id'])
+                    synced_port_ids.add(port['id'])
 
             if self.mode == n_lib_ovn_const.OVN_DB_SYNC_MODE_REPAIR:
                 try:
@@ -1120,6 +1148,189 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
                     LOG.error('Could not allocate IP address for '
                               'metadata port in network %s', net['id'])
         LOG.debug('OVN-NB Sync metadata ports completed')
+        return synced_port_ids
+
+    @staticmethod
+    def _is_lsp_in_ovn(ovn_ports, port_id):
+        index = bisect.bisect_left(ovn_ports, (port_id,))
+        return index < len(ovn_ports) and ovn_ports[index][0] == port_id
+
+    @staticmethod
+    def _get_next_port_ids(ctx, last_id, limit):
+        """Returns the IDs of the ``limit`` ports following ``last_id``
+
+        The ports are paged on their ID rather than with a marker port, so
+        that a port deleted while the ports are walked does not stop the
+        walk.
+        """
+        with db_api.CONTEXT_READER.using(ctx):
+            query = ctx.session.query(models_v2.Port.id)
+            if last_id is not None:
+                query = query.filter(models_v2.Port.id > last_id)
+            query = query.order_by(models_v2.Port.id).limit(limit)
+            return [port_id for port_id, in query]
+
+    def _get_ports_by_pages(self, ctx, page_size):
+        """Yields the Neutron ports by pages of ``page_size`` ports
+
+        The ports are sorted by ID, so that they can be merge-joined with
+        the Logical_Switch_Ports sorted by name.
+        """
+        last_id = None
+        while True:
+            port_ids = self._get_next_port_ids(ctx, last_id, page_size)
+            if not port_ids:
+                return
+            # The ports deleted since their ID was read are not returned
+            ports = self.core_plugin.get_ports(
+                ctx, filters={'id': port_ids}, sorts=[('id', True)])
+            if ports:
+                yield ports
+            if len(port_ids) < page_size:
+                return
+            last_id = port_ids[-1]
+
+    def _create_ports_in_ovn(self, ctx, ports, ovn_all_dhcp_options):
+        for port in ports:
+            LOG.warning("Port found in Neutron but not in OVN NB "
+                        "DB, port_id=%s", port['id'])
+        if not ports or self.mode != n_lib_ovn_const.OVN_DB_SYNC_MODE_REPAIR:
+            return
+
+        for port in ports:
+            LOG.warning('Creating the port %s in OVN NB DB', port['id'])
+        try:
+            # Remove any old ACLs for the ports to avoid creating duplicate
+            # ACLs.
+            with self.ovn_nb_api.transaction(check_error=True) as txn:
+                for port in ports:
+                    txn.add(self.ovn_nb_api.delete_acl(
+                        utils.ovn_name(port['network_id']), port['id']))
+            self._ovn_client.create_ports(ctx, ports)
+            created_ports = ports
+        except Exception as e:
+            LOG.warning('Create ports in OVN NB DB failed, creating them one '
+                        'by one: %s', e)
+            created_ports = []
+            for port in ports:
+                try:
+                    self._create_port_in_ovn(ctx, port)
+                    created_ports.append(port)
+                except RuntimeError:
+                    LOG.warning("Create port in OVN NB DB failed for"
+                                " port %s", port['id'])
+
+        for port in created_ports:
+            if port['id'] in ovn_all_dhcp_options['ports_v4']:
+                __, lsp_opts = utils.get_lsp_dhcp_opts(
+                    port, constants.IP_VERSION_4)
+                if lsp_opts:
+                    ovn_all_dhcp_options['ports_v4'].pop(port['id'])
+            if port['id'] in ovn_all_dhcp_options['ports_v6']:
+                __, lsp_opts = utils.get_lsp_dhcp_opts(
+                    port, constants.IP_VERSION_6)
+                if lsp_opts:
+                    ovn_all_dhcp_options['ports_v6'].pop(port['id'])
+
+    def _delete_lports_from_ovn(self, del_lports_list, ovn_all_dhcp_options):
+        for lport, lswitch in del_lports_list:
+            LOG.warning("Port found in OVN NB DB but not in "
+                        "Neutron, port_id=%s", lport)
+        if (not del_lports_list or
+                self.mode != n_lib_ovn_const.OVN_DB_SYNC_MODE_REPAIR):
+            return
+
+        with self.ovn_nb_api.transaction(check_error=True) as txn:
+            for lport, lswitch in del_lports_list:
+                LOG.warning('Deleting port %s from OVN NB DB', lport)
+                txn.add(self.ovn_nb_api.delete_lswitch_port(
+                    lport_name=lport, lswitch_name=lswitch))
+                if lport in ovn_all_dhcp_options['ports_v4']:
+                    LOG.warning('Deleting port DHCPv4 options for '
+                                '(port %s)', lport)
+                    txn.add(self.ovn_nb_api.delete_dhcp_options(
+                        ovn_all_dhcp_options['ports_v4'].pop(lport)['uuid']))
+                if lport in ovn_all_dhcp_options['ports_v6']:
+                    LOG.warning('Deleting port DHCPv6 options for '
+                                '(port %s)', lport)
+                    txn.add(self.ovn_nb_api.delete_dhcp_options(
+                        ovn_all_dhcp_options['ports_v6'].pop(lport)['uuid']))
+
+    def _sync_ports(self, ctx, ovn_ports, synced_port_ids,
+                    ovn_all_dhcp_options):
+        """Sync the Neutron ports with the Logical_Switch_Ports
+
+        The Neutron ports are walked by pages, sorted by ID, and merge-joined
+        with ``ovn_ports``, the names and Logical_Switch of the
+        Logical_Switch_Ports of the Neutron networks sorted by name, so that
+        only a page of ports is loaded at once. The missing ports of a page
+        are created, and the stale Logical_Switch_Ports deleted, in OVN NB
+        transactions of at most [ovn] neutron_sync_batch_size ports.
+
+        The ports in ``synced_port_ids`` have already been synced, by the
+        metadata port sync, and are skipped.
+        """
+        batch_size = ovn_conf.get_ovn_neutron_sync_batch_size()
+        total = self.core_plugin.get_ports_count(ctx)
+        processed = 0
+        timer = timeutils.StopWatch().start()
+        index = 0
+        del_lports_list = []
+
+        def _add_stale_lports(port_id=None):
+            nonlocal index
+            # The Logical_Switch_Ports sorted before the port_id, or all the
+            # remaining ones, are not in Neutron.
+            while index < len(ovn_ports) and (
+                    port_id is None or ovn_ports[index][0] < port_id):
+                if ovn_ports[index][0] not in synced_port_ids:
+                    del_lports_list.append(ovn_ports[index])
+                    if len(del_lports_list) >= batch_size:
+                        self._delete_lports_from_ovn(del_lports_list,
+                                                     ovn_all_dhcp_options)
+                        del_lports_list.clear()
+                index += 1
+
+        for ports in self._get_ports_by_pages(ctx, batch_size):
+            add_ports_list = []
+            ports_need_sync_dhcp_opts = []
+            for port in ports:
+                # Ignore the floating ip ports with device_owner set to
+                # constants.DEVICE_OWNER_FLOATINGIP
+                if utils.is_lsp_ignored(port):
+                    continue
+                _add_stale_lports(port['id'])
+                if (index < len(ovn_ports) and
+                        ovn_ports[index][0] == port['id']):
+                    index += 1
+                    if not utils.is_network_device_port(port):
+                        ports_need_sync_dhcp_opts.append(port)
+                elif port['id'] not in synced_port_ids:
+                    add_ports_list.append(port)
+
+            # ovn_ports is a snapshot taken before the walk: skip the ports
+            # whose Logical_Switch_Port has been created since.
+            add_ports_list = [
+                port for port in add_ports_list
+                if self.ovn_nb_api.lookup('Logical_Switch_Port', port['id'],
+                                          default=None) is None]
+            self._create_ports_in_ovn(ctx, add_ports_list,
+                                      ovn_all_dhcp_options)
+            self._sync_port_dhcp_options(ports_need_sync_dhcp_opts,
+                                         ovn_all_dhcp_options['ports_v4'],
+                                         ovn_all_dhcp_options['ports_v6'])
+
+            processed += len(ports)
+            elapsed = timer.elapsed()
+            rate = processed / elapsed if elapsed else 0.0
+            eta = max(total - processed, 0) / rate if rate else 0.0
+            LOG.info('OVN-NB Sync ports: processed %(processed)d of '
+                     '%(total)d ports, %(rate).1f per second, ETA %(eta).0f '
+                     'seconds', {'processed': processed, 'total': total,
+                                 'rate': rate, 'eta': eta})
+
+        _add_stale_lports()
+        self._delete_lports_from_ovn(del_lports_list, ovn_all_dhcp_options)
 
     def sync_networks_ports_and_dhcp_opts(self, ctx):
         LOG.debug('OVN-NB Sync networks, ports and DHCP options started @ %s',
@@ -1128,31 +1339,21 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
         for net in self.core_plugin.get_networks(ctx):
             db_networks[utils.ovn_name(net['id'])] = net
 
-        # Ignore the floating ip ports with device_owner set to
-        # constants.DEVICE_OWNER_FLOATINGIP
-        db_ports = {port['id']: port for port in
-                    self.core_plugin.get_ports(ctx) if not
-                    utils.is_lsp_ignored(port)}
-
         ovn_all_dhcp_options = self.ovn_nb_api.get_all_dhcp_options()
         db_network_cache = dict(db_networks)
 
-        ports_need_sync_dhcp_opts = []
+        # The name and Logical_Switch of the Logical_Switch_Ports of the
+        # Neutron networks, sorted by name to be merge-joined with the
+        # Neutron ports.
+        ovn_ports = []
         lswitches = self.ovn_nb_api.get_all_logical_switches_with_ports()
         del_lswitchs_list = []
-        del_lports_list = []
         add_provnet_ports_list = []
         del_provnet_ports_list = []
         for lswitch in lswitches:
             if lswitch['name'] in db_networks:
-                for lport in lswitch['ports']:
-                    if lport in db_ports:
-                        port = db_ports.pop(lport)
-                        if not utils.is_network_device_port(port):
-                            ports_need_sync_dhcp_opts.append(port)
-                    else:
-                        del_lports_list.append({'port': lport,
-                                                'lswitch': lswitch['name']})
+                ovn_ports.extend((lport, lswitch['name'])
+                                 for lport in lswitch['ports'])
                 db_network = db_networks[lswitch['name']]
                 db_segments = self.segments_plugin.get_segments(
                     ctx, filters={'network_id': [db_network['id']],
@@ -1199,32 +1400,15 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
                                 "implicit port creation while creating "
                                 "network %s", network['id'])
 
-        self._sync_metadata_ports(ctx, db_ports)
+        del lswitches
+        ovn_ports.sort()
+        synced_port_ids = self._sync_metadata_ports(ctx, ovn_ports)
 
         self._sync_subnet_dhcp_options(
             ctx, db_network_cache, ovn_all_dhcp_options['subnets'])
 
-        for port_id, port in db_ports.items():
-            LOG.warning("Port found in Neutron but not in OVN NB "
-                        "DB, port_id=%s", port['id'])
-            if self.mode == n_lib_ovn_const.OVN_DB_SYNC_MODE_REPAIR:
-                try:
-                    LOG.warning('Creating the port %s in OVN NB DB',
-                                port['id'])
-                    self._create_port_in_ovn(ctx, port)
-                    if port_id in ovn_all_dhcp_options['ports_v4']:
-                        __, lsp_opts = utils.get_lsp_dhcp_opts(
-                            port, constants.IP_VERSION_4)
-                        if lsp_opts:
-                            ovn_all_dhcp_options['ports_v4'].pop(port_id)
-                    if port_id in ovn_all_dhcp_options['ports_v6']:
-                        __, lsp_opts = utils.get_lsp_dhcp_opts(
-                            port, constants.IP_VERSION_6)
-                        if lsp_opts:
-                            ovn_all_dhcp_options['ports_v6'].pop(port_id)
-                except RuntimeError:
-                    LOG.warning("Create port in OVN NB DB failed for"
-                                " port %s", port['id'])
+        self._sync_ports(ctx, ovn_ports, synced_port_ids,
+                         ovn_all_dhcp_options)
 
         with self.ovn_nb_api.transaction(check_error=True) as txn:
             for lswitch in del_lswitchs_list:
@@ -1266,31 +1450,8 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
                         lport_name=lport,
                         lswitch_name=lswitch))
 
-            for lport_info in del_lports_list:
-                LOG.warning("Port found in OVN NB DB but not in "
-                            "Neutron, port_id=%s", lport_info['port'])
-                if self.mode == n_lib_ovn_const.OVN_DB_SYNC_MODE_REPAIR:
-                    LOG.warning('Deleting port %s from OVN NB DB',
-                                lport_info['port'])
-                    txn.add(self.ovn_nb_api.delete_lswitch_port(
-                        lport_name=lport_info['port'],
-                        lswitch_name=lport_info['lswitch']))
-                    if lport_info['port'] in ovn_all_dhcp_options['ports_v4']:
-                        LOG.warning('Deleting port DHCPv4 options for '
-                                    '(port %s)', lport_info['port'])
-                        txn.add(self.ovn_nb_api.delete_dhcp_options(
-                            ovn_all_dhcp_options['ports_v4'].pop(
-                                lport_info['port'])['uuid']))
-                    if lport_info['port'] in ovn_all_dhcp_options['ports_v6']:
-                        LOG.warning('Deleting port DHCPv6 options for '
-                                    '(port %s)', lport_info['port'])
-                        txn.add(self.ovn_nb_api.delete_dhcp_options(
-                            ovn_all_dhcp_options['ports_v6'].pop(
-                                lport_info['port'])['uuid']))
-
-        self._sync_port_dhcp_options(ports_need_sync_dhcp_opts,
-                                     ovn_all_dhcp_options['ports_v4'],
-                                     ovn_all_dhcp_options['ports_v6'])
+        self._delete_port_dhcp_options(ovn_all_dhcp_options['ports_v4'],
+                                       ovn_all_dhcp_options['ports_v6'])
         LOG.debug('OVN-NB Sync networks, ports and DHCP options completed @ '
                   '%s', str(datetime.now()))
 
@@ -1299,15 +1460,17 @@ class OvnNbSynchronizer(db_sync_base.BaseOvnDbSynchronizer):
             return
         LOG.debug('OVN-NB Sync port DNS records started @ %s',
                   str(datetime.now()))
-        # Ignore the floating ip ports with device_owner set to
-        # constants.DEVICE_OWNER_FLOATINGIP
-        db_ports = [port for port in
-                    self.core_plugin.get_ports(ctx) if not
-                    port.get('device_owner', '').startswith(
-                        constants.DEVICE_OWNER_FLOATINGIP)]
         dns_records = {}
-        for port in db_ports:
-            if self._ovn_client.is_dns_required_for_port(port):
+        for ports in self._get_ports_by_pages(
+                ctx, ovn_conf.get_ovn_neutron_sync_batch_size()):
+            for port in ports:
+                # Ignore the floating ip ports with device_owner set to
+                # constants.DEVICE_OWNER_FLOATINGIP
+                if port.get('device_owner', '').startswith(
+                        constants.DEVICE_OWNER_FLOATINGIP):
+                    continue
+                if not self._ovn_client.is_dns_required_for_port(port):
+                    continue
                 port_dns_records = self._ovn_client.get_port_dns_records(port)
                 if port['network_id'] not in dns_records:
                     dns_records[port['network_id']] = {}
@@ -0,0 +1,141 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from oslo_log import log
+from ovsdbapp.backend.ovs_idl import transaction as idl_trans
+from ovsdbapp import exceptions as ovsdbapp_exc
+
+
+LOG = log.getLogger(__name__)
+
+
+class _Batch:
+    """The transactions committed together in one NB transaction"""
+
+    def __init__(self):
+        self.transactions = []
+        self.num_commands = 0
+        # Set when the batch is full and must be committed without waiting
+        # for the end of the coalescing window.
+        self.full = threading.Event()
+        # Set when the batch has been committed, or has failed.
+        self.done = threading.Event()
+        self.results = {}
+        # Whether each caller must commit its own transaction
+        self.commit_one_by_one = False
+        # The error raised to every caller
+        self.error = None
+
+    def add(self, txn):
+        self.transactions.append(txn)
+        self.num_commands += len(txn.commands)
+
+
+class TransactionCoalescer:
+    """Group commit of the NB transactions of concurrent callers
+
+    The first transaction committed opens a batch and its caller (the
+    leader) waits for the coalescing window, or for the batch to reach the
+    maximum number of commands. The transactions committed by the other
+    threads of the worker in the meantime join the batch. The leader then
+    commits the commands of all the transactions of the batch, in order, in a
+    single NB transaction, and each caller gets the results of its own
+    commands.
+
+    If the NB transaction fails, for instance because the command of one of
+    the callers raises an error, every caller commits its own transaction
+    again on its own, so that it gets its own result or error. A timeout is
+    raised to every caller instead, as the NB transaction might still be
+    committed.
+    """
+
+    def __init__(self, api, window, max_commands):
+        self._api = api
+        # Maximum time, in seconds, the leader waits for other transactions
+        self._window = window
+        self._max_commands = max_commands
+        self._lock = threading.Lock()
+        self._batch = None
+
+    def commit(self, txn):
+        """Commits an OvnNbTransaction, possibly with other transactions
+
+        Returns the results of the commands of the transaction, as
+        ``Transaction.commit`` does.
+        """
+        if not txn.commands:
+            return txn.commit_uncoalesced()
+
+        with self._lock:
+            batch = self._batch
+            is_leader = batch is None
+            if is_leader:
+                batch = self._batch = _Batch()
+            batch.add(txn)
+            if batch.num_commands >= self._max_commands:
+                self._batch = None
+                batch.full.set()
+
+        if is_leader:
+            batch.full.wait(self._window)
+            with self._lock:
+                if self._batch is batch:
+                    self._batch = None
+            self._commit_batch(batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        if batch.commit_one_by_one:
+            return txn.commit_uncoalesced()
+        return batch.results[txn]
+
+    def _commit_batch(self, batch):
+        try:
+            if len(batch.transactions) == 1:
+                # Nothing to coalesce
+                batch.commit_one_by_one = True
+                return
+            merged = idl_trans.Transaction(
+                self._api, self._api.ovsdb_connection,
+                max(txn.timeout for txn in batch.transactions),
+                check_error=True, log_errors=False)
+            for txn in batch.transactions:
+                merged.commands.extend(txn.commands)
+            try:
+                results = merged.commit()
+            except ovsdbapp_exc.TimeoutException as e:
+                batch.error = e
+                return
+            except Exception as e:
+                LOG.debug('Coalesced NB transaction of %(txns)d transactions '
+                          'failed, committing them one by one: %(error)s',
+                          {'txns': len(batch.transactions), 'error': e})
+                batch.commit_one_by_one = True
+                return
+            if results is None:
+                # The transaction was aborted without raising an error
+                batch.commit_one_by_one = True
+                return
+            LOG.debug('Committed %(txns)d transactions (%(cmds)d commands) '
+                      'in one NB transaction',
+                      {'txns': len(batch.transactions),
+                       'cmds': batch.num_commands})
+            index = 0
+            for txn in batch.transactions:
+                batch.results[txn] = results[index:index + len(txn.commands)]
+                index += len(txn.commands)
+        finally:
+            batch.done.set()
@@ -738,6 +738,39 @@ class MechanismManager(stevedore.named.NamedExtensionManager):
         """
         self._call_on_drivers("create_port_postcommit", context)
 
+    def create_port_bulk_postcommit(self, contexts):
+        """Notify all mechanism drivers of the creation of a batch of ports.
+
+        :raises: neutron.plugins.ml2.common.MechanismDriverError
+        if any mechanism driver create_port_bulk_postcommit or
+        create_port_postcommit call fails.
+
+        Called after the database transaction of create_port_bulk. The
+        mechanism drivers implementing create_port_bulk_postcommit are
+        called once with all the port contexts, the other ones are called
+        with create_port_postcommit for each port. Errors raised by
+        mechanism drivers are left to propagate to the caller, where the
+        ports will be deleted, triggering any required cleanup. There is
+        no guarantee that all mechanism drivers are called in this case.
+        """
+        for driver in self.ordered_mech_drivers:
+            try:
+                if hasattr(driver.obj, 'create_port_bulk_postcommit'):
+                    driver.obj.create_port_bulk_postcommit(contexts)
+                else:
+                    for context in contexts:
+                        driver.obj.create_port_postcommit(context)
+            except Exception as e:
+                LOG.exception(
+                    "Mechanism driver '%(name)s' failed in %(method)s",
+                    {'name': driver.name,
+                     'method': 'create_port_bulk_postcommit'}
+                )
+                raise ml2_exc.MechanismDriverError(
+                    method='create_port_bulk_postcommit',
+                    errors=[e]
+                )
+
     def update_port_precommit(self, context):
         """Notify all mechanism drivers during port update.
 
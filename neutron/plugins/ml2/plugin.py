@@ -1879,15 +1879,48 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                     })
 
         # Perform actions after the transaction is committed
-        completed_ports = []
         for port in port_data:
             resource_extend.apply_funcs('ports',
                                         port['port_dict'],
                                         port['port_obj'].db_obj)
-            completed_ports.append(
-                self._after_create_port(context,
-                                        port['port_dict'],
-                                        port['mech_context']))
+        return self._after_create_ports(
+            context, [port['mech_context'] for port in port_data])
+
+    def _after_create_ports(self, context, mech_contexts):
+        # The bulk version of _after_create_port: the mechanism drivers are
+        # notified of all the ports at once, so that they can create them in
+        # their backend in bulk.
+        for mech_context in mech_contexts:
+            result = mech_context.current
+            result['network'] = mech_context.network.current
+            registry.publish(resources.PORT, events.AFTER_CREATE, self,
+                             payload=events.DBEventPayload(
+                                 context, states=(result,),
+                                 resource_id=result['id']))
+
+        try:
+            self.mechanism_manager.create_port_bulk_postcommit(mech_contexts)
+        except ml2_exc.MechanismDriverError:
+            with excutils.save_and_reraise_exception():
+                port_ids = [mech_context.current['id']
+                            for mech_context in mech_contexts]
+                LOG.error("mechanism_manager.create_port_bulk_postcommit "
+                          "failed, deleting ports %s", port_ids)
+                for port_id in port_ids:
+                    self.delete_port(context, port_id, l3_port_check=False)
+
+        completed_ports = []
+        for mech_context in mech_contexts:
+            try:
+                bound_context = self._bind_port_if_needed(mech_context)
+            except ml2_exc.MechanismDriverError:
+                with excutils.save_and_reraise_exception():
+                    LOG.error("_bind_port_if_needed "
+                              "failed, deleting port '%s'",
+                              mech_context.current['id'])
+                    self.delete_port(context, mech_context.current['id'],
+                                     l3_port_check=False)
+            completed_ports.append(bound_context.current)
         return completed_ports
 
     # TODO(yalei) - will be simplified after security group and address pair be
@@ -2385,7 +2418,13 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
             # get all networks for PortContext construction
             netctxs_by_netid = self.get_network_contexts(
                 plugin_context,
-                {p.network_id for p in port_dbs_by_id.values()})
+                {p.network_id for p in port_dbs_by_id.values() if p})
+            # get all distributed bindings on the host in a single query
+            dvr_bindings_by_id = db.get_distributed_port_bindings_by_host(
+                plugin_context,
+                [p.id for p in port_dbs_by_id.values()
+                 if p and p.device_owner == const.DEVICE_OWNER_DVR_INTERFACE],
+                host)
             for dev_id in dev_ids:
                 port_id = dev_to_full_pids.get(dev_id)
                 port_db = port_dbs_by_id.get(port_id)
@@ -2395,8 +2434,7 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                     continue
                 port = self._make_port_dict(port_db)
                 if port['device_owner'] == const.DEVICE_OWNER_DVR_INTERFACE:
-                    binding = db.get_distributed_port_binding_by_host(
-                        plugin_context, port['id'], host)
+                    binding = dvr_bindings_by_id.get(port['id'])
                     bindlevelhost_match = host
                 else:
                     binding = p_utils.get_port_binding_by_status_and_host(
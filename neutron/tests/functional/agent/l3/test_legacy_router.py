@@ -176,13 +176,16 @@ class L3AgentTestCase(framework.L3AgentTestFramework):
         for r in routers_to_keep:
             r['external_gateway_info'] = {'network_id': external_network_id}
 
-        # while sync updates are still in the queue, higher priority
-        # router_deleted events may be added there as well
+        # while sync updates are still in the queue, router_deleted events
+        # may be added there as well. They are queued in another update
+        # class than the sync updates, which can be picked first, but the
+        # pending updates of a router are processed together in priority
+        # order, so the sync updates older than the deletes are skipped.
         for r in routers_deleted_during_resync:
             self.agent.router_deleted(self.agent.context, r['id'])
 
         # make sure all events are processed
-        while not self.agent._queue._queue.empty():
+        while self.agent._queue.qsize:
             self.agent._process_update()
 
         for r in routers_to_keep:
@@ -13,7 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
 from neutron_lib import constants
+from oslo_log import log as logging
 import testtools
 
 from neutron.agent.linux import iptables_manager
@@ -22,6 +25,8 @@ from neutron.tests.common import net_helpers
 from neutron.tests.functional.agent.linux import base as linux_base
 from neutron.tests.functional import base as functional_base
 
+LOG = logging.getLogger(__name__)
+
 
 class IptablesManagerTestCase(functional_base.BaseSudoTestCase):
     DIRECTION_CHAIN_MAPPER = {'ingress': 'INPUT',
@@ -161,3 +166,35 @@ class IptablesManagerTestCase(functional_base.BaseSudoTestCase):
     def test_udp_output(self):
         self._test_with_nc(self.client_fw, 'egress', port=None,
                            protocol=net_helpers.NetcatTester.UDP)
+
+
+class IptablesChainDiffBenchmark(functional_base.BaseLoggingTestCase):
+    """CPU time of diffing a chain against the number of rules."""
+
+    def _diff_chain(self, num_rules):
+        chain = 'test-chain'
+        old_rules = ['-A %s -s 10.%d.%d.0/24 -j RETURN' %
+                     (chain, idx // 256, idx % 256)
+                     for idx in range(num_rules)]
+        new_rules = list(old_rules)
+        # a deleted rule, an inserted rule and two swapped rules
+        del new_rules[num_rules // 3]
+        new_rules.insert(num_rules // 2, '-A %s -j DROP' % chain)
+        new_rules[10], new_rules[-10] = new_rules[-10], new_rules[10]
+
+        start = time.process_time()
+        commands = iptables_manager._generate_chain_diff_iptables_commands(
+            chain, old_rules, new_rules)
+        elapsed = time.process_time() - start
+        LOG.info('Diffing a chain of %(num)d rules took %(elapsed).3f '
+                 'seconds', {'num': num_rules, 'elapsed': elapsed})
+        self.assertEqual(6, len(commands))
+
+    def test_diff_chain_1k_rules(self):
+        self._diff_chain(1000)
+
+    def test_diff_chain_10k_rules(self):
+        self._diff_chain(10000)
+
+    def test_diff_chain_50k_rules(self):
+        self._diff_chain(50000)
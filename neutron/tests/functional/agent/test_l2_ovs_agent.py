@@ -21,11 +21,14 @@ from neutron_lib.callbacks import events
 from neutron_lib.callbacks import registry
 from neutron_lib.callbacks import resources
 from neutron_lib.plugins.ml2 import ovs_constants
+from oslo_log import log as logging
 
 from neutron.common import utils
 from neutron.tests.common import net_helpers
 from neutron.tests.functional.agent.l2 import base
 
+LOG = logging.getLogger(__name__)
+
 
 class TestOVSAgent(base.OVSAgentTestFramework):
     def test_port_creation_and_deletion(self):
@@ -351,3 +354,46 @@ class TestOVSAgentExtensionConfig(base.OVSAgentTestFramework):
         self.agent._report_state()
         agent_state = self.agent.state_rpc.report_state.call_args[0][1]
         self.assertEqual(['qos'], agent_state['configurations']['extensions'])
+
+
+class TestOVSAgentPortProcessingBenchmark(base.OVSAgentTestFramework):
+    """Wall-clock time of wiring ports against the number of ports.
+
+    The ports are spread over several networks so they can be processed in
+    shards when "port_processing_workers" is greater than 1.
+    """
+
+    NUM_NETWORKS = 10
+
+    def _wire_ports(self, num_ports, workers):
+        agent = self.create_agent(create_tunnels=False)
+        agent.port_processing_workers = workers
+        networks = []
+        for idx in range(self.NUM_NETWORKS):
+            network = self._create_test_network_dict()
+            network['segmentation_id'] = 100 + idx
+            networks.append(network)
+        ports = self.create_test_ports(amount=num_ports)
+        devices = []
+        for idx, port in enumerate(ports):
+            network = networks[idx % self.NUM_NETWORKS]
+            self._plug_ports(network, [port], agent)
+            devices.append(self._get_device_details(port, network))
+        (agent.plugin_rpc.get_devices_details_list_and_failed_devices.
+            return_value) = {'devices': devices, 'failed_devices': []}
+
+        start = time.time()
+        agent.treat_devices_added_or_updated(
+            {port['id'] for port in ports}, False, set())
+        elapsed = time.time() - start
+        self.assert_vlan_tags(ports, agent)
+        return elapsed
+
+    def test_port_processing_wall_clock(self):
+        for num_ports in (10, 50, 100):
+            serial = self._wire_ports(num_ports, workers=1)
+            sharded = self._wire_ports(num_ports, workers=8)
+            LOG.info("Wired %(num_ports)d ports in %(serial).3fs with one "
+                     "worker and in %(sharded).3fs with 8 workers",
+                     {'num_ports': num_ports, 'serial': serial,
+                      'sharded': sharded})
@@ -414,6 +414,32 @@ class OVS_Lib_Test(base.BaseTestCase):
         ]
         self.execute.assert_has_calls(expected_calls)
 
+    def test_do_action_flows_in_bundle(self):
+        self.br.do_action_flows_in_bundle([
+            ovs_lib.ActionFlowTuple('del', {'cookie': 1234, 'in_port': 5},
+                                    None),
+            ovs_lib.ActionFlowTuple(
+                'mod', {'cookie': 1234, 'priority': 1, 'in_port': 5,
+                        'strict': True, 'actions': 'drop'}, None),
+            ovs_lib.ActionFlowTuple(
+                'add', {'cookie': 1234, 'in_port': 6, 'actions': 'normal'},
+                None),
+        ])
+        flow_strs = ["delete cookie=1234/-1,in_port=5",
+                     "modify_strict cookie=1234,priority=1,in_port=5,"
+                     "actions=drop",
+                     "add hard_timeout=0,idle_timeout=0,priority=1,"
+                     "cookie=1234,in_port=6,actions=normal"]
+        self._verify_ofctl_mock("add-flows", self.BR_NAME, '--bundle', '-',
+                                process_input='\n'.join(flow_strs))
+
+    def test_do_action_flows_in_bundle_add_strict(self):
+        self.assertRaises(
+            exceptions.InvalidInput, self.br.do_action_flows_in_bundle,
+            [ovs_lib.ActionFlowTuple(
+                'add', {'in_port': 6, 'strict': True, 'actions': 'drop'},
+                None)])
+
     def test_delete_flows_any_cookie(self):
         self.br.delete_flows(in_port=5, cookie=ovs_lib.COOKIE_ANY)
         self.br.delete_flows(cookie=ovs_lib.COOKIE_ANY)
@@ -651,6 +677,52 @@ class OVS_Lib_Test(base.BaseTestCase):
             self.assertRaises(tenacity.RetryError,
                               self.br._get_port_val, '1', 'ofport')
 
+    def test_get_ports_ofports_retry(self):
+        self.br.ovsdb.ovsdb_connection.timeout = 10
+        with mock.patch.object(
+                self.br, 'get_ports_attributes',
+                side_effect=[[{'name': 'p1', 'ofport': 1},
+                              {'name': 'p2', 'ofport': []}],
+                             [{'name': 'p1', 'ofport': 1},
+                              {'name': 'p2', 'ofport': 2}]]) as get_attrs:
+            self.assertEqual({'p1': 1, 'p2': 2, 'p3': ovs_lib.INVALID_OFPORT},
+                             self.br.get_ports_ofports(['p1', 'p2', 'p3']))
+        get_attrs.assert_called_with('Interface', columns=['name', 'ofport'],
+                                     ports=['p1', 'p2', 'p3'], if_exists=True)
+        self.assertEqual(2, get_attrs.call_count)
+
+    def test_get_ports_ofports_retry_fails(self):
+        self.br.ovsdb.ovsdb_connection.timeout = 1
+        with mock.patch.object(
+                self.br, 'get_ports_attributes',
+                return_value=[{'name': 'p1', 'ofport': []}]):
+            self.assertEqual({'p1': ovs_lib.INVALID_OFPORT},
+                             self.br.get_ports_ofports(['p1']))
+
+    def test_add_tunnel_ports(self):
+        self.br.ovsdb = mock.Mock()
+        txn = self.br.ovsdb.transaction.return_value.__enter__.return_value
+        with mock.patch.object(self.br, 'get_ports_ofports',
+                               return_value={'gre-1': 1, 'vxlan-2': 2}):
+            self.assertEqual(
+                {'gre-1': 1, 'vxlan-2': 2},
+                self.br.add_tunnel_ports(
+                    {'gre-1': ('10.0.0.2', lib_const.TYPE_GRE),
+                     'vxlan-2': ('10.0.0.3', lib_const.TYPE_VXLAN)},
+                    '10.0.0.1'))
+        self.br.ovsdb.transaction.assert_called_once_with()
+        self.br.ovsdb.add_port.assert_has_calls([
+            mock.call(self.BR_NAME, 'gre-1'),
+            mock.call(self.BR_NAME, 'vxlan-2')])
+        self.assertEqual(4, txn.add.call_count)
+        self.br.ovsdb.db_set.assert_any_call(
+            'Interface', 'vxlan-2', ('type', lib_const.TYPE_VXLAN), mock.ANY)
+
+    def test_add_tunnel_ports_no_ports(self):
+        self.br.ovsdb = mock.Mock()
+        self.assertEqual({}, self.br.add_tunnel_ports({}, '10.0.0.1'))
+        self.br.ovsdb.transaction.assert_not_called()
+
     def test_set_controller_rate_limit(self):
         with mock.patch.object(
                 self.br, "set_controller_field"
@@ -818,6 +890,20 @@ class TestDeferredOVSBridge(base.BaseTestCase):
             deferred_br.mod_flow(**self.mod_flow_dict2)
         self._verify_mock_call(expected_calls)
 
+    def test_apply_single_bundle(self):
+        with ovs_lib.DeferredOVSBridge(self.br, full_ordered=True,
+                                       single_bundle=True) as deferred_br:
+            deferred_br.add_flow(**self.add_flow_dict1)
+            deferred_br.delete_flows(**self.del_flow_dict1)
+            deferred_br.mod_flow(**self.mod_flow_dict1)
+            self.br.do_action_flows_in_bundle.assert_not_called()
+        self.br.do_action_flows_in_bundle.assert_called_once_with([
+            ovs_lib.ActionFlowTuple('add', self.add_flow_dict1, None),
+            ovs_lib.ActionFlowTuple('del', self.del_flow_dict1, None),
+            ovs_lib.ActionFlowTuple('mod', self.mod_flow_dict1, None),
+        ])
+        self._verify_mock_call([])
+
     def test_getattr_unallowed_attr(self):
         with ovs_lib.DeferredOVSBridge(self.br) as deferred_br:
             self.assertEqual(self.br.add_port, deferred_br.add_port)
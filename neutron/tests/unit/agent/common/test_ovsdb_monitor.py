@@ -111,3 +111,78 @@ class TestSimpleInterfaceMonitor(base.BaseTestCase):
             self.monitor.process_events()
             self.assertIn(expected_dev,
                           self.monitor.new_events['modified'])
+
+
+class TestIdlInterfaceMonitor(base.BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ovs = mock.Mock()
+        self.idl = self.ovs.ovsdb.idl_monitor
+        self.idl.tables = {'Interface': mock.Mock(rows={})}
+        self.monitor = ovsdb_monitor.IdlInterfaceMonitor(self.ovs)
+
+    def _get_row(self, name='fake_dev', ofport=(10,), external_ids=None):
+        row = mock.Mock(ofport=list(ofport), external_ids=external_ids or {})
+        row.name = name
+        return row
+
+    def test_start_reports_existing_interfaces_as_added(self):
+        self.idl.tables['Interface'].rows = {'uuid': self._get_row()}
+        self.monitor.start()
+        self.idl.notify_handler.watch_event.assert_called_once_with(
+            self.monitor._event)
+        self.assertTrue(self.monitor.is_active())
+        self.assertEqual(
+            {'added': [{'name': 'fake_dev', 'ofport': 10,
+                        'external_ids': {}}],
+             'removed': [], 'modified': []},
+            self.monitor.get_events())
+        self.assertFalse(self.monitor.has_updates)
+
+    def test_stop(self):
+        self.monitor.start()
+        event = self.monitor._event
+        self.monitor.stop()
+        self.idl.notify_handler.unwatch_event.assert_called_once_with(event)
+        self.assertFalse(self.monitor.is_active())
+
+    def test_events(self):
+        self.monitor.start()
+        event = self.monitor._event
+        event.run(event.ROW_CREATE, self._get_row('dev1', ofport=()), None)
+        event.run(event.ROW_UPDATE, self._get_row('dev1', ofport=(5,)), None)
+        event.run(event.ROW_UPDATE, self._get_row('dev2', ofport=(6,)), None)
+        event.run(event.ROW_DELETE, self._get_row('dev3'), None)
+        self.assertTrue(self.monitor.has_updates)
+        self.assertEqual(
+            {'added': [{'name': 'dev1', 'ofport': 5, 'external_ids': {}}],
+             'modified': [{'name': 'dev2', 'ofport': 6, 'external_ids': {}}],
+             'removed': [{'name': 'dev3', 'ofport': 10,
+                          'external_ids': {}}]},
+            self.monitor.get_events())
+
+    def test_unassigned_ofport(self):
+        self.monitor.add_event(ovsdb_monitor.InterfaceEvent.ROW_CREATE,
+                               self._get_row(ofport=()))
+        self.assertEqual(ovs_lib.UNASSIGNED_OFPORT,
+                         self.monitor.get_events()['added'][0]['ofport'])
+
+    def test_update_of_other_columns_is_ignored(self):
+        event = ovsdb_monitor.InterfaceEvent(self.monitor)
+        self.assertFalse(event.match_fn(event.ROW_UPDATE, self._get_row(),
+                                        mock.Mock(spec=['statistics'])))
+        self.assertTrue(event.match_fn(event.ROW_UPDATE, self._get_row(),
+                                       mock.Mock(spec=['ofport'])))
+
+    def test_get_events_filtered_by_bridge(self):
+        monitor = ovsdb_monitor.IdlInterfaceMonitor(
+            self.ovs, bridge_names=['br-int'])
+        self.ovs.get_bridge_for_iface.side_effect = (
+            lambda name: 'br-int' if name == 'dev1' else 'br-other')
+        monitor.add_event(ovsdb_monitor.InterfaceEvent.ROW_CREATE,
+                          self._get_row('dev1'))
+        monitor.add_event(ovsdb_monitor.InterfaceEvent.ROW_CREATE,
+                          self._get_row('dev2'))
+        self.assertEqual(['dev1'], [device['name'] for device in
+                                    monitor.get_events()['added']])
@@ -91,6 +91,20 @@ class TestGetPollingManager(base.BaseTestCase):
                 mock_stop.assert_has_calls([mock.call()])
             mock_start.assert_has_calls([mock.call()])
 
+    def test_manage_idl_polling_minimizer(self):
+        mock_target = ('neutron.agent.common.polling.'
+                       'IdlInterfacePollingMinimizer')
+        with mock.patch('%s.start' % mock_target) as mock_start:
+            with mock.patch('%s.stop' % mock_target) as mock_stop:
+                with polling.get_polling_manager(
+                        minimize_polling=True, ovs=mock.Mock(),
+                        ovsdb_monitor_backend=polling.OVSDB_MONITOR_NATIVE
+                ) as pm:
+                    self.assertEqual(pm.__class__,
+                                     polling.IdlInterfacePollingMinimizer)
+                mock_stop.assert_called_once_with()
+            mock_start.assert_called_once_with()
+
 
 class TestInterfacePollingMinimizer(base.BaseTestCase):
 
@@ -120,3 +134,26 @@ class TestInterfacePollingMinimizer(base.BaseTestCase):
     def test__is_polling_required_returns_when_updates_are_present(self):
         with self.mock_has_updates(True):
             self.assertTrue(self.pm._is_polling_required())
+
+
+class TestIdlInterfacePollingMinimizer(base.BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pm = polling.IdlInterfacePollingMinimizer(ovs=mock.Mock())
+
+    def test_start_calls_monitor_start(self):
+        with mock.patch.object(self.pm._monitor, 'start') as mock_start:
+            self.pm.start()
+        mock_start.assert_called_once_with()
+
+    def test_stop_calls_monitor_stop(self):
+        with mock.patch.object(self.pm._monitor, 'stop') as mock_stop:
+            self.pm.stop()
+        mock_stop.assert_called_once_with()
+
+    def test__is_polling_required_returns_when_updates_are_present(self):
+        self.pm._monitor.new_events['added'].append({'name': 'tap0'})
+        self.assertTrue(self.pm._is_polling_required())
+        self.pm.get_events()
+        self.assertFalse(self.pm._is_polling_required())
@@ -14,6 +14,7 @@
 #
 
 import datetime
+from unittest import mock
 
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
@@ -141,5 +142,134 @@ class TestExclusiveResourceProcessor(base.BaseTestCase):
             rpqueue.add(queue.ResourceUpdate(FAKE_ID, PRIORITY_RPC))
             self.assertEqual(idx + 1, rpqueue.qsize)
         for idx in reversed(range(5)):
-            rpqueue._queue.get()
+            rpqueue._get()
             self.assertEqual(idx, rpqueue.qsize)
+
+
+class TestResourceProcessingQueue(base.BaseTestCase):
+
+    def _add_updates(self, rpqueue, update_class, count, priority=0):
+        updates = [queue.ResourceUpdate(_uuid(), priority,
+                                        update_class=update_class)
+                   for _ in range(count)]
+        for update in updates:
+            rpqueue.add(update)
+        return updates
+
+    def _get_and_release(self, rpqueue):
+        class_queue, update = rpqueue._get()
+        rpqueue._release(class_queue)
+        return update
+
+    def test_weighted_fair_scheduling(self):
+        rpqueue = queue.ResourceProcessingQueue(
+            class_weights={queue.UPDATE_CLASS_USER: 2,
+                           queue.UPDATE_CLASS_RESYNC: 1})
+        self._add_updates(rpqueue, queue.UPDATE_CLASS_RESYNC, 10)
+        self._add_updates(rpqueue, queue.UPDATE_CLASS_USER, 10)
+        classes = [self._get_and_release(rpqueue).update_class
+                   for _ in range(6)]
+        self.assertEqual(4, classes.count(queue.UPDATE_CLASS_USER))
+        self.assertEqual(2, classes.count(queue.UPDATE_CLASS_RESYNC))
+        self.assertEqual(14, rpqueue.qsize)
+
+    def test_priority_within_class(self):
+        rpqueue = queue.ResourceProcessingQueue()
+        low = self._add_updates(rpqueue, queue.UPDATE_CLASS_USER, 1,
+                                priority=2)
+        high = self._add_updates(rpqueue, queue.UPDATE_CLASS_USER, 1,
+                                 priority=1)
+        self.assertEqual(high + low, [self._get_and_release(rpqueue),
+                                      self._get_and_release(rpqueue)])
+
+    def test_class_limit(self):
+        rpqueue = queue.ResourceProcessingQueue(
+            class_limits={queue.UPDATE_CLASS_RESYNC: 1})
+        resync = self._add_updates(rpqueue, queue.UPDATE_CLASS_RESYNC, 2)
+        resync_class, update = rpqueue._get()
+        self.assertEqual(resync[0], update)
+        user = self._add_updates(rpqueue, queue.UPDATE_CLASS_USER, 1)
+        user_class, update = rpqueue._get()
+        self.assertEqual(user[0], update)
+        # The second resync update waits for the first one to finish
+        self.assertIsNone(rpqueue._select_class())
+        rpqueue._release(resync_class)
+        self.assertEqual(resync[1], self._get_and_release(rpqueue))
+
+    def test_each_update_to_next_resource_orders_resource_classes(self):
+        # The resync class is picked first, but the newer delete of the same
+        # resource, queued in the user class, is processed before the older
+        # resync update, which is then skipped.
+        rpqueue = queue.ResourceProcessingQueue(
+            class_weights={queue.UPDATE_CLASS_RESYNC: 10})
+        resync = queue.ResourceUpdate(
+            FAKE_ID, PRIORITY_RPC + 1,
+            timestamp=timeutils.utcnow() - datetime.timedelta(seconds=1),
+            update_class=queue.UPDATE_CLASS_RESYNC)
+        delete = queue.ResourceUpdate(FAKE_ID, PRIORITY_RPC)
+        other = queue.ResourceUpdate(_uuid(), PRIORITY_RPC)
+        for update in (resync, delete, other):
+            rpqueue.add(update)
+        processed = []
+        for rp, update in rpqueue.each_update_to_next_resource():
+            processed.append(update)
+            rp.fetched_and_processed(update.timestamp)
+        self.assertEqual([delete], processed)
+        self.assertEqual(1, rpqueue.qsize)
+        self.assertEqual(
+            {queue.UPDATE_CLASS_HA: 0, queue.UPDATE_CLASS_USER: 1,
+             queue.UPDATE_CLASS_RESYNC: 0},
+            {update_class: stats['pending']
+             for update_class, stats in rpqueue.get_stats().items()})
+
+    def test_each_update_to_next_resource_records_latencies(self):
+        rpqueue = queue.ResourceProcessingQueue()
+        update = queue.ResourceUpdate(_uuid(), PRIORITY_RPC)
+        rpqueue.add(update)
+        self.assertEqual([update], [u for _, u in
+                                    rpqueue.each_update_to_next_resource()])
+        stats = rpqueue.get_stats()[queue.UPDATE_CLASS_USER]
+        self.assertEqual(0, stats['pending'])
+        self.assertEqual(0, stats['in_flight'])
+        self.assertEqual(1, stats['wait']['count'])
+        self.assertEqual(1, stats['processing']['count'])
+
+    def test_each_update_to_next_resource_releases_class_on_error(self):
+        rpqueue = queue.ResourceProcessingQueue(
+            class_limits={queue.UPDATE_CLASS_USER: 1})
+        update = queue.ResourceUpdate(_uuid(), PRIORITY_RPC)
+        rpqueue.add(update)
+
+        def _process():
+            for _ in rpqueue.each_update_to_next_resource():
+                raise RuntimeError()
+
+        self.assertRaises(RuntimeError, _process)
+        stats = rpqueue.get_stats()[queue.UPDATE_CLASS_USER]
+        self.assertEqual(0, stats['in_flight'])
+        self.assertEqual(0, stats['processing']['count'])
+        self.assertNotIn(update.id,
+                         queue.ExclusiveResourceProcessor._primaries)
+
+    def test_stats_logged(self):
+        rpqueue = queue.ResourceProcessingQueue(stats_interval=60)
+        rpqueue._stats_reported = 0
+        rpqueue.add(queue.ResourceUpdate(_uuid(), PRIORITY_RPC))
+        with mock.patch.object(queue.LOG, 'info') as mock_log:
+            list(rpqueue.each_update_to_next_resource())
+            rpqueue.add(queue.ResourceUpdate(_uuid(), PRIORITY_RPC))
+            list(rpqueue.each_update_to_next_resource())
+        # The second update finished before the end of the interval
+        mock_log.assert_called_once_with(mock.ANY, mock.ANY)
+
+
+class TestLatencyHistogram(base.BaseTestCase):
+
+    def test_observe(self):
+        histogram = queue.LatencyHistogram(buckets=(1, 10))
+        for latency in (0.5, 1, 5, 100):
+            histogram.observe(latency)
+        self.assertEqual({'count': 4,
+                          'sum': 106.5,
+                          'buckets': {1: 2, 10: 1, float('inf'): 1}},
+                         histogram.to_dict())
@@ -562,6 +562,41 @@ class TestDhcpAgent(base.BaseTestCase):
             wait_calls = [mock.call(mock.ANY), mock.call(mock.ANY)]
             mock_wait.assert_has_calls(wait_calls)
 
+    def test_sync_state_paged(self):
+        cfg.CONF.set_override('sync_state_page_size', 2)
+        pages = [[mock.Mock(id='a'), mock.Mock(id='b')],
+                 oslo_messaging.MessagingTimeout(),
+                 [mock.Mock(id='c')], []]
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks_info.side_effect = pages
+            plug.return_value = mock_plugin
+
+            dhcp_obj = dhcp_agent.DhcpAgent(HOSTNAME)
+            dhcp_obj.init_host()
+            mock_plugin.get_active_networks_info.reset_mock()
+            mock_plugin.get_active_networks_info.side_effect = pages
+
+            attrs_to_mock = {a: mock.DEFAULT
+                             for a in ['disable_dhcp_helper', 'cache',
+                                       'safe_configure_dhcp_for_network']}
+            with mock.patch.multiple(dhcp_obj, **attrs_to_mock) as mocks:
+                mocks['cache'].get_network_ids.return_value = ['c', 'd']
+                mocks['cache'].get_port_ids.return_value = []
+                dhcp_obj.sync_state()
+
+        # The page that timed out is fetched again with a smaller page size
+        mock_plugin.get_active_networks_info.assert_has_calls([
+            mock.call(enable_dhcp_filter=False, limit=2, marker=None),
+            mock.call(enable_dhcp_filter=False, limit=2, marker='b'),
+            mock.call(enable_dhcp_filter=False, limit=1, marker='b'),
+            mock.call(enable_dhcp_filter=False, limit=1, marker='c')])
+        self.assertEqual(
+            ['a', 'b', 'c'],
+            sorted(c[0][0].id for c in
+                   mocks['safe_configure_dhcp_for_network'].call_args_list))
+        mocks['disable_dhcp_helper'].assert_called_once_with('d')
+
     def test_sync_state_for_all_networks_plugin_error(self):
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
@@ -1764,6 +1799,10 @@ class TestDhcpPluginApiProxy(base.BaseTestCase):
     def test_get_active_networks_info(self):
         self._test_dhcp_api('get_active_networks_info', version='1.1')
 
+    def test_get_active_networks_info_paged(self):
+        self._test_dhcp_api('get_active_networks_info', version='1.11',
+                            limit=10, marker='fake_id')
+
     def test_get_network_info(self):
         self._test_dhcp_api('get_network_info', network_id='fake_id',
                             return_value=None)
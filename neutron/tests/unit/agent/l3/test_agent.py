@@ -334,6 +334,8 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
                 agent.context,
                 {'router_id': 'router_id', 'state': 'primary',
                  'host': agent.host, 'enable_ndp_proxy': True})
+        self.assertEqual(resource_processing_queue.UPDATE_CLASS_HA,
+                         agent._router_update_class('router_id'))
 
     def test_enqueue_state_change_router_active_ha(self):
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
@@ -2701,6 +2703,18 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
         agent.routers_updated(None, [FAKE_ID])
         self.assertEqual(1, agent._queue.add.call_count)
 
+    def test_routers_updated_update_class(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.init_host()
+        agent._queue = mock.Mock()
+        failover_id = _uuid()
+        agent._failover_routers.add(failover_id)
+        agent.routers_updated(None, [FAKE_ID, failover_id])
+        self.assertEqual(
+            [resource_processing_queue.UPDATE_CLASS_USER,
+             resource_processing_queue.UPDATE_CLASS_HA],
+            [c[0][0].update_class for c in agent._queue.add.call_args_list])
+
     def test_removed_from_agent(self):
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
         agent.init_host()
@@ -2962,6 +2976,19 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
         agent._process_update()
         self.assertTrue(agent.plugin_rpc.get_routers.called)
 
+    def test_process_routers_update_clears_failover(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.init_host()
+        router = {'id': _uuid()}
+        agent._process_router_if_compatible = mock.Mock()
+        agent._failover_routers.add(router['id'])
+        update = resource_processing_queue.ResourceUpdate(
+            router['id'], l3_agent.PRIORITY_RPC, resource=router,
+            update_class=resource_processing_queue.UPDATE_CLASS_HA)
+        agent._queue.add(update)
+        agent._process_update()
+        self.assertNotIn(router['id'], agent._failover_routers)
+
     def test_process_routers_update_rpc_timeout_on_get_ext_net(self):
         self._test_process_routers_update_rpc_timeout(ext_net_call=True,
                                                       ext_net_call_failed=True)
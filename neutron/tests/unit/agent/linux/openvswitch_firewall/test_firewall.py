@@ -478,6 +478,56 @@ class TestConjIPFlowManager(base.BaseTestCase):
                       flow_group_id='ofport1')]
         self.assertEqual(self.driver._add_flow.call_args_list, calls)
 
+    def test_update_members_only_changed_addresses(self):
+        addr1 = ('10.22.3.4', 'fa:16:3e:aa:bb:cc')
+        addr2 = ('10.22.3.5', 'fa:16:3e:aa:bb:dd')
+        remote_group = self.driver.sg_port_map.get_sg.return_value
+        remote_group.members = {constants.IPv4: [addr1]}
+        remote_group.get_ethertype_filtered_addresses.return_value = [addr1]
+        with mock.patch.object(self.manager.conj_id_map,
+                               'get_conj_id') as get_conj_id_mock:
+            get_conj_id_mock.return_value = self.conj_id
+            self.manager.add(self.vlan_tag, 'sg', 'remote_id',
+                             constants.INGRESS_DIRECTION, constants.IPv4, 0)
+            self.manager.update_flows_for_vlan(self.vlan_tag, 'ofport1')
+        self.driver._add_flow.reset_mock()
+
+        remote_group.members = {constants.IPv4: [addr1, addr2]}
+        remote_group.get_ethertype_filtered_addresses.return_value = [
+            addr1, addr2]
+        self.manager.update_members('remote_id',
+                                    {constants.IPv4: [addr1]},
+                                    remote_group.members)
+        calls = [
+            mock.call(actions='conjunction(16,1/2)', ct_state='+est-rel-rpl',
+                      dl_type=2048, nw_src='10.22.3.5/32', priority=70,
+                      reg_net=self.vlan_tag, table=82, flow_group_id=None),
+            mock.call(actions='conjunction(17,1/2)', ct_state='+new-est',
+                      dl_type=2048, nw_src='10.22.3.5/32', priority=70,
+                      reg_net=self.vlan_tag, table=82, flow_group_id=None)]
+        self.assertEqual(calls, self.driver._add_flow.call_args_list)
+        self.assertEqual({'updates': 1, 'flow_mods': 2, 'flow_mods_saved': 4},
+                         self.manager.member_update_stats)
+
+        # A following port refresh has nothing left to do
+        self.driver._add_flow.reset_mock()
+        self.manager.update_flows_for_vlan(self.vlan_tag, 'ofport1')
+        self.driver._add_flow.assert_not_called()
+
+    def test_update_members_no_change(self):
+        addr1 = ('10.22.3.4', 'fa:16:3e:aa:bb:cc')
+        with mock.patch.object(self.manager.conj_id_map,
+                               'get_conj_id') as get_conj_id_mock:
+            get_conj_id_mock.return_value = self.conj_id
+            self.manager.add(self.vlan_tag, 'sg', 'remote_id',
+                             constants.INGRESS_DIRECTION, constants.IPv4, 0)
+        self.manager.update_members('remote_id',
+                                    {constants.IPv4: [addr1]},
+                                    {constants.IPv4: [addr1]})
+        self.driver._add_flow.assert_not_called()
+        self.driver.delete_flows_for_flow_state.assert_not_called()
+        self.assertEqual(0, self.manager.member_update_stats['updates'])
+
     def _sg_removed(self, sg_name):
         with mock.patch.object(self.manager.conj_id_map,
                                'get_conj_id') as get_id_mock, \
@@ -1079,6 +1129,26 @@ class TestOVSFirewallDriver(base.BaseTestCase):
              'remote_group_id': 2}]
         self.firewall.update_security_group_rules(1, new_rules)
 
+    def test_update_security_group_rules_invalidates_rules_cache(self):
+        self._prepare_security_group()
+        with mock.patch.object(self.firewall.rules_cache,
+                               'invalidate') as invalidate:
+            # Same rules, the compiled flows are still valid
+            self.firewall.update_security_group_rules(
+                1, [{'ethertype': constants.IPv4,
+                     'protocol': constants.PROTO_NAME_TCP,
+                     'direction': constants.INGRESS_DIRECTION,
+                     'port_range_min': 123,
+                     'port_range_max': 123}])
+            invalidate.assert_not_called()
+            self.firewall.update_security_group_rules(
+                1, [{'ethertype': constants.IPv4,
+                     'protocol': constants.PROTO_NAME_TCP,
+                     'direction': constants.INGRESS_DIRECTION,
+                     'port_range_min': 124,
+                     'port_range_max': 124}])
+            invalidate.assert_called_once_with(1)
+
     def test_update_security_group_members(self):
         """Just make sure it doesn't crash"""
         new_members = {constants.IPv4: [1, 2, 3, 4]}
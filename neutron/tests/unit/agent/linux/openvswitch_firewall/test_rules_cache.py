@@ -0,0 +1,77 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from neutron_lib import constants
+
+from neutron.agent.linux.openvswitch_firewall import firewall as ovsfw
+from neutron.agent.linux.openvswitch_firewall import rules
+from neutron.agent.linux.openvswitch_firewall import rules_cache
+from neutron.tests import base
+
+
+class TestCompiledRulesCache(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = rules_cache.CompiledRulesCache()
+        self.sg = ovsfw.SecurityGroup(1)
+        self.sg.update_rules([
+            {'ethertype': constants.IPv4,
+             'protocol': constants.PROTO_NAME_TCP,
+             'direction': constants.INGRESS_DIRECTION,
+             'port_range_min': 22,
+             'port_range_max': 22},
+            {'ethertype': constants.IPv4,
+             'direction': constants.EGRESS_DIRECTION},
+            {'ethertype': constants.IPv6,
+             'direction': constants.EGRESS_DIRECTION}])
+
+    def _create_port(self, ofport):
+        ovs_port = mock.Mock(vif_mac='00:00:00:00:00:00', ofport=ofport)
+        port = ovsfw.OFPort({'device': 'port-%d' % ofport}, ovs_port,
+                            vlan_tag=1)
+        port.sec_groups = [self.sg]
+        return port
+
+    def _expected_flows(self, port, ethertype):
+        flows = []
+        for rule in self.sg.raw_rules:
+            if rule['ethertype'] != ethertype:
+                continue
+            for flow in rules.create_flows_from_rule_and_port(rule, port):
+                flows.extend(rules.create_accept_flows(flow))
+        return flows
+
+    def test_get_flows_same_as_uncached(self):
+        for ofport in (1, 2):
+            port = self._create_port(ofport)
+            for ethertype in (constants.IPv4, constants.IPv6):
+                self.assertEqual(self._expected_flows(port, ethertype),
+                                 self.cache.get_flows(port, ethertype))
+        self.assertEqual(2, len(self.cache))
+
+    def test_get_flows_compiles_once(self):
+        with mock.patch.object(rules, 'create_flows_from_rule_and_port',
+                               wraps=rules.create_flows_from_rule_and_port
+                               ) as create_flows:
+            for ofport in range(1, 10):
+                self.cache.get_flows(self._create_port(ofport),
+                                     constants.IPv4)
+        self.assertEqual(2, create_flows.call_count)
+
+    def test_invalidate(self):
+        self.cache.get_flows(self._create_port(1), constants.IPv4)
+        self.cache.invalidate(2)
+        self.assertEqual(1, len(self.cache))
+        self.cache.invalidate(1)
+        self.assertEqual(0, len(self.cache))
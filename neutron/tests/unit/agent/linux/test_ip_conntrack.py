@@ -14,7 +14,10 @@
 
 from unittest import mock
 
+from oslo_config import cfg
+
 from neutron.agent.linux import ip_conntrack
+from neutron.privileged.agent.linux import netlink_lib
 from neutron.tests import base
 
 
@@ -43,6 +46,152 @@ class IPConntrackTestCase(base.BaseTestCase):
         self.assertEqual(1, len(self.execute.mock_calls))
 
 
+class IPConntrackQueueTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.execute = mock.Mock()
+        mock.patch.object(ip_conntrack.IpConntrackManager,
+                          '_process_queue_worker').start()
+        self.mgr = ip_conntrack.IpConntrackManager(
+            self._get_rule_for_table, {}, {}, self.execute,
+            zone_per_port=True)
+
+    def _get_rule_for_table(self, table):
+        return ['test --physdev-in tapdevice1 -j CT --zone 100',
+                'test --physdev-in tapdevice2 -j CT --zone 200']
+
+    @staticmethod
+    def _conntrack_call(direction, ip, zone, remote_ip=None):
+        cmd = ['conntrack', '-D', '-f', 'ipv4', direction, ip, '-w', zone]
+        if remote_ip:
+            cmd.extend(['-s' if direction == '-d' else '-d', remote_ip])
+        return mock.call(cmd, run_as_root=True, privsep_exec=True,
+                         check_exit_code=True, extra_ok_codes=[1])
+
+    def test_process_queue_coalesces_updates(self):
+        dev_info = {'device': 'tapdevice1', 'fixed_ips': ['1.2.3.4']}
+        for _ in range(3):
+            self.mgr.delete_conntrack_state_by_remote_ips(
+                [dev_info], 'IPv4', ['10.0.0.1'])
+        self.mgr._process_queue()
+
+        self.assertTrue(self.mgr._queue.empty())
+        self.execute.assert_has_calls([
+            self._conntrack_call('-d', '1.2.3.4', 100, '10.0.0.1'),
+            self._conntrack_call('-s', '1.2.3.4', 100, '10.0.0.1')])
+        self.assertEqual(2, len(self.execute.mock_calls))
+        stats = self.mgr.get_stats()
+        self.assertEqual(6, stats['processed_updates'])
+        self.assertEqual(1, stats['processed_batches'])
+        self.assertEqual(0, stats['queue_depth'])
+
+    def test_process_queue_parallel_zones(self):
+        cfg.CONF.set_override('conntrack_cleanup_workers', 2, group='AGENT')
+        dev_infos = [{'device': 'tapdevice1', 'fixed_ips': ['1.2.3.4']},
+                     {'device': 'tapdevice2', 'fixed_ips': ['1.2.3.5']}]
+        rule = {'ethertype': 'IPv4', 'direction': 'ingress'}
+        with mock.patch.object(ip_conntrack.futurist,
+                               'ThreadPoolExecutor') as executor:
+            self.mgr.delete_conntrack_state_by_rule(dev_infos, rule)
+            self.mgr._process_queue()
+        executor.assert_called_once_with(max_workers=2)
+        submit = executor.return_value.__enter__.return_value.submit
+        submit.assert_has_calls([
+            mock.call(self.mgr._delete_zone_conntrack_state, 100, mock.ANY),
+            mock.call(self.mgr._delete_zone_conntrack_state, 200, mock.ANY)])
+
+    def test_process_queue_parallel_zones_worker_error(self):
+        cfg.CONF.set_override('conntrack_cleanup_workers', 2, group='AGENT')
+        dev_infos = [{'device': 'tapdevice1', 'fixed_ips': ['1.2.3.4']},
+                     {'device': 'tapdevice2', 'fixed_ips': ['1.2.3.5']}]
+        rule = {'ethertype': 'IPv4', 'direction': 'ingress'}
+        with mock.patch.object(self.mgr, '_get_conntrack_cmd',
+                               side_effect=ValueError), \
+                mock.patch.object(ip_conntrack.LOG,
+                                  'exception') as log_exception:
+            self.mgr.delete_conntrack_state_by_rule(dev_infos, rule)
+            self.mgr._process_queue()
+        # The error of a worker is logged, as in the serial processing
+        log_exception.assert_called_once_with(
+            "Failed to process ip_conntrack queue entries: %s", mock.ANY)
+
+    def test_get_stats_queue_depth(self):
+        rule = {'ethertype': 'IPv4', 'direction': 'ingress'}
+        self.mgr.delete_conntrack_state_by_rule([], rule)
+        self.assertEqual(1, self.mgr.get_stats()['queue_depth'])
+
+
+class IPConntrackNetlinkTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cfg.CONF.set_override('conntrack_cleanup_netlink', True,
+                              group='AGENT')
+        mock.patch.object(netlink_lib, 'nfct_lib',
+                          'libnetfilter_conntrack').start()
+        self.list_entries = mock.patch.object(netlink_lib,
+                                              'list_entries').start()
+        self.delete_entries = mock.patch.object(netlink_lib,
+                                                'delete_entries').start()
+        self.execute = mock.Mock()
+        mock.patch.object(ip_conntrack.IpConntrackManager,
+                          '_process_queue_worker').start()
+        self.mgr = ip_conntrack.IpConntrackManager(
+            self._get_rule_for_table, {}, {}, self.execute,
+            zone_per_port=True)
+
+    def _get_rule_for_table(self, table):
+        return ['test --physdev-in tapdevice1 -j CT --zone 100']
+
+    def test_delete_conntrack_state_netlink(self):
+        entries = [(4, 'tcp', 1, 22, '10.0.0.1', '1.2.3.4', 100),
+                   (4, 'udp', 1, 53, '10.0.0.2', '1.2.3.4', 100),
+                   (4, 'icmp', 8, 0, '1.2.3.4', '10.0.0.1', 3333, 100),
+                   (4, 'tcp', 2, 80, '10.0.0.1', '1.2.3.9', 100)]
+        self.list_entries.return_value = entries
+        dev_info = {'device': 'tapdevice1', 'fixed_ips': ['1.2.3.4']}
+        self.mgr.delete_conntrack_state_by_remote_ips(
+            [dev_info], 'IPv4', ['10.0.0.1'])
+        self.mgr._process_queue()
+
+        self.list_entries.assert_called_once_with(100)
+        self.delete_entries.assert_called_once_with(entries[0:1] +
+                                                    entries[2:3])
+        self.execute.assert_not_called()
+
+    def test_delete_conntrack_state_netlink_protocol(self):
+        entries = [(4, 'tcp', 1, 22, '10.0.0.1', '1.2.3.4', 100),
+                   (4, 'udp', 1, 53, '10.0.0.2', '1.2.3.4', 100)]
+        self.list_entries.return_value = entries
+        dev_info = {'device': 'tapdevice1', 'fixed_ips': ['1.2.3.4']}
+        self.mgr._delete_conntrack_state(
+            [dev_info], {'ethertype': 'IPv4', 'direction': 'ingress',
+                         'protocol': '17'})
+        self.delete_entries.assert_called_once_with(entries[1:])
+
+    def test_delete_conntrack_state_mark_uses_command(self):
+        dev_info = {'device': 'tapdevice1', 'fixed_ips': ['1.2.3.4']}
+        self.mgr._delete_conntrack_state(
+            [dev_info], {'ethertype': 'IPv4', 'direction': 'ingress',
+                         'mark': 1})
+        self.list_entries.assert_not_called()
+        self.execute.assert_called_once_with(
+            ['conntrack', '-D', '-f', 'ipv4', '-m', '1', '-d', '1.2.3.4',
+             '-w', 100], run_as_root=True, privsep_exec=True,
+            check_exit_code=True, extra_ok_codes=[1])
+
+    def test_delete_conntrack_state_netlink_failure(self):
+        self.list_entries.side_effect = RuntimeError
+        dev_info = {'device': 'tapdevice1', 'fixed_ips': ['1.2.3.4']}
+        self.mgr._delete_conntrack_state(
+            [dev_info], {'ethertype': 'IPv4', 'direction': 'ingress'})
+        self.execute.assert_called_once_with(
+            ['conntrack', '-D', '-f', 'ipv4', '-d', '1.2.3.4', '-w', 100],
+            run_as_root=True, privsep_exec=True, check_exit_code=True,
+            extra_ok_codes=[1])
+
+
 class OvsIPConntrackTestCase(IPConntrackTestCase):
 
     def setUp(self):
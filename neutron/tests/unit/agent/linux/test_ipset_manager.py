@@ -14,6 +14,7 @@
 from unittest import mock
 
 from neutron_lib import constants as n_const
+import testtools
 
 from neutron.agent.linux import ipset_manager
 from neutron.tests import base
@@ -164,3 +165,69 @@ class IpsetManagerTestCase(BaseIpsetManagerTest):
         self.expect_destroy()
         self.ipset.destroy(TEST_SET_ID, ETHERTYPE)
         self.verify_mock_calls()
+
+
+class IpsetManagerDeferApplyTestCase(BaseIpsetManagerTest):
+
+    def expect_restore(self, process_input):
+        self.execute.assert_called_once_with(
+            ['ipset', 'restore', '-exist'],
+            process_input='\n'.join(process_input), run_as_root=True,
+            check_exit_code=True, privsep_exec=True)
+
+    def test_defer_apply_single_restore(self):
+        other_set_name = self.ipset.get_name('other_sgid', 'IPv6')
+        with self.ipset.defer_apply():
+            self.ipset.set_members(TEST_SET_ID, ETHERTYPE, [FAKE_IPS[0]])
+            self.ipset.set_members('other_sgid', 'IPv6',
+                                   [('fe80::1', None)])
+            self.execute.assert_not_called()
+        self.expect_restore([
+            'create %s hash:net family inet' % TEST_SET_NAME,
+            'create %s hash:net family inet' % TEST_SET_NAME_NEW,
+            f'add {TEST_SET_NAME_NEW} 10.0.0.1/32',
+            f'swap {TEST_SET_NAME_NEW} {TEST_SET_NAME}',
+            'destroy %s' % TEST_SET_NAME_NEW,
+            'create %s hash:net family inet6' % other_set_name,
+            'create %s-n hash:net family inet6' % other_set_name,
+            f'add {other_set_name}-n fe80::1/128',
+            f'swap {other_set_name}-n {other_set_name}',
+            'destroy %s-n' % other_set_name])
+        self.assertEqual(['10.0.0.1/32'], self.ipset.ipset_sets[TEST_SET_NAME])
+        self.assertEqual(['fe80::1/128'],
+                         self.ipset.ipset_sets[other_set_name])
+
+    def test_defer_apply_add_del_without_swap(self):
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS[0:3])
+        self.execute.reset_mock()
+        with self.ipset.defer_apply():
+            self.ipset.set_members(TEST_SET_ID, ETHERTYPE, FAKE_IPS[2:])
+        self.expect_restore([
+            f'add {TEST_SET_NAME} 10.0.0.4/32',
+            f'add {TEST_SET_NAME} 10.0.0.5/32',
+            f'add {TEST_SET_NAME} 10.0.0.6/32',
+            f'del {TEST_SET_NAME} 10.0.0.1/32',
+            f'del {TEST_SET_NAME} 10.0.0.2/32'])
+        self.assertEqual(['10.0.0.3/32', '10.0.0.4/32', '10.0.0.5/32',
+                          '10.0.0.6/32'],
+                         sorted(self.ipset.ipset_sets[TEST_SET_NAME]))
+
+    def test_defer_apply_no_changes(self):
+        self.ipset.set_members(TEST_SET_ID, ETHERTYPE, [FAKE_IPS[0]])
+        self.execute.reset_mock()
+        with self.ipset.defer_apply():
+            self.ipset.set_members(TEST_SET_ID, ETHERTYPE, [FAKE_IPS[0]])
+        self.execute.assert_not_called()
+
+    def test_defer_apply_failure_forgets_modified_sets(self):
+        self.execute.side_effect = RuntimeError
+        with testtools.ExpectedException(RuntimeError):
+            with self.ipset.defer_apply():
+                self.ipset.set_members(TEST_SET_ID, ETHERTYPE,
+                                       [FAKE_IPS[0]])
+        self.assertFalse(self.ipset.set_name_exists(TEST_SET_NAME))
+
+        self.execute.side_effect = None
+        self.execute.reset_mock()
+        self.add_first_ip()
+        self.verify_mock_calls()
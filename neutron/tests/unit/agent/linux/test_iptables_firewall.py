@@ -1946,6 +1946,36 @@ class IptablesFirewallTestCase(BaseIptablesFirewallTestCase):
         self.iptables_inst.assert_has_calls([mock.call.defer_apply_on(),
                                              mock.call.defer_apply_off()])
 
+    def test_defer_apply_ipsets_before_iptables(self):
+        manager = mock.Mock()
+        manager.attach_mock(self.iptables_inst, 'iptables')
+        with mock.patch.object(self.firewall, 'ipset') as ipset:
+            manager.attach_mock(ipset, 'ipset')
+            with self.firewall.defer_apply():
+                pass
+        manager.assert_has_calls([mock.call.ipset.defer_apply_off(),
+                                  mock.call.iptables.defer_apply_off()])
+
+    def test_filter_defer_apply_off_ipset_restore_failure(self):
+        with mock.patch.object(self.firewall.ipset, '_restore_sets',
+                               side_effect=RuntimeError), \
+                mock.patch.object(
+                    self.firewall,
+                    '_remove_conntrack_entries_from_sg_updates') as rm_ct, \
+                mock.patch.object(
+                    self.firewall,
+                    '_remove_unused_security_group_info') as rm_sg_info:
+            with testtools.ExpectedException(RuntimeError):
+                with self.firewall.defer_apply():
+                    self.firewall.ipset.set_members(
+                        'fake_sgid', constants.IPv4, [('10.0.0.1', None)])
+        # The iptables rules are applied and the deferred state is reset
+        self.iptables_inst.defer_apply_off.assert_called_once_with()
+        rm_ct.assert_called_once_with()
+        rm_sg_info.assert_called_once_with()
+        self.assertIsNone(self.firewall._pre_defer_filtered_ports)
+        self.assertIsNone(self.firewall._pre_defer_unfiltered_ports)
+
     def test_filter_defer_with_exception(self):
         try:
             with self.firewall.defer_apply():
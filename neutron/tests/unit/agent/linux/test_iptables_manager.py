@@ -1349,6 +1349,128 @@ class IptablesManagerStateFulTestCaseEmptyCustomBinaryNameIPv6(
     use_ipv6 = True
 
 
+class IptablesManagerIncrementalApplyTestCase(IptablesManagerBaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cfg.CONF.set_override('iptables_incremental_apply', True, 'AGENT')
+        self.iptables = iptables_manager.IptablesManager()
+        self.execute.side_effect = self._execute
+        self.restore_inputs = []
+
+    def _execute(self, args, process_input=None, **kwargs):
+        if args[0] == 'iptables-restore':
+            self.restore_inputs.append(process_input)
+        return ''
+
+    def _save_calls(self):
+        return [call for call in self.execute.mock_calls
+                if call.args[0] == ['iptables-save']]
+
+    def test_apply_uses_applied_rules(self):
+        self.iptables.apply()
+        self.iptables.ipv4['filter'].add_chain('filter')
+        self.iptables.ipv4['filter'].add_rule('filter', '-j DROP')
+        self.iptables.apply()
+
+        self.assertEqual(1, len(self._save_calls()))
+        self.assertEqual(2, len(self.restore_inputs))
+        self.assertEqual(
+            '# Generated by iptables_manager\n'
+            '*filter\n'
+            ':%(bn)s-filter - [0:0]\n'
+            '-I %(bn)s-filter 1 -j DROP\n'
+            'COMMIT\n'
+            '# Completed by iptables_manager\n' % IPTABLES_ARG,
+            self.restore_inputs[1])
+
+    def test_apply_no_changes(self):
+        self.iptables.apply()
+        self.assertEqual([], self.iptables.apply())
+        self.assertEqual(1, len(self._save_calls()))
+        self.assertEqual(1, len(self.restore_inputs))
+
+    def test_apply_periodic_full_resync(self):
+        cfg.CONF.set_override('iptables_full_resync_interval', 10, 'AGENT')
+        with mock.patch.object(iptables_manager, 'time') as time_mock:
+            time_mock.monotonic.side_effect = [100, 105, 111]
+            self.iptables.apply()
+            self.iptables.apply()
+            self.iptables.apply()
+        self.assertEqual(2, len(self._save_calls()))
+
+    def test_apply_failure_forces_full_resync(self):
+        self.iptables.apply()
+        self.iptables.ipv4['filter'].add_chain('filter')
+        with mock.patch.object(self.iptables, '_run_restore',
+                               return_value=RuntimeError()), \
+                mock.patch.object(self.iptables, '_log_restore_err'):
+            self.assertRaises(RuntimeError, self.iptables.apply)
+        self.iptables.apply()
+        self.assertEqual(2, len(self._save_calls()))
+
+    def test_apply_disabled(self):
+        cfg.CONF.set_override('iptables_incremental_apply', False, 'AGENT')
+        self.iptables.apply()
+        self.iptables.apply()
+        self.assertEqual(2, len(self._save_calls()))
+        self.assertEqual({}, self.iptables._applied_rules)
+
+
+class IptablesChainDiffTestCase(base.BaseTestCase):
+
+    @staticmethod
+    def _apply_commands(chain, rules, commands):
+        rules = list(rules)
+        for command in commands:
+            action, _chain, index, rule = (command.split(' ', 3) + [''])[:4]
+            if action == '-D':
+                del rules[int(index) - 1]
+            else:
+                rules.insert(int(index) - 1, f'-A {chain} {rule}'.strip())
+        return rules
+
+    def _test_chain_diff(self, old_rules, new_rules, expected=None):
+        commands = iptables_manager._generate_chain_diff_iptables_commands(
+            'test', old_rules, new_rules)
+        if expected is not None:
+            self.assertEqual(expected, commands)
+        self.assertEqual(new_rules,
+                         self._apply_commands('test', old_rules, commands))
+
+    def test_insert_and_delete(self):
+        old_rules = ['-A test -j A', '-A test -j B', '-A test -j C']
+        new_rules = ['-A test -j A', '-A test -j X', '-A test -j C',
+                     '-A test -j D']
+        self._test_chain_diff(
+            old_rules, new_rules,
+            ['-D test 2', '-I test 2 -j X', '-I test 4 -j D'])
+
+    def test_no_change(self):
+        rules = ['-A test -j A', '-A test -j B']
+        self._test_chain_diff(rules, rules, [])
+
+    def test_reordered_rules(self):
+        old_rules = ['-A test -j %s' % rule for rule in 'ABCDEF']
+        new_rules = ['-A test -j %s' % rule for rule in 'FBCADE']
+        self._test_chain_diff(old_rules, new_rules)
+        commands = iptables_manager._generate_chain_diff_iptables_commands(
+            'test', old_rules, new_rules)
+        # B, C, D and E are kept in place, A and F are moved
+        self.assertEqual(4, len(commands))
+
+    def test_duplicated_rules(self):
+        old_rules = ['-A test -j A', '-A test -j B', '-A test -j A']
+        new_rules = ['-A test -j B', '-A test -j A', '-A test -j A',
+                     '-A test']
+        self._test_chain_diff(old_rules, new_rules)
+
+    def test_lowercase_mac_address(self):
+        old_rules = ['-A test -m mac --mac-source fa:16:3e:00:00:01 -j A']
+        new_rules = ['-A test -m mac --mac-source FA:16:3E:00:00:01 -j A']
+        self._test_chain_diff(old_rules, new_rules, [])
+
+
 class IptablesManagerStateLessTestCase(base.BaseTestCase):
 
     def setUp(self):
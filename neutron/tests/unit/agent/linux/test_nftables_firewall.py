@@ -0,0 +1,195 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from neutron_lib import constants
+
+from neutron.agent.linux import ip_conntrack
+from neutron.agent.linux import nftables_firewall
+from neutron.tests import base
+
+FAKE_SGID = 'fake_sgid'
+OTHER_SGID = 'other_sgid'
+NFT_LIST_MAP_OUTPUT = """table bridge neutron {
+    map ct-zones {
+        typeof iifname : ct zone
+        elements = { "tapfake_port" : 4097, "qvbfake_port" : 4097 }
+    }
+}"""
+
+
+class NftRulesetTestCase(base.BaseTestCase):
+
+    def test_generate_nft_commands_no_change(self):
+        ruleset = nftables_firewall.NftRuleset()
+        ruleset.chains['ifoo'] = ['drop']
+        self.assertEqual([], nftables_firewall.generate_nft_commands(
+            ruleset, ruleset))
+
+    def test_generate_nft_commands(self):
+        old = nftables_firewall.NftRuleset()
+        old.chains = {'ifoo': ['drop'], 'ibar': ['drop'], 'ibaz': ['drop']}
+        old.sets['IPv4-sg1'] = ('type ipv4_addr; flags interval;',
+                                frozenset(['10.0.0.1', '10.0.0.2']))
+        old.sets['IPv4-sg2'] = ('type ipv4_addr; flags interval;',
+                                frozenset())
+        old.maps[nftables_firewall.INGRESS_PORTS_MAP] = {
+            '"tapfoo"': 'jump ifoo', '"tapbaz"': 'jump ibaz'}
+        new = nftables_firewall.NftRuleset()
+        new.chains = {'ifoo': ['drop'], 'ibar': ['return', 'drop'],
+                      'iqux': ['drop']}
+        new.sets['IPv4-sg1'] = ('type ipv4_addr; flags interval;',
+                                frozenset(['10.0.0.1', '10.0.0.3']))
+        new.maps[nftables_firewall.INGRESS_PORTS_MAP] = {
+            '"tapfoo"': 'jump ifoo', '"tapqux"': 'jump iqux'}
+
+        self.assertEqual(
+            ['delete element bridge neutron IPv4-sg1 { 10.0.0.2 }',
+             'add element bridge neutron IPv4-sg1 { 10.0.0.3 }',
+             'add chain bridge neutron iqux',
+             'flush chain bridge neutron ibar',
+             'add rule bridge neutron ibar return',
+             'add rule bridge neutron ibar drop',
+             'add rule bridge neutron iqux drop',
+             'delete element bridge neutron ingress-ports { "tapbaz" }',
+             'add element bridge neutron ingress-ports '
+             '{ "tapqux" : jump iqux }',
+             'flush chain bridge neutron ibaz',
+             'delete chain bridge neutron ibaz',
+             'delete set bridge neutron IPv4-sg2'],
+            nftables_firewall.generate_nft_commands(old, new))
+
+
+class NftablesFirewallTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.execute = mock.patch(
+            'neutron.agent.linux.utils.execute').start()
+        mock.patch.object(ip_conntrack.IpConntrackManager,
+                          '_process_queue_worker').start()
+        ip_conntrack.CONTRACK_MGRS.pop(None, None)
+        self.addCleanup(ip_conntrack.CONTRACK_MGRS.pop, None, None)
+        self.execute.return_value = NFT_LIST_MAP_OUTPUT
+        self.firewall = nftables_firewall.NftablesFirewallDriver()
+        self.execute.reset_mock()
+        self.execute.return_value = ''
+
+    @staticmethod
+    def _fake_port(sg_ids=(FAKE_SGID,)):
+        return {'device': 'fake_port',
+                'mac_address': 'fa:16:3e:00:00:01',
+                'network_id': 'fake_net',
+                'fixed_ips': ['10.0.0.1'],
+                'security_groups': list(sg_ids)}
+
+    def _nft_commands(self, call_index=-1):
+        call = self.execute.mock_calls[call_index]
+        self.assertEqual(['nft', '-f', '-'], call.args[0])
+        return call.kwargs['process_input'].splitlines()
+
+    def test_initial_zone_map(self):
+        self.assertEqual(4097, self.firewall.ipconntrack.get_device_zone(
+            {'device': 'tapfake_port'}, create=False))
+
+    def test_prepare_port_filter(self):
+        self.firewall.update_security_group_rules(FAKE_SGID, [
+            {'ethertype': constants.IPv4,
+             'direction': constants.INGRESS_DIRECTION,
+             'protocol': constants.PROTO_NAME_TCP,
+             'port_range_min': 22, 'port_range_max': 22}])
+        self.firewall.prepare_port_filter(self._fake_port())
+
+        commands = self._nft_commands()
+        self.assertEqual(['add table bridge neutron',
+                          'delete table bridge neutron'], commands[:2])
+        self.assertIn('add rule bridge neutron ifake_port ether type ip '
+                      'meta l4proto tcp th dport 22 return', commands)
+        self.assertIn('add element bridge neutron ingress-ports '
+                      '{ "tapfake_port" : jump ifake_port }', commands)
+        self.assertIn('add element bridge neutron egress-ports '
+                      '{ "tapfake_port" : jump ofake_port }', commands)
+        self.assertIn('add rule bridge neutron sfake_port ether saddr '
+                      'fa:16:3e:00:00:01 ip saddr 10.0.0.1/32 return',
+                      commands)
+
+    def test_update_security_group_rules_only_changed_chain(self):
+        self.firewall.prepare_port_filter(self._fake_port())
+        self.firewall.update_security_group_rules(FAKE_SGID, [
+            {'ethertype': constants.IPv6,
+             'direction': constants.EGRESS_DIRECTION,
+             'protocol': constants.PROTO_NAME_IPV6_ICMP_LEGACY,
+             'port_range_min': 128, 'port_range_max': 0}])
+        self.firewall.update_port_filter(self._fake_port())
+
+        commands = self._nft_commands()
+        self.assertEqual('flush chain bridge neutron ofake_port', commands[0])
+        self.assertIn('add rule bridge neutron ofake_port ether type ip6 '
+                      'meta l4proto ipv6-icmp icmpv6 type 128 icmpv6 code 0 '
+                      'return', commands)
+        self.assertFalse([command for command in commands
+                          if 'ifake_port' in command])
+
+    def test_update_security_group_members_only_changed_elements(self):
+        self.firewall.update_security_group_rules(FAKE_SGID, [
+            {'ethertype': constants.IPv4,
+             'direction': constants.INGRESS_DIRECTION,
+             'remote_group_id': OTHER_SGID}])
+        self.firewall.update_security_group_members(
+            OTHER_SGID, {constants.IPv4: [('10.0.0.2', None),
+                                          ('10.0.0.3', None)]})
+        self.firewall.prepare_port_filter(self._fake_port())
+        self.assertIn('add rule bridge neutron ifake_port ether type ip '
+                      'ip saddr @IPv4-other_sgid return',
+                      self._nft_commands())
+
+        self.firewall.update_security_group_members(
+            OTHER_SGID, {constants.IPv4: [('10.0.0.2', None),
+                                          ('10.0.1.0/24', None)]})
+        self.assertEqual(
+            ['delete element bridge neutron IPv4-other_sgid { 10.0.0.3 }',
+             'add element bridge neutron IPv4-other_sgid { 10.0.1.0/24 }'],
+            self._nft_commands())
+
+    def test_defer_apply(self):
+        with self.firewall.defer_apply():
+            self.firewall.prepare_port_filter(self._fake_port())
+            self.firewall.prepare_port_filter(
+                dict(self._fake_port(), device='other_port'))
+            self.execute.assert_not_called()
+        self.execute.assert_called_once()
+
+    def test_remove_port_filter(self):
+        port = self._fake_port()
+        self.firewall.prepare_port_filter(port)
+        self.firewall.remove_port_filter(port)
+
+        commands = self._nft_commands()
+        self.assertIn('delete element bridge neutron ingress-ports '
+                      '{ "tapfake_port" }', commands)
+        self.assertIn('delete chain bridge neutron ifake_port', commands)
+        self.assertEqual({}, self.firewall.ports)
+
+    def test_apply_failure_recreates_table(self):
+        self.execute.side_effect = RuntimeError
+        self.assertRaises(RuntimeError, self.firewall.prepare_port_filter,
+                          self._fake_port())
+        self.execute.side_effect = None
+        self.firewall.update_port_filter(self._fake_port())
+        self.assertEqual('add table bridge neutron', self._nft_commands()[0])
+
+    def test_port_security_disabled(self):
+        port = dict(self._fake_port(), port_security_enabled=False)
+        self.firewall.prepare_port_filter(port)
+        self.assertNotIn('fake_port', '\n'.join(self._nft_commands()))
+        self.assertIn('fake_port', self.firewall.ports)
@@ -38,6 +38,13 @@ class OVOLikeThing:
     def get(self, k):
         return getattr(self, k, None)
 
+    def obj_to_primitive(self):
+        return self.to_dict()
+
+    @classmethod
+    def clean_obj_from_primitive(cls, primitive):
+        return cls(**primitive)
+
 
 class RemoteResourceCacheTestCase(base.BaseTestCase):
     def setUp(self):
@@ -113,6 +120,16 @@ class RemoteResourceCacheTestCase(base.BaseTestCase):
         self.assertCountEqual([geese[3]],
                               self.rcache.get_resources('goose', is_small))
 
+    def test_get_resources_by_id(self):
+        geese = [OVOLikeThing(3, size='large'), OVOLikeThing(5, size='large')]
+        for goose in geese:
+            self.rcache.record_resource_update(self.ctx, 'goose', goose)
+        with mock.patch.object(self.rcache,
+                               'match_resources_with_func') as scan:
+            self.assertEqual([geese[1]], self.rcache.get_resources(
+                'goose', {'id': (5, 7), 'size': ('large', )}))
+        scan.assert_not_called()
+
     def test_match_resources_with_func(self):
         geese = [OVOLikeThing(3, size='large'), OVOLikeThing(5, size='medium'),
                  OVOLikeThing(4, size='xlarge'), OVOLikeThing(6, size='small')]
@@ -210,3 +227,146 @@ class RemoteResourceCacheTestCase(base.BaseTestCase):
         for goose in geese:
             self.assertIsNone(
                 self.rcache.get_resource_by_id('goose', goose.id))
+
+
+class RemoteResourceCacheIndexTestCase(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ctx = context.get_admin_context()
+        self.rcache = resource_cache.RemoteResourceCache(
+            ['goose'], indexed_fields={'goose': ('size', 'flocks')})
+        mock.patch.object(self.rcache, '_puller').start()
+        self.scan = mock.patch.object(
+            self.rcache, 'match_resources_with_func').start()
+        self.geese = [
+            OVOLikeThing(3, size='large', flocks=['a', 'b'], color='grey'),
+            OVOLikeThing(5, size='medium', flocks=['b'], color='white'),
+            OVOLikeThing(4, size='large', flocks=[], color='white'),
+            OVOLikeThing(6, size='small', flocks=['c'], color='grey')]
+        for goose in self.geese:
+            self.rcache.record_resource_update(self.ctx, 'goose', goose)
+
+    def test_get_resources_indexed_field(self):
+        self.assertEqual(
+            [self.geese[0], self.geese[2]],
+            self.rcache.get_resources('goose', {'size': ('large', )}))
+        self.assertEqual(
+            [self.geese[0], self.geese[1], self.geese[3]],
+            self.rcache.get_resources('goose', {'flocks': ('b', 'c')}))
+        self.assertEqual(
+            [], self.rcache.get_resources('goose', {'size': ('tiny', )}))
+        self.scan.assert_not_called()
+
+    def test_get_resources_indexed_and_not_indexed_fields(self):
+        self.assertEqual(
+            [self.geese[2]],
+            self.rcache.get_resources('goose', {'size': ('large', ),
+                                                'color': ('white', )}))
+        self.assertEqual(
+            [self.geese[1]],
+            self.rcache.get_resources('goose', {'size': ('medium', 'large'),
+                                                'flocks': ('b', ),
+                                                'color': ('white', )}))
+        self.scan.assert_not_called()
+
+    def test_get_resources_not_indexed_field(self):
+        self.rcache.get_resources('goose', {'color': ('grey', )})
+        self.scan.assert_called_once_with('goose', mock.ANY)
+
+    def test_index_updated(self):
+        self.rcache.record_resource_update(
+            self.ctx, 'goose', OVOLikeThing(3, revision_number=11,
+                                            size='small', flocks=['c'],
+                                            color='grey'))
+        self.assertEqual(
+            [self.geese[2]],
+            self.rcache.get_resources('goose', {'size': ('large', )}))
+        self.assertCountEqual(
+            [3, 6], [goose.id for goose in self.rcache.get_resources(
+                'goose', {'flocks': ('a', 'c')})])
+        self.assertNotIn('a', self.rcache._indexes['goose']['flocks'])
+
+    def test_index_deleted(self):
+        self.rcache.record_resource_delete(self.ctx, 'goose', 3)
+        self.rcache.record_resource_remove('goose', 5)
+        self.assertEqual(
+            [], self.rcache.get_resources('goose', {'flocks': ('a', 'b')}))
+        self.assertEqual({}, self.rcache._indexes['goose']['flocks'].get(
+            'b', {}))
+        self.assertNotIn(3, self.rcache._indexed_values['goose'])
+
+
+class RemoteResourceCacheSnapshotTestCase(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ctx = context.get_admin_context()
+        self.path = self.get_temp_file_path('cache.json.gz')
+        mock.patch.object(resource_cache.rpc_resources, 'get_resource_cls',
+                          return_value=OVOLikeThing).start()
+        self.rcache = self._create_cache()
+        self.rcache._puller.bulk_pull.side_effect = [
+            [OVOLikeThing(3, size='large')],
+            [OVOLikeThing(4, size='large'), OVOLikeThing(5, size='small')]]
+        self.rcache.get_resource_by_id('goose', 3)
+        self.rcache.get_resources('goose', {'size': ('large', 'small')})
+        self.rcache.save_snapshot(self.path)
+
+    def _create_cache(self):
+        rcache = resource_cache.RemoteResourceCache(
+            ['goose'], indexed_fields={'goose': ('size', )})
+        mock.patch.object(rcache, '_puller').start()
+        return rcache
+
+    def test_load_snapshot(self):
+        rcache = self._create_cache()
+        self.assertTrue(rcache.load_snapshot(self.path))
+        self.assertEqual(
+            [3, 4], [goose.id for goose in rcache._type_cache('goose')
+                     .values() if goose.size == 'large'])
+        # the queries of the snapshot are only satisfied once reconciled
+        self.assertEqual(set(), rcache._satisfied_server_queries)
+        self.assertEqual(self.rcache._satisfied_server_queries,
+                         rcache._snapshot_queries)
+
+    def test_load_snapshot_missing_or_invalid(self):
+        rcache = self._create_cache()
+        self.assertFalse(rcache.load_snapshot(self.path + '.missing'))
+        with open(self.path, 'wb') as f:
+            f.write(b'garbage')
+        self.assertFalse(rcache.load_snapshot(self.path))
+        self.assertEqual({}, rcache._type_cache('goose'))
+
+    def test_load_snapshot_other_version(self):
+        rcache = self._create_cache()
+        with mock.patch.object(resource_cache, 'SNAPSHOT_VERSION', 2):
+            self.assertFalse(rcache.load_snapshot(self.path))
+        self.assertEqual({}, rcache._type_cache('goose'))
+
+    def test_reconcile_snapshot(self):
+        rcache = self._create_cache()
+        rcache.load_snapshot(self.path)
+        rcache._puller.bulk_pull.side_effect = [
+            [OVOLikeThing(3, size='small', revision_number=11)],
+            [OVOLikeThing(4, size='large')]]
+        rcache.reconcile_snapshot()
+
+        rcache._puller.bulk_pull.assert_has_calls([
+            mock.call(mock.ANY, 'goose', filter_kwargs={'id': (3, )}),
+            mock.call(mock.ANY, 'goose',
+                      filter_kwargs={'size': mock.ANY})], any_order=True)
+        self.assertEqual(2, rcache._puller.bulk_pull.call_count)
+        self.assertEqual('small', rcache.get_resource_by_id('goose', 3).size)
+        self.assertNotIn(5, rcache._type_cache('goose'))
+        self.assertEqual(
+            [4], [goose.id for goose in rcache.get_resources(
+                'goose', {'size': ('large', )})])
+        self.assertEqual(self.rcache._satisfied_server_queries,
+                         rcache._satisfied_server_queries)
+
+    def test_reconcile_snapshot_failure(self):
+        rcache = self._create_cache()
+        rcache.load_snapshot(self.path)
+        rcache._puller.bulk_pull.side_effect = RuntimeError
+        rcache.reconcile_snapshot()
+        self.assertEqual({}, rcache._type_cache('goose'))
+        self.assertEqual(set(), rcache._satisfied_server_queries)
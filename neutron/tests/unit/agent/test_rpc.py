@@ -230,6 +230,25 @@ class TestCacheBackedPluginApi(base.BaseTestCase):
                 "openvswitch": {"other_config": {"tx-steering": "hash"}}}),
         )
 
+    def test_stop_saves_resource_cache_snapshot(self):
+        cfg.CONF.set_override('resource_cache_snapshot', True, group='AGENT')
+        cfg.CONF.set_override('state_path', '/fake/state')
+        self._api.stop()
+        self._api.remote_resource_cache.save_snapshot.assert_called_once_with(
+            '/fake/state/l2-agent-resource-cache.json.gz')
+
+    def test_create_cache_loads_resource_cache_snapshot(self):
+        cfg.CONF.set_override('resource_cache_snapshot', True, group='AGENT')
+        with mock.patch.object(rpc.resource_cache,
+                               'RemoteResourceCache') as rcache_cls:
+            self._api._create_cache_for_l2_agent()
+        rcache = rcache_cls.return_value
+        rcache.assert_has_calls([
+            mock.call.load_snapshot(
+                self._api._resource_cache_snapshot_path()),
+            mock.call.start_watcher(),
+            mock.call.reconcile_snapshot()])
+
     def test__legacy_notifier_resource_delete(self):
         self._api._legacy_notifier(resources.PORT, events.AFTER_DELETE, self,
                                    payload=events.DBEventPayload(
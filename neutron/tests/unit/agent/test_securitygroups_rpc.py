@@ -19,6 +19,8 @@ from unittest import mock
 
 import netaddr
 from neutron_lib.api.definitions import allowedaddresspairs as addr_apidef
+from neutron_lib.callbacks import events
+from neutron_lib.callbacks import resources
 from neutron_lib import constants as const
 from neutron_lib import context
 from neutron_lib.plugins import directory
@@ -134,6 +136,8 @@ class SecurityGroupRpcTestPlugin(test_sg.SecurityGroupTestPlugin,
     def create_port(self, context, port):
         result = super().create_port(context, port)
         self.devices[result['id']] = result
+        self._invalidate_sg_member_ips(
+            result.get(ext_sg.SECURITYGROUPS, []))
         self.notify_security_groups_member_updated(context, result)
         return result
 
@@ -143,11 +147,15 @@ class SecurityGroupRpcTestPlugin(test_sg.SecurityGroupTestPlugin,
         self.devices[id] = updated_port
         self._update_security_group_on_port(
             context, id, port, original_port, updated_port)
+        self._invalidate_sg_member_ips(
+            set(original_port.get(ext_sg.SECURITYGROUPS, [])) |
+            set(updated_port.get(ext_sg.SECURITYGROUPS, [])))
         return updated_port
 
     def delete_port(self, context, id):
         port = self.get_port(context, id)
         super().delete_port(context, id)
+        self._invalidate_sg_member_ips(port.get(ext_sg.SECURITYGROUPS, []))
         self.notify_security_groups_member_updated(context, port)
         del self.devices[id]
 
@@ -868,6 +876,96 @@ class SGServerRpcCallBackTestCase(test_sg.SecurityGroupDBTestCase):
             self._delete('ports', port_id2)
 
 
+class SGServerRpcCallBackWithCacheTestCase(SGServerRpcCallBackTestCase):
+    def setUp(self, plugin=None):
+        super().setUp(plugin)
+        cfg.CONF.set_override('enabled', True, group='cache')
+        cfg.CONF.set_override('backend', 'oslo_cache.dict', group='cache')
+        cfg.CONF.set_override('security_group_info_cache', True)
+        self.plugin = directory.get_plugin()
+
+    def _create_port_with_sg(self, network, sg_id):
+        res = self._create_port(self.fmt, network['network']['id'],
+                                security_groups=[sg_id])
+        return self.deserialize(self.fmt, res)['port']
+
+    def test_security_group_info_rules_cached_per_revision(self):
+        with self.network() as n,\
+                self.subnet(n),\
+                self.security_group() as sg:
+            sg_id = sg['security_group']['id']
+            port_id = self._create_port_with_sg(n, sg_id)['id']
+            ctx = context.get_admin_context()
+            with mock.patch.object(
+                    self.plugin, '_select_rules_for_sg_ids',
+                    wraps=self.plugin._select_rules_for_sg_ids) as select:
+                first = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id])
+                second = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id])
+                self.assertEqual(1, select.call_count)
+                self.assertEqual(first['security_groups'],
+                                 second['security_groups'])
+
+                rule = self._build_security_group_rule(
+                    sg_id, 'ingress', const.PROTO_NAME_TCP, '22', '22')
+                self._create_security_group_rule(self.fmt, rule)
+                sg_info = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id])
+                self.assertEqual(2, select.call_count)
+            self.assertIn({'direction': 'ingress',
+                           'ethertype': const.IPv4,
+                           'protocol': const.PROTO_NAME_TCP,
+                           'port_range_min': 22, 'port_range_max': 22,
+                           'stateful': True},
+                          sg_info['security_groups'][sg_id])
+            self._delete('ports', port_id)
+
+    def test_security_group_info_member_ips_invalidated(self):
+        with self.network() as n,\
+                self.subnet(n),\
+                self.security_group() as sg1,\
+                self.security_group() as sg2:
+            sg1_id = sg1['security_group']['id']
+            sg2_id = sg2['security_group']['id']
+            rule = self._build_security_group_rule(
+                sg1_id, 'ingress', const.PROTO_NAME_TCP, '22', '22',
+                remote_group_id=sg2_id)
+            self._create_security_group_rule(self.fmt, rule)
+            port_id1 = self._create_port_with_sg(n, sg1_id)['id']
+            port2 = self._create_port_with_sg(n, sg2_id)
+            port_ip2 = port2['fixed_ips'][0]['ip_address']
+            ctx = context.get_admin_context()
+            with mock.patch.object(
+                    self.plugin, '_select_ips_for_remote_group',
+                    wraps=self.plugin._select_ips_for_remote_group) as select:
+                sg_info = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual(1, select.call_count)
+                self.assertEqual({(port_ip2, None)},
+                                 sg_info['sg_member_ips'][sg2_id]['IPv4'])
+
+                self._delete('ports', port2['id'])
+                sg_info = self.rpc.security_group_info_for_devices(
+                    ctx, devices=[port_id1])
+                self.assertEqual(2, select.call_count)
+                self.assertEqual(set(),
+                                 sg_info['sg_member_ips'][sg2_id]['IPv4'])
+            self._delete('ports', port_id1)
+
+    def test_notify_sg_on_port_change_invalidates_member_ips(self):
+        port = {'id': 'fake_port', 'device_owner': 'compute:nova',
+                ext_sg.SECURITYGROUPS: ['sg1', 'sg2']}
+        payload = mock.Mock(states=(port,), latest_state=port)
+        with mock.patch.object(self.plugin,
+                               '_invalidate_sg_member_ips') as invalidate:
+            self.plugin._notify_sg_on_port_change(
+                resources.PORT, events.AFTER_CREATE, mock.ANY, payload)
+        invalidate.assert_called_once_with({'sg1', 'sg2'})
+
+
 class SecurityGroupAgentRpcTestCaseForNoneDriver(base.BaseTestCase):
     def test_init_firewall_with_none_driver(self):
         set_enable_security_groups(False)
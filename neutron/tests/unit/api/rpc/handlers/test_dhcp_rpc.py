@@ -93,6 +93,34 @@ class TestDhcpRpcCallback(base.BaseTestCase):
                           host='test-host', ports=[ports[2]])
             ])
 
+    @mock.patch.object(dhcp_rpc.extensions, 'is_extension_supported',
+                       return_value=True)
+    def test__get_active_networks_page(self, *args):
+        networks = [mock.Mock(id='net3'), mock.Mock(id='net2')]
+        self.plugin.list_active_network_ids_on_active_dhcp_agent.\
+            return_value = ['net4', 'net2', 'net1', 'net3']
+        with mock.patch.object(network_obj.Network, 'get_objects',
+                               return_value=networks) as get_objects:
+            ret = self.callbacks._get_active_networks(
+                'ctx', host='test-host', limit=2, marker='net1')
+        get_objects.assert_called_once_with('ctx', id=['net2', 'net3'])
+        self.assertEqual(['net2', 'net3'], [net.id for net in ret])
+        # The networks are only scheduled with the first page
+        self.plugin.auto_schedule_networks.assert_not_called()
+        self.plugin.list_active_networks_on_active_dhcp_agent.\
+            assert_not_called()
+
+    @mock.patch.object(dhcp_rpc.extensions, 'is_extension_supported',
+                       return_value=True)
+    def test__get_active_networks_last_page(self, *args):
+        self.plugin.list_active_network_ids_on_active_dhcp_agent.\
+            return_value = ['net1', 'net2']
+        with mock.patch.object(network_obj.Network,
+                               'get_objects') as get_objects:
+            self.assertEqual([], self.callbacks._get_active_networks(
+                'ctx', host='test-host', limit=2, marker='net2'))
+        get_objects.assert_not_called()
+
     def _test__port_action_with_failures(self, exc=None, action=None):
         port = {
             'network_id': 'foo_network_id',
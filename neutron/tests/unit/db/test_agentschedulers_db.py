@@ -681,6 +681,21 @@ class OvsAgentSchedulerTestCase(OvsAgentSchedulerTestCaseBase):
             else:
                 self.assertEqual(0, len(nets))
 
+    def test_get_active_networks_info_paged(self):
+        helpers.register_dhcp_agent(DHCP_HOSTA)
+        dhcp_rpc_cb = dhcp_rpc.DhcpRpcCallback()
+        with self.port() as port1, self.port() as port2, \
+                self.port() as port3:
+            net_ids = sorted(port['port']['network_id']
+                             for port in (port1, port2, port3))
+            nets = dhcp_rpc_cb.get_active_networks_info(
+                self.adminContext, host=DHCP_HOSTA, limit=2)
+            self.assertEqual(net_ids[:2], [net['id'] for net in nets])
+            nets = dhcp_rpc_cb.get_active_networks_info(
+                self.adminContext, host=DHCP_HOSTA, limit=2,
+                marker=net_ids[1])
+            self.assertEqual(net_ids[2:], [net['id'] for net in nets])
+
     def test_dhcp_agent_keep_services_off(self):
         self._test_get_active_networks_from_admin_state_down_agent(False)
 
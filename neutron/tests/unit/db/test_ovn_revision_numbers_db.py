@@ -94,6 +94,42 @@ class TestRevisionNumber(test_db_base_plugin_v2.NeutronDbPluginV2TestCase):
             self.assertIn('No revision row found for',
                           mock_log.call_args[0][0])
 
+    @mock.patch.object(ovn_rn_db.LOG, 'warning')
+    def test_bump_revisions(self, mock_log):
+        res = self._create_network(fmt=self.fmt, name='net2',
+                                   admin_state_up=True)
+        net2 = self.deserialize(self.fmt, res)['network']
+        res = self._create_network(fmt=self.fmt, name='net3',
+                                   admin_state_up=True)
+        net3 = self.deserialize(self.fmt, res)['network']
+        with db_api.CONTEXT_WRITER.using(self.ctx):
+            self._create_initial_revision(self.net['id'],
+                                          ovn_const.TYPE_NETWORKS)
+            self._create_initial_revision(net2['id'], ovn_const.TYPE_NETWORKS,
+                                          revision_number=124)
+            self.net['revision_number'] = 123
+            net2['revision_number'] = 1
+            net3['revision_number'] = 5
+            ovn_rn_db.bump_revisions(
+                self.ctx, [(self.net, ovn_const.TYPE_NETWORKS),
+                           (net2, ovn_const.TYPE_NETWORKS),
+                           (net3, ovn_const.TYPE_NETWORKS)])
+            revision_numbers = [
+                ovn_rn_db.get_revision_row(self.ctx, net['id']).revision_number
+                for net in (self.net, net2, net3)]
+        # The older revision of net2 is not registered, the missing revision
+        # row of net3 is created
+        self.assertEqual([123, 124, 5], revision_numbers)
+        self.assertIn('No revision row found for', mock_log.call_args[0][0])
+
+    def test_bump_revisions_not_found(self):
+        self.assertRaises(
+            ovn_rn_db.StandardAttributeIDNotFound,
+            ovn_rn_db.bump_revisions, self.ctx,
+            [(self.net, ovn_const.TYPE_NETWORKS),
+             ({'id': 'fake-id', 'revision_number': 1},
+              ovn_const.TYPE_NETWORKS)])
+
     def test_delete_revision(self):
         with db_api.CONTEXT_WRITER.using(self.ctx):
             self._create_initial_revision(self.net['id'],
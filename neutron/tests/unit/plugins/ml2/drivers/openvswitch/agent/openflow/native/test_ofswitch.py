@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
 import time
 from unittest import mock
 
@@ -18,6 +19,7 @@ from os_ken.ofproto import ofproto_v1_3
 from os_ken.ofproto import ofproto_v1_3_parser
 from oslo_config import cfg
 
+from neutron.agent.common import ovs_lib
 from neutron.plugins.ml2.drivers.openvswitch.agent.openflow.native \
     import ofswitch
 from neutron.tests import base
@@ -148,3 +150,91 @@ class TestBundledOpenFlowBridge(base.BaseTestCase):
         args, kwargs = self.br.br._send_msg.call_args_list[1]
         self.assertEqual(ofproto_v1_3.ONF_BCT_COMMIT_REQUEST,
                          args[0].type)
+
+
+class TestBundleFlowMods(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.br = ofswitch.OpenFlowSwitchMixin(os_ken_app=mock.Mock())
+        self.br._get_dp = lambda: (mock.Mock(), ofproto_v1_3,
+                                   ofproto_v1_3_parser)
+        self.br._send_msg = mock.Mock()
+        self.br.default_cookie = self.br._default_cookie = 10
+
+    def test_bundle_flow_mods(self):
+        self.br._send_msg.side_effect = [
+            FakeReply(ofproto_v1_3.ONF_BCT_OPEN_REPLY), None, None,
+            FakeReply(ofproto_v1_3.ONF_BCT_COMMIT_REPLY), None]
+        with self.br.bundle_flow_mods(ordered=True):
+            self.br.install_goto(table_id=0, dest_table_id=1)
+            # Nested calls use the outer bundle
+            with self.br.bundle_flow_mods():
+                self.br.uninstall_flows(table_id=1)
+        self.br.install_drop(table_id=2)
+
+        calls = self.br._send_msg.call_args_list
+        self.assertEqual(5, len(calls))
+        self.assertEqual(ofproto_v1_3.ONF_BCT_OPEN_REQUEST,
+                         calls[0].args[0].type)
+        active_bundle = calls[1].kwargs['active_bundle']
+        self.assertEqual(ofproto_v1_3.ONF_BF_ORDERED,
+                         active_bundle['bundle_flags'])
+        self.assertEqual(active_bundle, calls[2].kwargs['active_bundle'])
+        self.assertEqual(ofproto_v1_3.ONF_BCT_COMMIT_REQUEST,
+                         calls[3].args[0].type)
+        self.assertIsNone(calls[4].kwargs['active_bundle'])
+        self.assertEqual(set(), self.br.active_bundles)
+
+    def test_bundle_flow_mods_other_thread(self):
+        self.br._send_msg.side_effect = [
+            FakeReply(ofproto_v1_3.ONF_BCT_OPEN_REPLY), None,
+            FakeReply(ofproto_v1_3.ONF_BCT_COMMIT_REPLY)]
+        with self.br.bundle_flow_mods():
+            thread = threading.Thread(target=self.br.install_drop,
+                                      kwargs={'table_id': 2})
+            thread.start()
+            thread.join()
+        self.assertIsNone(
+            self.br._send_msg.call_args_list[1].kwargs['active_bundle'])
+
+
+class TestFlowIndex(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.br = ofswitch.OpenFlowSwitchMixin(os_ken_app=mock.Mock())
+        self.br._get_dp = lambda: (mock.Mock(), ofproto_v1_3,
+                                   ofproto_v1_3_parser)
+        self.br._send_msg = mock.Mock()
+        self.br.default_cookie = self.br._default_cookie = 10
+        self.index = self.br.flow_index
+
+    def test_not_populated_ignores_updates(self):
+        self.br.install_goto(table_id=0, dest_table_id=1)
+        self.assertFalse(self.index.populated)
+        self.assertEqual(set(), self.index.cookies())
+
+    def test_install_and_uninstall(self):
+        self.index.populate([mock.Mock(cookie=20, table_id=3)])
+        self.br.install_goto(table_id=0, dest_table_id=1)
+        self.br.install_drop(table_id=1)
+        self.assertEqual({10, 20}, self.index.cookies())
+        self.assertEqual({0, 1}, self.index.tables(10))
+
+        # Deleting only some flows of a cookie does not change the index
+        self.br.uninstall_flows(table_id=0, in_port=1)
+        self.assertEqual({0, 1}, self.index.tables(10))
+
+        self.br.uninstall_flows(table_id=0)
+        self.assertEqual({1}, self.index.tables(10))
+        self.br.uninstall_flows(cookie=20, cookie_mask=(1 << 64) - 1)
+        self.assertEqual({10}, self.index.cookies())
+
+        self.br.uninstall_flows(cookie=ovs_lib.COOKIE_ANY)
+        self.assertTrue(self.index.populated)
+        self.assertEqual(set(), self.index.cookies())
+
+    def test_invalidate(self):
+        self.index.populate([mock.Mock(cookie=20, table_id=3)])
+        self.index.invalidate()
+        self.assertFalse(self.index.populated)
+        self.assertEqual(set(), self.index.tables(20))
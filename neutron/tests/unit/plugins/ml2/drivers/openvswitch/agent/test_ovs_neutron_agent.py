@@ -35,6 +35,7 @@ import testtools
 
 from neutron._i18n import _
 from neutron.agent.common import async_process
+from neutron.agent.common import base_polling
 from neutron.agent.common import ovs_lib
 from neutron.agent.common import polling
 from neutron.agent.common import utils
@@ -1071,6 +1072,53 @@ class TestOvsNeutronAgent:
             self.assertFalse(skip_devs)
             self.assertTrue(treat_vif_port.called)
 
+    def test_treat_devices_added_updated_sharded_by_network(self):
+        self.agent.port_processing_workers = 4
+        devices = []
+        for device, network_id in (('p1', 'net1'), ('p2', 'net2'),
+                                   ('p3', 'net1')):
+            devices.append({'admin_state_up': True,
+                            'port_id': device,
+                            'device': device,
+                            'network_id': network_id,
+                            'physical_network': 'foo',
+                            'segmentation_id': 'bar',
+                            'network_type': 'baz',
+                            'fixed_ips': [],
+                            'device_owner': DEVICE_OWNER_COMPUTE})
+        vifs = {d['device']: mock.Mock(ofport=1) for d in devices}
+        with mock.patch.object(self.agent.plugin_rpc,
+                               'get_devices_details_list_and_failed_devices',
+                               return_value={'devices': devices,
+                                             'failed_devices': []}),\
+                mock.patch.object(self.agent.int_br,
+                                  'get_vifs_by_ids',
+                                  return_value=vifs),\
+                mock.patch.object(self.agent.ext_manager,
+                                  'handle_port') as handle_port,\
+                mock.patch.object(self.agent, 'treat_vif_port',
+                                  return_value=True) as treat_vif_port:
+            skip_devs, _, need_bound_devices, _, _, _ = (
+                self.agent.treat_devices_added_or_updated([], False, set()))
+        self.assertFalse(skip_devs)
+        self.assertEqual(3, treat_vif_port.call_count)
+        self.assertEqual(3, handle_port.call_count)
+        self.assertCountEqual(['p1', 'p2', 'p3'],
+                              [d['device'] for d in need_bound_devices])
+        self.assertEqual({'p1', 'p3'},
+                         self.agent.network_ports['net1']['bar'])
+        self.assertEqual({'p2'}, self.agent.network_ports['net2']['bar'])
+
+    def test__shard_devices_by_network(self):
+        devices = [{'device': 'p1', 'network_id': 'net1'},
+                   {'device': 'p2', 'network_id': 'net2'},
+                   {'device': 'p3', 'network_id': 'net1'},
+                   {'device': 'p4'}]
+        shards = self.agent._shard_devices_by_network(devices)
+        self.assertEqual(
+            [['p1', 'p3'], ['p2'], ['p4']],
+            [[d['device'] for d in shard] for shard in shards])
+
     def _mock_treat_devices_removed(self, port_exists):
         details = dict(exists=port_exists)
         with mock.patch.object(self.agent.plugin_rpc,
@@ -1127,6 +1175,22 @@ class TestOvsNeutronAgent:
                 self.assertNotIn(device_id,
                                  rcache._cache_by_type_and_id['Port'])
 
+    def test_treat_devices_removed_cleans_port_state(self):
+        self.agent._update_port_network(
+            TEST_PORT_ID1, TEST_NETWORK_ID1, TEST_SEG_NET1_ID1)
+        with mock.patch.object(self.agent.plugin_rpc,
+                               'update_device_list',
+                               return_value={'devices_up': [],
+                                             'devices_down': [],
+                                             'failed_devices_up': [],
+                                             'failed_devices_down': []}),\
+                mock.patch.object(self.agent, 'port_unbound'):
+            self.agent.treat_devices_removed([TEST_PORT_ID1])
+        self.assertNotIn(TEST_PORT_ID1, self.agent.port_states)
+        self.assertEqual(
+            set(), self.agent.network_ports[
+                TEST_NETWORK_ID1][TEST_SEG_NET1_ID1])
+
     def test_treat_devices_removed_ext_delete_port(self):
         port_id = 'fake-id'
 
@@ -1973,14 +2037,34 @@ class TestOvsNeutronAgent:
                                                                FAKE_IP1)]}}}
         with mock.patch.object(self.agent, 'tun_br', autospec=True) as tun_br,\
                 mock.patch.object(self.agent,
-                                  '_setup_tunnel_port') as add_tun_fn:
+                                  '_setup_tunnel_ports') as add_tun_fn:
             self.agent.fdb_add(None, fdb_entry)
             add_tun_fn.assert_not_called()
             fdb_entry['net1']['ports']['10.10.10.10'] = [
                 l2pop_rpc.PortInfo(FAKE_MAC, FAKE_IP1)]
+            fdb_entry['net1']['ports']['10.10.10.11'] = [
+                l2pop_rpc.PortInfo(FAKE_MAC, FAKE_IP2)]
             self.agent.fdb_add(None, fdb_entry)
-            add_tun_fn.assert_called_with(
-                tun_br, 'gre-0a0a0a0a', '10.10.10.10', 'gre')
+            add_tun_fn.assert_called_once_with(
+                tun_br, {('gre', '10.10.10.10'), ('gre', '10.10.10.11')})
+            tun_br.bundle_flow_mods.assert_called_with(ordered=True)
+
+    def test_setup_tunnel_ports(self):
+        self.agent.tun_br_ofports = {'gre': {}}
+        self.agent.local_ip = '10.0.0.1'
+        with mock.patch.object(self.agent, 'tun_br', autospec=True) as tun_br:
+            tun_br.add_tunnel_ports.return_value = {
+                'gre-0a000002': 2, 'gre-0a000003': ovs_lib.INVALID_OFPORT}
+            self.agent._setup_tunnel_ports(
+                tun_br, {('gre', '10.0.0.2'), ('gre', '10.0.0.3'),
+                         ('gre', 'fe80::1')})
+        tun_br.add_tunnel_ports.assert_called_once_with(
+            {'gre-0a000002': ('10.0.0.2', 'gre'),
+             'gre-0a000003': ('10.0.0.3', 'gre')},
+            '10.0.0.1', self.agent.vxlan_udp_port, self.agent.dont_fragment,
+            self.agent.tunnel_csum, self.agent.tos)
+        self.assertEqual({'gre': {'10.0.0.2': 2}}, self.agent.tun_br_ofports)
+        tun_br.setup_tunnel_port.assert_called_once_with('gre', 2)
 
     def test_fdb_del_port(self):
         self._prepare_l2_pop_ofports()
@@ -2098,7 +2182,7 @@ class TestOvsNeutronAgent:
             rpc_stop.assert_called_once()
         mock_get_pm.assert_called_with(
             True, ovs_constants.DEFAULT_OVSDBMON_RESPAWN, bridge_names=[],
-            ovs=self.agent.ovs)
+            ovs=self.agent.ovs, ovsdb_monitor_backend='ovsdb-client')
         mock_loop.assert_called_once_with(polling_manager=mock.ANY)
         mock_idl_monitor.start_bridge_monitor.assert_called()
 
@@ -2436,6 +2520,18 @@ class TestOvsNeutronAgent:
                 pass
         install_ingress_direct_goto_flows.assert_called_once_with()
 
+    def test__handle_ovs_restart_restarts_idl_polling_manager(self):
+        polling_manager = mock.Mock(
+            spec=polling.IdlInterfacePollingMinimizer)
+        with mock.patch.object(self.agent, 'setup_integration_br'), \
+                mock.patch.object(self.agent,
+                                  'install_ingress_direct_goto_flows'), \
+                mock.patch.object(self.agent, 'setup_physical_bridges'):
+            self.agent._handle_ovs_restart(polling_manager)
+        # The restarted monitor reports all the current ports as added
+        polling_manager.stop.assert_called_once_with()
+        polling_manager.start.assert_called_once_with()
+
     def test_rpc_loop_fail_to_process_network_ports_keep_flows(self):
         with mock.patch.object(async_process.AsyncProcess, "_spawn"),\
                 mock.patch.object(async_process.AsyncProcess, "start"),\
@@ -2560,6 +2656,69 @@ class TestOvsNeutronAgent:
         # Assert that we have one value left in the hints
         self.assertEqual(1, len(self.agent._local_vlan_hints))
 
+    def _loop_count_and_wait(self, polling_manager, has_updates=(),
+                             backoff=False, iteration_time=0):
+        clock = [1000.0]
+
+        def _sleep(seconds):
+            clock[0] += seconds
+
+        self.agent.adaptive_polling = True
+        with mock.patch.object(time, 'time', side_effect=lambda: clock[0]),\
+                mock.patch.object(time, 'sleep',
+                                  side_effect=_sleep) as sleep,\
+                mock.patch.object(self.agent, '_agent_has_updates',
+                                  side_effect=has_updates):
+            start = clock[0]
+            clock[0] += iteration_time
+            self.agent.loop_count_and_wait(start, {}, polling_manager,
+                                           backoff=backoff)
+        return [sleep_call.args[0] for sleep_call in sleep.mock_calls]
+
+    def test_loop_count_and_wait_adaptive_pending_work(self):
+        sleeps = self._loop_count_and_wait(mock.Mock(),
+                                           has_updates=[False, True])
+        self.assertEqual([0.2, 0.2], sleeps)
+        self.assertEqual(1, self.agent.iter_num)
+
+    def test_loop_count_and_wait_adaptive_no_work(self):
+        sleeps = self._loop_count_and_wait(
+            mock.Mock(), has_updates=mock.Mock(return_value=False))
+        self.assertAlmostEqual(self.agent.polling_interval, sum(sleeps))
+
+    def test_loop_count_and_wait_adaptive_always_poll(self):
+        sleeps = self._loop_count_and_wait(base_polling.AlwaysPoll())
+        self.assertAlmostEqual(self.agent.polling_interval, sum(sleeps))
+
+    def test_loop_count_and_wait_adaptive_backoff(self):
+        self.agent.max_polling_backoff = 5
+        self.assertEqual([2], self._loop_count_and_wait(mock.Mock(),
+                                                        backoff=True))
+        self.assertEqual([4], self._loop_count_and_wait(mock.Mock(),
+                                                        backoff=True))
+        # Slow iteration
+        self.assertEqual([5], self._loop_count_and_wait(mock.Mock(),
+                                                        iteration_time=3))
+        self._loop_count_and_wait(
+            mock.Mock(), has_updates=mock.Mock(return_value=False))
+        self.assertEqual(0, self.agent.polling_backoff)
+
+    def test_loop_count_and_wait_publishes_iteration_stats(self):
+        with self.agent._iteration_phase(self.mod_agent.PHASE_SCAN):
+            pass
+        with mock.patch.object(self.mod_agent.registry, 'publish') as pub,\
+                mock.patch.object(time, 'sleep'):
+            self.agent.loop_count_and_wait(time.time(), {'regular': {}})
+        pub.assert_called_once_with(
+            self.mod_agent.RPC_LOOP_ITERATION,
+            self.mod_agent.callback_events.AFTER_UPDATE, self.agent,
+            payload=mock.ANY)
+        stats = pub.call_args.kwargs['payload'].latest_state
+        self.assertEqual(0, stats['iteration'])
+        self.assertEqual({'regular': {}}, stats['port_stats'])
+        self.assertEqual([self.mod_agent.PHASE_SCAN],
+                         list(stats['phases']))
+
     def test_set_rpc_timeout(self):
         with mock.patch.object(n_rpc.BackingOffClient,
                                'set_max_timeout') as smt:
@@ -3115,9 +3274,7 @@ class TestOvsNeutronAgentOSKen(TestOvsNeutronAgent,
             self.agent.iter_num = 3
             self.agent.cleanup_stale_flows()
 
-            dump_flows_expected = [
-                mock.call(tid) for tid in ovs_constants.INT_BR_ALL_TABLES]
-            dump_flows.assert_has_calls(dump_flows_expected)
+            dump_flows.assert_called_once_with()
 
             expected = [mock.call(table_id=2,
                                   cookie=17185,
@@ -3126,9 +3283,22 @@ class TestOvsNeutronAgentOSKen(TestOvsNeutronAgent,
                                   cookie=9029,
                                   cookie_mask=uint64_max)]
             uninstall_flows.assert_has_calls(expected, any_order=True)
-            self.assertEqual(
-                len(ovs_constants.INT_BR_ALL_TABLES) * len(expected),
-                len(uninstall_flows.mock_calls))
+            self.assertEqual(len(expected), len(uninstall_flows.mock_calls))
+
+    def test_cleanup_stale_flows_uses_flow_index(self):
+        uint64_max = (1 << 64) - 1
+        int_br = self.agent.int_br
+        int_br.set_agent_uuid_stamp(5678)
+        int_br.flow_index.populate([mock.Mock(cookie=1234, table_id=0),
+                                    mock.Mock(cookie=5678, table_id=0)])
+        int_br.flow_index.add(5678, 60)
+        with mock.patch.object(int_br, 'dump_flows') as dump_flows, \
+                mock.patch.object(int_br,
+                                  'uninstall_flows') as uninstall_flows:
+            self.agent.cleanup_stale_flows()
+            dump_flows.assert_not_called()
+            uninstall_flows.assert_called_once_with(
+                table_id=0, cookie=1234, cookie_mask=uint64_max)
 
 
 class AncillaryBridgesTest:
@@ -4555,6 +4725,51 @@ class TestOvsDvrNeutronAgent:
                 pass
         self.assertTrue(all(x.called for x in reset_mocks))
 
+    def test_treat_devices_added_updated_dvr_shards(self):
+        self._setup_for_dvr_test()
+        self.agent.port_processing_workers = 2
+        int_br = mock.create_autospec(self.agent.int_br)
+        int_br.db_get_val.return_value = {}
+        devices = []
+        vifs = {}
+        for device, network_id, seg_id in (('p1', 'net1', 1001),
+                                           ('p2', 'net2', 1002)):
+            self.agent.vlan_manager.add(network_id, seg_id - 1000,
+                                        n_const.TYPE_VXLAN, None, seg_id)
+            devices.append({'admin_state_up': True,
+                            'port_id': device,
+                            'device': device,
+                            'network_id': network_id,
+                            'physical_network': None,
+                            'segmentation_id': seg_id,
+                            'network_type': n_const.TYPE_VXLAN,
+                            'fixed_ips': self._compute_fixed_ips,
+                            'device_owner': DEVICE_OWNER_COMPUTE})
+            vifs[device] = mock.Mock(ofport=1, vif_id=device,
+                                     port_name=device)
+        int_br.get_vifs_by_ids.return_value = vifs
+        bound_ports = []
+
+        def bind_port_to_dvr(port, lvm, fixed_ips, device_owner):
+            # The shards bind their ports to DVR one at a time
+            self.assertTrue(self.agent._dvr_lock.locked())
+            bound_ports.append(port.vif_id)
+
+        executor_cls = self.mod_agent.futurist.ThreadPoolExecutor
+        with mock.patch.object(self.agent.plugin_rpc,
+                               'get_devices_details_list_and_failed_devices',
+                               return_value={'devices': devices,
+                                             'failed_devices': []}),\
+                mock.patch.object(self.agent, 'int_br', new=int_br),\
+                mock.patch.object(self.agent.dvr_agent, 'bind_port_to_dvr',
+                                  side_effect=bind_port_to_dvr),\
+                mock.patch.object(self.mod_agent.futurist,
+                                  'ThreadPoolExecutor',
+                                  wraps=executor_cls) as executor:
+            self.agent.treat_devices_added_or_updated([], False, set())
+        executor.assert_called_once_with(max_workers=2)
+        self.assertCountEqual(['p1', 'p2'], bound_ports)
+
     def test_rpc_loop_survives_error_in_check_canary_table(self):
         with mock.patch.object(self.agent.int_br,
                                'check_canary_table',
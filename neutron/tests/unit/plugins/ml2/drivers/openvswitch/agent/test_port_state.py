@@ -0,0 +1,58 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron.plugins.ml2.drivers.openvswitch.agent import port_state
+from neutron.tests import base
+
+
+class TestPortStateTable(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.table = port_state.PortStateTable()
+
+    def test_intern_id(self):
+        port_id = ''.join(['port', '-1'])
+        self.assertIs(port_state.intern_id('port-1'),
+                      port_state.intern_id(port_id))
+        self.assertIsNone(port_state.intern_id(None))
+        self.assertEqual(100, port_state.intern_id(100))
+
+    def test_port_state_slots(self):
+        state = port_state.PortState('port-1')
+        self.assertFalse(hasattr(state, '__dict__'))
+        self.assertRaises(AttributeError, setattr, state, 'foo', 'bar')
+
+    def test_update_network(self):
+        state = self.table.update_network(''.join(['port', '-1']),
+                                          'net-1', 100)
+        self.assertIs(port_state.intern_id('port-1'), state.port_id)
+        self.assertEqual(('net-1', 100),
+                         (state.network_id, state.segmentation_id))
+        self.assertIs(state, self.table.get('port-1'))
+        self.assertIn('port-1', self.table)
+        self.assertEqual({'port-1'}, self.table.network_ports['net-1'][100])
+
+    def test_update_network_moves_port(self):
+        self.table.update_network('port-1', 'net-1', 100)
+        self.table.update_network('port-2', 'net-1', 100)
+        self.table.update_network('port-1', 'net-2', 200)
+        self.assertEqual(2, len(self.table))
+        self.assertEqual({'port-2'}, self.table.network_ports['net-1'][100])
+        self.assertEqual({'port-1'}, self.table.network_ports['net-2'][200])
+
+    def test_remove(self):
+        state = self.table.update_network('port-1', 'net-1', 100)
+        self.assertIs(state, self.table.remove('port-1'))
+        self.assertNotIn('port-1', self.table)
+        self.assertEqual(set(), self.table.network_ports['net-1'][100])
+        self.assertIsNone(self.table.remove('port-1'))
+        self.assertEqual([], list(self.table))
@@ -1017,3 +1017,29 @@ class TestSBImplIdlOvnGetChassisByCardSerialFromCMSOptions(
             'fake-smartnic-dpu-chassis.fqdn',
             self.sb_ovn_idl.get_chassis_by_card_serial_from_cms_options(
                 'fake-serial').hostname)
+
+
+class TestOvnNbTransaction(base.BaseTestCase):
+
+    def _create_transaction(self, bump_nb_cfg=False):
+        api = mock.Mock()
+        return impl_idl_ovn.OvnNbTransaction(
+            api, mock.Mock(), timeout=10, bump_nb_cfg=bump_nb_cfg)
+
+    def test_commit_coalesced(self):
+        txn = self._create_transaction()
+        self.assertEqual(txn.api.txn_coalescer.commit.return_value,
+                         txn.commit())
+        txn.api.txn_coalescer.commit.assert_called_once_with(txn)
+
+    @mock.patch.object(impl_idl_ovn.idl_trans.Transaction, 'commit')
+    def test_commit_bump_nb_cfg_not_coalesced(self, mock_commit):
+        txn = self._create_transaction(bump_nb_cfg=True)
+        self.assertEqual(mock_commit.return_value, txn.commit())
+        txn.api.txn_coalescer.commit.assert_not_called()
+
+    @mock.patch.object(impl_idl_ovn.idl_trans.Transaction, 'commit')
+    def test_commit_no_coalescer(self, mock_commit):
+        txn = self._create_transaction()
+        txn.api.txn_coalescer = None
+        self.assertEqual(mock_commit.return_value, txn.commit())
@@ -164,7 +164,114 @@ class TestDBInconsistenciesPeriodics(testlib_api.SqlTestCaseLight,
         fake_row = mock.Mock(resource_type=constants.TYPE_NETWORKS)
         mock_get_incon_res.return_value = [fake_row, ]
         self.periodic.check_for_inconsistencies()
-        mock_fix_net.assert_called_once_with(mock.ANY, fake_row)
+        mock_fix_net.assert_called_once_with(mock.ANY, fake_row,
+                                             n_objs=mock.ANY, bumps=mock.ANY)
+
+    @staticmethod
+    def _make_rows(resource_type, resource_uuids):
+        return [mock.Mock(resource_type=resource_type, resource_uuid=uuid)
+                for uuid in resource_uuids]
+
+    @mock.patch.object(maintenance.DBInconsistenciesPeriodics,
+                       '_fix_create_update_batch', return_value=0)
+    @mock.patch.object(ovn_revision_numbers_db, 'get_deleted_resources',
+                       return_value=[])
+    @mock.patch.object(ovn_revision_numbers_db, 'get_inconsistent_resources')
+    def test_check_for_inconsistencies_max_per_run(
+            self, mock_get_incon_res, mock_get_deleted, mock_fix_batch):
+        cfg.CONF.set_override('inconsistencies_max_per_run', 2, group='ovn')
+        rows = self._make_rows(constants.TYPE_NETWORKS, ['c', 'a', 'b'])
+        mock_get_incon_res.return_value = rows
+        self.periodic.check_for_inconsistencies()
+        mock_fix_batch.assert_called_once_with([rows[1], rows[2]])
+
+        # The next run resumes after the last resource fixed
+        mock_fix_batch.reset_mock()
+        self.periodic.check_for_inconsistencies()
+        mock_fix_batch.assert_called_once_with([rows[0], rows[1]])
+
+        # The marker is dropped once all the resources of a type are fixed
+        cfg.CONF.set_override('inconsistencies_max_per_run', 0, group='ovn')
+        mock_fix_batch.reset_mock()
+        self.periodic.check_for_inconsistencies()
+        mock_fix_batch.assert_called_once_with([rows[2], rows[0], rows[1]])
+        self.assertEqual({}, self.periodic._resume_markers)
+
+    @mock.patch.object(maintenance.DBInconsistenciesPeriodics,
+                       '_fix_create_update_batch', return_value=0)
+    def test__fix_inconsistencies_concurrent(self, mock_fix_batch):
+        cfg.CONF.set_override('inconsistencies_batch_size', 2, group='ovn')
+        cfg.CONF.set_override('inconsistencies_fix_workers', 2, group='ovn')
+        rows = self._make_rows(constants.TYPE_NETWORKS, ['a', 'b', 'c'])
+        progress = maintenance._FixProgress(len(rows))
+        self.periodic._fix_inconsistencies(
+            maintenance.INCONSISTENCY_TYPE_CREATE_UPDATE, rows,
+            self.periodic._fix_create_update_batch, progress)
+        mock_fix_batch.assert_has_calls(
+            [mock.call(rows[:2]), mock.call(rows[2:])], any_order=True)
+        self.assertEqual(3, progress.processed)
+        self.assertEqual(0, progress.failed)
+
+    @mock.patch.object(ovn_revision_numbers_db, 'bump_revisions')
+    def test__fix_create_update_batch(self, mock_bump_revisions):
+        rows = self._make_rows(constants.TYPE_NETWORKS,
+                               ['net-1', 'net-2', 'net-3'])
+        nets = [{'id': 'net-1', 'revision_number': 2},
+                {'id': 'net-2', 'revision_number': 3}]
+        self.fake_ovn_client._plugin.get_networks.return_value = nets
+        self.fake_ovn_client._nb_idl.get_lswitch.return_value = mock.Mock(
+            external_ids={constants.OVN_REV_NUM_EXT_ID_KEY: '2'})
+
+        self.assertEqual(0, self.periodic._fix_create_update_batch(rows))
+        self.fake_ovn_client._plugin.get_networks.assert_called_once_with(
+            mock.ANY, filters={'id': ['net-1', 'net-2', 'net-3']})
+        self.fake_ovn_client._plugin.get_network.assert_not_called()
+        # net-2 is updated, the revision number of net-1 is just bumped and
+        # net-3 does not exist anymore
+        self.fake_ovn_client.update_network.assert_called_once_with(
+            mock.ANY, nets[1])
+        mock_bump_revisions.assert_called_once_with(
+            mock.ANY, [(nets[0], constants.TYPE_NETWORKS)])
+
+    def test__fix_create_update_batch_missing_ports(self):
+        rows = self._make_rows(constants.TYPE_PORTS, ['port-1', 'port-2'])
+        ports = [{'id': 'port-1', 'revision_number': 2},
+                 {'id': 'port-2', 'revision_number': 3}]
+        self.fake_ovn_client._plugin.get_ports.return_value = ports
+        self.fake_ovn_client._nb_idl.get_lswitch_port.return_value = None
+
+        self.assertEqual(0, self.periodic._fix_create_update_batch(rows))
+        self.fake_ovn_client.create_ports.assert_called_once_with(
+            mock.ANY, mock.ANY)
+        self.assertCountEqual(
+            ports, self.fake_ovn_client.create_ports.call_args[0][1])
+        self.fake_ovn_client.create_port.assert_not_called()
+
+    def test__fix_create_update_batch_missing_ports_failed(self):
+        rows = self._make_rows(constants.TYPE_PORTS, ['port-1', 'port-2'])
+        ports = [{'id': 'port-1', 'revision_number': 2},
+                 {'id': 'port-2', 'revision_number': 3}]
+        self.fake_ovn_client._plugin.get_ports.return_value = ports
+        self.fake_ovn_client._nb_idl.get_lswitch_port.return_value = None
+        self.fake_ovn_client.create_ports.side_effect = RuntimeError
+        self.fake_ovn_client.create_port.side_effect = [None, RuntimeError]
+
+        # The ports are created one by one, one of them fails
+        self.assertEqual(1, self.periodic._fix_create_update_batch(rows))
+        self.fake_ovn_client.create_port.assert_has_calls(
+            [mock.call(mock.ANY, port) for port in ports])
+
+    @mock.patch.object(ovn_revision_numbers_db, 'delete_revisions')
+    def test__fix_delete_batch(self, mock_delete_revisions):
+        rows = self._make_rows(constants.TYPE_NETWORKS, ['net-1', 'net-2'])
+        self.fake_ovn_client._nb_idl.get_lswitch.side_effect = [
+            None, mock.Mock(), mock.Mock()]
+
+        self.assertEqual(0, self.periodic._fix_delete_batch(rows))
+        mock_delete_revisions.assert_called_once_with(
+            mock.ANY, ['net-1'], constants.TYPE_NETWORKS)
+        self.fake_ovn_client.delete_network.assert_called_once_with(
+            mock.ANY, 'net-2')
 
     def _test_fix_create_update_network(self, ovn_rev, neutron_rev):
         with db_api.CONTEXT_WRITER.using(self.ctx):
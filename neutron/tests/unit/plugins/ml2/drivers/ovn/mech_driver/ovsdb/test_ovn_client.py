@@ -23,6 +23,7 @@ from neutron_lib.services.trunk import constants as trunk_const
 from oslo_config import cfg
 
 from neutron.common.ovn import constants
+from neutron.common.ovn import utils
 from neutron.conf.plugins.ml2 import config as ml2_conf
 from neutron.conf.plugins.ml2.drivers.ovn import ovn_conf
 from neutron.plugins.ml2 import db as ml2_db
@@ -391,6 +392,47 @@ class TestOVNClient(TestOVNClientBase):
                 ctx, 'fake-id')
         self.assertEqual([const.IPv4_ANY], cidrs)
 
+    @mock.patch.object(ovn_client.db_rev, 'bump_revisions')
+    @mock.patch.object(ovn_client.utils, 'ovs_persist_uuid_supported',
+                       return_value=True)
+    def test_create_ports(self, mock_persist_uuid, mock_bump_revisions):
+        plugin = mock.MagicMock()
+        self.get_plugin.return_value = plugin
+        plugin.get_subnets.return_value = [{'id': 'subnet-1'}]
+        ports = [{'id': 'port-%d' % i, 'network_id': 'net-1',
+                  'device_owner': '', 'fixed_ips': [
+                      {'subnet_id': 'subnet-1',
+                       'ip_address': '10.0.0.%d' % i}],
+                  'security_groups': ['sg-1']} for i in range(3)]
+        # A port ignored by OVN is not created
+        ports.append({'id': 'ignored-port', 'network_id': 'net-1',
+                      'device_owner': const.DEVICE_OWNER_FLOATINGIP})
+        port_info = mock.Mock(port_security=['fake-mac'])
+        port_cmds = [mock.Mock() for _ in range(3)]
+        with mock.patch.object(
+                self.ovn_client, 'get_external_ids_from_port',
+                return_value=(port_info, {})) as mock_ext_ids, \
+                mock.patch.object(self.ovn_client, '_add_create_lswitch_port',
+                                  side_effect=port_cmds), \
+                mock.patch.object(self.ovn_client,
+                                  '_add_create_port_extras'):
+            self.ovn_client.create_ports(mock.Mock(), ports)
+
+        plugin.get_subnets.assert_called_once_with(
+            mock.ANY, filters={'id': ['subnet-1']})
+        mock_ext_ids.assert_has_calls(
+            [mock.call(mock.ANY, port,
+                       subnets_cache={'subnet-1': {'id': 'subnet-1'}})
+             for port in ports[:3]])
+        self.nb_idl.transaction.assert_called_once_with(check_error=True)
+        # One command per Port Group, adding all the ports
+        self.assertEqual(
+            [mock.call(constants.OVN_DROP_PORT_GROUP_NAME, port_cmds),
+             mock.call(utils.ovn_port_group_name('sg-1'), port_cmds)],
+            self.nb_idl.pg_add_ports.call_args_list)
+        mock_bump_revisions.assert_called_once_with(
+            mock.ANY, [(port, constants.TYPE_PORTS) for port in ports[:3]])
+
 
 class TestOVNClientFairMeter(TestOVNClientBase,
                              test_log_driver.TestOVNDriverBase):
@@ -16,8 +16,10 @@ import collections
 from unittest import mock
 
 from neutron_lib import constants as const
+from neutron_lib import context
 from neutron_lib.ovn import constants as n_lib_ovn_const
 from neutron_lib.services.logapi import constants as log_const
+from oslo_config import cfg
 from oslo_utils import uuidutils
 
 from neutron.common.ovn import acl
@@ -483,10 +485,13 @@ class TestOvnNbSyncML2(test_mech_driver.OVNMechanismDriverTestCase):
                 # if caller specified a filter could lead to failed tests,
                 # for example, it will not filter out non-metadata ports.
                 filters = kwargs.get('filters')
-                if not filters:
-                    return self.ports
-                ports = [port for port in self.ports if
-                         all(port[k] in v for k, v in filters.items())]
+                ports = self.ports
+                if filters:
+                    ports = [port for port in self.ports if
+                             all(port[k] in v for k, v in filters.items())]
+                # The ports are walked by pages, sorted by ID
+                if kwargs.get('sorts'):
+                    ports = sorted(ports, key=lambda port: port['id'])
                 return ports
 
             return wrapper
@@ -508,6 +513,17 @@ class TestOvnNbSyncML2(test_mech_driver.OVNMechanismDriverTestCase):
 
         core_plugin.get_ports = mock.Mock()
         core_plugin.get_ports.side_effect = get_ports()
+        core_plugin.get_ports_count = mock.Mock(return_value=len(self.ports))
+
+        def get_next_port_ids(ctx, last_id, limit):
+            port_ids = sorted(port['id'] for port in self.ports
+                              if last_id is None or port['id'] > last_id)
+            return port_ids[:limit]
+
+        mock.patch.object(ovn_nb_synchronizer, '_get_next_port_ids',
+                          side_effect=get_next_port_ids).start()
+        # No port is created in OVN NB DB while the ports are walked
+        ovn_api.lookup = mock.Mock(return_value=None)
         mock.patch.object(acl, '_get_subnet_from_cache',
                           return_value=self.subnet).start()
         mock.patch.object(acl, 'acl_remote_group_id',
@@ -611,7 +627,8 @@ class TestOvnNbSyncML2(test_mech_driver.OVNMechanismDriverTestCase):
         ovn_driver.validate_and_get_data_from_binding_profile = mock.Mock()
         ovn_nb_synchronizer._ovn_client.create_port = mock.Mock()
         ovn_nb_synchronizer._ovn_client.create_port.return_value = mock.ANY
-        ovn_nb_synchronizer._ovn_client.create_metadata_port = mock.Mock()
+        ovn_nb_synchronizer._ovn_client.create_metadata_port = mock.Mock(
+            side_effect=lambda ctx, net: {'id': 'metadata-%s' % net['id']})
         ovn_nb_synchronizer._ovn_client.create_provnet_port = mock.Mock()
         ovn_api.ls_del = mock.Mock()
         ovn_api.delete_lswitch_port = mock.Mock()
@@ -759,13 +776,16 @@ class TestOvnNbSyncML2(test_mech_driver.OVNMechanismDriverTestCase):
         ovn_nb_synchronizer._ovn_client.create_metadata_port.assert_has_calls(
             create_metadata_calls, any_order=True)
 
-        self.assertEqual(
-            len(create_port_list),
-            ovn_nb_synchronizer._ovn_client.create_port.call_count)
-        create_port_calls = [mock.call(mock.ANY, port)
-                             for port in create_port_list]
-        ovn_nb_synchronizer._ovn_client.create_port.assert_has_calls(
-            create_port_calls, any_order=True)
+        # The missing ports are created by pages, with a fallback to
+        # create_port
+        created_ports = [
+            port for call in
+            ovn_nb_synchronizer._ovn_client.create_ports.call_args_list
+            for port in call[0][1]]
+        created_ports.extend(
+            call[0][1] for call in
+            ovn_nb_synchronizer._ovn_client.create_port.call_args_list)
+        self.assertCountEqual(create_port_list, created_ports)
 
         create_provnet_port_calls = [
             mock.call(
@@ -1406,6 +1426,177 @@ class TestIsRouterPortChanged(test_mech_driver.OVNMechanismDriverTestCase):
             self.db_router_port, self.lrport_nets))
 
 
+class TestOvnNbSyncPorts(test_mech_driver.OVNMechanismDriverTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cfg.CONF.set_override('neutron_sync_batch_size', 2, group='ovn')
+        self.ovn_nb_synchronizer = ovn_db_sync.OvnNbSynchronizer(
+            self.plugin, self.mech_driver,
+            n_lib_ovn_const.OVN_DB_SYNC_MODE_REPAIR)
+        self.ovn_nb_synchronizer._ovn_client = mock.Mock()
+        self.ports = [{'id': 'p%d' % i, 'network_id': 'n1',
+                       'device_owner': 'compute:nova'} for i in range(1, 6)]
+        # p3 is a floating IP port, which is not created in OVN
+        self.ports[2]['device_owner'] = const.DEVICE_OWNER_FLOATINGIP
+        self.mock_get_ports = mock.patch.object(
+            self.plugin, 'get_ports', side_effect=self._get_ports).start()
+        mock.patch.object(self.plugin, 'get_ports_count',
+                          return_value=len(self.ports)).start()
+        mock.patch.object(self.ovn_nb_synchronizer, '_get_next_port_ids',
+                          side_effect=self._get_next_port_ids).start()
+        self.ovn_nb_synchronizer.ovn_nb_api.lookup = mock.Mock(
+            return_value=None)
+        self.dhcp_options = {'subnets': {}, 'ports_v4': {}, 'ports_v6': {}}
+
+    def _get_next_port_ids(self, context, last_id, limit):
+        return [port['id'] for port in self.ports
+                if last_id is None or port['id'] > last_id][:limit]
+
+    def _get_ports(self, context, filters=None, sorts=None):
+        return [port for port in self.ports if port['id'] in filters['id']]
+
+    def test__get_ports_by_pages(self):
+        pages = list(self.ovn_nb_synchronizer._get_ports_by_pages(
+            mock.ANY, 2))
+
+        self.assertEqual([self.ports[0:2], self.ports[2:4], self.ports[4:]],
+                         pages)
+        self.mock_get_ports.assert_has_calls([
+            mock.call(mock.ANY, filters={'id': ['p1', 'p2']},
+                      sorts=[('id', True)]),
+            mock.call(mock.ANY, filters={'id': ['p3', 'p4']},
+                      sorts=[('id', True)]),
+            mock.call(mock.ANY, filters={'id': ['p5']},
+                      sorts=[('id', True)])])
+
+    def test__get_ports_by_pages_last_port_deleted(self):
+        pages = []
+        for ports in self.ovn_nb_synchronizer._get_ports_by_pages(
+                mock.ANY, 2):
+            pages.append(ports)
+            if len(pages) == 1:
+                # The last port of the first page is deleted, and p3 is
+                # deleted after its ID has been read
+                self.ports.remove(ports[-1])
+                self.mock_get_ports.side_effect = (
+                    lambda context, filters=None, sorts=None: [
+                        port for port in self._get_ports(
+                            context, filters=filters, sorts=sorts)
+                        if port['id'] != 'p3'])
+
+        self.assertEqual(
+            [['p1', 'p2'], ['p4'], ['p5']],
+            [[port['id'] for port in ports] for ports in pages])
+
+    def test__sync_ports(self):
+        ovn_ports = [('p0', 'neutron-n1'), ('p1', 'neutron-n1'),
+                     ('p3', 'neutron-n1'), ('p4', 'neutron-n1'),
+                     ('p6', 'neutron-n1'), ('p7', 'neutron-n1')]
+        # p5 and p7 have been synced by the metadata port sync
+        synced_port_ids = {'p5', 'p7'}
+        deleted = []
+        with mock.patch.object(
+                self.ovn_nb_synchronizer, '_delete_lports_from_ovn',
+                side_effect=lambda lports, opts: deleted.append(
+                    list(lports))), \
+                mock.patch.object(self.ovn_nb_synchronizer,
+                                  '_sync_port_dhcp_options') as mock_dhcp:
+            self.ovn_nb_synchronizer._sync_ports(
+                mock.ANY, ovn_ports, synced_port_ids, self.dhcp_options)
+
+        # The stale Logical_Switch_Ports are deleted by batches of at most
+        # [ovn] neutron_sync_batch_size ports
+        self.assertEqual([[('p0', 'neutron-n1'), ('p3', 'neutron-n1')],
+                          [('p6', 'neutron-n1')]], deleted)
+        self.ovn_nb_synchronizer._ovn_client.create_ports.\
+            assert_called_once_with(mock.ANY, [self.ports[1]])
+        mock_dhcp.assert_has_calls([
+            mock.call([self.ports[0]], {}, {}),
+            mock.call([self.ports[3]], {}, {}),
+            mock.call([], {}, {})])
+
+    def test__sync_ports_lsp_created_during_the_walk(self):
+        # The Logical_Switch_Port of p2 is created after ovn_ports is read
+        self.ovn_nb_synchronizer.ovn_nb_api.lookup.side_effect = (
+            lambda table, name, default=None:
+            mock.Mock() if name == 'p2' else default)
+        with mock.patch.object(
+                self.ovn_nb_synchronizer,
+                '_create_ports_in_ovn') as mock_create, \
+                mock.patch.object(self.ovn_nb_synchronizer,
+                                  '_sync_port_dhcp_options'):
+            self.ovn_nb_synchronizer._sync_ports(
+                mock.ANY, [], set(), self.dhcp_options)
+
+        mock_create.assert_has_calls([
+            mock.call(mock.ANY, [self.ports[0]], self.dhcp_options),
+            mock.call(mock.ANY, [self.ports[3]], self.dhcp_options),
+            mock.call(mock.ANY, [self.ports[4]], self.dhcp_options)])
+
+    def test__create_ports_in_ovn_bulk_failure(self):
+        ovn_client = self.ovn_nb_synchronizer._ovn_client
+        ovn_client.create_ports.side_effect = RuntimeError
+        with mock.patch.object(
+                self.ovn_nb_synchronizer, '_create_port_in_ovn',
+                side_effect=[None, RuntimeError]) as mock_create:
+            self.ovn_nb_synchronizer._create_ports_in_ovn(
+                mock.ANY, self.ports[:2], self.dhcp_options)
+
+        ovn_client.create_ports.assert_called_once_with(
+            mock.ANY, self.ports[:2])
+        mock_create.assert_has_calls([mock.call(mock.ANY, self.ports[0]),
+                                      mock.call(mock.ANY, self.ports[1])])
+
+    def test__create_ports_in_ovn_log_mode(self):
+        self.ovn_nb_synchronizer.mode = n_lib_ovn_const.OVN_DB_SYNC_MODE_LOG
+        self.ovn_nb_synchronizer._create_ports_in_ovn(
+            mock.ANY, self.ports[:2], self.dhcp_options)
+        self.ovn_nb_synchronizer._ovn_client.create_ports.assert_not_called()
+
+
+class TestOvnNbSyncPortIds(test_mech_driver.OVNMechanismDriverTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ctx = context.get_admin_context()
+        self.ovn_nb_synchronizer = ovn_db_sync.OvnNbSynchronizer(
+            self.plugin, self.mech_driver,
+            n_lib_ovn_const.OVN_DB_SYNC_MODE_LOG)
+        with self.network() as net:
+            for _ in range(5):
+                self._make_port(self.fmt, net['network']['id'])
+        self.port_ids = sorted(port['id'] for port in
+                               self.plugin.get_ports(self.ctx))
+        self.assertEqual(5, len(self.port_ids))
+
+    def test__get_next_port_ids(self):
+        get_next_port_ids = self.ovn_nb_synchronizer._get_next_port_ids
+        self.assertEqual(self.port_ids[:2],
+                         get_next_port_ids(self.ctx, None, 2))
+        self.assertEqual(self.port_ids[2:4],
+                         get_next_port_ids(self.ctx, self.port_ids[1], 2))
+        self.assertEqual(self.port_ids[4:],
+                         get_next_port_ids(self.ctx, self.port_ids[3], 2))
+        self.assertEqual(
+            [], get_next_port_ids(self.ctx, self.port_ids[-1], 2))
+
+    def test__get_next_port_ids_last_port_deleted(self):
+        self._delete('ports', self.port_ids[1])
+        self.assertEqual(
+            self.port_ids[2:4],
+            self.ovn_nb_synchronizer._get_next_port_ids(
+                self.ctx, self.port_ids[1], 2))
+
+    def test__get_ports_by_pages(self):
+        pages = list(self.ovn_nb_synchronizer._get_ports_by_pages(
+            self.ctx, 2))
+
+        self.assertEqual(
+            [self.port_ids[0:2], self.port_ids[2:4], self.port_ids[4:]],
+            [[port['id'] for port in ports] for ports in pages])
+
+
 class TestOvnSbSyncML2(test_mech_driver.OVNMechanismDriverTestCase):
 
     def test_ovn_sb_sync(self):
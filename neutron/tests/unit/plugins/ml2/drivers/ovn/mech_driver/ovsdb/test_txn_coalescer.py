@@ -0,0 +1,107 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+from unittest import mock
+
+from ovsdbapp import exceptions as ovsdbapp_exc
+
+from neutron.plugins.ml2.drivers.ovn.mech_driver.ovsdb import txn_coalescer
+from neutron.tests import base
+
+
+class TestTransactionCoalescer(base.BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api = mock.Mock()
+        # A window long enough for the tests to fill the batches
+        self.coalescer = txn_coalescer.TransactionCoalescer(
+            self.api, window=60, max_commands=4)
+        self.mock_txn_cls = mock.patch.object(
+            txn_coalescer.idl_trans, 'Transaction').start()
+        self.merged = self.mock_txn_cls.return_value
+        self.merged.commands = []
+
+    @staticmethod
+    def _create_transaction(num_commands):
+        txn = mock.Mock(timeout=10)
+        txn.commands = [mock.Mock() for _ in range(num_commands)]
+        return txn
+
+    def _commit_concurrently(self, leader_txn, txn):
+        """Commits leader_txn in a thread, then txn once it waits"""
+        results = {}
+
+        def _commit():
+            try:
+                results['leader'] = self.coalescer.commit(leader_txn)
+            except Exception as e:
+                results['leader'] = e
+
+        leader = threading.Thread(target=_commit)
+        leader.start()
+        while self.coalescer._batch is None:
+            leader.join(0.01)
+        try:
+            results['follower'] = self.coalescer.commit(txn)
+        except Exception as e:
+            results['follower'] = e
+        leader.join()
+        return results['leader'], results['follower']
+
+    def test_commit_no_commands(self):
+        txn = self._create_transaction(0)
+        self.assertEqual(txn.commit_uncoalesced.return_value,
+                         self.coalescer.commit(txn))
+        self.assertIsNone(self.coalescer._batch)
+
+    def test_commit_single_transaction(self):
+        txn = self._create_transaction(4)
+        self.assertEqual(txn.commit_uncoalesced.return_value,
+                         self.coalescer.commit(txn))
+        self.mock_txn_cls.assert_not_called()
+
+    def test_commit_coalesced(self):
+        txn1 = self._create_transaction(2)
+        txn2 = self._create_transaction(2)
+        self.merged.commit.return_value = ['r1', 'r2', 'r3', 'r4']
+        self.assertEqual((['r1', 'r2'], ['r3', 'r4']),
+                         self._commit_concurrently(txn1, txn2))
+        self.assertEqual(txn1.commands + txn2.commands, self.merged.commands)
+        self.mock_txn_cls.assert_called_once_with(
+            self.api, self.api.ovsdb_connection, 10, check_error=True,
+            log_errors=False)
+        txn1.commit_uncoalesced.assert_not_called()
+        txn2.commit_uncoalesced.assert_not_called()
+
+    def test_commit_coalesced_failed(self):
+        txn1 = self._create_transaction(2)
+        txn2 = self._create_transaction(2)
+        txn2.commit_uncoalesced.side_effect = RuntimeError()
+        self.merged.commit.side_effect = RuntimeError()
+        leader_result, follower_result = self._commit_concurrently(txn1,
+                                                                   txn2)
+        # Each caller gets the result of its own transaction
+        self.assertEqual(txn1.commit_uncoalesced.return_value, leader_result)
+        self.assertIsInstance(follower_result, RuntimeError)
+
+    def test_commit_coalesced_timeout(self):
+        txn1 = self._create_transaction(2)
+        txn2 = self._create_transaction(2)
+        error = ovsdbapp_exc.TimeoutException(commands=[], timeout=10,
+                                              cause='Result queue is empty')
+        self.merged.commit.side_effect = error
+        self.assertEqual((error, error),
+                         self._commit_concurrently(txn1, txn2))
+        txn1.commit_uncoalesced.assert_not_called()
+        txn2.commit_uncoalesced.assert_not_called()
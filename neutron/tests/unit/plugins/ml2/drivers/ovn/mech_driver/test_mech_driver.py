@@ -2446,6 +2446,26 @@ class TestOVNMechanismDriver(TestOVNMechanismDriverBase):
         mock_create_port.assert_called_once_with(mock.ANY, passed_fake_port)
         mock_notify_dhcp.assert_called_once_with(mock.ANY, fake_port['id'])
 
+    @mock.patch.object(mech_driver.OVNMechanismDriver, '_notify_dhcp_updated')
+    @mock.patch.object(ovn_client.OVNClient, 'create_ports')
+    def test_create_port_bulk_postcommit(self, mock_create_ports,
+                                         mock_notify_dhcp):
+        fake_ports = [fakes.FakePort.create_one_port(
+            attrs={'status': const.PORT_STATUS_DOWN}).info()
+            for _ in range(2)]
+        fake_ctxs = [mock.Mock(current=port) for port in fake_ports]
+        self.mech_driver.create_port_bulk_postcommit(fake_ctxs)
+        passed_fake_ports = []
+        for fake_port, fake_ctx in zip(fake_ports, fake_ctxs):
+            passed_fake_port = copy.deepcopy(fake_port)
+            passed_fake_port['network'] = fake_ctx.network.current
+            passed_fake_ports.append(passed_fake_port)
+        mock_create_ports.assert_called_once_with(
+            fake_ctxs[0].plugin_context, passed_fake_ports)
+        mock_notify_dhcp.assert_has_calls(
+            [mock.call(fake_ctxs[0].plugin_context, port['id'])
+             for port in fake_ports])
+
     @mock.patch.object(mech_driver.OVNMechanismDriver,
                        '_is_port_provisioning_required', lambda *_: True)
     @mock.patch.object(mech_driver.OVNMechanismDriver, '_notify_dhcp_updated')
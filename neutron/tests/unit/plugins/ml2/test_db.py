@@ -280,6 +280,18 @@ class Ml2DBTestCase(testlib_api.SqlTestCase):
         port = ml2_db.get_port(self.ctx, port_id)
         self.assertIsNone(port)
 
+    def test_partial_port_ids_to_full_ids(self):
+        network_id = uuidutils.generate_uuid()
+        port_id_1 = uuidutils.generate_uuid()
+        port_id_2 = uuidutils.generate_uuid()
+        self._setup_neutron_network(network_id)
+        self._setup_neutron_port(network_id, port_id_1)
+        self._setup_neutron_port(network_id, port_id_2)
+        result = ml2_db.partial_port_ids_to_full_ids(
+            self.ctx, [port_id_1, port_id_2[:11], 'no_exist_device'])
+        self.assertEqual({port_id_1: port_id_1, port_id_2[:11]: port_id_2},
+                         result)
+
     def test_generating_multiple_mac_addresses(self):
         mac_regex = "^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$"
 
@@ -481,6 +493,33 @@ class Ml2DvrDBTestCase(testlib_api.SqlTestCase):
             self.ctx, 'foo_port_id', 'foo_host_id')
         self.assertIsNone(port)
 
+    def test_get_distributed_port_bindings_by_host(self):
+        network_id = uuidutils.generate_uuid()
+        port_id_1 = uuidutils.generate_uuid()
+        port_id_2 = uuidutils.generate_uuid()
+        port_id_3 = uuidutils.generate_uuid()
+        self._setup_neutron_network(network_id,
+                                    [port_id_1, port_id_2, port_id_3])
+        router = self._setup_neutron_router()
+        self._setup_distributed_binding(
+            network_id, port_id_1, router.id, 'foo_host_id_1')
+        self._setup_distributed_binding(
+            network_id, port_id_2, router.id, 'foo_host_id_1')
+        self._setup_distributed_binding(
+            network_id, port_id_2, router.id, 'foo_host_id_2')
+        self._setup_distributed_binding(
+            network_id, port_id_3, router.id, 'foo_host_id_2')
+        bindings = ml2_db.get_distributed_port_bindings_by_host(
+            self.ctx, [port_id_1, port_id_2, port_id_3], 'foo_host_id_1')
+        self.assertEqual({port_id_1, port_id_2}, set(bindings))
+        for port_id, binding in bindings.items():
+            self.assertEqual(port_id, binding.port_id)
+            self.assertEqual('foo_host_id_1', binding.host)
+
+    def test_get_distributed_port_bindings_by_host_no_ports(self):
+        self.assertEqual({}, ml2_db.get_distributed_port_bindings_by_host(
+            self.ctx, [], 'foo_host_id'))
+
     def test_get_distributed_port_bindings_not_found(self):
         port = ml2_db.get_distributed_port_bindings(self.ctx,
                                                     'foo_port_id')
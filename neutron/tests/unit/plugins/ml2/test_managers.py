@@ -208,6 +208,33 @@ class TestMechManager(base.BaseTestCase):
     def test_port_precommit(self):
         self._check_resource('port')
 
+    @mock.patch.object(mechanism_test.TestMechanismDriver,
+                       'create_port_postcommit')
+    def test_create_port_bulk_postcommit(self, mock_postcommit):
+        contexts = [mock.Mock(), mock.Mock()]
+        self._manager.create_port_bulk_postcommit(contexts)
+        mock_postcommit.assert_has_calls(
+            [mock.call(context) for context in contexts])
+
+    @mock.patch.object(mechanism_test.TestMechanismDriver,
+                       'create_port_postcommit')
+    def test_create_port_bulk_postcommit_bulk_driver(self, mock_postcommit):
+        contexts = [mock.Mock(), mock.Mock()]
+        with mock.patch.object(mechanism_test.TestMechanismDriver,
+                               'create_port_bulk_postcommit',
+                               create=True) as mock_bulk_postcommit:
+            self._manager.create_port_bulk_postcommit(contexts)
+        mock_bulk_postcommit.assert_called_once_with(contexts)
+        mock_postcommit.assert_not_called()
+
+    def test_create_port_bulk_postcommit_failure(self):
+        with mock.patch.object(mechanism_test.TestMechanismDriver,
+                               'create_port_postcommit',
+                               side_effect=RuntimeError()):
+            self.assertRaises(ml2_exc.MechanismDriverError,
+                              self._manager.create_port_bulk_postcommit,
+                              [mock.Mock()])
+
 
 class TypeManagerTestCase(base.BaseTestCase):
 
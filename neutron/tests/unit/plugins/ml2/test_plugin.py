@@ -1554,6 +1554,22 @@ class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
                 self._validate_behavior_on_bulk_failure(
                     res, 'ports', webob.exc.HTTPServerError.code)
 
+    def test_create_ports_bulk_postcommit_failure(self):
+        ctx = context.get_admin_context()
+        with self.network() as net:
+            with mock.patch.object(managers.MechanismManager,
+                                   'create_port_bulk_postcommit',
+                                   side_effect=ml2_exc.MechanismDriverError(
+                    method='create_port_bulk_postcommit')) as postcommit:
+
+                res = self._create_port_bulk(self.fmt, 2, net['network']['id'],
+                                             'test', True, context=ctx)
+                self.assertEqual(2, len(postcommit.call_args[0][0]))
+
+                # All the ports of the batch are deleted
+                self._validate_behavior_on_bulk_failure(
+                    res, 'ports', webob.exc.HTTPServerError.code)
+
     def test_create_ports_bulk_with_sec_grp(self):
         plugin = directory.get_plugin()
         with self.network() as net,\
@@ -348,6 +348,8 @@ class RpcApiTestCase(base.BaseTestCase):
                         'failed_devices_up': [],
                         'devices_down': [],
                         'failed_devices_down': []}
+        elif method == 'get_devices_details_list_and_failed_devices':
+            expected = {'devices': [], 'failed_devices': []}
         else:
             expected = 'foo'
 
@@ -504,6 +506,33 @@ class RpcApiTestCase(base.BaseTestCase):
                            agent_id='fake_agent_id', host='fake_host',
                            version='1.5')
 
+    def test_devices_details_list_and_failed_devices_in_chunks(self):
+        cfg.CONF.set_override('rpc_resources_processing_step', 2)
+        rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
+        ctxt = oslo_context.RequestContext(user_id='fake_user',
+                                           project_id='fake_project')
+        with mock.patch.object(rpcapi.client, 'call') as rpc_mock,\
+                mock.patch.object(rpcapi.client, 'prepare') as prepare_mock:
+            prepare_mock.return_value = rpcapi.client
+            rpc_mock.side_effect = [
+                {'devices': [{'device': 'dev1'}, {'device': 'dev2'}],
+                 'failed_devices': []},
+                {'devices': [], 'failed_devices': ['dev3']}]
+            retval = rpcapi.get_devices_details_list_and_failed_devices(
+                ctxt, devices=['dev1', 'dev2', 'dev3'],
+                agent_id='fake_agent_id', host='fake_host')
+
+        self.assertEqual({'devices': [{'device': 'dev1'},
+                                      {'device': 'dev2'}],
+                          'failed_devices': ['dev3']}, retval)
+        rpc_mock.assert_has_calls([
+            mock.call(ctxt, 'get_devices_details_list_and_failed_devices',
+                      devices=['dev1', 'dev2'], agent_id='fake_agent_id',
+                      host='fake_host'),
+            mock.call(ctxt, 'get_devices_details_list_and_failed_devices',
+                      devices=['dev3'], agent_id='fake_agent_id',
+                      host='fake_host')])
+
     def test_get_ports_by_vnic_type_and_host(self):
         rpcapi = agent_rpc.PluginApi(topics.PLUGIN)
         self._test_rpc_api(rpcapi, None,
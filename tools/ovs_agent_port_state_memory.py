@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Memory used by the per-port bookkeeping of the OVS agent.
+
+Compares, for 1k, 5k and 10k ports, the memory allocated by the port
+bookkeeping of the OVS agent (port state table, VifPort objects of the local
+VLAN mappings and the updated ports set) with the previous model, where
+every structure kept its own copy of the port IDs and VifPort objects had an
+instance dict.
+
+Usage: tools/ovs_agent_port_state_memory.py [NUM_PORTS ...]
+"""
+
+import collections
+import gc
+import sys
+import tracemalloc
+import uuid
+
+from neutron.agent.common import ovs_lib
+from neutron.plugins.ml2.drivers.openvswitch.agent import port_state
+
+PORTS_PER_NETWORK = 20
+DEFAULT_NUM_PORTS = (1000, 5000, 10000)
+
+
+class _DictVifPort:
+    def __init__(self, port_name, ofport, vif_id, vif_mac, switch):
+        self.port_name = port_name
+        self.ofport = ofport
+        self.vif_id = vif_id
+        self.vif_mac = vif_mac
+        self.switch = switch
+
+
+def _copy(value):
+    # A new string with the same value, as received in another message
+    return ''.join(list(value))
+
+
+def _ports(num_ports):
+    for i in range(num_ports):
+        port_id = str(uuid.uuid4())
+        network_id = 'net-%d' % (i // PORTS_PER_NETWORK)
+        yield (port_id, network_id, i // PORTS_PER_NETWORK,
+               'tap%s' % port_id[:11], i + 1, 'fa:16:3e:%06x' % i)
+
+
+def _previous_model(ports):
+    network_ports = collections.defaultdict(
+        lambda: collections.defaultdict(set))
+    vif_ports = collections.defaultdict(dict)
+    updated_ports = set()
+    for port_id, network_id, seg_id, name, ofport, mac in ports:
+        network_ports[_copy(network_id)][seg_id].add(_copy(port_id))
+        vif_ports[network_id][_copy(port_id)] = _DictVifPort(
+            name, ofport, _copy(port_id), mac, None)
+        updated_ports.add(_copy(port_id))
+    return network_ports, vif_ports, updated_ports
+
+
+def _port_state_model(ports):
+    table = port_state.PortStateTable()
+    vif_ports = collections.defaultdict(dict)
+    updated_ports = set()
+    for port_id, network_id, seg_id, name, ofport, mac in ports:
+        state = table.update_network(_copy(port_id), _copy(network_id),
+                                     seg_id)
+        vif_ports[network_id][state.port_id] = ovs_lib.VifPort(
+            name, ofport, port_state.intern_id(_copy(port_id)), mac, None)
+        updated_ports.add(port_state.intern_id(_copy(port_id)))
+    return table, vif_ports, updated_ports
+
+
+def _measure(model, ports):
+    gc.collect()
+    tracemalloc.start()
+    result = model(ports)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or DEFAULT_NUM_PORTS
+    print('%8s %14s %14s %8s' % ('ports', 'previous (KiB)',
+                                 'port state (KiB)', 'saved'))
+    for num_ports in sizes:
+        ports = list(_ports(num_ports))
+        previous = _measure(_previous_model, ports)
+        current = _measure(_port_state_model, ports)
+        print('%8d %14d %16d %7.1f%%' % (
+            num_ports, previous // 1024, current // 1024,
+            100.0 * (previous - current) / previous))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])